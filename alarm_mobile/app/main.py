@@ -16,12 +16,15 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 
+from microapp_backend.event_stream import fibaro_event_stream
+
 load_dotenv()
 
 FIBARO10_BASE_URL = os.getenv("FIBARO10_BASE_URL", "http://fibaro10:8110").rstrip("/")
 ALARM_MOBILE_BUILD = os.getenv("ALARM_MOBILE_BUILD", "8")
 SESSION_COOKIE_NAME = "lilletorget_alarm_session"
 SESSION_MAX_AGE_SECONDS = 60 * 60 * 24 * 30
+ALARM_EVENT_TOPICS = "doors,bollards"
 
 app = FastAPI(title="Lilletorget Alarm", docs_url=None, redoc_url=None)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -351,6 +354,17 @@ async def api_bootstrap(request: Request):
     return await alarm_bootstrap(require_session(request))
 
 
+@app.get("/api/events")
+async def api_events(request: Request):
+    return await fibaro_event_stream(
+        FIBARO10_BASE_URL,
+        require_session(request),
+        ALARM_EVENT_TOPICS,
+        request.headers.get("last-event-id") or request.query_params.get("lastEventId"),
+        user_agent="lilletorget-alarm-mobile/1",
+    )
+
+
 @app.post("/api/notifications/bollards/test")
 async def api_bollard_test(request: Request):
     return await fibaro_request(
@@ -453,7 +467,7 @@ INDEX_HTML = """<!doctype html>
   <link rel="stylesheet" href="/appkit-assets/lilletorget-appkit.css?v=4">
   <link rel="stylesheet" href="/assets/alarm-mobile.css?v=8">
   <script src="/appkit-assets/lilletorget-appkit.js?v=5" defer></script>
-  <script src="/assets/alarm-mobile.js?v=8" defer></script>
+  <script src="/assets/alarm-mobile.js?v=10" defer></script>
 </head>
 <body class="appkit-mobile theme-light">
   <div id="preloader" aria-hidden="true"></div>
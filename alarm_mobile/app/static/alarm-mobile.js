@@ -3,6 +3,8 @@ const state = {
   currentView: "overview",
   currentMonitorId: "",
   busy: false,
+  liveConnected: false,
+  liveReloadTimer: 0,
 };
 
 const $ = (selector, root = document) => root.querySelector(selector);
@@ -604,6 +606,113 @@ async function loadData({ quiet = false } = {}) {
   }
 }
 
+function scheduleLiveReload() {
+  window.clearTimeout(state.liveReloadTimer);
+  state.liveReloadTimer = window.setTimeout(() => {
+    if (state.busy) scheduleLiveReload();
+    else loadData({ quiet: true });
+  }, 1500);
+}
+
+function upsertRow(rows, key, row) {
+  const index = rows.findIndex((item) => String(item?.[key]) === String(row[key]));
+  if (index >= 0) rows[index] = { ...rows[index], ...row };
+  else rows.unshift(row);
+}
+
+function refreshDoorSummary(doors) {
+  const rooms = doors.rooms || [];
+  const history = doors.history || [];
+  doors.alarms = rooms.filter((room) => room.severity === "alert" && room.isOccupied);
+  doors.summary = {
+    ...(doors.summary || {}),
+    active: rooms.filter((room) => room.isOccupied).length,
+    waiting: rooms.filter((room) => room.severity === "waiting").length,
+    warning: rooms.filter((room) => room.severity === "warning").length,
+    alarm: doors.alarms.length,
+    history: history.length,
+    historyActive: history.filter((item) => item.status === "active").length,
+  };
+}
+
+function applyDoorEvent(type, data) {
+  const doors = state.data?.doors;
+  if (!doors) return false;
+  if (type === "door_event") {
+    const room = (doors.rooms || []).find((item) => item.deviceKey && item.deviceKey === data.deviceKey);
+    if (!room) return false;
+    Object.assign(room, {
+      doorState: data.state,
+      doorStateLabel: data.stateLabel,
+      doorChangedAt: data.timestamp,
+      doorChangedLabel: data.timeLabel,
+      doorAgeLabel: data.ageLabel,
+      doorEventId: data.id,
+    });
+    if (data.state === "open" || data.state === "closed") room.isOccupied = data.state === "closed";
+  } else if (type === "alarm") {
+    if (data.id === undefined || data.id === null) return false;
+    doors.history = doors.history || [];
+    upsertRow(doors.history, "id", data);
+    const room = (doors.rooms || []).find((item) => item.deviceKey && item.deviceKey === data.deviceKey);
+    if (room && data.status === "active") Object.assign(room, { severity: data.severity || "alert", detail: data.detail || room.detail });
+    if (room && data.status !== "active" && room.severity === "alert") room.severity = room.isOccupied ? "active" : "free";
+  } else {
+    return false;
+  }
+  refreshDoorSummary(doors);
+  return true;
+}
+
+function applyBollardEvent(type, data) {
+  const bollards = state.data?.bollards;
+  if (!bollards || data.incident_id === undefined || data.incident_id === null) return false;
+  bollards.incidents = bollards.incidents || [];
+  if (type === "incident") upsertRow(bollards.incidents, "incident_id", data);
+  else if (type === "incident_removed") bollards.incidents = bollards.incidents.filter((item) => String(item.incident_id) !== String(data.incident_id));
+  else return false;
+  bollards.summary = {
+    ...(bollards.summary || {}),
+    active_incidents: bollards.incidents.filter((item) => ["active", "acknowledged"].includes(text(item.status).toLowerCase())).length,
+  };
+  return true;
+}
+
+function applyLiveEvent(event) {
+  let message;
+  try {
+    message = JSON.parse(event.data);
+  } catch {
+    scheduleLiveReload();
+    return;
+  }
+  const data = message?.data || {};
+  // Events carry the changed row, which is patched into the loaded payload. Reload markers,
+  // session syncs and rows the view has not loaded yet fall back to one debounced reload.
+  const applied = !data.reload && (event.type === "doors" ? applyDoorEvent(message.type, data) : applyBollardEvent(message.type, data));
+  if (!applied) {
+    scheduleLiveReload();
+    return;
+  }
+  renderOverview();
+  if (event.type === "doors") {
+    renderDoors();
+  } else {
+    renderBollards();
+    renderBollardDetail();
+  }
+}
+
+function connectLiveEvents() {
+  if (!window.EventSource) return;
+  // The browser resends Last-Event-ID on reconnect, so the core replays only what was missed.
+  const source = new EventSource("/api/events", { withCredentials: true });
+  source.addEventListener("open", () => { state.liveConnected = true; });
+  source.addEventListener("error", () => { state.liveConnected = false; });
+  ["doors", "bollards"].forEach((name) => source.addEventListener(name, applyLiveEvent));
+  source.addEventListener("reset", scheduleLiveReload);
+}
+
 document.addEventListener("DOMContentLoaded", async () => {
   state.currentMonitorId = monitorIdFromUrl();
   state.currentView = routeFromUrl();
@@ -626,5 +735,9 @@ document.addEventListener("DOMContentLoaded", async () => {
     slider.dispatchEvent(new Event("input"));
   });
   await loadData();
-  window.setInterval(() => loadData({ quiet: true }), 60_000);
+  connectLiveEvents();
+  window.setInterval(() => {
+    if (!state.liveConnected) loadData({ quiet: true });
+  }, 60_000);
+  window.setInterval(() => loadData({ quiet: true }), 300_000);
 });
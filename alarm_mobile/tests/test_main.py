@@ -96,7 +96,7 @@ class AlarmMobileTests(unittest.IsolatedAsyncioTestCase):
         self.assertIn('id="doorsView"', INDEX_HTML)
         self.assertIn('id="bollardsView"', INDEX_HTML)
         self.assertIn('id="bollardDetailView"', INDEX_HTML)
-        self.assertIn("alarm-mobile.js?v=8", INDEX_HTML)
+        self.assertIn("alarm-mobile.js?v=10", INDEX_HTML)
         self.assertIn("/appkit-assets/lilletorget-appkit.css?v=4", INDEX_HTML)
         self.assertIn('class="appkit-footer bottom-nav"', INDEX_HTML)
 
@@ -0,0 +1,291 @@
+"""Columnar replica of the analysis tables: Parquet per table and month plus a DuckDB catalog.
+
+The worker refreshes the replica from Postgres; every process can query it
+read-only. Without duckdb/pyarrow installed the replica is simply unavailable
+and callers keep reading Postgres.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from functools import cache
+import importlib.util
+import json
+import os
+from pathlib import Path
+import shutil
+from time import time
+from typing import Any, Optional
+
+NULL_PARTITION = "none"
+
+FingerprintFetcher = Callable[["ReplicaTable", Optional[str]], Awaitable[dict[str, list[Any]]]]
+RowFetcher = Callable[["ReplicaTable", str], Awaitable[list[dict[str, Any]]]]
+
+
+@cache
+def replica_supported() -> bool:
+    # duckdb and pyarrow are imported where they are used: together they add about
+    # 0.2 s to every start of the core, most of which never touch the replica.
+    return all(importlib.util.find_spec(name) is not None for name in ("duckdb", "pyarrow"))
+
+
+@dataclass(frozen=True)
+class ReplicaTable:
+    name: str
+    time_column: str
+    columns: tuple[str, ...]
+
+
+def month_key(value: date) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def shift_month(key: str, months: int) -> str:
+    year, month = (int(part) for part in key.split("-"))
+    index = year * 12 + month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def plan_partitions(
+    known: Mapping[str, Mapping[str, Any]],
+    fingerprints: Mapping[str, list[Any]],
+    since: Optional[str],
+) -> tuple[list[str], list[str]]:
+    """Months to re-export and months to drop.
+
+    ``since`` limits the comparison to recent months (incremental refresh);
+    older partitions are kept as they are. ``None`` compares everything.
+    """
+    changed = sorted(month for month, fingerprint in fingerprints.items() if (known.get(month) or {}).get("fingerprint") != list(fingerprint))
+    removed = sorted(
+        month
+        for month in known
+        if month not in fingerprints and (since is None or (month != NULL_PARTITION and month >= since))
+    )
+    return changed, removed
+
+
+def parquet_value(value: Any) -> Any:
+    # JSON columns would otherwise become per-file struct types that do not union.
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+class AnalyticsReplica:
+    def __init__(
+        self,
+        directory: Path,
+        tables: Iterable[ReplicaTable],
+        *,
+        max_age_seconds: float = 5400.0,
+        lookback_months: int = 2,
+        full_refresh_seconds: float = 86400.0,
+    ) -> None:
+        self.directory = Path(directory)
+        self.tables = {table.name: table for table in tables}
+        self.max_age_seconds = max_age_seconds
+        self.lookback_months = max(0, int(lookback_months))
+        self.full_refresh_seconds = full_refresh_seconds
+        self.last_error: Optional[str] = None
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / "manifest.json"
+
+    @property
+    def catalog_path(self) -> Path:
+        return self.directory / "catalog.duckdb"
+
+    def partition_path(self, table: str, month: str) -> Path:
+        return self.directory / table / f"month={month}" / "part.parquet"
+
+    def manifest(self) -> dict[str, Any]:
+        try:
+            payload = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"tables": {}}
+        return payload if isinstance(payload, dict) else {"tables": {}}
+
+    def _save_manifest(self, manifest: Mapping[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.manifest_path.with_suffix(".json.tmp")
+        temporary.write_text(json.dumps(manifest, ensure_ascii=False, indent=1, default=str), encoding="utf-8")
+        os.replace(temporary, self.manifest_path)
+
+    @property
+    def stale_dir(self) -> Path:
+        return self.directory / "stale"
+
+    def invalidate(self, table: str, months: Iterable[str]) -> None:
+        """Mark months of ``table`` as changed in Postgres.
+
+        The table is not read from the replica until the next refresh has
+        re-exported those months. Markers are plain files, so any process can
+        add them while the worker refreshes.
+        """
+        if table not in self.tables:
+            return
+        directory = self.stale_dir / table
+        directory.mkdir(parents=True, exist_ok=True)
+        for month in set(months):
+            (directory / month).touch()
+
+    def stale_months(self) -> dict[str, dict[str, int]]:
+        """Marked months per table, with the marker's mtime so a refresh only clears what it saw."""
+        stale: dict[str, dict[str, int]] = {}
+        for name in self.tables:
+            try:
+                entries = list((self.stale_dir / name).iterdir())
+            except FileNotFoundError:
+                continue
+            months: dict[str, int] = {}
+            for entry in entries:
+                try:
+                    months[entry.name] = entry.stat().st_mtime_ns
+                except FileNotFoundError:
+                    continue
+            if months:
+                stale[name] = months
+        return stale
+
+    def _clear_stale(self, seen: Mapping[str, Mapping[str, int]]) -> None:
+        for name, months in seen.items():
+            for month, mtime in months.items():
+                marker = self.stale_dir / name / month
+                try:
+                    # Marked again during the refresh: keep it for the next run.
+                    if marker.stat().st_mtime_ns == mtime:
+                        marker.unlink()
+                except FileNotFoundError:
+                    continue
+
+    def is_fresh(self, tables: Iterable[str] = ()) -> bool:
+        if not replica_supported() or not self.catalog_path.exists():
+            return False
+        manifest = self.manifest()
+        refreshed_at = manifest.get("refreshed_at")
+        if not isinstance(refreshed_at, (int, float)) or time() - refreshed_at > self.max_age_seconds:
+            return False
+        present = manifest.get("tables") or {}
+        tables = list(tables)
+        stale = self.stale_months()
+        if any(name in stale for name in (tables or stale)):
+            return False
+        return all(name in present for name in tables)
+
+    def refreshed_at(self) -> Optional[datetime]:
+        refreshed_at = self.manifest().get("refreshed_at")
+        return datetime.fromtimestamp(refreshed_at) if isinstance(refreshed_at, (int, float)) else None
+
+    async def refresh(self, fingerprints: FingerprintFetcher, rows: RowFetcher) -> dict[str, Any]:
+        """Re-export the months whose fingerprint changed, then rebuild the catalog."""
+        if not replica_supported():
+            raise RuntimeError("duckdb og pyarrow er ikke installert.")
+        manifest = self.manifest()
+        now = time()
+        full = now - float(manifest.get("full_refreshed_at") or 0) >= self.full_refresh_seconds
+        since = None if full else shift_month(month_key(datetime.fromtimestamp(now).date()), -self.lookback_months)
+        tables_manifest: dict[str, Any] = dict(manifest.get("tables") or {})
+        summary: dict[str, Any] = {"full": full, "since": since, "tables": {}}
+        stale = self.stale_months()
+        for table in self.tables.values():
+            known = dict((tables_manifest.get(table.name) or {}).get("partitions") or {})
+            stale_months = set(stale.get(table.name) or {})
+            table_since = since
+            dated = [month for month in stale_months if month != NULL_PARTITION]
+            if table_since is not None and dated:
+                table_since = min(table_since, min(dated))
+            current = await fingerprints(table, table_since)
+            changed, removed = plan_partitions(known, current, table_since)
+            # An in-place update can leave the fingerprint as it was; a marked month is exported anyway.
+            changed = sorted(set(changed) | (stale_months & set(current)))
+            for month in changed:
+                exported = await rows(table, month)
+                await asyncio.to_thread(self._write_partition, table, month, exported)
+                known[month] = {"fingerprint": list(current[month]), "rows": len(exported), "exported_at": now}
+            for month in removed:
+                shutil.rmtree(self.partition_path(table.name, month).parent, ignore_errors=True)
+                known.pop(month, None)
+            tables_manifest[table.name] = {"partitions": known}
+            summary["tables"][table.name] = {"exported": changed, "removed": removed}
+        await asyncio.to_thread(self._build_catalog, tables_manifest)
+        manifest = {
+            "refreshed_at": now,
+            "full_refreshed_at": now if full else manifest.get("full_refreshed_at"),
+            "tables": tables_manifest,
+        }
+        self._save_manifest(manifest)
+        self._clear_stale(stale)
+        self.last_error = None
+        return summary
+
+    def _write_partition(self, table: ReplicaTable, month: str, rows: list[dict[str, Any]]) -> None:
+        path = self.partition_path(table.name, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        columns = {column: [parquet_value(row.get(column)) for row in rows] for column in table.columns}
+        temporary = path.with_suffix(".parquet.tmp")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table(columns), temporary, compression="zstd")
+        os.replace(temporary, path)
+
+    def _build_catalog(self, tables_manifest: Mapping[str, Any]) -> None:
+        # Build beside the live catalog and swap it in, so readers never see a half-written file.
+        temporary = self.catalog_path.with_suffix(".duckdb.tmp")
+        temporary.unlink(missing_ok=True)
+        import duckdb
+
+        connection = duckdb.connect(str(temporary))
+        try:
+            for name, entry in tables_manifest.items():
+                if not (entry or {}).get("partitions") or name not in self.tables:
+                    continue
+                pattern = str(self.directory / name / "*" / "*.parquet").replace("'", "''")
+                connection.execute(
+                    f'CREATE VIEW "{name}" AS SELECT * FROM read_parquet(\'{pattern}\', union_by_name = true)'
+                )
+        finally:
+            connection.close()
+        os.replace(temporary, self.catalog_path)
+
+    def query(self, sql: str, parameters: Optional[list[Any]] = None) -> list[dict[str, Any]]:
+        """Run one read-only query against the catalog. Blocking; call it from a thread."""
+        import duckdb
+
+        connection = duckdb.connect(str(self.catalog_path), read_only=True)
+        try:
+            # The SQL may come from the AI assistant: only the replica's own Parquet files are
+            # readable, and the query cannot turn file access back on.
+            connection.execute("SET allowed_directories = ?", [[str(self.directory)]])
+            connection.execute("SET enable_external_access = false")
+            connection.execute("SET lock_configuration = true")
+            cursor = connection.execute(sql, parameters or [])
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            connection.close()
+
+    def payload(self) -> dict[str, Any]:
+        manifest = self.manifest()
+        tables = manifest.get("tables") or {}
+        refreshed_at = self.refreshed_at()
+        return {
+            "supported": replica_supported(),
+            "fresh": self.is_fresh(),
+            "refreshedAt": refreshed_at.isoformat() if refreshed_at else None,
+            "tables": {
+                name: {
+                    "partitions": len((entry or {}).get("partitions") or {}),
+                    "rows": sum(int(item.get("rows") or 0) for item in ((entry or {}).get("partitions") or {}).values()),
+                }
+                for name, entry in tables.items()
+            },
+            "error": self.last_error,
+        }
@@ -1,13 +1,13 @@
 from typing import Optional
 
 from api_types import BuildLogEntryPayload, BuildLogResponsePayload
-from build_log import APP_BUILD, BUILD_LOG, build_log_entry_by_build, build_log_list_row, normalized_build_log_entry
+from build_log import APP_BUILD, build_log_entry_by_build, build_log_list_row, load_build_log, normalized_build_log_entry
 
 
 def admin_builds_payload() -> BuildLogResponsePayload:
     return {
         "currentBuild": APP_BUILD,
-        "rows": [build_log_list_row(row) for row in BUILD_LOG],
+        "rows": [build_log_list_row(row) for row in load_build_log()],
     }
 
 
@@ -2,7 +2,8 @@ import asyncio
 import logging
 from collections.abc import AsyncIterator, Awaitable, Callable
 from contextlib import asynccontextmanager
-from typing import Any
+from contextvars import Context
+from typing import Any, Optional
 
 
 AsyncHandler = Callable[[], Awaitable[None]]
@@ -12,8 +13,9 @@ TaskFactory = Callable[[], Awaitable[Any]]
 class BackgroundTaskSupervisor:
     """Own long-running application tasks and stop them as one unit."""
 
-    def __init__(self, logger: logging.Logger) -> None:
+    def __init__(self, logger: logging.Logger, task_context: Optional[Callable[[], Context]] = None) -> None:
         self._logger = logger
+        self._task_context = task_context
         self._tasks: dict[str, asyncio.Task[Any]] = {}
 
     def start(self, name: str, factory: TaskFactory) -> asyncio.Task[Any]:
@@ -21,7 +23,8 @@ class BackgroundTaskSupervisor:
         if current is not None and not current.done():
             return current
 
-        task = asyncio.create_task(factory(), name=name)
+        context = self._task_context() if self._task_context is not None else None
+        task = asyncio.create_task(factory(), name=name, context=context)
         task.add_done_callback(lambda completed, task_name=name: self._task_finished(task_name, completed))
         self._tasks[name] = task
         return task
@@ -0,0 +1,384 @@
+"""Event-driven evaluation of the automation workbench rules.
+
+Enabled rules in ``Observer`` or ``Aktiv`` mode are compiled once per version
+(id and ``updated_at``) into an index keyed by event source and device, so an
+ingest event only reaches the few rules that listen for it. Conditions become
+Python predicates at compile time, and matches and evaluation times are
+buffered until the caller writes them in one batch. Cooldowns are checked in
+memory first; the caller claims ``last_triggered_at`` in the database when it
+writes a match, so several processes never fire a rule within one cooldown.
+
+Trigger config (JSON)::
+
+    {"kilde": "dører", "enhet": [479, "door_solrom_01"], "hendelse": "door_change"}
+
+``kilde`` falls back to the rule's domain (``Dører``, ``Lys``, ...). Conditions
+map fields of the event data to a value or to operators::
+
+    {"state": "closed", "batteryLevel": {"<": 20}, "any": [{"deviceId": 479}, {"deviceId": 543}]}
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import operator
+from time import monotonic
+from typing import Any, Optional
+
+
+EVALUATED_MODES = {"Observer", "Aktiv"}
+EVENT_TRIGGER_TYPES = {"Hendelse", "Terskel", "Datakilde"}
+SOURCE_ALIASES = {
+    "doors": "doors",
+    "door": "doors",
+    "dører": "doors",
+    "dør": "doors",
+    "lights": "lights",
+    "lys": "lights",
+    "utelys": "lights",
+    "ventilation": "ventilation",
+    "ventilasjon": "ventilation",
+    "bollards": "bollards",
+    "pullerter": "bollards",
+    "pullert": "bollards",
+    "sun2_sessions": "sun2_sessions",
+    "sun2": "sun2_sessions",
+    "soling": "sun2_sessions",
+    "solinger": "sun2_sessions",
+}
+DOMAIN_SOURCES = {"Dører": "doors", "Lys": "lights", "Ventilasjon": "ventilation", "Soling": "sun2_sessions"}
+
+
+class RuleError(ValueError):
+    pass
+
+
+def _equal(actual: Any, expected: Any) -> bool:
+    if isinstance(actual, str) and isinstance(expected, str):
+        return actual.casefold() == expected.casefold()
+    if isinstance(actual, bool) or isinstance(expected, bool):
+        return actual is expected
+    if isinstance(actual, (int, float)) and isinstance(expected, (int, float)):
+        return actual == expected
+    return actual == expected or (actual is not None and str(actual) == str(expected))
+
+
+def _compare(function: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def compare(actual: Any, expected: Any) -> bool:
+        try:
+            return actual is not None and bool(function(actual, expected))
+        except TypeError:
+            return False
+
+    return compare
+
+
+def _contains(actual: Any, expected: Any) -> bool:
+    if isinstance(actual, str):
+        return str(expected).casefold() in actual.casefold()
+    return expected in actual
+
+
+OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "=": _equal,
+    "==": _equal,
+    "!=": lambda actual, expected: not _equal(actual, expected),
+    "<": _compare(operator.lt),
+    "<=": _compare(operator.le),
+    ">": _compare(operator.gt),
+    ">=": _compare(operator.ge),
+    "in": lambda actual, expected: any(_equal(actual, item) for item in expected),
+    "not_in": lambda actual, expected: not any(_equal(actual, item) for item in expected),
+    "contains": _compare(_contains),
+    "exists": lambda actual, expected: (actual is not None) == bool(expected),
+}
+
+
+def _listed(value: Any) -> list[Any]:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _getter(path: str) -> Callable[[Mapping[str, Any]], Any]:
+    parts = tuple(part for part in str(path).split(".") if part)
+    if not parts:
+        raise RuleError("Tomt feltnavn i betingelsene")
+
+    def get(data: Mapping[str, Any]) -> Any:
+        value: Any = data
+        for part in parts:
+            if not isinstance(value, Mapping):
+                return None
+            value = value.get(part)
+        return value
+
+    return get
+
+
+def compile_conditions(conditions: Any) -> Callable[[Mapping[str, Any]], bool]:
+    """Predicate over event data; an empty condition set always matches."""
+    if conditions in (None, {}, []):
+        return lambda data: True
+    if isinstance(conditions, list):
+        predicates = [compile_conditions(item) for item in conditions]
+        return lambda data: all(predicate(data) for predicate in predicates)
+    if not isinstance(conditions, Mapping):
+        raise RuleError("Betingelsene må være et JSON-objekt")
+    if set(conditions) == {"verdi"} and isinstance(conditions["verdi"], list):
+        return compile_conditions(conditions["verdi"])
+    if set(conditions) <= {"beskrivelse", "verdi"}:
+        raise RuleError("Betingelsene er fritekst og kan ikke evalueres")
+    predicates: list[Callable[[Mapping[str, Any]], bool]] = []
+    for key, expected in conditions.items():
+        if key == "beskrivelse":
+            continue
+        if key in {"all", "alle"}:
+            predicates.append(compile_conditions(_listed(expected)))
+        elif key in {"any", "noen"}:
+            options = [compile_conditions(item) for item in _listed(expected)]
+            predicates.append(lambda data, options=options: any(option(data) for option in options))
+        elif key in {"not", "ikke"}:
+            negated = compile_conditions(expected)
+            predicates.append(lambda data, negated=negated: not negated(data))
+        else:
+            predicates.append(_field_predicate(key, expected))
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda data: all(predicate(data) for predicate in predicates)
+
+
+def _field_predicate(path: str, expected: Any) -> Callable[[Mapping[str, Any]], bool]:
+    get = _getter(path)
+    if not isinstance(expected, Mapping):
+        if isinstance(expected, list):
+            return lambda data: OPERATORS["in"](get(data), expected)
+        return lambda data: _equal(get(data), expected)
+    checks: list[tuple[Callable[[Any, Any], bool], Any]] = []
+    for name, value in expected.items():
+        function = OPERATORS.get(str(name))
+        if function is None:
+            raise RuleError(f"Ukjent operator {name!r} for {path}")
+        if name in {"in", "not_in"}:
+            value = _listed(value)
+        checks.append((function, value))
+    return lambda data: all(function(get(data), value) for function, value in checks)
+
+
+@dataclass(frozen=True)
+class RuleEvent:
+    source: str
+    event_type: str
+    data: Mapping[str, Any]
+    devices: tuple[str, ...] = ()
+    at: Optional[datetime] = None
+
+    def summary(self) -> str:
+        device = f" {self.devices[0]}" if self.devices else ""
+        return f"{self.source}/{self.event_type}{device}"
+
+
+@dataclass(eq=False)
+class CompiledRule:
+    id: int
+    version: tuple[Any, ...]
+    name: str
+    mode: str
+    source: Optional[str] = None
+    devices: frozenset[str] = frozenset()
+    event_types: frozenset[str] = frozenset()
+    predicate: Callable[[Mapping[str, Any]], bool] = lambda data: True
+    actions: Mapping[str, Any] = field(default_factory=dict)
+    cooldown: timedelta = timedelta(0)
+    error: Optional[str] = None
+
+
+@dataclass
+class RuleMatch:
+    rule_id: int
+    rule_name: str
+    mode: str
+    event: RuleEvent
+    matched_at: datetime
+    actions: Mapping[str, Any]
+    cooldown: timedelta = timedelta(0)
+
+
+def compile_rule(row: Any) -> Optional[CompiledRule]:
+    """Compiled form of an automation row, or None when the row is not evaluated on events."""
+    if not row.enabled or row.mode not in EVALUATED_MODES or row.trigger_type not in EVENT_TRIGGER_TYPES:
+        return None
+    rule = CompiledRule(
+        id=int(row.id),
+        version=(row.id, row.updated_at),
+        name=str(row.name),
+        mode=str(row.mode),
+        actions=row.actions if isinstance(row.actions, Mapping) else {},
+        cooldown=timedelta(minutes=max(0, int(row.cooldown_minutes or 0))),
+    )
+    trigger = row.trigger_config if isinstance(row.trigger_config, Mapping) else {}
+    try:
+        source_text = trigger.get("kilde") or trigger.get("source")
+        source = SOURCE_ALIASES.get(str(source_text).strip().casefold()) if source_text else DOMAIN_SOURCES.get(row.domain)
+        if source is None:
+            raise RuleError(f"Ukjent eller manglende kilde i utløseren: {source_text or row.domain}")
+        rule.source = source
+        rule.devices = frozenset(str(item) for item in _listed(trigger.get("enhet", trigger.get("device"))))
+        rule.event_types = frozenset(str(item) for item in _listed(trigger.get("hendelse", trigger.get("event"))))
+        rule.predicate = compile_conditions(row.conditions)
+    except RuleError as exc:
+        rule.error = str(exc)
+    return rule
+
+
+class RuleEngine:
+    def __init__(self, max_age_seconds: float = 60.0, match_limit: int = 1000) -> None:
+        self.max_age_seconds = max(1.0, float(max_age_seconds))
+        self.dispatched = 0
+        self.evaluations = 0
+        self.matches = 0
+        self.suppressed = 0
+        self.compiles = 0
+        self._rules: dict[int, CompiledRule] = {}
+        self._index: dict[tuple[str, Optional[str]], list[CompiledRule]] = {}
+        self._sources: frozenset[str] = frozenset()
+        self._loaded_at: Optional[float] = None
+        self._last_fired: dict[int, datetime] = {}
+        self._evaluated: dict[int, tuple[datetime, str]] = {}
+        self._pending: deque[RuleMatch] = deque(maxlen=max(1, match_limit))
+        self._flush_requested: Optional[asyncio.Event] = None
+
+    @property
+    def rules(self) -> list[CompiledRule]:
+        return list(self._rules.values())
+
+    def needs_load(self) -> bool:
+        return self._loaded_at is None or monotonic() - self._loaded_at >= self.max_age_seconds
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def load(self, rows: Iterable[Any], now: datetime) -> None:
+        """Replace the rule set; unchanged rule versions keep their compiled predicates."""
+        rules: dict[int, CompiledRule] = {}
+        for row in rows:
+            if row.last_triggered_at is not None:
+                # Another process may have fired the rule since the last load.
+                known = self._last_fired.get(int(row.id))
+                if known is None or row.last_triggered_at > known:
+                    self._last_fired[int(row.id)] = row.last_triggered_at
+            current = self._rules.get(int(row.id))
+            if current is not None and current.version == (row.id, row.updated_at):
+                rules[current.id] = current
+                continue
+            rule = compile_rule(row)
+            if rule is None:
+                continue
+            self.compiles += 1
+            rules[rule.id] = rule
+            if rule.error:
+                self._evaluated[rule.id] = (now, f"Ugyldig regel: {rule.error}")
+        index: dict[tuple[str, Optional[str]], list[CompiledRule]] = {}
+        for rule in rules.values():
+            if rule.error or rule.source is None:
+                continue
+            for device in rule.devices or (None,):
+                index.setdefault((rule.source, device), []).append(rule)
+        self._rules = rules
+        self._index = index
+        self._sources = frozenset(source for source, _device in index)
+        self._loaded_at = monotonic()
+
+    def listens(self, source: str) -> bool:
+        """Cheap check callers use before building event data nobody evaluates."""
+        return source in self._sources
+
+    def candidates(self, event: RuleEvent) -> list[CompiledRule]:
+        found = list(self._index.get((event.source, None), ()))
+        for device in event.devices:
+            for rule in self._index.get((event.source, device), ()):
+                if rule not in found:
+                    found.append(rule)
+        return found
+
+    def dispatch(self, event: RuleEvent, now: datetime) -> list[RuleMatch]:
+        """Evaluate the rules listening for ``event``; matches are buffered for the next flush."""
+        self.dispatched += 1
+        matches: list[RuleMatch] = []
+        for rule in self.candidates(event):
+            if rule.event_types and event.event_type not in rule.event_types:
+                continue
+            self.evaluations += 1
+            try:
+                matched = rule.predicate(event.data)
+            except Exception as exc:
+                self._evaluated[rule.id] = (now, f"Feil i betingelse: {exc}")
+                continue
+            if not matched:
+                self._evaluated[rule.id] = (now, f"Ikke oppfylt: {event.summary()}")
+                continue
+            last_fired = self._last_fired.get(rule.id)
+            if last_fired is not None and rule.cooldown and now - last_fired < rule.cooldown:
+                self.suppressed += 1
+                self._evaluated[rule.id] = (now, f"Oppfylt i ventetid: {event.summary()}")
+                continue
+            self._last_fired[rule.id] = now
+            verb = "Utløst" if rule.mode == "Aktiv" else "Observert"
+            self._evaluated[rule.id] = (now, f"{verb}: {event.summary()}")
+            match = RuleMatch(rule.id, rule.name, rule.mode, event, now, rule.actions, rule.cooldown)
+            self._pending.append(match)
+            matches.append(match)
+        if matches:
+            self.matches += len(matches)
+            if self._flush_requested is not None:
+                self._flush_requested.set()
+        return matches
+
+    def drain(self) -> tuple[dict[int, tuple[datetime, str]], list[RuleMatch]]:
+        evaluated, self._evaluated = self._evaluated, {}
+        matches = list(self._pending)
+        self._pending.clear()
+        return evaluated, matches
+
+    def restore(self, evaluated: Mapping[int, tuple[datetime, str]], matches: Iterable[RuleMatch]) -> None:
+        """Put back a batch whose write failed, without overwriting newer evaluations."""
+        for rule_id, value in evaluated.items():
+            self._evaluated.setdefault(rule_id, value)
+        # Restored matches are the oldest; when the buffer is full they are the ones dropped.
+        self._pending = deque([*matches, *self._pending], maxlen=self._pending.maxlen)
+
+    def note_suppressed(self, match: RuleMatch, fired_at: Optional[datetime] = None) -> None:
+        """A match that another process had already fired within the cooldown."""
+        self.suppressed += 1
+        if fired_at is not None:
+            known = self._last_fired.get(match.rule_id)
+            if known is None or fired_at > known:
+                self._last_fired[match.rule_id] = fired_at
+
+    async def wait_for_matches(self, timeout: float) -> None:
+        if self._flush_requested is None:
+            self._flush_requested = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._flush_requested.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._flush_requested.clear()
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "loaded": self._loaded_at is not None,
+            "rules": len(self._rules),
+            "invalid": sum(1 for rule in self._rules.values() if rule.error),
+            "indexKeys": len(self._index),
+            "compiles": self.compiles,
+            "dispatched": self.dispatched,
+            "evaluations": self.evaluations,
+            "matches": self.matches,
+            "suppressed": self.suppressed,
+            "pending": len(self._pending),
+        }
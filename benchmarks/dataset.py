@@ -0,0 +1,321 @@
+"""Seeded synthetic dataset for the benchmark suite.
+
+The generators are deterministic for a given seed and anchor time, so two
+runs against an empty database produce the same rows. ``scale=1.0`` is
+roughly the volume the QNAP holds today: about a year of parking and Sun2
+sessions, two weeks of 30 second Fibaro samples and two months of door and
+Protect events.
+
+    python -m benchmarks.dataset --database-url postgresql+asyncpg://... --scale 1.0
+"""
+
+import argparse
+import asyncio
+from collections.abc import Iterator
+from datetime import datetime, time, timedelta
+import json
+import os
+import random
+from typing import Any, Optional
+
+
+DEFAULT_SEED = 20260601
+
+PARKING_DAYS = 400
+PARKING_SESSIONS_PER_DAY = 120
+SUN2_DAYS = 400
+SUN2_SESSIONS_PER_DAY = 60
+ENERGY_SAMPLE_DAYS = 14
+ENERGY_SAMPLE_SECONDS = 30
+ENERGY_HOURLY_DAYS = 400
+DOOR_EVENT_DAYS = 60
+PROTECT_EVENT_DAYS = 30
+PROTECT_EVENTS_PER_DAY = 500
+
+PARKING_AREAS = (
+    (4101, "Fibaro10 Nord", "easypark"),
+    (4102, "Fibaro10 Sør", "easypark"),
+    (7721, "Fibaro10 Gate", "apcoa"),
+)
+SUN2_ROOMS = (
+    ("rom-01", "640"), ("rom-02", "641"), ("rom-03", "642"), ("rom-04", "643"),
+    ("rom-05", "644"), ("rom-06", "645"), ("rom-07", "646"), ("rom-08", "647"),
+    ("rom-09", "648"), ("rom-11", "679"), ("rom-12", "680"), ("rom-13", "681"),
+)
+PROTECT_CAMERAS = ("cam-inngang", "cam-parkering", "cam-bakgard", "cam-solrom")
+OPENING_HOUR = 7
+CLOSING_HOUR = 23
+
+
+def _scaled(value: int, scale: float) -> int:
+    return max(1, int(round(value * scale)))
+
+
+def _opening_minutes(rng: random.Random) -> int:
+    # Busier in the afternoon and evening, like the real site.
+    return int(rng.triangular(OPENING_HOUR * 60, CLOSING_HOUR * 60 - 30, 17 * 60))
+
+
+def _license_number(rng: random.Random) -> str:
+    return f"{rng.choice('EKLNRSUVZ')}{rng.choice('ABCDEFHJKL')}{rng.randint(10000, 99999)}"
+
+
+def parking_rows(rng: random.Random, now: datetime, scale: float = 1.0) -> Iterator[dict[str, Any]]:
+    parking_id = 900_000_000
+    plates = [_license_number(rng) for _ in range(_scaled(4000, scale))]
+    for day_offset in range(PARKING_DAYS, -1, -1):
+        day = now.date() - timedelta(days=day_offset)
+        for _ in range(_scaled(PARKING_SESSIONS_PER_DAY, scale)):
+            start_time = datetime.combine(day, time.min) + timedelta(minutes=_opening_minutes(rng))
+            if start_time > now:
+                continue
+            minutes = round(rng.lognormvariate(3.9, 0.55), 1)
+            end_time = start_time + timedelta(minutes=minutes)
+            ongoing = end_time > now
+            area_number, parking_area, source_system = rng.choice(PARKING_AREAS)
+            fee_inc_vat = round(max(10.0, minutes * 0.9), 2)
+            parking_id += 1
+            yield {
+                "parking_area": parking_area,
+                "source_system": source_system,
+                "area_number": area_number,
+                "parking_id": parking_id,
+                "start_time": start_time,
+                "end_time": None if ongoing else end_time,
+                "parking_time_min": None if ongoing else minutes,
+                "fee_ex_vat": round(fee_inc_vat / 1.25, 2),
+                "fee_inc_vat": fee_inc_vat,
+                "fee_vat": round(fee_inc_vat - fee_inc_vat / 1.25, 2),
+                "car_license_number": rng.choice(plates),
+                "user_interface": rng.choice(("app", "app", "web", "sms")),
+                "subtype": None,
+                "status": "ongoing" if ongoing else "completed",
+                "imported_at": now,
+                "raw_filename": "benchmark.csv",
+            }
+
+
+def sun2_session_rows(rng: random.Random, now: datetime, scale: float = 1.0) -> Iterator[dict[str, Any]]:
+    session_id = 0
+    for day_offset in range(SUN2_DAYS, -1, -1):
+        day = now.date() - timedelta(days=day_offset)
+        for _ in range(_scaled(SUN2_SESSIONS_PER_DAY, scale)):
+            started_at = datetime.combine(day, time.min) + timedelta(minutes=_opening_minutes(rng))
+            if started_at > now:
+                continue
+            room_id, bed_id = rng.choice(SUN2_ROOMS)
+            duration = float(rng.choice((6, 8, 10, 12, 12, 15, 15, 20)))
+            session_id += 1
+            yield {
+                "source_session_id": f"bench-{session_id}",
+                "started_at": started_at,
+                "ended_at": started_at + timedelta(minutes=duration),
+                "stat_date": day,
+                "room_id": room_id,
+                "room_key": room_id.replace("-", "_"),
+                "room": f"Rom {int(room_id[-2:])}",
+                "source_room_name": f"Rom {int(room_id[-2:])}",
+                "sun2_user_id": str(rng.randint(1, 9000)),
+                "sun2_center_id": "1",
+                "sun2_bed_id": bed_id,
+                "customer_type": rng.choice(("member", "member", "guest")),
+                "gender": rng.choice(("F", "F", "M")),
+                "payment_method": rng.choice(("card", "card", "vipps", "clip")),
+                "duration_minutes": duration,
+                "paid_amount_kr": round(duration * rng.choice((9.0, 10.0, 12.0)), 2),
+                "status": "completed",
+                "source": "sun2_session_scraper",
+                "imported_at": now,
+            }
+
+
+def energy_sample_rows(rng: random.Random, now: datetime, scale: float = 1.0) -> Iterator[dict[str, Any]]:
+    step = timedelta(seconds=ENERGY_SAMPLE_SECONDS)
+    count = int(_scaled(ENERGY_SAMPLE_DAYS, scale) * 86400 / ENERGY_SAMPLE_SECONDS)
+    bucket = now.replace(second=0, microsecond=0) - step * count
+    totals = dict.fromkeys(("inntak", "varmepumper", "belysning", "massasje", "annet", "avfukter"), 0.0)
+    for _ in range(count):
+        bucket += step
+        is_open = OPENING_HOUR <= bucket.hour < CLOSING_HOUR
+        sunbeds_w = sum(rng.choice((0.0, 0.0, 3800.0)) for _ in range(4)) if is_open else 0.0
+        watts = {
+            "varmepumper": rng.uniform(600, 2400),
+            "belysning": rng.uniform(400, 900) if is_open else rng.uniform(20, 80),
+            "massasje": rng.choice((0.0, 0.0, 650.0)) if is_open else 0.0,
+            "annet": rng.uniform(150, 400),
+            "avfukter": rng.choice((0.0, 380.0)),
+        }
+        watts["inntak"] = sum(watts.values()) + sunbeds_w + rng.uniform(-50, 50)
+        hours = ENERGY_SAMPLE_SECONDS / 3600
+        row: dict[str, Any] = {"timestamp": bucket, "bucket_start": bucket, "source": "benchmark"}
+        for key, value in watts.items():
+            delta = value * hours / 1000
+            totals[key] += delta
+            row[f"{key}_w"] = round(value, 1)
+            row[f"{key}_kwh"] = round(totals[key], 4)
+            row[f"{key}_delta_kwh"] = round(delta, 6)
+        computed = watts["inntak"] - sum(value for key, value in watts.items() if key != "inntak")
+        row["differanse_beregnet_w"] = round(computed, 1)
+        row["differanse_beregnet_delta_kwh"] = round(computed * hours / 1000, 6)
+        yield row
+
+
+def energy_hourly_rows(rng: random.Random, now: datetime, scale: float = 1.0) -> Iterator[dict[str, Any]]:
+    start = datetime.combine(now.date() - timedelta(days=_scaled(ENERGY_HOURLY_DAYS, scale)), time.min)
+    measured_at = start
+    while measured_at < now.replace(minute=0, second=0, microsecond=0):
+        is_open = OPENING_HOUR <= measured_at.hour < CLOSING_HOUR
+        yield {
+            "meter_id": "benchmark-meter",
+            "measured_at": measured_at,
+            "stat_date": measured_at.date(),
+            "year": measured_at.year,
+            "month": measured_at.month,
+            "day": measured_at.day,
+            "hour": measured_at.hour,
+            "consumption_kwh": round(rng.uniform(14, 32) if is_open else rng.uniform(3, 7), 3),
+            "status": "OK",
+            "is_estimated": False,
+            "source": "benchmark",
+            "imported_at": now,
+        }
+        measured_at += timedelta(hours=1)
+
+
+def door_event_rows(
+    rng: random.Random,
+    now: datetime,
+    devices: list[tuple[int, str]],
+    scale: float = 1.0,
+) -> Iterator[dict[str, Any]]:
+    """Open/close pairs per sunroom door, roughly one visit an hour while open."""
+    for day_offset in range(_scaled(DOOR_EVENT_DAYS, scale), -1, -1):
+        day = now.date() - timedelta(days=day_offset)
+        for device_id, device_key in devices:
+            minute = OPENING_HOUR * 60 + rng.randint(0, 40)
+            while minute < CLOSING_HOUR * 60:
+                closed_at = datetime.combine(day, time.min) + timedelta(minutes=minute)
+                opened_at = closed_at + timedelta(minutes=rng.choice((8, 10, 13, 15, 18, 22)))
+                if opened_at > now:
+                    break
+                for timestamp, state in ((closed_at, False), (opened_at, True)):
+                    yield {
+                        "timestamp": timestamp,
+                        "event_type": "door_change",
+                        "action": "OPEN" if state else "CLOSED",
+                        "device_key": device_key,
+                        "device_id": device_id,
+                        "source": "HC3",
+                        "raw_value": "true" if state else "false",
+                        "state": state,
+                        "previous_state": not state,
+                        "extra": {},
+                    }
+                minute += rng.randint(30, 110)
+
+
+def protect_event_rows(rng: random.Random, now: datetime, scale: float = 1.0) -> Iterator[dict[str, Any]]:
+    event_id = 0
+    for day_offset in range(_scaled(PROTECT_EVENT_DAYS, scale), -1, -1):
+        day = now.date() - timedelta(days=day_offset)
+        for _ in range(_scaled(PROTECT_EVENTS_PER_DAY, scale)):
+            start_at = datetime.combine(day, time.min) + timedelta(seconds=rng.randint(0, 86399))
+            if start_at > now:
+                continue
+            event_id += 1
+            camera_id = rng.choice(PROTECT_CAMERAS)
+            event_type = rng.choice(("motion", "motion", "smartDetectZone", "smartDetectLine"))
+            yield {
+                "console_key": "benchmark",
+                "source_event_id": f"bench-{event_id}",
+                "message_type": "add",
+                "event_type": event_type,
+                "model_key": "event",
+                "camera_id": camera_id,
+                "camera_name": camera_id.removeprefix("cam-").title(),
+                "start_at": start_at,
+                "end_at": start_at + timedelta(seconds=rng.randint(4, 90)),
+                "score": rng.randint(40, 99),
+                "raw": json.dumps({"type": event_type, "camera": camera_id}),
+            }
+
+
+def _chunks(rows: Iterator[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    chunk: list[dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def seed(
+    database_url: Optional[str] = None,
+    scale: float = 1.0,
+    seed_value: int = DEFAULT_SEED,
+    now: Optional[datetime] = None,
+    chunk_size: int = 2000,
+) -> dict[str, int]:
+    """Replace the benchmark tables with a fresh synthetic dataset and return row counts per table."""
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    import main
+    from sqlalchemy import insert, text
+
+    now = now or main.local_now_naive()
+    configs = [config for config in main.DOOR_SENSOR_CONFIG if config.get("group_key") == "solrom"]
+    devices = [(int(config["device_id"]), config["device_key"]) for config in configs if config.get("device_id") is not None]
+    tables = {
+        main.ParkingSession.__table__: parking_rows(random.Random(seed_value), now, scale),
+        main.Sun2TanningSession.__table__: sun2_session_rows(random.Random(seed_value + 1), now, scale),
+        main.EnergyFibaroSample.__table__: energy_sample_rows(random.Random(seed_value + 2), now, scale),
+        main.EnergyHourlyConsumption.__table__: energy_hourly_rows(random.Random(seed_value + 3), now, scale),
+        main.DoorEvent.__table__: door_event_rows(random.Random(seed_value + 4), now, devices, scale),
+    }
+    counts: dict[str, int] = {}
+    async with main.engine.begin() as conn:
+        # The endpoints also read tables that are not seeded (occupancy state, settings); they stay empty.
+        await conn.run_sync(main.Base.metadata.create_all)
+        for table, rows in tables.items():
+            # CASCADE: tables that reference these (session images etc.) may exist in a fully migrated database.
+            await conn.execute(text(f"TRUNCATE {table.name} RESTART IDENTITY CASCADE"))
+            counts[table.name] = 0
+            for chunk in _chunks(rows, chunk_size):
+                await conn.execute(insert(table), chunk)
+                counts[table.name] += len(chunk)
+        # The Protect Ledger owns its table; only fill it when that schema is already in this database.
+        if (await conn.execute(text("SELECT to_regclass('unifi_protect_events')"))).scalar() is not None:
+            await conn.execute(text("DELETE FROM unifi_protect_events WHERE console_key = 'benchmark'"))
+            counts["unifi_protect_events"] = 0
+            statement = text(
+                "INSERT INTO unifi_protect_events "
+                "(console_key, source_event_id, message_type, event_type, model_key, camera_id, camera_name, start_at, end_at, score, raw) "
+                "VALUES (:console_key, :source_event_id, :message_type, :event_type, :model_key, :camera_id, :camera_name, "
+                "CAST(:start_at AS timestamp) AT TIME ZONE 'Europe/Oslo', CAST(:end_at AS timestamp) AT TIME ZONE 'Europe/Oslo', "
+                ":score, CAST(:raw AS jsonb))"
+            )
+            for chunk in _chunks(protect_event_rows(random.Random(seed_value + 5), now, scale), chunk_size):
+                await conn.execute(statement, chunk)
+                counts["unifi_protect_events"] += len(chunk)
+    main.SUMMARY_CACHE.clear()
+    return counts
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fill a scratch database with the synthetic benchmark dataset.")
+    parser.add_argument("--database-url", required=True, help="SQLAlchemy URL of a scratch database. Its benchmark tables are truncated.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Volume relative to production (default 1.0).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    return parser.parse_args()
+
+
+def main_cli() -> None:
+    args = parse_args()
+    counts = asyncio.run(seed(args.database_url, scale=args.scale, seed_value=args.seed))
+    print(json.dumps(counts, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
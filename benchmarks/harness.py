@@ -0,0 +1,106 @@
+"""Timing helpers and regression thresholds for the benchmark suite."""
+
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+import json
+import os
+from pathlib import Path
+import statistics
+from time import perf_counter
+from typing import Any, Optional
+
+
+THRESHOLDS_PATH = Path(__file__).with_name("thresholds.json")
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    name: str
+    rounds: int
+    min_ms: float
+    median_ms: float
+    p95_ms: float
+    threshold_ms: Optional[float]
+
+    @property
+    def regressed(self) -> bool:
+        return self.threshold_ms is not None and self.median_ms > self.threshold_ms
+
+    def payload(self) -> dict[str, Any]:
+        return {**asdict(self), "regressed": self.regressed}
+
+
+def summarize(name: str, timings_ms: list[float], threshold_ms: Optional[float]) -> BenchmarkResult:
+    ordered = sorted(timings_ms)
+    p95_index = min(len(ordered) - 1, max(0, round(0.95 * (len(ordered) - 1))))
+    return BenchmarkResult(
+        name=name,
+        rounds=len(ordered),
+        min_ms=round(ordered[0], 3),
+        median_ms=round(statistics.median(ordered), 3),
+        p95_ms=round(ordered[p95_index], 3),
+        threshold_ms=threshold_ms,
+    )
+
+
+def measure(fn: Callable[[], Any], rounds: int = 5, warmup: int = 1) -> tuple[list[float], Any]:
+    result = None
+    for _ in range(max(0, warmup)):
+        result = fn()
+    timings = []
+    for _ in range(max(1, rounds)):
+        started = perf_counter()
+        result = fn()
+        timings.append((perf_counter() - started) * 1000)
+    return timings, result
+
+
+async def measure_async(factory: Callable[[], Awaitable[Any]], rounds: int = 5, warmup: int = 1) -> tuple[list[float], Any]:
+    result = None
+    for _ in range(max(0, warmup)):
+        result = await factory()
+    timings = []
+    for _ in range(max(1, rounds)):
+        started = perf_counter()
+        result = await factory()
+        timings.append((perf_counter() - started) * 1000)
+    return timings, result
+
+
+def calibration_workload() -> int:
+    """Fixed pure-Python work (dicts, sorting, formatting, JSON) that tracks how fast this host runs the builders."""
+    rows = [{"id": index, "value": (index * 7919) % 1000, "label": f"rom_{index % 12:02d}"} for index in range(20_000)]
+    rows.sort(key=lambda row: (row["label"], row["value"], row["id"]))
+    return len(json.dumps(rows[::6]))
+
+
+def calibrate(rounds: int = 5) -> BenchmarkResult:
+    timings, _ = measure(calibration_workload, rounds=rounds)
+    return summarize("calibration", timings, None)
+
+
+def load_thresholds(path: Path = THRESHOLDS_PATH, factor: Optional[float] = None, calibration_ms: Optional[float] = None) -> dict[str, float]:
+    """Median limits in ms for the host the file was measured on.
+
+    A ``calibration_ms`` slower than the stored reference raises the limits by the
+    same ratio; faster hosts keep them as stored. ``BENCHMARK_THRESHOLD_FACTOR``
+    scales on top of that.
+    """
+    if factor is None:
+        try:
+            factor = float(os.getenv("BENCHMARK_THRESHOLD_FACTOR", "1"))
+        except ValueError:
+            factor = 1.0
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    reference_ms = payload.get("calibration_ms")
+    if calibration_ms and reference_ms:
+        factor *= max(1.0, calibration_ms / float(reference_ms))
+    return {name: float(value) * factor for name, value in payload.get("median_ms", {}).items()}
+
+
+def write_results(results: list[BenchmarkResult], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps([result.payload() for result in results], ensure_ascii=False, indent=2) + "\n",
+        encoding="utf-8",
+    )
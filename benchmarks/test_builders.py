@@ -0,0 +1,88 @@
+import random
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import main
+from benchmarks.dataset import DEFAULT_SEED, SUN2_ROOMS, energy_sample_rows, sun2_session_rows
+from roborock_reports import build_night_report
+
+
+NOW = datetime(2026, 8, 14, 21, 30)
+
+
+def row(**values):
+    return SimpleNamespace(**values)
+
+
+def test_build_sunbed_power_analysis(benchmark) -> None:
+    # Two weeks of sessions against two weeks of 30 second samples, like the sunroom power page.
+    sessions = [
+        row(id=index, **values)
+        for index, values in enumerate(sun2_session_rows(random.Random(DEFAULT_SEED), NOW), start=1)
+        if values["started_at"] >= NOW - timedelta(days=14)
+    ]
+    samples = list(energy_sample_rows(random.Random(DEFAULT_SEED), NOW))
+    bed_lookup = {room_id: row(room_id=room_id, sun2_bed_id=bed_id, name=None, bed_model="Ergoline") for room_id, bed_id in SUN2_ROOMS}
+
+    analysis = benchmark(main.build_sunbed_power_analysis, sessions, samples, bed_lookup)
+
+    assert analysis["rooms"]
+
+
+def test_build_night_report(benchmark) -> None:
+    report_day = date(2026, 8, 14)
+    robots = [row(duid=f"robot-{index}", name=f"Robot {index}", model="Qrevo") for index in range(4)]
+    jobs = []
+    samples = []
+    for robot in robots:
+        started = datetime(2026, 8, 13, 23, 0)
+        jobs.append(
+            row(
+                robot_duid=robot.duid,
+                record_id=f"{robot.duid}-job",
+                begin_at=started,
+                end_at=started + timedelta(hours=2),
+                duration_minutes=110.0,
+                duration_seconds=6600,
+                cleaned_area_m2=80.0,
+                area_m2=80.0,
+                complete=True,
+                error_code=0,
+                wash_count=3,
+                clean_times=1,
+            )
+        )
+        # One status sample every 15 seconds through the night window.
+        for step in range(4 * 60 * 9):
+            timestamp = datetime(2026, 8, 13, 22, 0) + timedelta(seconds=15 * step)
+            cleaning = started <= timestamp <= started + timedelta(hours=2)
+            samples.append(
+                row(
+                    robot_duid=robot.duid,
+                    timestamp=timestamp,
+                    state_code=5 if cleaning else 8,
+                    in_cleaning=cleaning,
+                    in_returning=False,
+                    is_charging=not cleaning,
+                    battery=max(20, 100 - step // 40),
+                    fan_power=104,
+                    water_box_mode=200,
+                    mop_mode=300,
+                )
+            )
+
+    report = benchmark(build_night_report, report_day, robots, jobs, samples, [], generated_at=datetime(2026, 8, 14, 9, 0))
+
+    assert len(report["robots"]) == len(robots)
+
+
+def test_intraday_forecast_value_day_grid(benchmark) -> None:
+    def run() -> float:
+        total = 0.0
+        for minute in range(0, 24 * 60, 5):
+            for actual in range(0, 200, 10):
+                projected, _tempo = main.intraday_forecast_value(actual, 140.0, minute / (24 * 60), minute, 7 * 60)
+                total += projected
+        return total
+
+    assert benchmark(run) > 0
@@ -0,0 +1,59 @@
+"""Hot endpoints against the seeded dataset, with the summary cache cleared before every round."""
+
+import pytest
+
+import main
+
+
+pytestmark = pytest.mark.usefixtures("seeded_database")
+
+
+async def dispose_engines() -> None:
+    for engine in main.engines.values():
+        await engine.dispose()
+
+
+def run_with_session(benchmark, handler):
+    async def factory():
+        main.SUMMARY_CACHE.clear()
+        async with main.async_session() as session:
+            return await handler(session)
+
+    return benchmark.run_async(factory, teardown=dispose_engines)
+
+
+def test_api_overview(benchmark) -> None:
+    async def factory():
+        main.SUMMARY_CACHE.clear()
+        return await main.api_v2_overview(scope=None)
+
+    assert benchmark.run_async(factory, teardown=dispose_engines)
+
+
+def test_sunroom_room_overview(benchmark) -> None:
+    payload = run_with_session(benchmark, lambda session: main.sunroom_room_overview_payload(session, days=2))
+
+    assert payload
+
+
+def test_parking_time_distribution(benchmark) -> None:
+    now = main.local_now_naive()
+    payload = run_with_session(benchmark, lambda session: main.api_parking_time_distribution(session, {"period": "last_90_days"}, now))
+
+    assert payload
+
+
+def test_energy_summaries(benchmark) -> None:
+    assert run_with_session(benchmark, main.build_energy_summaries_fast)
+
+
+def test_sun2_forecast(benchmark) -> None:
+    now = main.local_now_naive()
+
+    assert run_with_session(benchmark, lambda session: main.build_sun2_forecast(session, now.date(), now))
+
+
+def test_parking_forecast(benchmark) -> None:
+    now = main.local_now_naive()
+
+    assert run_with_session(benchmark, lambda session: main.build_parking_forecast(session, now.date(), now))
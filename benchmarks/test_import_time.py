@@ -0,0 +1,26 @@
+import compileall
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_import_main(benchmark) -> None:
+    # A fresh interpreter each round: this is what a container restart pays before serving.
+    # The image compiles its bytecode at build time; a stale main.pyc would add a recompile to every round.
+    compileall.compile_dir(REPO_ROOT, maxlevels=0, quiet=1)
+    environment = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+
+    def run() -> int:
+        return subprocess.run(
+            [sys.executable, "-c", "import main"],
+            cwd=REPO_ROOT,
+            env=environment,
+            check=True,
+            capture_output=True,
+        ).returncode
+
+    assert benchmark(run) == 0
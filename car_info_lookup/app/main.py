@@ -12,6 +12,7 @@ from urllib.parse import urlencode
 import requests
 from dotenv import load_dotenv
 from fastapi import FastAPI, Header, HTTPException, Query, Request
+from pydantic import BaseModel, Field
 
 from .parsing import (
     compact_plate,
@@ -23,6 +24,7 @@ from .parsing import (
     parse_biluppgifter_html,
     parse_tjekbil_json,
 )
+from .registry import LookupCache, MockRegistry, TokenBucket, Upstream, VehicleRegistry, parse_country_days
 
 load_dotenv()
 
@@ -53,6 +55,22 @@ BACKLOG_DELAY_SECONDS = max(0, int(os.getenv("CAR_INFO_BACKLOG_DELAY_SECONDS", s
 SWEDISH_BACKLOG_DELAY_SECONDS = max(0, int(os.getenv("CAR_INFO_SWEDISH_BACKLOG_DELAY_SECONDS", "2")))
 DANISH_BACKLOG_DELAY_SECONDS = max(0, int(os.getenv("CAR_INFO_DANISH_BACKLOG_DELAY_SECONDS", "0")))
 BACKLOG_COUNTRY_SEQUENCE_RAW = os.getenv("CAR_INFO_BACKLOG_COUNTRY_SEQUENCE", "DK,S")
+SVV_API_KEY = os.getenv("SVV_API_KEY", "").strip()
+SVV_API_URL = os.getenv(
+    "SVV_API_URL",
+    "https://www.vegvesen.no/ws/no/vegvesen/kjoretoy/felles/datautlevering/enkeltoppslag/kjoretoydata",
+).strip()
+SVV_API_AUTH_HEADER = os.getenv("SVV_API_AUTH_HEADER", "SVV-Authorization").strip()
+SVV_API_AUTH_PREFIX = os.getenv("SVV_API_AUTH_PREFIX", "Apikey").strip()
+CACHE_PATH = DATA_DIR / "lookup_cache.sqlite3"
+CACHE_POSITIVE_DAYS = os.getenv("CAR_INFO_CACHE_POSITIVE_DAYS", "N:30,S:30,DK:30")
+CACHE_NEGATIVE_DAYS = os.getenv("CAR_INFO_CACHE_NEGATIVE_DAYS", "N:1,S:7,DK:7")
+LOOKUP_CONCURRENCY = max(1, min(16, int(os.getenv("CAR_INFO_LOOKUP_CONCURRENCY", "4"))))
+SVV_RATE_PER_MINUTE = max(1.0, float(os.getenv("CAR_INFO_SVV_RATE_PER_MINUTE", "60")))
+BILUPPGIFTER_RATE_PER_MINUTE = max(0.1, float(os.getenv("CAR_INFO_BILUPPGIFTER_RATE_PER_MINUTE", "30")))
+TJEKBIL_RATE_PER_MINUTE = max(0.1, float(os.getenv("CAR_INFO_TJEKBIL_RATE_PER_MINUTE", "60")))
+RATE_BURST = max(1, int(os.getenv("CAR_INFO_RATE_BURST", "2")))
+MOCK_REGISTRY_PATH = os.getenv("CAR_INFO_MOCK_REGISTRY_PATH", "").strip()
 
 PROVIDER = "nordic-vehicle-lookup"
 app = FastAPI(title="Fibaro10 nordisk biloppslag")
@@ -279,14 +297,61 @@ def fetch_danish_vehicle(plate: str) -> tuple[int, str, dict[str, Any], str | No
     return 200, response.url, parsed, None
 
 
-def fetch_foreign_vehicle(plate: str) -> tuple[int, str, dict[str, Any], str | None]:
+def fetch_norwegian_vehicle(plate: str) -> tuple[int, str, dict[str, Any], str | None]:
     compact = compact_plate(plate)
-    country = lookup_country_for_plate(compact)
-    if country == "S":
-        return fetch_swedish_vehicle(compact)
-    if country == "DK":
-        return fetch_danish_vehicle(compact)
-    return 400, "", {}, "Registreringsnummer matcher ikke svensk eller dansk standardformat"
+    if not SVV_API_KEY:
+        return 0, "", {}, "SVV_API_KEY mangler i nordisk biloppslag"
+    url = f"{SVV_API_URL}?{urlencode({'kjennemerke': compact})}"
+    response = requests.get(
+        url,
+        headers={
+            "Accept": "application/json",
+            SVV_API_AUTH_HEADER: " ".join(part for part in (SVV_API_AUTH_PREFIX, SVV_API_KEY) if part),
+            "User-Agent": "fibaro10/1.0",
+        },
+        timeout=REQUEST_TIMEOUT_SECONDS,
+    )
+    text = response.text or ""
+    if response.status_code == 204 or (response.status_code < 400 and not text.strip()):
+        return 204, url, {}, "Ingen kjøretøydata fra SVV"
+    if response.status_code >= 400:
+        return response.status_code, url, {}, f"HTTP {response.status_code}: {text.strip()[:160]}".rstrip(": ")
+    try:
+        raw = response.json()
+    except ValueError:
+        return 204, url, {}, "Tomt eller uleselig svar fra SVV"
+    return 200, url, {"country_code": "N", "provider": "svv", "confirmed_vehicle": True, "raw": raw}, None
+
+
+def build_registry() -> VehicleRegistry:
+    fetchers = {"svv": fetch_norwegian_vehicle, "biluppgifter": fetch_swedish_vehicle, "tjekbil": fetch_danish_vehicle}
+    if MOCK_REGISTRY_PATH:
+        # Offline development: answer every registry from one local JSON file of {"registry": {"PLATE": {...}}}.
+        table = json.loads(Path(MOCK_REGISTRY_PATH).read_text(encoding="utf-8"))
+        countries = {"svv": "N", "biluppgifter": "S", "tjekbil": "DK"}
+        fetchers = {name: MockRegistry(table.get(name) or {}, country_code=countries[name]) for name in fetchers}
+    return VehicleRegistry(
+        [
+            Upstream("svv", "N", fetchers["svv"], TokenBucket(SVV_RATE_PER_MINUTE, RATE_BURST)),
+            Upstream("biluppgifter", "S", fetchers["biluppgifter"], TokenBucket(BILUPPGIFTER_RATE_PER_MINUTE, RATE_BURST)),
+            Upstream("tjekbil", "DK", fetchers["tjekbil"], TokenBucket(TJEKBIL_RATE_PER_MINUTE, RATE_BURST)),
+        ],
+        LookupCache(CACHE_PATH),
+        parse_country_days(CACHE_POSITIVE_DAYS, 30),
+        parse_country_days(CACHE_NEGATIVE_DAYS, 7),
+        concurrency=LOOKUP_CONCURRENCY,
+        rate_limit_pause_seconds=RATE_LIMIT_BACKOFF_MINUTES * 60,
+    )
+
+
+registry: VehicleRegistry | None = None
+
+
+def vehicle_registry() -> VehicleRegistry:
+    global registry
+    if registry is None:
+        registry = build_registry()
+    return registry
 
 
 def backoff_active() -> str | None:
@@ -339,7 +404,8 @@ async def run_once(limit: int = BATCH_SIZE, force: bool = False, country: str |
                     results.append({"plate": plate, "status": "skipped", "message": "Ikke svensk eller dansk format"})
                     continue
                 set_state(last_action="fetch_foreign_vehicle", last_plate=plate, last_url=lookup_url(plate))
-                status_code, url, data, error = await asyncio.to_thread(fetch_foreign_vehicle, plate)
+                looked_up = await vehicle_registry().resolve(plate)
+                status_code, url, data, error = looked_up["http_status"], looked_up["url"] or "", looked_up["data"], looked_up["error"]
                 payload = {"status": status_code, "url": url, "error": error, "data": data}
                 post_result = await asyncio.to_thread(fibaro_post, f"/api/parkering/kjoretoy/{plate}/car-info", payload)
                 processed += 1
@@ -355,6 +421,7 @@ async def run_once(limit: int = BATCH_SIZE, force: bool = False, country: str |
                     "status": status_code,
                     "url": url,
                     "confirmed_foreign": is_confirmed_foreign(data),
+                    "cached": looked_up["cached"],
                     "error": error,
                     "fibaro10": post_result,
                 }
@@ -365,7 +432,7 @@ async def run_once(limit: int = BATCH_SIZE, force: bool = False, country: str |
                     set_state(backoff_until=until.isoformat(), last_error=error)
                     break
                 delay_seconds = delay_for_country(data.get("country_code") or lookup_country_for_plate(plate), REQUEST_DELAY_SECONDS)
-                if delay_seconds and index < len(rows) - 1:
+                if delay_seconds and not looked_up["cached"] and index < len(rows) - 1:
                     await asyncio.sleep(delay_seconds)
 
             set_state(
@@ -416,7 +483,8 @@ async def run_plate(plate: str, force: bool = False) -> dict[str, Any]:
         started = time.monotonic()
         set_state(running=True, last_action="fetch_foreign_vehicle_direct", last_plate=compact, last_url=lookup_url(compact), last_error=None)
         try:
-            status_code, url, data, error = await asyncio.to_thread(fetch_foreign_vehicle, compact)
+            looked_up = await vehicle_registry().resolve(compact, force=force)
+            status_code, url, data, error = looked_up["http_status"], looked_up["url"] or "", looked_up["data"], looked_up["error"]
             payload = {"status": status_code, "url": url, "error": error, "data": data}
             post_result = await asyncio.to_thread(fibaro_post, f"/api/parkering/kjoretoy/{compact}/car-info", payload)
             result = {
@@ -425,6 +493,7 @@ async def run_plate(plate: str, force: bool = False) -> dict[str, Any]:
                 "status": status_code,
                 "url": url,
                 "confirmed_foreign": is_confirmed_foreign(data),
+                "cached": looked_up["cached"],
                 "error": error,
                 "fibaro10": post_result,
             }
@@ -457,7 +526,7 @@ async def run_plate(plate: str, force: bool = False) -> dict[str, Any]:
 
 
 async def lookup_plate_only(plate: str, force: bool = False) -> dict[str, Any]:
-    """Fetch one Nordic registry result without reading or writing Fibaro10 data."""
+    """Resolve one Nordic plate through the shared cache without reading or writing Fibaro10 data."""
     compact = compact_plate(plate)
     country_code = lookup_country_for_plate(compact)
     if not country_code:
@@ -470,51 +539,50 @@ async def lookup_plate_only(plate: str, force: bool = False) -> dict[str, Any]:
             "data": {},
             "error": "Registreringsnummer matcher ikke svensk eller dansk standardformat",
         }
-    if lock.locked():
-        return {
-            "plate": compact,
-            "country_code": country_code,
-            "http_status": 425,
-            "confirmed": False,
-            "url": lookup_url(compact),
-            "data": {},
-            "error": "Nordisk oppslagsadapter er opptatt",
-        }
-    async with lock:
-        if not force:
-            until = backoff_active()
-            if until:
-                return {
-                    "plate": compact,
-                    "country_code": country_code,
-                    "http_status": 429,
-                    "confirmed": False,
-                    "url": lookup_url(compact),
-                    "data": {},
-                    "error": f"Oppslagskilden er i backoff til {until}",
-                    "backoff_until": until,
-                }
-        status_code, url, data, error = await asyncio.to_thread(fetch_foreign_vehicle, compact)
-        if status_code == 429:
-            until = utcnow() + timedelta(minutes=RATE_LIMIT_BACKOFF_MINUTES)
-            set_state(backoff_until=until.isoformat(), last_error=error)
-        result = {
-            "plate": compact,
-            "country_code": data.get("country_code") or country_code,
-            "http_status": status_code,
-            "confirmed": status_code == 200 and is_confirmed_foreign(data),
-            "url": url,
-            "data": data,
-            "error": error,
-        }
-        set_state(
-            last_action="lookup_plate_only",
-            last_plate=compact,
-            last_url=url,
-            last_result=result,
-            last_success_at=utcnow_iso() if status_code < 400 else state.get("last_success_at"),
-        )
-        return result
+    if not force:
+        until = backoff_active()
+        if until:
+            cached = await vehicle_registry().cached(compact)
+            if cached is not None:
+                return cached
+            return {
+                "plate": compact,
+                "country_code": country_code,
+                "http_status": 429,
+                "confirmed": False,
+                "url": lookup_url(compact),
+                "data": {},
+                "error": f"Oppslagskilden er i backoff til {until}",
+                "backoff_until": until,
+            }
+    result = await vehicle_registry().resolve(compact, force=force)
+    if result["http_status"] == 429 and not backoff_active():
+        until = utcnow() + timedelta(minutes=RATE_LIMIT_BACKOFF_MINUTES)
+        set_state(backoff_until=until.isoformat(), last_error=result["error"])
+    set_state(
+        last_action="lookup_plate_only",
+        last_plate=compact,
+        last_url=result["url"],
+        last_result=result,
+        last_success_at=utcnow_iso() if result["http_status"] < 400 else state.get("last_success_at"),
+    )
+    return result
+
+
+async def resolve_plates(plates: list[str], registry_name: str | None = None, force: bool = False) -> dict[str, Any]:
+    """Bulk lookup for the other subsystems; every plate is answered from the cache when it can be."""
+    started = time.monotonic()
+    if registry_name and registry_name not in vehicle_registry().upstreams:
+        raise HTTPException(status_code=400, detail=f"Ukjent oppslagskilde: {registry_name}")
+    results = await vehicle_registry().resolve_many(plates, registry_name, force)
+    return {
+        "status": "ok",
+        "registry": registry_name,
+        "count": len(results),
+        "cached": sum(1 for item in results if item["cached"]),
+        "duration_seconds": round(time.monotonic() - started, 2),
+        "results": results,
+    }
 
 
 async def run_backlog_cycle(max_items: int = BACKLOG_MAX_PER_CYCLE, force: bool = False) -> dict[str, Any]:
@@ -582,7 +650,7 @@ async def run_backlog_cycle(max_items: int = BACKLOG_MAX_PER_CYCLE, force: bool
         last_result = (result.get("results") or [{}])[-1]
         country_code = last_result.get("country_code") or lookup_country_for_plate(last_result.get("plate"))
         delay_seconds = delay_for_country(country_code, BACKLOG_DELAY_SECONDS)
-        if delay_seconds and total_processed < max_items:
+        if delay_seconds and not last_result.get("cached") and total_processed < max_items:
             await asyncio.sleep(delay_seconds)
 
     payload = {
@@ -631,6 +699,7 @@ async def startup() -> None:
     global worker_task
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     load_state()
+    vehicle_registry().cache.purge(time.time())
     if state.get("provider") != PROVIDER or state_has_legacy_lookup_data():
         set_state(
             provider=PROVIDER,
@@ -672,7 +741,13 @@ async def health() -> dict[str, Any]:
             "swedish_backlog_delay_seconds": SWEDISH_BACKLOG_DELAY_SECONDS,
             "danish_backlog_delay_seconds": DANISH_BACKLOG_DELAY_SECONDS,
             "backlog_country_sequence": BACKLOG_COUNTRY_SEQUENCE,
+            "cache_positive_days": CACHE_POSITIVE_DAYS,
+            "cache_negative_days": CACHE_NEGATIVE_DAYS,
+            "lookup_concurrency": LOOKUP_CONCURRENCY,
+            "svv_configured": bool(SVV_API_KEY),
+            "mock_registry": bool(MOCK_REGISTRY_PATH),
         },
+        "registry": vehicle_registry().payload(),
     }
 
 
@@ -705,11 +780,27 @@ async def api_lookup_plate(
     force: bool = Query(False),
     x_car_info_token: str | None = Header(None),
 ) -> dict[str, Any]:
-    """Stateless registry adapter used by Protect Ledger's validation pipeline."""
+    """Registry adapter used by Protect Ledger's validation pipeline, answered from the shared cache when possible."""
     require_token(x_car_info_token)
     return await lookup_plate_only(plate, force)
 
 
+class ResolvePlatesIn(BaseModel):
+    plates: list[str] = Field(default_factory=list, max_length=200)
+    registry: str | None = None
+    force: bool = False
+
+
+@app.post("/api/resolve")
+async def api_resolve_plates(
+    payload: ResolvePlatesIn,
+    x_car_info_token: str | None = Header(None),
+) -> dict[str, Any]:
+    """Shared registry lookups for the core SVV worker and Protect Ledger."""
+    require_token(x_car_info_token)
+    return await resolve_plates(payload.plates, payload.registry, payload.force)
+
+
 @app.post("/api/run-backlog")
 async def api_run_backlog(
     request: Request,
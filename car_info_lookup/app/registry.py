@@ -0,0 +1,321 @@
+"""Shared plate lookups: persistent result cache, de-duplication and per-upstream rate limits.
+
+Every subsystem that asks about a plate goes through ``VehicleRegistry``, so
+an upstream registry is asked at most once per TTL for the same plate.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .parsing import compact_plate, lookup_country_for_plate
+
+FetchResult = tuple[int, str, dict[str, Any], str | None]
+
+CONFIRMED_STATUS = 200
+NEGATIVE_STATUSES = {204, 400, 404}
+
+
+def is_confirmed_vehicle(data: Mapping[str, Any]) -> bool:
+    return bool(data.get("confirmed_vehicle") or data.get("confirmed_swedish") or data.get("confirmed_danish"))
+
+
+def parse_country_days(value: str, default_days: float) -> dict[str, float]:
+    """Parse ``N:30,S:30,DK:14`` into TTL seconds per country code; ``*`` sets the fallback."""
+    ttl = {"*": default_days * 86400}
+    for item in (value or "").split(","):
+        country, _, days = item.partition(":")
+        country = country.strip().upper()
+        try:
+            ttl[country] = max(0.0, float(days)) * 86400
+        except ValueError:
+            continue
+    return ttl
+
+
+class TokenBucket:
+    """Token bucket for one upstream; ``pause`` holds it back after a rate-limit answer."""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1) -> None:
+        self.rate = max(0.001, float(rate_per_minute)) / 60
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def paused_for(self) -> float:
+        return max(0.0, self.paused_until - time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def wait_seconds(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                wait = self.wait_seconds()
+                if wait <= 0:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(wait)
+
+
+class LookupCache:
+    """SQLite table of registry answers keyed by (registry, plate)."""
+
+    def __init__(self, path: Path | str) -> None:
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS vehicle_lookups (
+                    registry TEXT NOT NULL,
+                    plate TEXT NOT NULL,
+                    http_status INTEGER NOT NULL,
+                    url TEXT,
+                    error TEXT,
+                    data TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (registry, plate)
+                )
+                """
+            )
+
+    def get(self, registry: str, plate: str, now: float) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT http_status, url, error, data, fetched_at, expires_at FROM vehicle_lookups "
+                "WHERE registry = ? AND plate = ? AND expires_at > ?",
+                (registry, plate, now),
+            ).fetchone()
+        if row is None:
+            return None
+        status, url, error, data, fetched_at, expires_at = row
+        return {
+            "http_status": status,
+            "url": url,
+            "error": error,
+            "data": json.loads(data),
+            "fetched_at": fetched_at,
+            "expires_at": expires_at,
+        }
+
+    def put(self, registry: str, plate: str, result: Mapping[str, Any], fetched_at: float, expires_at: float) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                """
+                INSERT INTO vehicle_lookups (registry, plate, http_status, url, error, data, fetched_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (registry, plate) DO UPDATE SET
+                    http_status = excluded.http_status, url = excluded.url, error = excluded.error,
+                    data = excluded.data, fetched_at = excluded.fetched_at, expires_at = excluded.expires_at
+                """,
+                (
+                    registry,
+                    plate,
+                    int(result["http_status"]),
+                    result.get("url"),
+                    result.get("error"),
+                    json.dumps(result.get("data") or {}, ensure_ascii=False, default=str),
+                    fetched_at,
+                    expires_at,
+                ),
+            )
+
+    def purge(self, now: float) -> int:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM vehicle_lookups WHERE expires_at <= ?", (now,)).rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT count(*) FROM vehicle_lookups").fetchone()[0])
+
+
+@dataclass(frozen=True)
+class Upstream:
+    name: str
+    country_code: str
+    fetch: Callable[[str], FetchResult]
+    bucket: TokenBucket
+
+
+class MockRegistry:
+    """Local stand-in for an upstream registry; answers from a plate table and records every call."""
+
+    def __init__(
+        self,
+        vehicles: Mapping[str, Mapping[str, Any]] | None = None,
+        statuses: Mapping[str, int] | None = None,
+        country_code: str = "N",
+    ) -> None:
+        self.vehicles = {compact_plate(plate): dict(data) for plate, data in (vehicles or {}).items()}
+        self.statuses = {compact_plate(plate): int(status) for plate, status in (statuses or {}).items()}
+        self.country_code = country_code
+        self.calls: list[str] = []
+
+    def __call__(self, plate: str) -> FetchResult:
+        compact = compact_plate(plate)
+        self.calls.append(compact)
+        url = f"mock://{self.country_code.lower()}/{compact}"
+        if compact in self.statuses:
+            return self.statuses[compact], url, {}, f"HTTP {self.statuses[compact]}"
+        if compact in self.vehicles:
+            return 200, url, {"country_code": self.country_code, "confirmed_vehicle": True, **self.vehicles[compact]}, None
+        return 404, url, {}, "Ikke funnet i testregisteret"
+
+
+class VehicleRegistry:
+    """Cached, de-duplicated and rate-limited plate lookups against a set of upstreams."""
+
+    def __init__(
+        self,
+        upstreams: Iterable[Upstream],
+        cache: LookupCache,
+        positive_ttl: Mapping[str, float],
+        negative_ttl: Mapping[str, float],
+        *,
+        concurrency: int = 4,
+        rate_limit_pause_seconds: float = 4 * 3600,
+    ) -> None:
+        self.upstreams = {upstream.name: upstream for upstream in upstreams}
+        self.cache = cache
+        self.positive_ttl = dict(positive_ttl)
+        self.negative_ttl = dict(negative_ttl)
+        self.rate_limit_pause_seconds = rate_limit_pause_seconds
+        self._semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+        self._inflight: dict[tuple[str, str], asyncio.Task[dict[str, Any]]] = {}
+        self._waiters: dict[asyncio.Task[dict[str, Any]], int] = {}
+        self.stats = {"hits": 0, "fetched": 0, "shared": 0, "rate_limited": 0}
+
+    def upstream_for(self, plate: str, registry: str | None = None) -> Upstream | None:
+        if registry:
+            return self.upstreams.get(registry)
+        country = lookup_country_for_plate(plate)
+        return next((upstream for upstream in self.upstreams.values() if upstream.country_code == country), None)
+
+    def ttl_for(self, country_code: str, status: int) -> float:
+        if status == CONFIRMED_STATUS:
+            ttl = self.positive_ttl
+        elif status in NEGATIVE_STATUSES:
+            ttl = self.negative_ttl
+        else:
+            return 0.0
+        return ttl.get(country_code, ttl.get("*", 0.0))
+
+    async def cached(self, plate: str, registry: str | None = None) -> dict[str, Any] | None:
+        compact = compact_plate(plate)
+        upstream = self.upstream_for(compact, registry)
+        if upstream is None:
+            return None
+        cached = await asyncio.to_thread(self.cache.get, upstream.name, compact, time.time())
+        if cached is None:
+            return None
+        self.stats["hits"] += 1
+        return self._result(compact, upstream, cached["http_status"], cached["url"], cached["data"], cached["error"], cached=cached)
+
+    async def resolve(self, plate: str, registry: str | None = None, force: bool = False) -> dict[str, Any]:
+        compact = compact_plate(plate)
+        upstream = self.upstream_for(compact, registry)
+        if upstream is None:
+            return self._result(compact, None, 400, None, {}, "Ingen oppslagskilde for registreringsnummeret")
+        key = (upstream.name, compact)
+        if not force and key not in self._inflight:
+            cached = await self.cached(compact, upstream.name)
+            if cached is not None:
+                return cached
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.create_task(self._fetch(compact, upstream))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _done, key=key: self._inflight.pop(key, None))
+        else:
+            self.stats["shared"] += 1
+        # The lookup belongs to everyone waiting for it: a cancelled caller only
+        # cancels it when nobody else is left.
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                task.cancel()
+        return {**result, "shared": True} if shared else result
+
+    async def resolve_many(self, plates: Iterable[str], registry: str | None = None, force: bool = False) -> list[dict[str, Any]]:
+        unique = list(dict.fromkeys(compact_plate(plate) for plate in plates if compact_plate(plate)))
+        return list(await asyncio.gather(*(self.resolve(plate, registry, force) for plate in unique)))
+
+    async def _fetch(self, plate: str, upstream: Upstream) -> dict[str, Any]:
+        async with self._semaphore:
+            paused_for = upstream.bucket.paused_for()
+            if paused_for > 0:
+                self.stats["rate_limited"] += 1
+                return self._result(plate, upstream, 429, None, {}, f"{upstream.name} er i backoff i {int(paused_for)} sekunder")
+            await upstream.bucket.acquire()
+            status, url, data, error = await asyncio.to_thread(upstream.fetch, plate)
+        self.stats["fetched"] += 1
+        if status == 429:
+            self.stats["rate_limited"] += 1
+            upstream.bucket.pause(self.rate_limit_pause_seconds)
+        result = self._result(plate, upstream, status, url, data, error)
+        ttl = self.ttl_for(upstream.country_code, status)
+        if ttl > 0:
+            fetched_at = time.time()
+            await asyncio.to_thread(self.cache.put, upstream.name, plate, result, fetched_at, fetched_at + ttl)
+        return result
+
+    def _result(
+        self,
+        plate: str,
+        upstream: Upstream | None,
+        status: int,
+        url: str | None,
+        data: Mapping[str, Any],
+        error: str | None,
+        cached: Mapping[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        return {
+            "plate": plate,
+            "registry": upstream.name if upstream else None,
+            "country_code": data.get("country_code") or (upstream.country_code if upstream else None),
+            "http_status": status,
+            "confirmed": status == CONFIRMED_STATUS and is_confirmed_vehicle(data),
+            "url": url,
+            "data": dict(data),
+            "error": error,
+            "cached": cached is not None,
+            "expires_at": cached["expires_at"] if cached else None,
+        }
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            **self.stats,
+            "cached_rows": self.cache.count(),
+            "inflight": len(self._inflight),
+            "upstreams": {
+                name: {"country_code": upstream.country_code, "paused_seconds": round(upstream.bucket.paused_for())}
+                for name, upstream in self.upstreams.items()
+            },
+        }
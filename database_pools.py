@@ -0,0 +1,272 @@
+"""Connection pools per process role and workload, plus per-request query accounting.
+
+Request handlers use the interactive pool; tasks started by the background
+supervisor run with the background workload and get their own pool, so a
+long retention or sync job cannot hold every connection a page needs.
+LISTEN connections are held for the life of the process and are opened
+outside both pools.
+"""
+
+from collections import Counter
+from collections.abc import Mapping
+from contextvars import Context, ContextVar, copy_context
+from dataclasses import dataclass, field
+import logging
+import os
+import re
+from time import perf_counter
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+WORKLOADS = (INTERACTIVE, BACKGROUND)
+
+# (pool_size, max_overflow) per role family and workload.
+ROLE_POOL_DEFAULTS: dict[str, dict[str, tuple[int, int]]] = {
+    "web": {INTERACTIVE: (8, 8), BACKGROUND: (2, 2)},
+    "worker": {INTERACTIVE: (2, 2), BACKGROUND: (8, 4)},
+    "combined": {INTERACTIVE: (8, 8), BACKGROUND: (4, 4)},
+}
+# Off by default: bulk ingest endpoints and AI SQL run long statements on the interactive pool.
+STATEMENT_TIMEOUT_DEFAULTS_MS = {INTERACTIVE: 0, BACKGROUND: 0}
+
+db_workload: ContextVar[str] = ContextVar("fibaro10_db_workload", default=INTERACTIVE)
+current_query_stats: ContextVar[Optional["QueryStats"]] = ContextVar("fibaro10_query_stats", default=None)
+
+
+def role_family(role: str) -> str:
+    role = (role or "").strip().lower()
+    if role.startswith("web"):
+        return "web"
+    return role if role in ROLE_POOL_DEFAULTS else "combined"
+
+
+def _env_int(env: Mapping[str, str], name: str, default: int) -> int:
+    try:
+        return int(str(env.get(name, default)).strip())
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    workload: str
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pre_ping: bool
+    statement_timeout_ms: int
+    application_name: str
+
+    def engine_options(self, database_url: str) -> dict[str, Any]:
+        options: dict[str, Any] = {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            "pool_pre_ping": self.pre_ping,
+        }
+        if database_url.startswith("postgresql+asyncpg"):
+            server_settings = {"application_name": self.application_name}
+            if self.statement_timeout_ms > 0:
+                server_settings["statement_timeout"] = str(self.statement_timeout_ms)
+            options["connect_args"] = {"server_settings": server_settings}
+        return options
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "poolSize": self.pool_size,
+            "maxOverflow": self.max_overflow,
+            "poolTimeoutSeconds": self.pool_timeout,
+            "statementTimeoutMs": self.statement_timeout_ms,
+            "applicationName": self.application_name,
+        }
+
+
+def pool_settings(role: str, workload: str, env: Mapping[str, str] = os.environ) -> PoolSettings:
+    """Pool settings for one workload; ``DB_POOL_*`` sets the interactive pool, ``DB_BACKGROUND_POOL_*`` the other."""
+    size, overflow = ROLE_POOL_DEFAULTS[role_family(role)][workload]
+    prefix = "DB_POOL" if workload == INTERACTIVE else "DB_BACKGROUND_POOL"
+    timeout_name = "DB_STATEMENT_TIMEOUT_MS" if workload == INTERACTIVE else "DB_BACKGROUND_STATEMENT_TIMEOUT_MS"
+    try:
+        pool_timeout = float(env.get("DB_POOL_TIMEOUT_SECONDS", "30"))
+    except ValueError:
+        pool_timeout = 30.0
+    return PoolSettings(
+        workload=workload,
+        pool_size=max(1, _env_int(env, f"{prefix}_SIZE", size)),
+        max_overflow=max(0, _env_int(env, f"{prefix}_MAX_OVERFLOW", overflow)),
+        pool_timeout=max(1.0, pool_timeout),
+        pool_recycle=max(60, _env_int(env, "DB_POOL_RECYCLE_SECONDS", 1800)),
+        pre_ping=str(env.get("DB_POOL_PRE_PING", "true")).strip().lower() in {"1", "true", "yes", "ja"},
+        statement_timeout_ms=max(0, _env_int(env, timeout_name, STATEMENT_TIMEOUT_DEFAULTS_MS[workload])),
+        application_name=f"fibaro10-{(role or 'combined').strip().lower()}-{workload}"[:63],
+    )
+
+
+def listener_engine_options(role: str, database_url: str) -> dict[str, Any]:
+    """Engine options for LISTEN connections: unpooled, so a listener never pins a pooled connection."""
+    options: dict[str, Any] = {"poolclass": NullPool}
+    if database_url.startswith("postgresql+asyncpg"):
+        application_name = f"fibaro10-{(role or 'combined').strip().lower()}-listen"[:63]
+        options["connect_args"] = {"server_settings": {"application_name": application_name}}
+    return options
+
+
+def background_task_context() -> Context:
+    """Context for supervised background tasks: database work goes to the background pool."""
+    context = copy_context()
+    context.run(db_workload.set, BACKGROUND)
+    return context
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_BIND_PARAMETER = re.compile(r"\$\d+\b")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str, limit: int = 600) -> str:
+    """Statement with literals and parameters replaced, so repeats of one query group together."""
+    normalized = _STRING_LITERAL.sub("?", statement or "")
+    normalized = _BIND_PARAMETER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return normalized if len(normalized) <= limit else normalized[: limit - 3] + "..."
+
+
+@dataclass
+class QueryStats:
+    """Queries run on behalf of one request."""
+
+    count: int = 0
+    duration_ms: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.duration_ms += duration_ms
+        # Raw text is enough to group here: the driver sends parameters separately.
+        self.statements[statement] += 1
+
+    def most_repeated(self) -> tuple[Optional[str], int]:
+        if not self.statements:
+            return None, 0
+        statement, count = self.statements.most_common(1)[0]
+        return normalize_statement(statement), count
+
+
+@dataclass
+class CompiledCacheStats:
+    """How often SQLAlchemy reused a compiled statement instead of compiling it again."""
+
+    hits: int = 0
+    misses: int = 0
+    uncached: int = 0
+
+    def record(self, context: Any) -> None:
+        cache_hit = getattr(context, "cache_hit", None)
+        dialect = getattr(context, "dialect", None)
+        if dialect is None or cache_hit is None:
+            return
+        if cache_hit == dialect.CACHE_HIT:
+            self.hits += 1
+        elif cache_hit == dialect.CACHE_MISS:
+            self.misses += 1
+        else:
+            self.uncached += 1
+
+    def payload(self) -> dict[str, Any]:
+        cached = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "hitRatio": round(self.hits / cached, 3) if cached else None,
+        }
+
+
+class SlowQueryLog:
+    """Slow statements grouped by their normalized text, bounded to ``limit`` groups."""
+
+    def __init__(self, threshold_ms: float, limit: int = 50) -> None:
+        self.threshold_ms = threshold_ms
+        self.limit = max(1, int(limit))
+        self.entries: dict[str, dict[str, Any]] = {}
+
+    def record(self, statement: str, duration_ms: float, workload: str) -> Optional[str]:
+        if duration_ms < self.threshold_ms:
+            return None
+        normalized = normalize_statement(statement)
+        entry = self.entries.get(normalized)
+        if entry is None:
+            if len(self.entries) >= self.limit:
+                del self.entries[min(self.entries, key=lambda key: self.entries[key]["count"])]
+            entry = self.entries[normalized] = {"count": 0, "totalMs": 0.0, "maxMs": 0.0, "workload": workload}
+        entry["count"] += 1
+        entry["totalMs"] += duration_ms
+        entry["maxMs"] = max(entry["maxMs"], duration_ms)
+        return normalized
+
+    def payload(self, top: int = 10) -> list[dict[str, Any]]:
+        ranked = sorted(self.entries.items(), key=lambda item: item[1]["totalMs"], reverse=True)[:top]
+        return [
+            {
+                "statement": statement,
+                "count": entry["count"],
+                "totalMs": round(entry["totalMs"], 1),
+                "maxMs": round(entry["maxMs"], 1),
+                "workload": entry["workload"],
+            }
+            for statement, entry in ranked
+        ]
+
+
+def instrument_engine(
+    sync_engine: Any,
+    workload: str,
+    slow_queries: SlowQueryLog,
+    logger: logging.Logger,
+    compiled_cache: Optional[CompiledCacheStats] = None,
+) -> None:
+    """Time every statement on ``sync_engine`` into the request's stats and the slow-query log."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany) -> None:
+        conn.info.setdefault("fibaro10_query_started", []).append(perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, _cursor, statement, _parameters, context, _executemany) -> None:
+        if compiled_cache is not None:
+            compiled_cache.record(context)
+        started = conn.info.get("fibaro10_query_started")
+        if not started:
+            return
+        duration_ms = (perf_counter() - started.pop()) * 1000
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, duration_ms)
+        normalized = slow_queries.record(statement, duration_ms, workload)
+        if normalized is not None:
+            logger.warning("Slow query (%s) took %.1f ms: %s", workload, duration_ms, normalized)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context) -> None:
+        connection = context.connection
+        started = connection.info.get("fibaro10_query_started") if connection is not None else None
+        if started:
+            started.pop()
+
+
+def pool_payload(pool: Any) -> dict[str, Any]:
+    try:
+        return {"size": pool.size(), "checkedOut": pool.checkedout(), "overflow": pool.overflow()}
+    except AttributeError:
+        return {"status": pool.status()}
@@ -0,0 +1,232 @@
+"""Long-lived Edge context for the EasyPark downloader.
+
+The persistent profile can only be opened by one browser at a time, so the
+pool keeps that single context alive between runs and hands out its pages
+(tabs). Tabs share the login, which lets a backfill download several months
+in parallel while a scheduled sync reuses an already authenticated tab.
+The context is closed after ``idle_seconds`` without use or when a run
+reports a broken browser; the next run launches it again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
+
+
+DEFAULT_BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+# Login depends on reCAPTCHA; never block anything it loads.
+ALWAYS_ALLOWED_URL_PARTS = ("recaptcha", "gstatic.com")
+
+
+class PhaseTimer:
+    """Wall-clock milliseconds per phase of a run (browser, login, date_pick, download, import)."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def payload(self) -> dict[str, int]:
+        timings = {f"{name}_ms": round(seconds * 1000) for name, seconds in self.phases.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started) * 1000)
+        return timings
+
+
+def local_storage_init_script(storage_state: dict[str, Any]) -> str | None:
+    """Init script that puts saved localStorage back for matching origins without overwriting newer values."""
+    origins = {
+        origin["origin"]: {item["name"]: item["value"] for item in origin.get("localStorage") or []}
+        for origin in storage_state.get("origins") or []
+        if origin.get("origin") and origin.get("localStorage")
+    }
+    if not origins:
+        return None
+    return (
+        "(() => {"
+        f"const items = {json.dumps(origins)}[location.origin];"
+        "if (!items) return;"
+        "for (const [key, value] of Object.entries(items)) {"
+        "if (window.localStorage.getItem(key) === null) window.localStorage.setItem(key, value);"
+        "}"
+        "})();"
+    )
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        start_playwright: Callable[[], Awaitable[Any]],
+        launch_context: Callable[[Any], Awaitable[Any]],
+        *,
+        storage_state_path: Path,
+        idle_seconds: float = 5400.0,
+        max_idle_pages: int = 4,
+        blocked_resource_types: frozenset[str] | set[str] = DEFAULT_BLOCKED_RESOURCE_TYPES,
+    ) -> None:
+        self.start_playwright = start_playwright
+        self.launch_context = launch_context
+        self.storage_state_path = storage_state_path
+        self.idle_seconds = max(0.0, idle_seconds)
+        self.max_idle_pages = max(1, max_idle_pages)
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.lock = asyncio.Lock()
+        self._playwright: Any = None
+        self._context: Any = None
+        self._idle_pages: list[Any] = []
+        self._storage_restored = False
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.launched_at: float | None = None
+        self.launches = 0
+        self.pages_opened = 0
+        self.pages_reused = 0
+        self.blocked_requests = 0
+        self.last_close_reason: str | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._context is not None
+
+    async def context(self) -> Any:
+        async with self.lock:
+            if self._context is None:
+                await self._launch()
+            return self._context
+
+    async def _launch(self) -> None:
+        if self._playwright is None:
+            self._playwright = await self.start_playwright()
+        context = await self.launch_context(self._playwright)
+        if self.blocked_resource_types:
+            await context.route("**/*", self._route)
+        context.on("close", lambda _context: self._forget(context))
+        self._context = context
+        self._idle_pages = list(context.pages)
+        self._storage_restored = False
+        self.launched_at = time.monotonic()
+        self.launches += 1
+
+    def _forget(self, context: Any) -> None:
+        # The browser went away on its own (crash, killed process); launch again on next use.
+        if self._context is context:
+            self._context = None
+            self._idle_pages = []
+            self.last_close_reason = "browser closed"
+
+    async def _route(self, route: Any) -> None:
+        request = route.request
+        if request.resource_type in self.blocked_resource_types and not any(part in request.url for part in ALWAYS_ALLOWED_URL_PARTS):
+            self.blocked_requests += 1
+            await route.abort()
+            return
+        await route.continue_()
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Any]:
+        context = await self.context()
+        page = None
+        while self._idle_pages and page is None:
+            candidate = self._idle_pages.pop()
+            if not candidate.is_closed():
+                page = candidate
+                self.pages_reused += 1
+        if page is None:
+            page = await context.new_page()
+            self.pages_opened += 1
+        self.in_use += 1
+        try:
+            yield page
+        finally:
+            self.in_use -= 1
+            self.last_used = time.monotonic()
+            if self._context is context and not page.is_closed() and len(self._idle_pages) < self.max_idle_pages:
+                self._idle_pages.append(page)
+            elif not page.is_closed():
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+    async def save_storage_state(self) -> None:
+        if self._context is None:
+            return
+        self.storage_state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.storage_state_path.with_name(f"{self.storage_state_path.name}.tmp")
+        await self._context.storage_state(path=str(tmp_path))
+        tmp_path.replace(self.storage_state_path)
+
+    async def restore_storage_state(self) -> bool:
+        """Add the last saved cookies and localStorage to the context; at most once per launch."""
+        if self._context is None or self._storage_restored or not self.storage_state_path.exists():
+            return False
+        self._storage_restored = True
+        try:
+            storage_state = json.loads(self.storage_state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        cookies = storage_state.get("cookies") or []
+        if not cookies:
+            return False
+        await self._context.add_cookies(cookies)
+        script = local_storage_init_script(storage_state)
+        if script:
+            await self._context.add_init_script(script)
+        return True
+
+    def forget_storage_state(self) -> None:
+        try:
+            self.storage_state_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    async def close(self, reason: str) -> None:
+        async with self.lock:
+            context, self._context = self._context, None
+            playwright, self._playwright = self._playwright, None
+            self._idle_pages = []
+            self.last_close_reason = reason
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            if playwright is not None:
+                try:
+                    await playwright.stop()
+                except Exception:
+                    pass
+
+    async def close_if_idle(self) -> bool:
+        if not self.idle_seconds or self._context is None or self.in_use:
+            return False
+        if time.monotonic() - self.last_used < self.idle_seconds:
+            return False
+        await self.close("idle")
+        return True
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "open": self.is_open,
+            "in_use": self.in_use,
+            "idle_pages": len(self._idle_pages),
+            "launches": self.launches,
+            "pages_opened": self.pages_opened,
+            "pages_reused": self.pages_reused,
+            "blocked_requests": self.blocked_requests,
+            "uptime_seconds": round(time.monotonic() - self.launched_at) if self._context is not None and self.launched_at else None,
+            "idle_seconds": self.idle_seconds,
+            "last_close_reason": self.last_close_reason,
+            "storage_state_saved": self.storage_state_path.exists(),
+        }
@@ -18,6 +18,8 @@ from dotenv import load_dotenv
 from fastapi import FastAPI, Query
 from playwright.async_api import async_playwright
 
+from .browser_pool import BrowserPool, PhaseTimer
+
 load_dotenv()
 
 DATA_DIR = Path(os.getenv("EASYPARK_DATA_DIR", "/data"))
@@ -28,6 +30,7 @@ DOWNLOAD_DIR = DATA_DIR / "downloads"
 ARTIFACT_DIR = DATA_DIR / "artifacts"
 STATE_PATH = DATA_DIR / "state.json"
 AUTH_STATE_PATH = DATA_DIR / "auth-state.json"
+STORAGE_STATE_PATH = DATA_DIR / "storage-state.json"
 
 REPORT_URL = os.getenv("EASYPARK_REPORT_URL", "https://dashboard.easypark.net/search-parkings/1")
 RUN_INTERVAL_MINUTES = int(os.getenv("EASYPARK_RUN_INTERVAL_MINUTES", "2"))
@@ -46,6 +49,14 @@ EDGE_EXECUTABLE_PATH = os.getenv("EASYPARK_EDGE_EXECUTABLE_PATH", "/usr/bin/micr
 JOB_TIMEOUT_SECONDS = max(60, int(os.getenv("EASYPARK_JOB_TIMEOUT_SECONDS", "300")))
 WATCHDOG_INTERVAL_SECONDS = max(10, int(os.getenv("EASYPARK_WATCHDOG_INTERVAL_SECONDS", "30")))
 STALE_JOB_SECONDS = max(JOB_TIMEOUT_SECONDS + 30, int(os.getenv("EASYPARK_STALE_JOB_SECONDS", "600")))
+BROWSER_IDLE_MINUTES = max(0, int(os.getenv("EASYPARK_BROWSER_IDLE_MINUTES", "240")))
+BACKFILL_PARALLEL = max(1, int(os.getenv("EASYPARK_BACKFILL_PARALLEL", "3")))
+PROFILE_SNAPSHOT_HOURS = max(1, int(os.getenv("EASYPARK_PROFILE_SNAPSHOT_HOURS", "24")))
+BLOCKED_RESOURCE_TYPES = {
+    part.strip().lower()
+    for part in os.getenv("EASYPARK_BLOCK_RESOURCE_TYPES", "image,media,font").split(",")
+    if part.strip()
+}
 AUTO_RESTART_ON_BROWSER_FAILURE = os.getenv("EASYPARK_AUTO_RESTART_ON_BROWSER_FAILURE", "true").strip().lower() in {"1", "true", "yes", "ja"}
 EDGE_USER_AGENT = os.getenv(
     "EASYPARK_USER_AGENT",
@@ -77,6 +88,7 @@ state: dict[str, Any] = {
     "last_import": None,
     "last_period": None,
     "last_action": "init",
+    "last_timings": None,
 }
 
 STEALTH_INIT_SCRIPT = """
@@ -288,6 +300,65 @@ async def prepare_browser_context(context) -> None:
     await context.add_init_script(STEALTH_INIT_SCRIPT)
 
 
+async def launch_browser_context(playwright):
+    clear_stale_browser_locks()
+    context = await playwright.chromium.launch_persistent_context(
+        str(PROFILE_DIR),
+        headless=HEADLESS,
+        accept_downloads=True,
+        downloads_path=str(DOWNLOAD_DIR),
+        viewport={"width": 1365, "height": 900},
+        locale="en-US",
+        timezone_id="Europe/Oslo",
+        user_agent=EDGE_USER_AGENT,
+        **edge_launch_options(),
+    )
+    await prepare_browser_context(context)
+    return context
+
+
+async def start_playwright():
+    return await async_playwright().start()
+
+
+BROWSER_POOL = BrowserPool(
+    start_playwright,
+    launch_browser_context,
+    storage_state_path=STORAGE_STATE_PATH,
+    idle_seconds=BROWSER_IDLE_MINUTES * 60,
+    max_idle_pages=BACKFILL_PARALLEL,
+    blocked_resource_types=BLOCKED_RESOURCE_TYPES,
+)
+
+
+async def reset_browser_pool(reason: str) -> None:
+    try:
+        await asyncio.wait_for(BROWSER_POOL.close(reason), timeout=30)
+    except Exception:
+        schedule_self_restart(reason)
+
+
+async def snapshot_profile_if_due() -> bool:
+    """Copy the profile after a successful run when the last good copy is older than PROFILE_SNAPSHOT_HOURS.
+
+    Copying is only safe while Edge is closed, so the pool is closed for it
+    on purpose and the next run launches the browser again. Callers hold the
+    import lock, so no run can reopen the profile during the copy.
+    """
+    last_snapshot = parse_iso_datetime(read_auth_state().get("last_good_profile_at"))
+    if last_snapshot and datetime.now(timezone.utc) - last_snapshot < timedelta(hours=PROFILE_SNAPSHOT_HOURS):
+        return False
+    if BROWSER_POOL.in_use:
+        return False
+    await BROWSER_POOL.close("profile snapshot")
+    try:
+        await asyncio.to_thread(snapshot_browser_profile)
+    except Exception as exc:
+        set_state(last_profile_snapshot_error=str(exc))
+        return False
+    return True
+
+
 def parse_run_times(value: str) -> list[tuple[int, int]]:
     times: list[tuple[int, int]] = []
     for part in re.split(r"[,;\s]+", value.strip()):
@@ -444,20 +515,40 @@ async def looks_logged_in(page) -> bool:
     )
 
 
+async def wait_for_report(page, timeout_ms: int) -> bool:
+    """Poll until the report page is usable instead of sleeping the whole ``timeout_ms``."""
+    deadline = time.monotonic() + timeout_ms / 1000
+    while True:
+        try:
+            if await looks_logged_in(page):
+                return True
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        await page.wait_for_timeout(250)
+
+
 async def save_debug(page, name: str) -> None:
     ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
     (ARTIFACT_DIR / f"{name}.txt").write_text((await page_text(page))[:5000], encoding="utf-8")
     await page.screenshot(path=str(ARTIFACT_DIR / f"{name}.png"), full_page=True)
 
 
-async def ensure_logged_in(page) -> bool:
+async def ensure_logged_in(page, restore_session=None) -> bool:
     await page.goto(REPORT_URL, wait_until="domcontentloaded", timeout=60000)
-    await page.wait_for_timeout(5000)
-    if await looks_logged_in(page):
+    if await wait_for_report(page, 5000):
         if not parse_iso_datetime(read_auth_state().get("last_login_at")):
             mark_login_completed()
         return False
 
+    if restore_session is not None and await restore_session():
+        # Cookies from the last good run usually still work after a profile reset or restore.
+        await page.goto(REPORT_URL, wait_until="domcontentloaded", timeout=60000)
+        if await wait_for_report(page, 5000):
+            write_auth_state(last_storage_state_restore_at=utcnow_iso())
+            return False
+
     performed_login = False
     body = await page_text(page)
     if re.search(r"sign in|username|password", body, re.I):
@@ -521,8 +612,7 @@ async def ensure_logged_in(page) -> bool:
         raise RuntimeError("EasyPark-login fullførte ikke.")
 
     await page.goto(REPORT_URL, wait_until="domcontentloaded", timeout=60000)
-    await page.wait_for_timeout(5000)
-    if not await looks_logged_in(page):
+    if not await wait_for_report(page, 5000):
         await save_debug(page, "easypark-report-not-ready")
         raise RuntimeError("EasyPark-rapporten ble ikke tilgjengelig etter login.")
     if performed_login:
@@ -566,32 +656,7 @@ async def logout_easypark(page) -> bool:
     return False
 
 
-async def try_logout_existing_session(playwright) -> bool:
-    if not PROFILE_DIR.exists():
-        return False
-    clear_stale_browser_locks()
-    context = await playwright.chromium.launch_persistent_context(
-        str(PROFILE_DIR),
-        headless=HEADLESS,
-        accept_downloads=False,
-        viewport={"width": 1365, "height": 900},
-        locale="en-US",
-        timezone_id="Europe/Oslo",
-        user_agent=EDGE_USER_AGENT,
-        **edge_launch_options(),
-    )
-    await prepare_browser_context(context)
-    page = context.pages[0] if context.pages else await context.new_page()
-    try:
-        return await logout_easypark(page)
-    finally:
-        try:
-            await context.close()
-        except Exception:
-            pass
-
-
-async def download_report(page) -> Path:
+async def download_report(page, label: str | None = None) -> Path:
     body = await page_text(page)
     if not re.search(r"export to file", body, re.I):
         await save_debug(page, "easypark-export-missing")
@@ -619,7 +684,9 @@ async def download_report(page) -> Path:
 
     DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
     extension = Path(download.suggested_filename).suffix or ".csv"
-    target = DOWNLOAD_DIR / f"easypark-parkings-{stamp()}{extension}"
+    # Parallel backfill months finish within the same second, so the period is part of the name.
+    suffix = f"-{label}" if label else ""
+    target = DOWNLOAD_DIR / f"easypark-parkings-{stamp()}{suffix}{extension}"
     await download.save_as(str(target))
     return target
 
@@ -761,6 +828,38 @@ def report_failure_to_fibaro10(started_at: str, message: str) -> None:
         pass
 
 
+def period_slug(from_day: date | None, to_day: date | None) -> str | None:
+    if not from_day or not to_day:
+        return None
+    return f"{from_day.isoformat()}_{to_day.isoformat()}"
+
+
+async def download_period(page, from_day: date | None, to_day: date | None, timer: PhaseTimer) -> Path:
+    period = period_label(from_day, to_day)
+    with timer.phase("login"):
+        set_state(last_action="login")
+        login_performed = await ensure_logged_in(page, restore_session=BROWSER_POOL.restore_storage_state)
+    if login_performed:
+        set_state(last_action="login_completed")
+    if from_day and to_day:
+        with timer.phase("date_pick"):
+            set_state(last_action="set_period", last_period=period)
+            await set_date_range(page, from_day, to_day)
+    with timer.phase("download"):
+        set_state(last_action="download", last_period=period)
+        return await download_report(page, period_slug(from_day, to_day))
+
+
+async def import_download(file_path: Path, timer: PhaseTimer) -> dict[str, Any]:
+    with timer.phase("import"):
+        import_result = await asyncio.to_thread(post_to_fibaro10, file_path)
+    try:
+        await BROWSER_POOL.save_storage_state()
+    except Exception:
+        pass
+    return import_result
+
+
 async def _run_download_import(
     from_day: date | None = None,
     to_day: date | None = None,
@@ -771,59 +870,30 @@ async def _run_download_import(
     period = period_label(from_day, to_day)
     set_state(running=True, last_action="starting", last_error=None, last_period=period)
     started = fibaro10_datetime_iso()
+    timer = PhaseTimer()
     try:
-        async with async_playwright() as playwright:
-            if force_login:
-                set_state(last_action="logout_before_login", last_period=period)
-                await try_logout_existing_session(playwright)
-                set_state(last_action="refresh_login", last_period=period)
-                write_auth_state(
-                    last_reset_at=utcnow_iso(),
-                    last_reset_reason="scheduled logout/login without profile reset",
-                    last_logout_at=utcnow_iso(),
-                    last_login_at=None,
-                )
-
-            clear_stale_browser_locks()
-            context = await playwright.chromium.launch_persistent_context(
-                str(PROFILE_DIR),
-                headless=HEADLESS,
-                accept_downloads=True,
-                downloads_path=str(DOWNLOAD_DIR),
-                viewport={"width": 1365, "height": 900},
-                locale="en-US",
-                timezone_id="Europe/Oslo",
-                user_agent=EDGE_USER_AGENT,
-                **edge_launch_options(),
+        with timer.phase("browser"):
+            await BROWSER_POOL.context()
+        if force_login:
+            set_state(last_action="logout_before_login", last_period=period)
+            async with BROWSER_POOL.page() as page:
+                await logout_easypark(page)
+            BROWSER_POOL.forget_storage_state()
+            set_state(last_action="refresh_login", last_period=period)
+            write_auth_state(
+                last_reset_at=utcnow_iso(),
+                last_reset_reason="scheduled logout/login without profile reset",
+                last_logout_at=utcnow_iso(),
+                last_login_at=None,
             )
-            await prepare_browser_context(context)
-            page = context.pages[0] if context.pages else await context.new_page()
-            try:
-                set_state(last_action="login")
-                login_performed = await ensure_logged_in(page)
-                if login_performed:
-                    set_state(last_action="login_completed")
-                if from_day and to_day:
-                    set_state(last_action="set_period", last_period=period)
-                    await set_date_range(page, from_day, to_day)
-                    set_state(last_action="download", last_period=period)
-                    file_path = await download_report(page)
-                else:
-                    set_state(last_action="download")
-                    file_path = await download_report(page)
-            finally:
-                try:
-                    await context.close()
-                except Exception:
-                    pass
+
+        async with BROWSER_POOL.page() as page:
+            file_path = await download_period(page, from_day, to_day, timer)
 
         set_state(last_action="import")
-        import_result = post_to_fibaro10(file_path)
-        try:
-            snapshot_browser_profile()
-        except Exception:
-            pass
-        result = {"ok": True, "started_at": started, "period": period, "file": str(file_path), "import": import_result}
+        import_result = await import_download(file_path, timer)
+        timings = timer.payload()
+        result = {"ok": True, "started_at": started, "period": period, "file": str(file_path), "import": import_result, "timings": timings}
         set_state(
             running=False,
             last_success_at=utcnow_iso(),
@@ -832,26 +902,25 @@ async def _run_download_import(
             last_import=import_result,
             last_period=period,
             last_action="done",
+            last_timings=timings,
         )
         return result
     except Exception as exc:
         message = str(exc)
-        if (
-            allow_profile_restore
-            and should_restore_profile_after_error(message)
-            and restore_browser_profile_snapshot(message)
-        ):
-            set_state(running=False, last_error=None, last_action="profile_restore_retry", last_period=period)
-            return await _run_download_import(
-                from_day,
-                to_day,
-                force_login=False,
-                allow_profile_restore=False,
-            )
-        set_state(running=False, last_error=message, last_action="error", last_period=period)
+        if allow_profile_restore and should_restore_profile_after_error(message) and PROFILE_SNAPSHOT_DIR.exists():
+            await reset_browser_pool(message)
+            if restore_browser_profile_snapshot(message):
+                set_state(running=False, last_error=None, last_action="profile_restore_retry", last_period=period)
+                return await _run_download_import(
+                    from_day,
+                    to_day,
+                    force_login=False,
+                    allow_profile_restore=False,
+                )
+        set_state(running=False, last_error=message, last_action="error", last_period=period, last_timings=timer.payload())
         report_failure_to_fibaro10(started, message)
         if should_restart_after_error(message):
-            schedule_self_restart(message)
+            await reset_browser_pool(message)
         raise
 
 
@@ -861,7 +930,7 @@ async def run_download_import(
     force_login: bool = False,
 ) -> dict[str, Any]:
     try:
-        return await asyncio.wait_for(
+        result = await asyncio.wait_for(
             _run_download_import(from_day, to_day, force_login),
             timeout=JOB_TIMEOUT_SECONDS,
         )
@@ -870,8 +939,10 @@ async def run_download_import(
         message = f"EasyPark-importen stoppet etter {JOB_TIMEOUT_SECONDS} sekunder."
         set_state(running=False, last_error=message, last_action="timeout", last_period=period)
         report_failure_to_fibaro10(fibaro10_datetime_iso(), message)
-        schedule_self_restart(message)
+        await reset_browser_pool(message)
         raise RuntimeError(message) from exc
+    await snapshot_profile_if_due()
+    return result
 
 
 async def run_once(from_day: date | None = None, to_day: date | None = None) -> dict[str, Any]:
@@ -951,23 +1022,65 @@ async def run_scheduled_once() -> dict[str, Any]:
         return await run_download_import(from_day, to_day, force_login=should_force_login_now())
 
 
+async def backfill_period(from_day: date, to_day: date) -> dict[str, Any]:
+    period = period_label(from_day, to_day)
+    timer = PhaseTimer()
+    try:
+        async with BROWSER_POOL.page() as page:
+            file_path = await download_period(page, from_day, to_day, timer)
+        import_result = await import_download(file_path, timer)
+        return {"ok": True, "period": period, "file": str(file_path), "import": import_result, "timings": timer.payload()}
+    except Exception as exc:
+        await asyncio.to_thread(report_failure_to_fibaro10, fibaro10_datetime_iso(), f"{period}: {exc}")
+        return {"ok": False, "period": period, "error": str(exc), "timings": timer.payload()}
+
+
 async def run_backfill_year(year: int, end_day: date | None = None) -> dict[str, Any]:
     async with lock:
-        results: list[dict[str, Any]] = []
         set_state(running=True, last_action="backfill_start", last_error=None, last_period=str(year))
-        for from_day, to_day in monthly_periods(year, end_day):
-            set_state(last_action="backfill_period", last_period=period_label(from_day, to_day))
-            results.append(await run_download_import(from_day, to_day, force_login=False))
+        timer = PhaseTimer()
+        try:
+            with timer.phase("browser"):
+                await BROWSER_POOL.context()
+            # Log in on one tab first so the parallel tabs never race through the email-code flow.
+            with timer.phase("login"):
+                async with BROWSER_POOL.page() as page:
+                    await ensure_logged_in(page, restore_session=BROWSER_POOL.restore_storage_state)
+        except Exception as exc:
+            set_state(running=False, last_error=str(exc), last_action="error", last_period=str(year), last_timings=timer.payload())
+            if should_restart_after_error(str(exc)):
+                await reset_browser_pool(str(exc))
+            raise
+        semaphore = asyncio.Semaphore(BACKFILL_PARALLEL)
+
+        async def run_month(from_day: date, to_day: date) -> dict[str, Any]:
+            async with semaphore:
+                set_state(running=True, last_action="backfill_period", last_period=period_label(from_day, to_day))
+                try:
+                    return await asyncio.wait_for(backfill_period(from_day, to_day), timeout=JOB_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    return {"ok": False, "period": period_label(from_day, to_day), "error": f"Stoppet etter {JOB_TIMEOUT_SECONDS} sekunder."}
+
+        results = await asyncio.gather(*(run_month(from_day, to_day) for from_day, to_day in monthly_periods(year, end_day)))
+        imported = [item for item in results if item.get("ok")]
+        failed = [item for item in results if not item.get("ok")]
         totals = {
             "periods": len(results),
-            "inserted": sum(int(item.get("import", {}).get("inserted") or 0) for item in results),
-            "updated": sum(int(item.get("import", {}).get("updated") or 0) for item in results),
-            "unchanged": sum(int(item.get("import", {}).get("unchanged") or 0) for item in results),
-            "skipped": sum(int(item.get("import", {}).get("skipped") or 0) for item in results),
-            "total": sum(int(item.get("import", {}).get("total") or 0) for item in results),
+            "failed": len(failed),
+            "inserted": sum(int(item.get("import", {}).get("inserted") or 0) for item in imported),
+            "updated": sum(int(item.get("import", {}).get("updated") or 0) for item in imported),
+            "unchanged": sum(int(item.get("import", {}).get("unchanged") or 0) for item in imported),
+            "skipped": sum(int(item.get("import", {}).get("skipped") or 0) for item in imported),
+            "total": sum(int(item.get("import", {}).get("total") or 0) for item in imported),
         }
-        set_state(running=False, last_action="backfill_done", last_period=str(year))
-        return {"ok": True, "year": year, "totals": totals, "results": results}
+        timings = timer.payload()
+        last_error = "; ".join(f"{item['period']}: {item['error']}" for item in failed) or None
+        if any(should_restart_after_error(item["error"]) for item in failed):
+            await reset_browser_pool(last_error or "backfill")
+        if imported and not failed:
+            await snapshot_profile_if_due()
+        set_state(running=False, last_action="backfill_done", last_period=str(year), last_error=last_error, last_timings=timings)
+        return {"ok": not failed, "year": year, "totals": totals, "timings": timings, "results": results}
 
 
 async def worker_loop() -> None:
@@ -987,6 +1100,11 @@ async def worker_loop() -> None:
 async def watchdog_loop() -> None:
     while True:
         await asyncio.sleep(WATCHDOG_INTERVAL_SECONDS)
+        if not import_is_active():
+            try:
+                await BROWSER_POOL.close_if_idle()
+            except Exception:
+                pass
         if not state.get("running") or running_started_monotonic is None:
             continue
         elapsed = time.monotonic() - running_started_monotonic
@@ -1013,6 +1131,11 @@ async def startup() -> None:
     watchdog_task = asyncio.create_task(watchdog_loop())
 
 
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    await BROWSER_POOL.close("shutdown")
+
+
 @app.get("/health")
 async def health() -> dict[str, Any]:
     return {
@@ -1041,6 +1164,7 @@ async def status() -> dict[str, Any]:
             "stale_job_seconds": STALE_JOB_SECONDS,
             "auto_restart": AUTO_RESTART_ON_BROWSER_FAILURE,
         },
+        "browser": {**BROWSER_POOL.payload(), "backfill_parallel": BACKFILL_PARALLEL},
     }
 
 
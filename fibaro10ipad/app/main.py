@@ -16,6 +16,8 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 
+from microapp_backend.event_stream import fibaro_event_stream
+
 load_dotenv()
 
 FIBARO10_BASE_URL = os.getenv("FIBARO10_BASE_URL", "http://fibaro10:8110").rstrip("/")
@@ -26,6 +28,7 @@ ASSET_VERSION = f"{APP_BUILD}-{APP_COMMIT[:7]}"
 
 SESSION_COOKIE_NAME = "lilletorget_ipad_session"
 SESSION_MAX_AGE_SECONDS = 60 * 60 * 24 * 30
+IPAD_EVENT_TOPICS = "doors,bollards,notifications,robot"
 
 ALLOWED_MODULES: dict[str, set[str]] = {
     "parkering": {"oversikt", "parkeringer", "dagslinje", "kjoretoy", "prognose"},
@@ -286,6 +289,17 @@ async def api_bootstrap(request: Request):
     }
 
 
+@app.get("/api/events")
+async def api_events(request: Request):
+    return await fibaro_event_stream(
+        FIBARO10_BASE_URL,
+        require_session(request),
+        IPAD_EVENT_TOPICS,
+        request.headers.get("last-event-id") or request.query_params.get("lastEventId"),
+        user_agent="lilletorget-ipad/1",
+    )
+
+
 @app.get("/api/module/{module}")
 async def api_module(module: str, request: Request, view: Optional[str] = None, day: Optional[str] = None):
     token = require_session(request)
@@ -492,6 +506,12 @@ INDEX_HTML = f"""<!doctype html>
           </div>
           <div id="serviceList" class="service-list"></div>
         </article>
+        <article class="panel">
+          <div class="panel-head">
+            <h2>Live</h2>
+          </div>
+          <div id="liveList" class="event-list"></div>
+        </article>
       </div>
     </section>
     </section>
@@ -1,6 +1,7 @@
 const state = {
   data: null,
   activeView: "overview",
+  liveEvents: [],
 };
 
 const viewTitles = {
@@ -385,6 +386,7 @@ function renderAll() {
   renderParking();
   renderSun();
   renderOps();
+  renderEvents("liveList", state.liveEvents);
 }
 
 function showView(view) {
@@ -412,6 +414,47 @@ async function loadBootstrap() {
   renderAll();
 }
 
+function liveEventRow(topic, type, data) {
+  if (topic === "doors" && type === "door_event") {
+    return { label: `Dør ${safeText(data.deviceName || data.deviceKey)}`, detail: safeText(data.timeLabel, ""), value: safeText(data.stateLabel) };
+  }
+  if (topic === "doors" && type === "alarm") {
+    return { label: safeText(data.title, "Døralarm"), detail: safeText(data.detail, ""), value: data.status === "active" ? "Alarm" : "Løst" };
+  }
+  if (topic === "bollards" && type === "incident") {
+    return { label: safeText(data.display_name || data.bollard_key, "Pullert"), detail: safeText(data.severity, ""), value: safeText(data.status) };
+  }
+  if (topic === "notifications" && type === "queued") {
+    return { label: safeText(data.title || data.topic, "Varsel"), detail: safeText(data.message, ""), value: "Varsel" };
+  }
+  if (topic === "robot" && type === "status") {
+    const battery = data.battery === null || data.battery === undefined ? "" : `${data.battery} % batteri`;
+    return { label: safeText(data.name, "Robot"), detail: battery, value: safeText(data.stateName) };
+  }
+  return null;
+}
+
+function applyLiveEvent(event) {
+  let message;
+  try {
+    message = JSON.parse(event.data);
+  } catch {
+    return;
+  }
+  // Events carry the changed row itself, so the feed is patched without fetching the bootstrap again.
+  const row = liveEventRow(event.type, message?.type, message?.data || {});
+  if (!row) return;
+  state.liveEvents = [row, ...state.liveEvents].slice(0, 10);
+  renderEvents("liveList", state.liveEvents);
+}
+
+function connectLiveEvents() {
+  if (!window.EventSource) return;
+  // The browser resends Last-Event-ID on reconnect, so the core replays only what was missed.
+  const source = new EventSource("/api/events", { withCredentials: true });
+  ["doors", "bollards", "notifications", "robot"].forEach((name) => source.addEventListener(name, applyLiveEvent));
+}
+
 function boot() {
   document.querySelectorAll(".mode-tabs button").forEach((button) => {
     button.addEventListener("click", () => showView(button.dataset.view || "overview"));
@@ -424,6 +467,8 @@ function boot() {
     }
   });
   loadBootstrap().catch((error) => setText("syncStatus", `Feil: ${error.message}`));
+  connectLiveEvents();
+  // Revenue, parking, sun and operations figures have no live topic and keep their timer.
   window.setInterval(() => {
     loadBootstrap().catch((error) => setText("syncStatus", `Feil: ${error.message}`));
   }, 60_000);
@@ -0,0 +1,173 @@
+"""In-memory mirror of HC3 device state fed by the ``/api/refreshStates`` change feed."""
+
+import asyncio
+from collections.abc import Callable, Iterable, Mapping
+from time import monotonic, time
+from typing import Any, Optional
+
+
+STRUCTURE_EVENTS = {"DeviceCreatedEvent", "DeviceRemovedEvent", "DeviceModifiedEvent", "DeviceChangedRoomEvent"}
+IGNORED_CHANGE_KEYS = {"id", "log", "logTemp"}
+
+
+class Hc3StateMirror:
+    """Device table kept current from HC3 change events.
+
+    Lookups return ``None`` while the mirror is stale, so callers can fall
+    back to asking HC3 directly.
+    """
+
+    def __init__(self, stale_after_seconds: float = 15.0) -> None:
+        self.stale_after_seconds = max(1.0, float(stale_after_seconds))
+        self.devices: dict[int, dict[str, Any]] = {}
+        self.changed_at: dict[int, float] = {}
+        self.last = 0
+        self.needs_reload = True
+        self.error: Optional[str] = None
+        self.polls = 0
+        self.changes = 0
+        self.reloads = 0
+        self._synced_at: Optional[float] = None
+        self._loaded_at: Optional[float] = None
+
+    def is_fresh(self) -> bool:
+        return (
+            not self.needs_reload
+            and self._synced_at is not None
+            and monotonic() - self._synced_at <= self.stale_after_seconds
+        )
+
+    def reload_due(self, resync_seconds: float) -> bool:
+        return self.needs_reload or self._loaded_at is None or monotonic() - self._loaded_at >= resync_seconds
+
+    def load(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        now = time()
+        devices: dict[int, dict[str, Any]] = {}
+        for row in rows:
+            if not isinstance(row, Mapping) or row.get("id") is None:
+                continue
+            device = dict(row)
+            device["properties"] = dict(row.get("properties") or {})
+            devices[int(row["id"])] = device
+        self.devices = devices
+        self.changed_at = {device_id: self.changed_at.get(device_id, now) for device_id in devices}
+        self.needs_reload = False
+        self.reloads += 1
+        self._loaded_at = monotonic()
+        self._mark_synced()
+
+    def apply(self, payload: Mapping[str, Any]) -> int:
+        """Apply one refreshStates answer and return the number of devices that changed."""
+        changed: set[int] = set()
+        for change in payload.get("changes") or []:
+            if isinstance(change, Mapping) and change.get("id") is not None:
+                values = {key: value for key, value in change.items() if key not in IGNORED_CHANGE_KEYS}
+                if self._update(int(change["id"]), values):
+                    changed.add(int(change["id"]))
+        for event in payload.get("events") or []:
+            if not isinstance(event, Mapping):
+                continue
+            event_type = str(event.get("type") or "")
+            data = event.get("data") if isinstance(event.get("data"), Mapping) else {}
+            if event_type in STRUCTURE_EVENTS:
+                self.needs_reload = True
+            elif event_type == "DevicePropertyUpdatedEvent" and data.get("id") is not None and data.get("property"):
+                if self._update(int(data["id"]), {str(data["property"]): data.get("newValue")}):
+                    changed.add(int(data["id"]))
+        if isinstance(payload.get("last"), int):
+            self.last = int(payload["last"])
+        self.polls += 1
+        self.changes += len(changed)
+        self._mark_synced()
+        return len(changed)
+
+    def fail(self, message: str) -> None:
+        self.error = message[:500]
+        self.needs_reload = True
+
+    def device(self, device_id: int) -> Optional[dict[str, Any]]:
+        if not self.is_fresh():
+            return None
+        row = self.devices.get(int(device_id))
+        if row is None:
+            return None
+        return {**row, "properties": dict(row.get("properties") or {})}
+
+    def rows(self) -> Optional[list[dict[str, Any]]]:
+        if not self.is_fresh():
+            return None
+        return [{**row, "properties": dict(row.get("properties") or {})} for row in self.devices.values()]
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "fresh": self.is_fresh(),
+            "devices": len(self.devices),
+            "last": self.last,
+            "polls": self.polls,
+            "changes": self.changes,
+            "reloads": self.reloads,
+            "secondsSinceSync": round(monotonic() - self._synced_at, 1) if self._synced_at is not None else None,
+            "lastChangeAt": max(self.changed_at.values(), default=None),
+            "error": self.error,
+        }
+
+    def _update(self, device_id: int, values: Mapping[str, Any]) -> bool:
+        device = self.devices.get(device_id)
+        if device is None:
+            # A device we have not seen yet; pick it up on the next full load.
+            self.needs_reload = True
+            return False
+        properties = device.setdefault("properties", {})
+        updated = False
+        for key, value in values.items():
+            if properties.get(key) != value:
+                properties[key] = value
+                updated = True
+        if updated:
+            self.changed_at[device_id] = time()
+        return updated
+
+    def _mark_synced(self) -> None:
+        self._synced_at = monotonic()
+        self.error = None
+
+
+async def run_hc3_state_mirror(
+    mirror: Hc3StateMirror,
+    client: Any,
+    *,
+    poll_interval_seconds: float = 1.0,
+    resync_seconds: float = 900.0,
+    retry_seconds: float = 10.0,
+    on_error: Optional[Callable[[Exception], None]] = None,
+) -> None:
+    """Keep ``mirror`` in sync through an ``httpx.AsyncClient`` pointed at HC3, until cancelled.
+
+    HC3 holds refreshStates briefly and answers as soon as something changes,
+    so the loop only sleeps after an empty answer.
+    """
+    while True:
+        try:
+            if mirror.reload_due(resync_seconds):
+                # Take the cursor before the snapshot so no change between the two is lost.
+                cursor = await client.get("/api/refreshStates", params={"last": 0, "lang": "en"})
+                cursor.raise_for_status()
+                response = await client.get("/api/devices")
+                response.raise_for_status()
+                rows = response.json()
+                if not isinstance(rows, list):
+                    raise RuntimeError("HC3 svarte ikke med en enhetsliste.")
+                mirror.load(rows)
+                cursor_last = cursor.json().get("last")
+                mirror.last = int(cursor_last) if isinstance(cursor_last, int) else 0
+            response = await client.get("/api/refreshStates", params={"last": mirror.last, "lang": "en"})
+            response.raise_for_status()
+            if not mirror.apply(response.json()):
+                await asyncio.sleep(poll_interval_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            mirror.fail(str(exc))
+            if on_error is not None:
+                on_error(exc)
+            await asyncio.sleep(retry_seconds)
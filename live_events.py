@@ -0,0 +1,170 @@
+"""In-process publish/subscribe bus behind the core's server-sent event stream."""
+
+import asyncio
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import secrets
+from typing import Any, Optional
+
+
+LIVE_EVENTS_CHANNEL = "fibaro10_live_events"
+LIVE_EVENT_TOPICS = ("doors", "bollards", "notifications", "robot")
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+
+def live_event_topics(value: Optional[str]) -> frozenset[str]:
+    requested = {part.strip().casefold() for part in str(value or "").split(",") if part.strip()}
+    if not requested:
+        return frozenset(LIVE_EVENT_TOPICS)
+    return frozenset(topic for topic in LIVE_EVENT_TOPICS if topic in requested)
+
+
+def notify_payload(topic: str, event_type: str, data: Any) -> str:
+    """JSON for pg_notify; oversized data is replaced by a reload marker."""
+    payload = json.dumps(
+        {"topic": topic, "type": event_type, "data": data},
+        ensure_ascii=False,
+        default=str,
+        separators=(",", ":"),
+    )
+    if len(payload.encode("utf-8")) < NOTIFY_PAYLOAD_LIMIT:
+        return payload
+    return json.dumps({"topic": topic, "type": event_type, "data": {"reload": True}}, separators=(",", ":"))
+
+
+def sse_frame(event: Mapping[str, Any]) -> str:
+    data = json.dumps(
+        {"type": event["type"], "at": event["at"], "data": event["data"]},
+        ensure_ascii=False,
+        default=str,
+        separators=(",", ":"),
+    )
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {data}\n\n"
+
+
+def sse_control_frame(event_name: str, event_id: str, data: Mapping[str, Any]) -> str:
+    return f"id: {event_id}\nevent: {event_name}\ndata: {json.dumps(dict(data), separators=(',', ':'))}\n\n"
+
+
+class LiveSubscription:
+    def __init__(self, topics: frozenset[str], queue_size: int) -> None:
+        self.topics = topics
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=queue_size)
+        self.lagged = False
+
+
+class LiveEventBus:
+    """Topic bus with a bounded replay history.
+
+    Event ids are ``<origin>-<sequence>``. The origin changes with every
+    process start, so a ``Last-Event-ID`` from another process or from
+    before a restart is reported as unknown and the client reloads once.
+    """
+
+    def __init__(self, history_size: int = 512, queue_size: int = 256, origin: Optional[str] = None) -> None:
+        self.origin = origin or secrets.token_hex(4)
+        self.queue_size = max(1, int(queue_size))
+        self.listening = False
+        self.published = 0
+        self.lagged = 0
+        self._sequence = 0
+        self._history: deque[dict[str, Any]] = deque(maxlen=max(1, int(history_size)))
+        self._subscribers: set[LiveSubscription] = set()
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    @property
+    def current_id(self) -> str:
+        return f"{self.origin}-{self._sequence}"
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, topic: str, event_type: str, data: Any) -> dict[str, Any]:
+        self._sequence += 1
+        event = {
+            "id": f"{self.origin}-{self._sequence}",
+            "sequence": self._sequence,
+            "topic": topic,
+            "type": event_type,
+            "at": datetime.now().astimezone().isoformat(),
+            "data": data,
+        }
+        self._history.append(event)
+        self.published += 1
+        for subscription in tuple(self._subscribers):
+            if topic not in subscription.topics or subscription.lagged:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The stream tells the client to reload instead of silently skipping events.
+                subscription.lagged = True
+                self.lagged += 1
+        return event
+
+    def events_after(self, last_event_id: Optional[str], topics: Iterable[str]) -> Optional[list[dict[str, Any]]]:
+        """Events newer than ``last_event_id``, or ``None`` when they can no longer be replayed."""
+        origin, _, sequence_text = str(last_event_id or "").strip().rpartition("-")
+        if origin != self.origin or not sequence_text.isdigit():
+            return None
+        sequence = int(sequence_text)
+        if sequence > self._sequence:
+            return None
+        oldest = self._history[0]["sequence"] if self._history else self._sequence + 1
+        if sequence < oldest - 1:
+            return None
+        wanted = set(topics)
+        return [event for event in self._history if event["sequence"] > sequence and event["topic"] in wanted]
+
+    @contextmanager
+    def subscribe(self, topics: Iterable[str]) -> Iterator[LiveSubscription]:
+        subscription = LiveSubscription(frozenset(topics), self.queue_size)
+        self._subscribers.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscribers.discard(subscription)
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "origin": self.origin,
+            "currentId": self.current_id,
+            "listening": self.listening,
+            "subscribers": self.subscriber_count,
+            "published": self.published,
+            "lagged": self.lagged,
+            "history": len(self._history),
+        }
+
+
+def keyed_row_changes(
+    previous: Mapping[str, tuple[Any, ...]],
+    rows: Iterable[Mapping[str, Any]],
+    key_field: str,
+    fields: tuple[str, ...],
+) -> tuple[list[dict[str, Any]], list[str], dict[str, tuple[Any, ...]]]:
+    """Compare polled rows with the previous fingerprints.
+
+    Returns the changed rows (reduced to ``fields``), the keys that
+    disappeared and the fingerprints to compare against next time.
+    """
+    current: dict[str, tuple[Any, ...]] = {}
+    changed: list[dict[str, Any]] = []
+    for row in rows:
+        if not isinstance(row, Mapping) or row.get(key_field) is None:
+            continue
+        key = str(row[key_field])
+        fingerprint = tuple(row.get(field) for field in fields)
+        current[key] = fingerprint
+        if previous.get(key) != fingerprint:
+            changed.append({field: row.get(field) for field in fields})
+    removed = [key for key in previous if key not in current]
+    return changed, removed, current
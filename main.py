@@ -2,20 +2,23 @@ from datetime import date, datetime, time, timedelta, timezone
 from email.header import decode_header, make_header
 from email.message import Message
 from email.utils import parsedate_to_datetime
-from io import BytesIO, StringIO
+from io import BytesIO, StringIO, TextIOWrapper
+from itertools import islice
 from pathlib import Path
 from copy import deepcopy
 from collections import defaultdict
 from functools import lru_cache
 from statistics import median
 from types import SimpleNamespace
-from typing import Any, Dict, Iterable, List, Mapping, Optional
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Mapping, Optional
 from time import monotonic, perf_counter
 import asyncio
 from bisect import bisect_left, bisect_right
 import calendar
+import codecs
 import csv
 import email as email_lib
+import gzip
 import hashlib
 import imaplib
 import json
@@ -34,20 +37,22 @@ from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+import httpx
 from microapp_backend import PwaConfig, register_pwa, render_login_page
 from microapp_backend.auth import AUTH_SESSION_COOKIE_NAME, clear_auth_cookies, request_is_secure, set_auth_session_cookie
-from pydantic import BaseModel, Field
-from sqlalchemy import Boolean, BigInteger, Column, Date, DateTime, Float, ForeignKey, Integer, JSON, LargeBinary, String, Text, UniqueConstraint, and_, case, cast, delete, func, literal, or_, select, text as sql_text, tuple_, union_all, update
+from microapp_backend.profiler import profiler_from_env, route_codes
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import Boolean, BigInteger, Column, Date, DateTime, Float, ForeignKey, Integer, JSON, LargeBinary, String, Text, UniqueConstraint, and_, case, cast, delete, event as sa_event, func, lambda_stmt, literal, or_, select, text as sql_text, tuple_, union_all, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, load_only
 from dateutil import parser as dtparser
 load_dotenv()
 from application_lifecycle import BackgroundTaskSupervisor, create_lifespan
-from build_log import APP_BUILD, APP_VERSION, BUILD_LOG, api_build_log_row, build_log_entry_by_build, normalized_build_log_entry
+from build_log import APP_BUILD, APP_VERSION, api_build_log_row, build_log_entry_by_build, load_build_log, normalized_build_log_entry
 from api_contracts import admin_build_payload, admin_builds_payload
 from api_types import ModuleCardPayload, ModuleTablePayload
 from cars_domain import (
@@ -116,9 +121,61 @@ from energy_helpers import (
     normalize_energy_sunbed_filter,
     parse_elvia_json_payload,
 )
+from analytics_replica import NULL_PARTITION, AnalyticsReplica, ReplicaTable, replica_supported, shift_month
+from automation_rules import RuleEngine, RuleEvent, RuleMatch
+from database_pools import (
+    BACKGROUND,
+    INTERACTIVE,
+    CompiledCacheStats,
+    QueryStats,
+    SlowQueryLog,
+    background_task_context,
+    current_query_stats,
+    db_workload,
+    instrument_engine,
+    listener_engine_options,
+    pool_payload,
+    pool_settings,
+)
+from hc3_state_mirror import Hc3StateMirror, run_hc3_state_mirror
 from import_jobs import IMPORT_JOB_DEFINITIONS, IMPORT_JOB_NUMBER_BY_NAME
+from migration_runner import ensure_schema, metadata_schema_parts, schema_fingerprint
 from observability import cache_control_for_path, health_payload, response_timing_headers
+from live_events import (
+    LIVE_EVENT_TOPICS,
+    LIVE_EVENTS_CHANNEL,
+    LiveEventBus,
+    keyed_row_changes,
+    live_event_topics,
+    notify_payload,
+    sse_control_frame,
+    sse_frame,
+)
+from notification_delivery import (
+    NOTIFICATION_OUTBOX_CHANNEL,
+    OutboxWakeup,
+    TopicRateLimiter,
+    coalesce_notification_items,
+    ntfy_headers,
+)
 from operational_retention import OperationalRetentionPolicy, execute_retention_statements
+from response_versions import (
+    DATA_VERSIONS_CHANNEL,
+    DataVersionSignal,
+    conditional_headers,
+    data_version_trigger_statements,
+    etag_matches,
+    long_poll_seconds,
+    table_version_parts,
+    table_version_sql,
+    version_query_items,
+    versioned_path_tables,
+    versioned_tables,
+    wait_for_new_etag,
+    weak_etag,
+)
+from sunroom_occupancy import SunroomOccupancy
+from time_partitioning import PARTITIONED_TABLE_COLUMNS, PartitionedTable, maintain_time_partitions
 from unifi_protect_client import ProtectLedgerClient, ProtectLedgerError
 from pdf_exports import build_table_pdf, pdf_response
 from parking_vehicle_helpers import (
@@ -293,6 +350,7 @@ SUNBED_POWER_CACHE_WARM_ENABLED = os.getenv("SUNBED_POWER_CACHE_WARM_ENABLED", "
 CARS_DAY_CACHE_TTL = timedelta(seconds=max(15, int(os.getenv("CARS_DAY_CACHE_SECONDS", "60"))))
 CARS_HISTORY_CACHE_TTL = timedelta(minutes=max(5, int(os.getenv("CARS_HISTORY_CACHE_MINUTES", "30"))))
 FIBARO10_PROCESS_ROLE = os.getenv("FIBARO10_PROCESS_ROLE", "combined").strip().lower() or "combined"
+SCHEMA_SYNC_ALWAYS = os.getenv("SCHEMA_SYNC_ALWAYS", "false").strip().lower() in {"1", "true", "yes", "ja"}
 FIBARO10_BACKGROUND_TASKS_ENABLED = os.getenv("FIBARO10_BACKGROUND_TASKS_ENABLED", "true").strip().lower() in {
     "1",
     "true",
@@ -335,6 +393,7 @@ CAR_INFO_CANDIDATE_RETRY_HOURS = max(24, int(os.getenv("CAR_INFO_CANDIDATE_RETRY
 CAR_INFO_CANDIDATE_TRANSIENT_RETRY_MINUTES = max(30, int(os.getenv("CAR_INFO_CANDIDATE_TRANSIENT_RETRY_MINUTES", "240")))
 CAR_INFO_AUTO_TRIGGER_ENABLED = os.getenv("CAR_INFO_AUTO_TRIGGER_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
 CAR_INFO_AUTO_TRIGGER_MAX_PER_SVV_RUN = max(0, min(5, int(os.getenv("CAR_INFO_AUTO_TRIGGER_MAX_PER_SVV_RUN", "1"))))
+SVV_SHARED_LOOKUP_ENABLED = os.getenv("SVV_SHARED_LOOKUP_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
 MOBILE_PREVIEW_REFRESH_SECONDS = max(15, int(os.getenv("MOBILE_PREVIEW_REFRESH_SECONDS", "60")))
 NTFY_TIMEOUT_SECONDS = env_float("NTFY_TIMEOUT_SECONDS", "4")
 NTFY_ACCESS_COOLDOWN_MINUTES = env_float("NTFY_ACCESS_COOLDOWN_MINUTES", "30")
@@ -345,6 +404,47 @@ NTFY_OUTBOX_RETRY_MAX_SECONDS = max(
     int(os.getenv("NTFY_OUTBOX_RETRY_MAX_SECONDS", "900")),
 )
 NTFY_OUTBOX_STALE_LOCK_SECONDS = max(30, int(os.getenv("NTFY_OUTBOX_STALE_LOCK_SECONDS", "300")))
+NTFY_OUTBOX_CONCURRENCY = max(1, int(os.getenv("NTFY_OUTBOX_CONCURRENCY", "4")))
+NTFY_OUTBOX_LISTEN_ENABLED = os.getenv("NTFY_OUTBOX_LISTEN_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+NTFY_TOPIC_RATE_PER_MINUTE = max(1.0, env_float("NTFY_TOPIC_RATE_PER_MINUTE", "30"))
+NTFY_TOPIC_BURST = max(1, int(os.getenv("NTFY_TOPIC_BURST", "10")))
+notification_outbox_wakeup = OutboxWakeup()
+LIVE_EVENTS_ENABLED = os.getenv("LIVE_EVENTS_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+LIVE_EVENTS_LISTEN_ENABLED = os.getenv("LIVE_EVENTS_LISTEN_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+LIVE_EVENTS_HISTORY_SIZE = max(16, int(os.getenv("LIVE_EVENTS_HISTORY_SIZE", "1000")))
+LIVE_EVENTS_QUEUE_SIZE = max(8, int(os.getenv("LIVE_EVENTS_QUEUE_SIZE", "256")))
+LIVE_EVENTS_KEEPALIVE_SECONDS = max(5.0, env_float("LIVE_EVENTS_KEEPALIVE_SECONDS", "20"))
+LIVE_EVENTS_BOLLARD_POLL_SECONDS = max(2.0, env_float("LIVE_EVENTS_BOLLARD_POLL_SECONDS", "10"))
+LIVE_EVENTS_BOLLARD_FIELDS = (
+    "incident_id",
+    "bollard_key",
+    "display_name",
+    "status",
+    "severity",
+    "detected_at",
+    "confirmed_at",
+    "acknowledged_at",
+    "resolved_at",
+)
+live_event_bus = LiveEventBus(LIVE_EVENTS_HISTORY_SIZE, LIVE_EVENTS_QUEUE_SIZE)
+roborock_live_fingerprints: dict[str, tuple[Any, ...]] = {}
+AUTOMATION_RULES_ENABLED = os.getenv("AUTOMATION_RULES_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+AUTOMATION_RULES_REFRESH_SECONDS = max(5.0, env_float("AUTOMATION_RULES_REFRESH_SECONDS", "60"))
+AUTOMATION_RULES_FLUSH_SECONDS = max(1.0, env_float("AUTOMATION_RULES_FLUSH_SECONDS", "10"))
+AUTOMATION_NTFY_TOPICS = {
+    "doors": NTFY_DOORS_TOPIC,
+    "lights": NTFY_LIGHTS_TOPIC,
+    "ventilation": NTFY_VENTILATION_TOPIC,
+    "bollards": NTFY_BOLLARDS_TOPIC,
+    "sun2_sessions": NTFY_DOORS_TOPIC,
+}
+automation_rule_engine = RuleEngine(AUTOMATION_RULES_REFRESH_SECONDS)
+ANALYTICS_REPLICA_ENABLED = os.getenv("ANALYTICS_REPLICA_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+ANALYTICS_REPLICA_DIR = Path(os.getenv("ANALYTICS_REPLICA_DIR", "/analytics_replica"))
+ANALYTICS_REPLICA_INTERVAL_MINUTES = max(1.0, env_float("ANALYTICS_REPLICA_INTERVAL_MINUTES", "15"))
+ANALYTICS_REPLICA_MAX_AGE_MINUTES = max(5.0, env_float("ANALYTICS_REPLICA_MAX_AGE_MINUTES", "90"))
+ANALYTICS_REPLICA_LOOKBACK_MONTHS = max(0, int(os.getenv("ANALYTICS_REPLICA_LOOKBACK_MONTHS", "2")))
+ANALYTICS_REPLICA_FULL_REFRESH_HOURS = max(1.0, env_float("ANALYTICS_REPLICA_FULL_REFRESH_HOURS", "24"))
 OPERATIONAL_RETENTION_ENABLED = os.getenv("OPERATIONAL_RETENTION_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
 OPERATIONAL_RETENTION_INTERVAL_HOURS = max(1, int(os.getenv("OPERATIONAL_RETENTION_INTERVAL_HOURS", "24")))
 OPERATIONAL_RETENTION_INITIAL_DELAY_SECONDS = max(5, int(os.getenv("OPERATIONAL_RETENTION_INITIAL_DELAY_SECONDS", "60")))
@@ -369,6 +469,31 @@ OPERATIONAL_RETENTION_STATE: Dict[str, Any] = {
     "lastError": None,
     "deleted": {},
 }
+TIME_PARTITION_MAINTENANCE_ENABLED = os.getenv("TIME_PARTITION_MAINTENANCE_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+TIME_PARTITION_INTERVAL_HOURS = max(1, int(os.getenv("TIME_PARTITION_INTERVAL_HOURS", "6")))
+TIME_PARTITION_INITIAL_DELAY_SECONDS = max(0, int(os.getenv("TIME_PARTITION_INITIAL_DELAY_SECONDS", "30")))
+TIME_PARTITION_MONTHS_AHEAD = max(1, int(os.getenv("TIME_PARTITION_MONTHS_AHEAD", "3")))
+TIME_PARTITION_BACKFILL_BATCH_IDS = max(100, int(os.getenv("TIME_PARTITION_BACKFILL_BATCH_IDS", "10000")))
+SAMPLE_PARTITION_RETENTION_DAYS = max(0, int(os.getenv("SAMPLE_PARTITION_RETENTION_DAYS", "0")))
+TIME_PARTITION_RETENTION_DAYS = {
+    "energy_fibaro_samples": SAMPLE_PARTITION_RETENTION_DAYS,
+    "utelys_samples": SAMPLE_PARTITION_RETENTION_DAYS,
+    "ventilasjon_samples": SAMPLE_PARTITION_RETENTION_DAYS,
+    "door_events": 0,
+    # Failed logins are kept longest; successful ones are trimmed row by row inside the partitions.
+    "access_logs": ACCESS_LOG_FAILURE_RETENTION_DAYS,
+}
+TIME_PARTITIONED_TABLES = tuple(
+    PartitionedTable(table, column, TIME_PARTITION_RETENTION_DAYS.get(table, 0))
+    for table, column in PARTITIONED_TABLE_COLUMNS.items()
+)
+TIME_PARTITION_STATE: Dict[str, Any] = {
+    "status": "waiting" if TIME_PARTITION_MAINTENANCE_ENABLED else "disabled",
+    "lastRunAt": None,
+    "lastSuccessAt": None,
+    "lastError": None,
+    "tables": {},
+}
 SUNROOM_DOOR_MONITOR_ENABLED = os.getenv("SUNROOM_DOOR_MONITOR_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
 SUNROOM_DOOR_MONITOR_INTERVAL_SECONDS = max(30, int(os.getenv("SUNROOM_DOOR_MONITOR_INTERVAL_SECONDS", "60")))
 SUNROOM_DOOR_MONITOR_INITIAL_DELAY_SECONDS = max(0, int(os.getenv("SUNROOM_DOOR_MONITOR_INITIAL_DELAY_SECONDS", "20")))
@@ -385,6 +510,7 @@ SUNROOM_DOOR_EXIT_GRACE_MINUTES = env_float("SUNROOM_DOOR_EXIT_GRACE_MINUTES", "
 SUNROOM_DOOR_WARN_AFTER_END_MINUTES = env_float("SUNROOM_DOOR_WARN_AFTER_END_MINUTES", "5")
 SUNROOM_DOOR_ALERT_AFTER_END_MINUTES = env_float("SUNROOM_DOOR_ALERT_AFTER_END_MINUTES", "10")
 SUNROOM_DOOR_SESSION_LOOKBACK_HOURS = max(2, int(os.getenv("SUNROOM_DOOR_SESSION_LOOKBACK_HOURS", "12")))
+SUNROOM_OCCUPANCY_MAX_AGE_SECONDS = max(30.0, env_float("SUNROOM_OCCUPANCY_MAX_AGE_SECONDS", "300"))
 HC3_BASE_URL = os.getenv("HC3_BASE_URL", "").strip().rstrip("/")
 HC3_USER = os.getenv("HC3_USER", "").strip()
 HC3_PASS = os.getenv("HC3_PASS", "")
@@ -400,6 +526,13 @@ HC3_SWITCH_POLL_TIMEOUT_SECONDS = max(2, int(os.getenv("HC3_SWITCH_POLL_TIMEOUT_
 HC3_SWITCH_STATUS_CACHE_SECONDS = max(0.0, env_float("HC3_SWITCH_STATUS_CACHE_SECONDS", "5"))
 HC3_ENERGY_DEVICE_LIST_CACHE_SECONDS = max(5.0, env_float("HC3_ENERGY_DEVICE_LIST_CACHE_SECONDS", "60"))
 HC3_ENERGY_LIVE_TIMEOUT_SECONDS = max(2, int(os.getenv("HC3_ENERGY_LIVE_TIMEOUT_SECONDS", "4")))
+HC3_STATE_MIRROR_ENABLED = os.getenv("HC3_STATE_MIRROR_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+HC3_STATE_MIRROR_POLL_SECONDS = max(0.2, env_float("HC3_STATE_MIRROR_POLL_SECONDS", "1"))
+HC3_STATE_MIRROR_STALE_SECONDS = max(2.0, env_float("HC3_STATE_MIRROR_STALE_SECONDS", "15"))
+HC3_STATE_MIRROR_RESYNC_SECONDS = max(60.0, env_float("HC3_STATE_MIRROR_RESYNC_SECONDS", "900"))
+HC3_STATE_MIRROR_RETRY_SECONDS = max(1.0, env_float("HC3_STATE_MIRROR_RETRY_SECONDS", "10"))
+HC3_STATE_MIRROR_TIMEOUT_SECONDS = max(5.0, env_float("HC3_STATE_MIRROR_TIMEOUT_SECONDS", "35"))
+hc3_state_mirror = Hc3StateMirror(stale_after_seconds=HC3_STATE_MIRROR_STALE_SECONDS)
 ENERGY_AGGREGATE_METERS = (
     {
         "key": "heat_pumps",
@@ -489,6 +622,7 @@ sun2_axis_snapshot_link_lock: Optional[asyncio.Lock] = None
 axis_snapshot_day_cache: Dict[tuple[str, str], Dict[str, Any]] = {}
 sunroom_door_verifications: Dict[str, Dict[str, Any]] = {}
 sunroom_door_sync_lock: Optional[asyncio.Lock] = None
+sunroom_occupancy_lock: Optional[asyncio.Lock] = None
 OWNTRACKS_SERVICE_URL = os.getenv("OWNTRACKS_SERVICE_URL", "http://owntracks_service:8128").rstrip("/")
 UNIFI_PROTECT_EVENTS_URL = os.getenv("UNIFI_PROTECT_EVENTS_URL", "http://unifi_protect_events:8130").rstrip("/")
 UNIFI_PROTECT_READ_API_TOKEN = os.getenv("UNIFI_PROTECT_READ_API_TOKEN", "").strip()
@@ -526,6 +660,13 @@ owntracks_visit_sync_lock: Optional[asyncio.Lock] = None
 SECURITY_HSTS_ENABLED = os.getenv("SECURITY_HSTS_ENABLED", "false").strip().lower() in {"1", "true", "yes", "ja"}
 SECURITY_HSTS_MAX_AGE_SECONDS = max(0, int(os.getenv("SECURITY_HSTS_MAX_AGE_SECONDS", str(60 * 60 * 24 * 180))))
 SLOW_REQUEST_WARNING_MS = max(250.0, env_float("SLOW_REQUEST_WARNING_MS", "1500"))
+SLOW_QUERY_WARNING_MS = max(10.0, env_float("SLOW_QUERY_WARNING_MS", "500"))
+DB_REQUEST_QUERY_WARNING_COUNT = max(1, int(os.getenv("DB_REQUEST_QUERY_WARNING_COUNT", "60")))
+DB_REPEATED_QUERY_WARNING_COUNT = max(2, int(os.getenv("DB_REPEATED_QUERY_WARNING_COUNT", "20")))
+CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+CONDITIONAL_GET_LONG_POLL_MAX_SECONDS = max(0.0, env_float("CONDITIONAL_GET_LONG_POLL_MAX_SECONDS", "55"))
+CONDITIONAL_GET_POLL_INTERVAL_SECONDS = max(0.25, env_float("CONDITIONAL_GET_POLL_INTERVAL_SECONDS", "2"))
+data_version_signal = DataVersionSignal()
 
 
 MOBILE_PREVIEW_SCREENS = [
@@ -542,7 +683,8 @@ MOBILE_PREVIEW_SCREENS = [
 MOBILE_PREVIEW_MONEY_KEYS = {"omsetning", "omsetning-uke"}
 
 
-background_tasks = BackgroundTaskSupervisor(logger)
+background_tasks = BackgroundTaskSupervisor(logger, task_context=background_task_context)
+sampling_profiler = profiler_from_env(logger)
 app = FastAPI(
     title="Fibaro10",
     lifespan=create_lifespan(lambda: startup(), lambda: shutdown_application()),
@@ -561,7 +703,7 @@ DESKTOP_V2_DIST = Path(__file__).parent / "desktop_v2" / "dist"
 if (DESKTOP_V2_DIST / "assets").exists():
     app.mount("/assets", StaticFiles(directory=str(DESKTOP_V2_DIST / "assets")), name="desktop_assets")
 templates = Jinja2Templates(directory="templates")
-templates.env.globals.update(app_version=APP_VERSION, app_build=APP_BUILD, build_log=BUILD_LOG)
+templates.env.globals.update(app_version=APP_VERSION, app_build=APP_BUILD)
 
 
 templates.env.filters["localtime"] = format_local_datetime
@@ -592,8 +734,81 @@ templates.env.filters["rounds"] = roborock_rounds_label
 templates.env.filters["pretty_json"] = roborock_json
 
 Base = declarative_base()
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+DB_POOL_SETTINGS = {workload: pool_settings(FIBARO10_PROCESS_ROLE, workload) for workload in (INTERACTIVE, BACKGROUND)}
+slow_query_log = SlowQueryLog(SLOW_QUERY_WARNING_MS)
+compiled_cache_stats = CompiledCacheStats()
+engines = {
+    workload: create_async_engine(DATABASE_URL, echo=False, **settings.engine_options(DATABASE_URL))
+    for workload, settings in DB_POOL_SETTINGS.items()
+}
+for _workload, _engine in engines.items():
+    instrument_engine(_engine.sync_engine, _workload, slow_query_log, logger, compiled_cache_stats)
+engine = engines[INTERACTIVE]
+listener_engine = create_async_engine(DATABASE_URL, echo=False, **listener_engine_options(FIBARO10_PROCESS_ROLE, DATABASE_URL))
+session_makers = {workload: async_sessionmaker(item, expire_on_commit=False) for workload, item in engines.items()}
+
+
+def current_engine():
+    return engines.get(db_workload.get(), engine)
+
+
+def async_session() -> AsyncSession:
+    """Session from the pool of the current workload (interactive requests or background tasks)."""
+    return session_makers.get(db_workload.get(), session_makers[INTERACTIVE])()
+
+
+def database_pools_payload() -> dict[str, Any]:
+    return {
+        workload: {**DB_POOL_SETTINGS[workload].payload(), **pool_payload(item.pool)}
+        for workload, item in engines.items()
+    }
+
+
+async def response_version_etag(request: Request, tables: tuple[str, ...]) -> str:
+    parts: list[Any] = [
+        APP_BUILD,
+        request.url.path,
+        version_query_items(request.query_params.multi_items()),
+        getattr(request.state, "auth_role", ""),
+    ]
+    if tables:
+        async with async_session() as session:
+            rows = (await session.execute(sql_text(table_version_sql()), {"tables": list(tables)})).all()
+        # Payloads are built around "today", so the date is part of the version as well.
+        parts.extend([local_now_naive().date().isoformat(), *table_version_parts(tables, rows)])
+    return weak_etag(*parts)
+
+
+# Registered before the access key middleware so it runs inside it, with the caller's role known.
+@app.middleware("http")
+async def conditional_get_middleware(request: Request, call_next):
+    if request.method != "GET":
+        return await call_next(request)
+    tables = versioned_path_tables(request.url.path) if CONDITIONAL_GET_ENABLED else None
+    if tables is None:
+        return await call_next(request)
+    try:
+        etag = await response_version_etag(request, tables)
+    except Exception:
+        logger.exception("Could not compute response version for %s", request.url.path)
+        return await call_next(request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        wait_seconds = long_poll_seconds(request.query_params.get("wait"), CONDITIONAL_GET_LONG_POLL_MAX_SECONDS)
+        if wait_seconds > 0 and tables:
+            etag = await wait_for_new_etag(
+                etag,
+                lambda: response_version_etag(request, tables),
+                data_version_signal,
+                wait_seconds,
+                CONDITIONAL_GET_POLL_INTERVAL_SECONDS,
+            )
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=conditional_headers(etag))
+    response = await call_next(request)
+    if response.status_code == 200:
+        for key, value in conditional_headers(etag).items():
+            response.headers[key] = value
+    return response
 
 
 @app.middleware("http")
@@ -652,14 +867,19 @@ async def access_key_middleware(request: Request, call_next):
 @app.middleware("http")
 async def security_headers_middleware(request: Request, call_next):
     started_at = perf_counter()
-    response = await call_next(request)
+    query_stats = QueryStats()
+    stats_token = current_query_stats.set(query_stats)
+    try:
+        response = await call_next(request)
+    finally:
+        current_query_stats.reset(stats_token)
     duration_ms = (perf_counter() - started_at) * 1000
     apply_security_headers(
         response.headers,
         hsts_enabled=SECURITY_HSTS_ENABLED,
         hsts_max_age_seconds=SECURITY_HSTS_MAX_AGE_SECONDS,
     )
-    for key, value in response_timing_headers(duration_ms).items():
+    for key, value in response_timing_headers(duration_ms, query_stats.count, query_stats.duration_ms).items():
         response.headers.setdefault(key, value)
     cache_control = cache_control_for_path(request.url.path)
     if cache_control:
@@ -672,6 +892,17 @@ async def security_headers_middleware(request: Request, call_next):
             duration_ms,
             response.status_code,
         )
+    repeated_statement, repeated_count = query_stats.most_repeated()
+    if query_stats.count >= DB_REQUEST_QUERY_WARNING_COUNT or repeated_count >= DB_REPEATED_QUERY_WARNING_COUNT:
+        logger.warning(
+            "Request %s %s ran %s queries (%.1f ms); repeated %s times: %s",
+            request.method,
+            request.url.path,
+            query_stats.count,
+            query_stats.duration_ms,
+            repeated_count,
+            repeated_statement,
+        )
     return response
 
 
@@ -944,6 +1175,21 @@ class AlarmEvent(Base):
     raw = Column(JSON, nullable=True)
 
 
+class SunroomOccupancyState(Base):
+    __tablename__ = "sunroom_occupancy_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    room_id = Column(String, unique=True, index=True, nullable=False)
+    device_id = Column(Integer, index=True, nullable=True)
+    door_state = Column(String, nullable=True)
+    door_changed_at = Column(DateTime, nullable=True)
+    door_event_id = Column(Integer, nullable=True)
+    session_id = Column(Integer, nullable=True)
+    severity = Column(String, nullable=True)
+    alarm_reason = Column(String, nullable=True)
+    updated_at = Column(DateTime, index=True, nullable=False, default=local_now_naive)
+
+
 class OperationalIncidentReview(Base):
     __tablename__ = "operational_incident_reviews"
 
@@ -1001,6 +1247,28 @@ class AutomationWorkbenchRule(Base):
     updated_at = Column(DateTime, index=True, nullable=False, default=local_now_naive)
 
 
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    changed_at = Column(DateTime, nullable=False, default=local_now_naive)
+
+
+class AutomationRuleEvaluation(Base):
+    __tablename__ = "automation_rule_evaluations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rule_id = Column(Integer, index=True, nullable=False)
+    rule_name = Column(String, nullable=True)
+    mode = Column(String, index=True, nullable=False)
+    source = Column(String, index=True, nullable=False)
+    event_type = Column(String, nullable=True)
+    device = Column(String, index=True, nullable=True)
+    result = Column(String, nullable=False)
+    matched_at = Column(DateTime, index=True, nullable=False, default=local_now_naive)
+
+
 class ImportJobStatus(Base):
     __tablename__ = "import_job_status"
 
@@ -2424,6 +2692,16 @@ class Sun2RoomStatsIngestIn(BaseModel):
     extra: Dict[str, Any] = Field(default_factory=dict)
 
 
+class Sun2RoomStatsBatchIn(BaseModel):
+    source: str = "sun2_importer"
+    collector_id: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    ok: bool = True
+    message: Optional[str] = None
+    days: list[Sun2RoomStatsIngestIn] = Field(default_factory=list)
+    extra: Dict[str, Any] = Field(default_factory=dict)
+
+
 class Sun2TanningSessionIn(BaseModel):
     source_session_id: str
     started_at: datetime
@@ -2455,6 +2733,9 @@ class Sun2TanningSessionsIngestIn(BaseModel):
     source_file: Optional[str] = None
     message: Optional[str] = None
     rows: list[Sun2TanningSessionIn] = Field(default_factory=list)
+    # Streamed page chunks only upsert; the final post lists every session id still in the source file.
+    replace_source_file: bool = True
+    keep_source_session_ids: Optional[list[str]] = None
     extra: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -2980,6 +3261,10 @@ DOOR_SENSOR_CONFIG = [
     },
 ]
 DOOR_SENSOR_IDS = [int(item["device_id"]) for item in DOOR_SENSOR_CONFIG if item.get("device_id") is not None]
+SUNROOM_DOOR_DEVICE_IDS = [
+    int(item["device_id"]) for item in DOOR_SENSOR_CONFIG if item.get("group_key") == "solrom" and item.get("device_id") is not None
+]
+sunroom_occupancy = SunroomOccupancy(SUNROOM_DOOR_DEVICE_IDS, max_age_seconds=SUNROOM_OCCUPANCY_MAX_AGE_SECONDS)
 
 VENT_SAMPLE_COLUMNS = [
     "id", "timestamp", "bucket_start", "mode", "source", "temp_1etg", "temp_2etg",
@@ -3338,6 +3623,17 @@ AI_DATASETS = {
         "time_column": "timestamp",
     },
 }
+analytics_replica = AnalyticsReplica(
+    ANALYTICS_REPLICA_DIR,
+    [
+        ReplicaTable(dataset["table"], dataset["time_column"], tuple(dataset["columns"]))
+        for dataset in AI_DATASETS.values()
+        if dataset.get("time_column")
+    ],
+    max_age_seconds=ANALYTICS_REPLICA_MAX_AGE_MINUTES * 60,
+    lookback_months=ANALYTICS_REPLICA_LOOKBACK_MONTHS,
+    full_refresh_seconds=ANALYTICS_REPLICA_FULL_REFRESH_HOURS * 3600,
+)
 
 
 SUN2_SUM_FIELDS = [
@@ -5620,10 +5916,12 @@ async def find_access_key(username: Optional[str], password: Optional[str]) -> O
     hashed = access_password_hash(normalized_username, password, is_master=normalized_username == "master")
     async with async_session() as session:
         result = await session.execute(
-            select(AccessKey)
-            .where(AccessKey.name == normalized_username)
-            .where(AccessKey.key_hash == hashed)
-            .where(AccessKey.active == True)
+            lambda_stmt(
+                lambda: select(AccessKey)
+                .where(AccessKey.name == normalized_username)
+                .where(AccessKey.key_hash == hashed)
+                .where(AccessKey.active == True)
+            )
         )
         return result.scalars().first()
 
@@ -5663,15 +5961,19 @@ async def find_auth_session(token: Optional[str]) -> Optional[tuple[AccessKey, i
     if not token:
         return None
     now_value = datetime.utcnow()
+    token_hash = hash_auth_session_token(token)
     async with async_session() as session:
+        # Runs on every authenticated request; the lambda keeps the statement built and compiled once.
         result = await session.execute(
-            select(AuthSession, AccessKey)
-            .join(AccessKey, AccessKey.id == AuthSession.access_key_id)
-            .where(AuthSession.token_hash == hash_auth_session_token(token))
-            .where(AuthSession.revoked_at.is_(None))
-            .where(AuthSession.expires_at > now_value)
-            .where(AccessKey.active == True)
-            .limit(1)
+            lambda_stmt(
+                lambda: select(AuthSession, AccessKey)
+                .join(AccessKey, AccessKey.id == AuthSession.access_key_id)
+                .where(AuthSession.token_hash == token_hash)
+                .where(AuthSession.revoked_at.is_(None))
+                .where(AuthSession.expires_at > now_value)
+                .where(AccessKey.active == True)
+                .limit(1)
+            )
         )
         row = result.first()
         if not row:
@@ -6872,21 +7174,31 @@ def publish_ntfy_message(
     priority: str = "3",
     click_url: str = "",
 ) -> None:
-    headers = {"Title": title, "Priority": priority}
-    if tags:
-        headers["Tags"] = tags
-    if click_url:
-        headers["Click"] = click_url
     request = urllib.request.Request(
         ntfy_topic_url(topic),
         data=message.encode("utf-8"),
-        headers=headers,
+        headers=ntfy_headers(title, priority, tags, click_url),
         method="POST",
     )
     with urllib.request.urlopen(request, timeout=NTFY_TIMEOUT_SECONDS):
         pass
 
 
+async def publish_ntfy_message_async(
+    client: httpx.AsyncClient,
+    topic: str,
+    title: str,
+    message: str,
+    tags: str = "",
+    priority: str = "3",
+    click_url: str = "",
+) -> None:
+    # Header values are sent as latin-1 bytes, the same encoding urllib uses for publish_ntfy_message.
+    headers = {key: value.encode("latin-1") for key, value in ntfy_headers(title, priority, tags, click_url).items()}
+    response = await client.post(ntfy_topic_url(topic), content=message.encode("utf-8"), headers=headers)
+    response.raise_for_status()
+
+
 def notification_retry_delay_seconds(attempts: int) -> int:
     exponent = max(0, min(16, int(attempts or 0) - 1))
     return min(NTFY_OUTBOX_RETRY_MAX_SECONDS, NTFY_OUTBOX_RETRY_BASE_SECONDS * (2**exponent))
@@ -6920,6 +7232,10 @@ def notification_outbox_row(
     )
 
 
+def wake_notification_outbox(_session: Any) -> None:
+    notification_outbox_wakeup.notify()
+
+
 async def enqueue_ntfy_message(
     topic: str,
     title: str,
@@ -6943,17 +7259,69 @@ async def enqueue_ntfy_message(
         related_type,
         related_id,
     )
+    notify = sql_text("SELECT pg_notify(:channel, '')")
     if session is not None:
         session.add(row)
         await session.flush()
+        # NOTIFY is delivered when the caller commits, so the worker never wakes before the row is visible.
+        await session.execute(notify, {"channel": NOTIFICATION_OUTBOX_CHANNEL})
+        await publish_live_event("notifications", "queued", notification_live_payload(row), session=session)
+        # The local worker is woken after the commit too, for when LISTEN is off or reconnecting.
+        sa_event.listen(session.sync_session, "after_commit", wake_notification_outbox, once=True)
         return True
     async with async_session() as own_session:
         own_session.add(row)
+        await own_session.flush()
+        await own_session.execute(notify, {"channel": NOTIFICATION_OUTBOX_CHANNEL})
+        await publish_live_event("notifications", "queued", notification_live_payload(row), session=own_session)
         await own_session.commit()
+    notification_outbox_wakeup.notify()
     return True
 
 
-async def claim_notification_outbox_row() -> Optional[dict[str, Any]]:
+def notification_live_payload(row: NotificationOutbox) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "topic": row.topic,
+        "title": row.title,
+        "message": row.message,
+        "priority": row.priority,
+        "relatedType": row.related_type,
+        "relatedId": row.related_id,
+    }
+
+
+def notification_outbox_item(row: NotificationOutbox) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "topic": row.topic,
+        "title": row.title,
+        "message": row.message,
+        "tags": row.tags or "",
+        "priority": row.priority or "3",
+        "click_url": row.click_url or "",
+        "attempts": row.attempts,
+        "related_type": row.related_type,
+        "related_id": row.related_id,
+    }
+
+
+# ntfy accepts both names and 1-5; the column is a string, so it is ranked explicitly rather than sorted as text.
+NTFY_PRIORITY_RANKS = {"min": 1, "1": 1, "low": 2, "2": 2, "default": 3, "3": 3, "high": 4, "4": 4, "max": 5, "urgent": 5, "5": 5}
+
+
+def notification_priority_rank():
+    priority = func.lower(func.trim(NotificationOutbox.priority))
+    return case(
+        *((priority == name, rank) for name, rank in NTFY_PRIORITY_RANKS.items()),
+        (priority.regexp_match("^[0-9]{1,9}$"), func.least(func.greatest(cast(priority, Integer), 1), 5)),
+        else_=3,
+    )
+
+
+async def claim_notification_outbox_rows(limit: int) -> list[dict[str, Any]]:
+    if limit <= 0:
+        return []
     now = datetime.utcnow()
     stale_before = now - timedelta(seconds=NTFY_OUTBOX_STALE_LOCK_SECONDS)
     eligible = or_(
@@ -6964,97 +7332,258 @@ async def claim_notification_outbox_row() -> Optional[dict[str, Any]]:
         ),
     )
     async with async_session() as session:
-        row = (
+        rows = (
             await session.execute(
                 select(NotificationOutbox)
                 .where(eligible)
                 .where(NotificationOutbox.next_attempt_at <= now)
-                .order_by(NotificationOutbox.next_attempt_at.asc(), NotificationOutbox.id.asc())
+                # Door and bollard alarms (priority 4-5) jump ahead of any light/ventilation backlog.
+                .order_by(
+                    notification_priority_rank().desc(),
+                    NotificationOutbox.next_attempt_at.asc(),
+                    NotificationOutbox.id.asc(),
+                )
                 .with_for_update(skip_locked=True)
-                .limit(1)
+                .limit(limit)
             )
-        ).scalars().first()
-        if row is None:
-            return None
-        row.status = "sending"
-        row.attempts = int(row.attempts or 0) + 1
-        row.locked_at = now
-        row.updated_at = now
+        ).scalars().all()
+        for row in rows:
+            row.status = "sending"
+            row.attempts = int(row.attempts or 0) + 1
+            row.locked_at = now
+            row.updated_at = now
+        items = [notification_outbox_item(row) for row in rows]
         await session.commit()
-        return {
-            "id": row.id,
-            "topic": row.topic,
-            "title": row.title,
-            "message": row.message,
-            "tags": row.tags or "",
-            "priority": row.priority or "3",
-            "click_url": row.click_url or "",
-            "attempts": row.attempts,
-            "related_type": row.related_type,
-            "related_id": row.related_id,
-        }
+        return items
 
 
-async def finish_notification_outbox_row(item: dict[str, Any], error: Optional[Exception] = None) -> None:
+async def defer_notification_outbox_rows(items: list[dict[str, Any]], delay_seconds: float) -> None:
+    now = datetime.utcnow()
+    async with async_session() as session:
+        for item in items:
+            row = await session.get(NotificationOutbox, item["id"])
+            if row is None:
+                continue
+            row.status = "pending"
+            row.attempts = max(0, int(row.attempts or 0) - 1)
+            row.locked_at = None
+            row.next_attempt_at = now + timedelta(seconds=delay_seconds)
+            row.updated_at = now
+        await session.commit()
+
+
+async def finish_notification_outbox_rows(items: list[dict[str, Any]], error: Optional[Exception] = None) -> None:
     now = datetime.utcnow()
     alarm_now = local_now_naive()
     async with async_session() as session:
-        row = await session.get(NotificationOutbox, item["id"])
-        if row is None:
+        for item in items:
+            row = await session.get(NotificationOutbox, item["id"])
+            if row is None:
+                continue
+            row.locked_at = None
+            row.updated_at = now
+            if error is None:
+                row.status = "sent"
+                row.sent_at = now
+                row.last_error = None
+                if row.related_type == "alarm_event" and row.related_id:
+                    alarm = await session.get(AlarmEvent, row.related_id)
+                    if alarm is not None:
+                        alarm.notification_status = "sent"
+                        alarm.notification_count = int(alarm.notification_count or 0) + 1
+                        alarm.first_notification_at = alarm.first_notification_at or alarm_now
+                        alarm.last_notification_at = alarm_now
+                        alarm.updated_at = alarm_now
+            else:
+                row.status = "retry"
+                row.last_error = str(error)[:2000]
+                row.next_attempt_at = now + timedelta(seconds=notification_retry_delay_seconds(row.attempts))
+        await session.commit()
+
+
+async def deliver_notification_group(
+    client: httpx.AsyncClient,
+    limiter: TopicRateLimiter,
+    item: dict[str, Any],
+    duplicates: list[dict[str, Any]],
+) -> None:
+    # Identical messages claimed together are sent once and finished as one group.
+    items = [item, *duplicates]
+    try:
+        wait_seconds = limiter.reserve(item["topic"])
+        if wait_seconds > 0:
+            await defer_notification_outbox_rows(items, wait_seconds)
             return
-        row.locked_at = None
-        row.updated_at = now
-        if error is None:
-            row.status = "sent"
-            row.sent_at = now
-            row.last_error = None
-            if row.related_type == "alarm_event" and row.related_id:
-                alarm = await session.get(AlarmEvent, row.related_id)
-                if alarm is not None:
-                    alarm.notification_status = "sent"
-                    alarm.notification_count = int(alarm.notification_count or 0) + 1
-                    alarm.first_notification_at = alarm.first_notification_at or alarm_now
-                    alarm.last_notification_at = alarm_now
-                    alarm.updated_at = alarm_now
+        try:
+            await publish_ntfy_message_async(
+                client,
+                item["topic"],
+                item["title"],
+                item["message"],
+                item["tags"],
+                item["priority"],
+                item["click_url"],
+            )
+        except Exception as exc:
+            logger.warning(
+                "NTFY-varsel %s feilet (forsok %s), prover igjen: %s",
+                item["id"],
+                item["attempts"],
+                exc,
+            )
+            await finish_notification_outbox_rows(items, exc)
         else:
-            row.status = "retry"
-            row.last_error = str(error)[:2000]
-            row.next_attempt_at = now + timedelta(seconds=notification_retry_delay_seconds(row.attempts))
-        await session.commit()
+            await finish_notification_outbox_rows(items)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Uventet feil ved levering av NTFY-varsel %s", item["id"])
 
 
-async def notification_outbox_worker() -> None:
+async def notification_outbox_listener() -> None:
+    def wake(*_args: Any) -> None:
+        notification_outbox_wakeup.notify()
+
     while True:
         try:
-            item = await claim_notification_outbox_row()
-            if item is None:
-                await asyncio.sleep(NTFY_OUTBOX_POLL_SECONDS)
-                continue
-            try:
-                await asyncio.to_thread(
-                    publish_ntfy_message,
-                    item["topic"],
-                    item["title"],
-                    item["message"],
-                    item["tags"],
-                    item["priority"],
-                    item["click_url"],
-                )
-            except Exception as exc:
-                logger.warning(
-                    "NTFY-varsel %s feilet (forsok %s), prover igjen: %s",
-                    item["id"],
-                    item["attempts"],
-                    exc,
-                )
-                await finish_notification_outbox_row(item, exc)
-            else:
-                await finish_notification_outbox_row(item)
+            async with listener_engine.connect() as conn:
+                raw_connection = await conn.get_raw_connection()
+                driver_connection = raw_connection.driver_connection
+                await driver_connection.add_listener(NOTIFICATION_OUTBOX_CHANNEL, wake)
+                try:
+                    # Rows queued while the listener was down are picked up straight away.
+                    wake()
+                    while not driver_connection.is_closed():
+                        await asyncio.sleep(30)
+                finally:
+                    if not driver_connection.is_closed():
+                        await driver_connection.remove_listener(NOTIFICATION_OUTBOX_CHANNEL, wake)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("LISTEN for NTFY-utkoen feilet, faller tilbake til polling: %s", exc)
+        await asyncio.sleep(30)
+
+
+async def publish_live_event(topic: str, event_type: str, data: Any, session=None) -> None:
+    if not LIVE_EVENTS_ENABLED:
+        return
+    if not live_event_bus.listening:
+        live_event_bus.publish(topic, event_type, data)
+        return
+    # Every process with a listener, this one included, receives the event through NOTIFY after commit.
+    notify = sql_text("SELECT pg_notify(:channel, :payload)")
+    params = {"channel": LIVE_EVENTS_CHANNEL, "payload": notify_payload(topic, event_type, data)}
+    if session is not None:
+        await session.execute(notify, params)
+        return
+    try:
+        async with current_engine().begin() as conn:
+            await conn.execute(notify, params)
+    except Exception as exc:
+        logger.warning("NOTIFY for live-hendelse feilet, publiserer lokalt: %s", exc)
+        live_event_bus.publish(topic, event_type, data)
+
+
+async def live_event_listener() -> None:
+    def receive(_connection: Any, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+        if isinstance(message, dict) and message.get("topic") in LIVE_EVENT_TOPICS:
+            live_event_bus.publish(str(message["topic"]), str(message.get("type") or "changed"), message.get("data"))
+
+    def data_versions_changed(_connection: Any, _pid: int, _channel: str, _payload: str) -> None:
+        data_version_signal.bump()
+
+    connected_before = False
+    while True:
+        try:
+            async with listener_engine.connect() as conn:
+                raw_connection = await conn.get_raw_connection()
+                driver_connection = raw_connection.driver_connection
+                await driver_connection.add_listener(LIVE_EVENTS_CHANNEL, receive)
+                # Data version bumps share this connection; they only wake long-polling conditional GETs.
+                await driver_connection.add_listener(DATA_VERSIONS_CHANNEL, data_versions_changed)
+                live_event_bus.listening = True
+                if connected_before:
+                    # Events from other processes may have been missed while LISTEN was down.
+                    for topic in LIVE_EVENT_TOPICS:
+                        live_event_bus.publish(topic, "resync", {"reload": True})
+                connected_before = True
+                try:
+                    while not driver_connection.is_closed():
+                        await asyncio.sleep(30)
+                finally:
+                    live_event_bus.listening = False
+                    if not driver_connection.is_closed():
+                        await driver_connection.remove_listener(LIVE_EVENTS_CHANNEL, receive)
+                        await driver_connection.remove_listener(DATA_VERSIONS_CHANNEL, data_versions_changed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("LISTEN for live-hendelser feilet, publiserer bare lokalt: %s", exc)
+        await asyncio.sleep(30)
+
+
+async def live_event_bollard_worker() -> None:
+    """Publishes bollard incident changes so the apps no longer poll the full Protect status."""
+    previous: Optional[dict[str, tuple[Any, ...]]] = None
+    while True:
+        try:
+            status = await protect_ledger_json("bollards")
+            changed, removed, current = keyed_row_changes(
+                previous or {},
+                status.get("incidents") or [],
+                "incident_id",
+                LIVE_EVENTS_BOLLARD_FIELDS,
+            )
+            if previous is not None:
+                for row in changed:
+                    await publish_live_event("bollards", "incident", row)
+                    dispatch_automation_event("bollards", "incident", row, (row.get("bollard_key"),))
+                for incident_id in removed:
+                    await publish_live_event("bollards", "incident_removed", {"incident_id": incident_id})
+            previous = current
         except asyncio.CancelledError:
             raise
         except Exception:
-            logger.exception("Uventet feil i NTFY-utkoarbeider")
-            await asyncio.sleep(max(1.0, NTFY_OUTBOX_POLL_SECONDS))
+            logger.debug("Kunne ikke lese pullerthendelser for live-strømmen", exc_info=True)
+        await asyncio.sleep(LIVE_EVENTS_BOLLARD_POLL_SECONDS)
+
+
+async def notification_outbox_worker() -> None:
+    limiter = TopicRateLimiter(NTFY_TOPIC_RATE_PER_MINUTE, NTFY_TOPIC_BURST)
+    deliveries: set[asyncio.Task[None]] = set()
+
+    def delivery_finished(task: asyncio.Task[None]) -> None:
+        deliveries.discard(task)
+        notification_outbox_wakeup.notify()
+
+    limits = httpx.Limits(max_connections=NTFY_OUTBOX_CONCURRENCY, max_keepalive_connections=NTFY_OUTBOX_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=NTFY_TIMEOUT_SECONDS, limits=limits) as client:
+        try:
+            while True:
+                try:
+                    capacity = NTFY_OUTBOX_CONCURRENCY - len(deliveries)
+                    items = await claim_notification_outbox_rows(capacity)
+                    for item, duplicates in coalesce_notification_items(items):
+                        task = asyncio.create_task(deliver_notification_group(client, limiter, item, duplicates))
+                        deliveries.add(task)
+                        task.add_done_callback(delivery_finished)
+                    if len(items) < capacity or capacity <= 0:
+                        await notification_outbox_wakeup.wait(NTFY_OUTBOX_POLL_SECONDS)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Uventet feil i NTFY-utkoarbeider")
+                    await asyncio.sleep(max(1.0, NTFY_OUTBOX_POLL_SECONDS))
+        finally:
+            for task in list(deliveries):
+                task.cancel()
+            if deliveries:
+                await asyncio.gather(*deliveries, return_exceptions=True)
 
 
 async def notification_outbox_status(session) -> dict[str, Any]:
@@ -7139,6 +7668,41 @@ async def operational_retention_worker() -> None:
         await asyncio.sleep(OPERATIONAL_RETENTION_INTERVAL_HOURS * 3600)
 
 
+async def time_partition_worker() -> None:
+    await asyncio.sleep(TIME_PARTITION_INITIAL_DELAY_SECONDS)
+    while True:
+        run_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        TIME_PARTITION_STATE["status"] = "running"
+        TIME_PARTITION_STATE["lastRunAt"] = api_local_iso(run_at)
+        try:
+            tables = await maintain_time_partitions(
+                async_session,
+                TIME_PARTITIONED_TABLES,
+                run_at,
+                TIME_PARTITION_MONTHS_AHEAD,
+                backfill_batch_ids=TIME_PARTITION_BACKFILL_BATCH_IDS,
+            )
+            TIME_PARTITION_STATE.update(
+                status="ok",
+                lastSuccessAt=api_local_iso(datetime.now(timezone.utc).replace(tzinfo=None)),
+                lastError=None,
+                tables=tables,
+            )
+            changed = {
+                table: result
+                for table, result in tables.items()
+                if result["created"] or result["dropped"] or (result["backfill"] or {}).get("swapped")
+            }
+            if changed:
+                logger.info("Time partition maintenance changed partitions: %s", changed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            TIME_PARTITION_STATE.update(status="error", lastError=str(exc)[:1000])
+            logger.exception("Time partition maintenance failed")
+        await asyncio.sleep(TIME_PARTITION_INTERVAL_HOURS * 3600)
+
+
 def bollard_mobile_notification_payload(status: dict[str, Any]) -> dict[str, Any]:
     settings = status.get("settings") if isinstance(status.get("settings"), dict) else {}
     summary = status.get("summary") if isinstance(status.get("summary"), dict) else {}
@@ -11261,10 +11825,12 @@ async def upsert_energy_fibaro_sample(session, data: EnergyFibaroIn) -> EnergyFi
     bucket_start = energy_sample_bucket(data.bucket_start or timestamp)
     previous = (
         await session.execute(
-            select(EnergyFibaroSample)
-            .where(EnergyFibaroSample.bucket_start < bucket_start)
-            .order_by(EnergyFibaroSample.bucket_start.desc())
-            .limit(1)
+            lambda_stmt(
+                lambda: select(EnergyFibaroSample)
+                .where(EnergyFibaroSample.bucket_start < bucket_start)
+                .order_by(EnergyFibaroSample.bucket_start.desc())
+                .limit(1)
+            )
         )
     ).scalars().first()
     values = energy_fibaro_sample_payload(
@@ -11273,9 +11839,11 @@ async def upsert_energy_fibaro_sample(session, data: EnergyFibaroIn) -> EnergyFi
     )
     existing = (
         await session.execute(
-            select(EnergyFibaroSample)
-            .where(EnergyFibaroSample.bucket_start == bucket_start)
-            .limit(1)
+            lambda_stmt(
+                lambda: select(EnergyFibaroSample)
+                .where(EnergyFibaroSample.bucket_start == bucket_start)
+                .limit(1)
+            )
         )
     ).scalars().first()
     if existing:
@@ -12220,6 +12788,31 @@ def door_event_payload(row: DoorEvent, now: Optional[datetime] = None) -> Dict[s
     }
 
 
+def door_event_from_live_payload(data: Dict[str, Any]) -> Optional[DoorEvent]:
+    """Transient DoorEvent rebuilt from ``door_event_payload`` output received on the live event bus."""
+    try:
+        timestamp = datetime.fromisoformat(str(data["timestamp"]))
+        event_id = int(data["id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    state = {"open": True, "closed": False}.get(str(data.get("state") or ""))
+    return DoorEvent(
+        id=event_id,
+        timestamp=timestamp,
+        event_type=data.get("eventType"),
+        action=data.get("action"),
+        device_key=data.get("deviceKey"),
+        device_id=data.get("deviceId"),
+        device_name=data.get("deviceName"),
+        source=data.get("source"),
+        raw_value=data.get("rawValue"),
+        state=state,
+        previous_state=data.get("previousState"),
+        battery_level=data.get("batteryLevel"),
+        extra=data.get("extra") or {},
+    )
+
+
 def door_status_payload(
     config: Dict[str, Any],
     row: Optional[DoorEvent],
@@ -12330,6 +12923,16 @@ def hc3_cached_device_request(device_id: int, timeout_seconds: Optional[int] = N
     return payload
 
 
+async def hc3_live_device(device_id: int, timeout_seconds: Optional[int] = None, cached: bool = True) -> Dict[str, Any]:
+    """Device state from the refreshStates mirror, or straight from HC3 while the mirror is stale."""
+    device = hc3_state_mirror.device(int(device_id))
+    if device is not None:
+        return device
+    if cached:
+        return await asyncio.to_thread(hc3_cached_device_request, int(device_id), timeout_seconds)
+    return await asyncio.to_thread(hc3_device_request, int(device_id), timeout_seconds)
+
+
 def hc3_devices_request(timeout_seconds: Optional[int] = None) -> list[Dict[str, Any]]:
     if not hc3_api_is_configured():
         raise RuntimeError("HC3_BASE_URL/HC3_USER/HC3_PASS er ikke konfigurert for Fibaro10.")
@@ -12441,7 +13044,7 @@ async def hc3_energy_nodes_live(nodes: list[EnergyNode]) -> Dict[str, Any]:
     async def fetch_one(device_id: int) -> tuple[int, Optional[Dict[str, Any]], Optional[str]]:
         async with semaphore:
             try:
-                device = await asyncio.to_thread(hc3_cached_device_request, device_id, HC3_ENERGY_LIVE_TIMEOUT_SECONDS)
+                device = await hc3_live_device(device_id, HC3_ENERGY_LIVE_TIMEOUT_SECONDS)
                 return device_id, hc3_energy_device_summary(device), None
             except Exception as exc:
                 return device_id, None, str(exc)
@@ -12549,7 +13152,7 @@ def hc3_door_status_from_device(config: Dict[str, Any], device: Dict[str, Any])
 
 
 async def hc3_fetch_door_status(config: Dict[str, Any]) -> Dict[str, Any]:
-    device = await asyncio.to_thread(hc3_device_request, int(config["device_id"]))
+    device = await hc3_live_device(int(config["device_id"]), cached=False)
     return hc3_door_status_from_device(config, device)
 
 
@@ -12595,11 +13198,7 @@ async def hc3_fetch_switch_status(config: Dict[str, Any]) -> Dict[str, Any]:
     device_id = config.get("device_id")
     if device_id is None:
         raise RuntimeError("Mangler HC3 device-id.")
-    device = await asyncio.to_thread(
-        hc3_cached_device_request,
-        int(device_id),
-        HC3_SWITCH_POLL_TIMEOUT_SECONDS,
-    )
+    device = await hc3_live_device(int(device_id), HC3_SWITCH_POLL_TIMEOUT_SECONDS)
     return hc3_switch_status_from_device(config, device)
 
 
@@ -12779,6 +13378,7 @@ async def run_hc3_door_poll_once(
     checked = 0
     changes: list[Dict[str, Any]] = []
     errors: list[Dict[str, Any]] = []
+    new_rows: list[DoorEvent] = []
 
     async with async_session() as session:
         latest_by_device = await latest_door_changes_by_device(session)
@@ -12802,6 +13402,8 @@ async def run_hc3_door_poll_once(
             row = door_event_from_payload(door_poll_sync_payload(config, status, latest_row))
             session.add(row)
             await session.flush()
+            await publish_live_event("doors", "door_event", door_event_payload(row), session=session)
+            new_rows.append(row)
             changes.append(
                 {
                     "event_id": row.id,
@@ -12846,6 +13448,9 @@ async def run_hc3_door_poll_once(
             },
         )
         await session.commit()
+    for row in new_rows:
+        sunroom_occupancy.record_door_event(row)
+        dispatch_automation_event("doors", row.event_type, door_event_payload(row), (row.device_id, row.device_key))
 
     return {
         "ok": ok,
@@ -12901,6 +13506,26 @@ async def run_hc3_door_unexpected_check_once(reason: str = "interval") -> Dict[s
     return result
 
 
+async def hc3_state_mirror_worker():
+    def log_error(exc: Exception) -> None:
+        logger.warning("HC3 refreshStates-speil feilet: %s", exc)
+
+    async with httpx.AsyncClient(
+        base_url=HC3_BASE_URL,
+        auth=(HC3_USER, HC3_PASS),
+        headers={"Accept": "application/json"},
+        timeout=HC3_STATE_MIRROR_TIMEOUT_SECONDS,
+    ) as client:
+        await run_hc3_state_mirror(
+            hc3_state_mirror,
+            client,
+            poll_interval_seconds=HC3_STATE_MIRROR_POLL_SECONDS,
+            resync_seconds=HC3_STATE_MIRROR_RESYNC_SECONDS,
+            retry_seconds=HC3_STATE_MIRROR_RETRY_SECONDS,
+            on_error=log_error,
+        )
+
+
 async def hc3_door_poll_worker():
     await asyncio.sleep(HC3_DOOR_UNEXPECTED_CHECK_INITIAL_DELAY_SECONDS)
     while True:
@@ -13981,6 +14606,7 @@ def sunroom_status_item(
         "doorChangedAt": changed_at.isoformat() if changed_at else None,
         "doorChangedLabel": format_source_datetime(changed_at) if changed_at else "-",
         "doorAgeLabel": door.get("ageLabel"),
+        "doorEventId": latest_row.id if latest_row else None,
         "isOccupied": is_occupied,
         "occupiedSince": closed_since.isoformat() if closed_since else None,
         "occupiedSinceLabel": format_source_datetime(closed_since) if closed_since else "-",
@@ -14302,6 +14928,7 @@ async def sync_sunroom_alarm_history(session, items: list[Dict[str, Any]], now:
     existing_rows = (await session.execute(select(AlarmEvent).where(where_clause))).scalars().all()
     existing_by_key = {row.event_key: row for row in existing_rows}
     current_by_device = {str(item.get("deviceKey") or ""): item for item in items}
+    changed_alarms: list[AlarmEvent] = []
 
     for event_key, item in active_by_key.items():
         alarm = existing_by_key.get(event_key)
@@ -14328,6 +14955,8 @@ async def sync_sunroom_alarm_history(session, items: list[Dict[str, Any]], now:
             )
             session.add(alarm)
             existing_by_key[event_key] = alarm
+        if alarm.status != "active" or alarm.id is None:
+            changed_alarms.append(alarm)
         alarm.status = "active"
         alarm.severity = str(item.get("severity") or "alert")
         alarm.detail = str(item.get("detail") or sunroom_alarm_message(item))
@@ -14362,8 +14991,11 @@ async def sync_sunroom_alarm_history(session, items: list[Dict[str, Any]], now:
             alarm.notification_status = "not_sent"
         alarm.last_observed_at = now
         alarm.updated_at = now
+        changed_alarms.append(alarm)
 
     await session.flush()
+    for alarm in changed_alarms:
+        await publish_live_event("doors", "alarm", alarm_event_payload(alarm), session=session)
     return existing_by_key
 
 
@@ -14447,55 +15079,166 @@ async def publish_sunroom_door_alerts(items: list[Dict[str, Any]], now: datetime
     return sent_count
 
 
-async def sunroom_door_session_payload(session, notify: bool = False) -> Dict[str, Any]:
-    now = local_now_naive()
-    solroom_configs = [config for config in DOOR_SENSOR_CONFIG if config.get("group_key") == "solrom"]
-    solroom_device_ids = [int(config["device_id"]) for config in solroom_configs if config.get("device_id") is not None]
-    raw_limit = max(len(solroom_device_ids) * 180, 1000)
+def sunroom_door_configs() -> list[Dict[str, Any]]:
+    return [config for config in DOOR_SENSOR_CONFIG if config.get("group_key") == "solrom"]
+
+
+def sunroom_room_ids() -> list[str]:
+    return sorted({room_id for room_id in (sunroom_room_id_for_config(config) for config in sunroom_door_configs()) if room_id})
+
+
+async def sunroom_recent_sessions_by_room(session, now: datetime) -> Dict[str, list[Sun2TanningSession]]:
+    configs = sunroom_door_configs()
+    room_ids = sunroom_room_ids()
+    bed_ids = sorted({bed_id for bed_id in (sunroom_bed_id_for_config(config) for config in configs) if bed_id})
+    sessions_by_room: Dict[str, list[Sun2TanningSession]] = {room_id: [] for room_id in room_ids}
+    if not room_ids and not bed_ids:
+        return sessions_by_room
+    start_cutoff = now - timedelta(hours=SUNROOM_DOOR_SESSION_LOOKBACK_HOURS)
+    identity_conditions = []
+    if room_ids:
+        identity_conditions.append(Sun2TanningSession.room_id.in_(room_ids))
+    if bed_ids:
+        identity_conditions.append(Sun2TanningSession.sun2_bed_id.in_(bed_ids))
+    session_rows = (
+        await session.execute(
+            select(Sun2TanningSession)
+            .where(or_(*identity_conditions))
+            .where(Sun2TanningSession.started_at >= start_cutoff)
+            .order_by(Sun2TanningSession.started_at.desc(), Sun2TanningSession.id.desc())
+        )
+    ).scalars().all()
+    for row in session_rows:
+        room_id = sunroom_canonical_room_id(row)
+        if room_id:
+            sessions_by_room.setdefault(room_id, []).append(row)
+    return sessions_by_room
+
+
+async def load_sunroom_occupancy(session, now: datetime) -> None:
+    device_ids = sorted(sunroom_occupancy.device_ids)
     raw_rows: list[DoorEvent] = []
-    if solroom_device_ids:
+    if device_ids:
+        # The stored state rows point at the door change each room was last evaluated on, so a
+        # restart reads that change and what came after it instead of the full recent history.
+        anchors = {
+            int(row.device_id): int(row.door_event_id)
+            for row in (await session.execute(select(SunroomOccupancyState))).scalars().all()
+            if row.device_id is not None and row.door_event_id is not None
+        }
+        statement = select(DoorEvent).where(DoorEvent.device_id.in_(device_ids))
+        if set(device_ids) <= set(anchors):
+            statement = statement.where(
+                or_(*(and_(DoorEvent.device_id == device_id, DoorEvent.id >= anchors[device_id]) for device_id in device_ids))
+            )
         result = await session.execute(
-            select(DoorEvent)
-            .where(DoorEvent.device_id.in_(solroom_device_ids))
-            .order_by(DoorEvent.timestamp.desc(), DoorEvent.id.desc())
-            .limit(raw_limit)
+            statement.order_by(DoorEvent.timestamp.desc(), DoorEvent.id.desc()).limit(max(len(device_ids) * 180, 1000))
         )
         raw_rows = result.scalars().all()
-    change_rows_ascending = door_change_rows(list(reversed(raw_rows)))
-    latest_change_by_device: Dict[int, DoorEvent] = {}
-    for row in reversed(change_rows_ascending):
-        if row.device_id is None:
-            continue
-        latest_change_by_device.setdefault(int(row.device_id), row)
+    sunroom_occupancy.load(raw_rows, await sunroom_recent_sessions_by_room(session, now))
 
-    room_ids = sorted({room_id for room_id in (sunroom_room_id_for_config(config) for config in solroom_configs) if room_id})
-    bed_ids = sorted({bed_id for bed_id in (sunroom_bed_id_for_config(config) for config in solroom_configs) if bed_id})
-    sessions_by_room: Dict[str, list[Sun2TanningSession]] = {room_id: [] for room_id in room_ids}
-    if room_ids or bed_ids:
-        start_cutoff = now - timedelta(hours=SUNROOM_DOOR_SESSION_LOOKBACK_HOURS)
-        identity_conditions = []
-        if room_ids:
-            identity_conditions.append(Sun2TanningSession.room_id.in_(room_ids))
-        if bed_ids:
-            identity_conditions.append(Sun2TanningSession.sun2_bed_id.in_(bed_ids))
-        session_rows = (
-            await session.execute(
-                select(Sun2TanningSession)
-                .where(or_(*identity_conditions))
-                .where(Sun2TanningSession.started_at >= start_cutoff)
-                .order_by(Sun2TanningSession.started_at.desc(), Sun2TanningSession.id.desc())
-            )
-        ).scalars().all()
-        for row in session_rows:
-            room_id = sunroom_canonical_room_id(row)
-            if room_id:
-                sessions_by_room.setdefault(room_id, []).append(row)
 
-    rooms = []
-    for config in solroom_configs:
+async def ensure_sunroom_occupancy(session, now: datetime) -> None:
+    """Load the occupancy state when it is missing or old; without LISTEN other processes' events are not seen."""
+    global sunroom_occupancy_lock
+    max_age = SUNROOM_OCCUPANCY_MAX_AGE_SECONDS
+    if not live_event_bus.listening:
+        max_age = min(max_age, SUNROOM_DOOR_MONITOR_INTERVAL_SECONDS)
+    if not sunroom_occupancy.needs_load(max_age) and not sunroom_occupancy.sessions_stale:
+        return
+    if sunroom_occupancy_lock is None:
+        sunroom_occupancy_lock = asyncio.Lock()
+    async with sunroom_occupancy_lock:
+        if sunroom_occupancy.needs_load(max_age):
+            await load_sunroom_occupancy(session, now)
+        elif sunroom_occupancy.sessions_stale:
+            sunroom_occupancy.load_sessions(await sunroom_recent_sessions_by_room(session, now))
+
+
+def apply_sunroom_occupancy_event(event: Dict[str, Any]) -> None:
+    data = event.get("data")
+    event_type = event.get("type")
+    if event_type == "resync" or (isinstance(data, dict) and data.get("reload")):
+        sunroom_occupancy.invalidate()
+    elif event_type == "door_event" and isinstance(data, dict):
+        row = door_event_from_live_payload(data)
+        if row is not None:
+            sunroom_occupancy.record_door_event(row)
+    elif event_type == "sunroom_sessions":
+        sunroom_occupancy.invalidate_sessions()
+
+
+async def sunroom_occupancy_listener() -> None:
+    """Keeps this process' sunroom occupancy in step with door events and Sun2 imports from every process."""
+    while True:
+        with live_event_bus.subscribe(("doors",)) as subscription:
+            while not subscription.lagged:
+                apply_sunroom_occupancy_event(await subscription.queue.get())
+        sunroom_occupancy.invalidate()
+
+
+async def sunroom_live_status_items(session, now: datetime) -> list[Dict[str, Any]]:
+    """Current status of every sunroom, evaluated from the occupancy state."""
+    await ensure_sunroom_occupancy(session, now)
+    latest_change_by_device: Dict[int, DoorEvent] = {}
+    for row in reversed(door_change_rows(sunroom_occupancy.door_rows())):
+        if row.device_id is not None:
+            latest_change_by_device.setdefault(int(row.device_id), row)
+    sessions_by_room = sunroom_occupancy.sessions_by_room(
+        sunroom_room_ids(),
+        now - timedelta(hours=SUNROOM_DOOR_SESSION_LOOKBACK_HOURS),
+    )
+    items = []
+    for config in sunroom_door_configs():
         device_id = config.get("device_id")
         latest_row = latest_change_by_device.get(int(device_id)) if device_id is not None else None
-        rooms.append(sunroom_status_item(config, latest_row, sessions_by_room, now))
+        items.append(sunroom_status_item(config, latest_row, sessions_by_room, now))
+    return items
+
+
+async def store_sunroom_occupancy_state(session, rooms: list[Dict[str, Any]], now: datetime) -> Dict[str, tuple[Any, ...]]:
+    """Write state rows for rooms whose evaluation changed; mark them saved after the commit."""
+    signatures = {
+        str(item["roomId"]): (
+            item.get("deviceId"),
+            item.get("doorState"),
+            item.get("doorChangedAt"),
+            item.get("doorEventId"),
+            (item.get("session") or {}).get("id"),
+            item.get("severity"),
+            item.get("alarmReason"),
+        )
+        for item in rooms
+        if item.get("roomId")
+    }
+    changed = sunroom_occupancy.unsaved(signatures)
+    if not changed:
+        return changed
+    existing = {
+        row.room_id: row
+        for row in (
+            await session.execute(select(SunroomOccupancyState).where(SunroomOccupancyState.room_id.in_(list(changed))))
+        ).scalars().all()
+    }
+    for room_id, (device_id, door_state, changed_at, door_event_id, session_id, severity, alarm_reason) in changed.items():
+        row = existing.get(room_id)
+        if row is None:
+            row = SunroomOccupancyState(room_id=room_id)
+            session.add(row)
+        row.device_id = device_id
+        row.door_state = door_state
+        row.door_changed_at = datetime.fromisoformat(changed_at) if changed_at else None
+        row.door_event_id = door_event_id
+        row.session_id = session_id
+        row.severity = severity
+        row.alarm_reason = alarm_reason
+        row.updated_at = now
+    return changed
+
+
+async def sunroom_door_session_payload(session, notify: bool = False) -> Dict[str, Any]:
+    now = local_now_naive()
+    rooms = await sunroom_live_status_items(session, now)
     rooms.sort(key=lambda item: (str(item.get("sectionKey") or ""), int(item.get("sortOrder") or 0)))
     candidate_alarm_keys = {
         sunroom_alarm_event_key(item)
@@ -14804,6 +15547,11 @@ async def sunroom_room_overview_payload(session, days: int = 2, day: Optional[st
         if normalized:
             sessions_by_room.setdefault(normalized, []).append(row)
 
+    # The live view shows the same status the door alarm monitor evaluates.
+    live_status_by_device: Dict[str, Dict[str, Any]] = {}
+    if not has_day_filter:
+        live_status_by_device = {str(item.get("deviceKey")): item for item in await sunroom_live_status_items(session, now)}
+
     rooms = []
     all_matched_ids: set[int] = set()
     for config in configs:
@@ -14812,7 +15560,9 @@ async def sunroom_room_overview_payload(session, days: int = 2, day: Optional[st
         device_id = config.get("device_id")
         latest_row = latest_change_by_device.get(int(device_id)) if device_id is not None else None
         room_sessions = sessions_by_room.get(room_id or "", [])
-        status_item = sunroom_status_item(config, latest_row, {room_id or "": room_sessions}, now)
+        status_item = live_status_by_device.get(str(config.get("device_key"))) or sunroom_status_item(
+            config, latest_row, {room_id or "": room_sessions}, now
+        )
         device_periods = periods_by_device.get(door_config_device_key(config), [])
 
         periods = []
@@ -14979,7 +15729,10 @@ async def sunroom_door_monitor_worker():
                     sync_result.get("rooms"),
                     sync_result.get("error"),
                 )
+                # The scraper posts the sessions to whichever web process takes the ingest request.
+                sunroom_occupancy.invalidate_sessions()
 
+            saved_state: Dict[str, tuple[Any, ...]] = {}
             async with async_session() as checked_session:
                 checked_payload = await sunroom_door_session_payload(checked_session, notify=False)
                 checked_rooms = list(checked_payload.get("rooms") or [])
@@ -14989,7 +15742,9 @@ async def sunroom_door_monitor_worker():
                 )
                 if not has_alert:
                     await sync_sunroom_alarm_history(checked_session, checked_rooms, local_now_naive())
-                    await checked_session.commit()
+                saved_state = await store_sunroom_occupancy_state(checked_session, checked_rooms, local_now_naive())
+                await checked_session.commit()
+            sunroom_occupancy.mark_saved(saved_state)
             if has_alert:
                 hc3_result = await verify_sunroom_alert_doors_with_hc3(checked_rooms)
                 async with async_session() as confirmation_session:
@@ -15008,7 +15763,10 @@ async def sunroom_door_monitor_worker():
                     await confirmation_session.commit()
         except Exception as exc:
             logger.warning("Sunroom door monitor feilet: %s", exc, exc_info=True)
-        await asyncio.sleep(SUNROOM_DOOR_MONITOR_INTERVAL_SECONDS)
+        # Door events and Sun2 imports wake the monitor; the interval remains for time-based thresholds.
+        if await sunroom_occupancy.wait_for_change(SUNROOM_DOOR_MONITOR_INTERVAL_SECONDS):
+            # A bouncing sensor is evaluated once, after the debounce window.
+            await asyncio.sleep(HC3_DOOR_DEBOUNCE_SECONDS)
 
 
 def door_change_text(row: Optional[DoorEvent]) -> str:
@@ -15055,7 +15813,41 @@ async def save_record(record, notification: Optional[dict[str, Any]] = None) ->
         return record.id
 
 
-async def ingest_roborock_robot(session, robot_data: Dict[str, Any], batch_time: datetime, source: str) -> Dict[str, Any]:
+async def publish_roborock_live_status(
+    session,
+    robot: RoborockRobot,
+    status: Dict[str, Any],
+    batch_time: datetime,
+    published: Optional[dict[str, tuple[Any, ...]]] = None,
+) -> None:
+    payload = {
+        "duid": robot.duid,
+        "name": robot.name,
+        "timestamp": batch_time.isoformat(),
+        "stateName": status.get("state_name") or roborock_state_label(status.get("state")),
+        "battery": int_value(status.get("battery")),
+        "errorCode": int_value(status.get("error_code") if "error_code" in status else status.get("error")),
+        "inCleaning": bool_value(status.get("in_cleaning")),
+        "inReturning": bool_value(status.get("in_returning")),
+        "cleanPercent": int_value(status.get("clean_percent")),
+    }
+    fingerprint = tuple(value for key, value in payload.items() if key != "timestamp")
+    # The collectors report every cycle; only actual state changes are pushed.
+    if roborock_live_fingerprints.get(robot.duid) == fingerprint:
+        return
+    await publish_live_event("robot", "status", payload, session=session)
+    if published is not None:
+        # The caller remembers the fingerprint after commit, so a rolled back sync is pushed again next cycle.
+        published[robot.duid] = fingerprint
+
+
+async def ingest_roborock_robot(
+    session,
+    robot_data: Dict[str, Any],
+    batch_time: datetime,
+    source: str,
+    live_fingerprints: Optional[dict[str, tuple[Any, ...]]] = None,
+) -> Dict[str, Any]:
     meta = robot_data.get("metadata") or robot_data
     provider = cleaning_provider(robot_data.get("provider") or meta.get("provider"), source)
     raw_identity = robot_data.get("external_id") or robot_data.get("duid") or robot_data.get("robot_duid")
@@ -15141,6 +15933,7 @@ async def ingest_roborock_robot(session, robot_data: Dict[str, Any], batch_time:
                 raw={"status": status, "network": network},
             )
         )
+        await publish_roborock_live_status(session, existing, status, batch_time, live_fingerprints)
 
     if consumable:
         session.add(
@@ -15462,6 +16255,14 @@ async def ingest_sun2_room_stats(session, data: Sun2RoomStatsIngestIn, batch_tim
     inserted = 0
     updated = 0
     batch_date = data.stat_date
+    # One query for every day in the payload instead of up to three per row.
+    stat_dates = {row.stat_date or batch_date for row in data.rows} - {None}
+    same_day_rows: Dict[date, list] = defaultdict(list)
+    if stat_dates:
+        for candidate in (
+            await session.execute(select(Sun2RoomDailyStat).where(Sun2RoomDailyStat.stat_date.in_(stat_dates)))
+        ).scalars():
+            same_day_rows[candidate.stat_date].append(candidate)
     for row in data.rows:
         source_room_name = (repair_mojibake(row.source_room_name or row.room) or "").strip()
         room = (repair_mojibake(row.room) or source_room_name).strip()
@@ -15470,27 +16271,11 @@ async def ingest_sun2_room_stats(session, data: Sun2RoomStatsIngestIn, batch_tim
         if not room:
             continue
         stat_date = row.stat_date or batch_date
-        existing = (
-            await session.execute(
-                select(Sun2RoomDailyStat)
-                .where(Sun2RoomDailyStat.stat_date == stat_date)
-                .where(Sun2RoomDailyStat.room_key == room_key)
-            )
-        ).scalars().first()
+        same_day = same_day_rows[stat_date]
+        existing = next((candidate for candidate in same_day if candidate.room_key == room_key), None)
         if not existing:
-            existing = (
-                await session.execute(
-                    select(Sun2RoomDailyStat)
-                    .where(Sun2RoomDailyStat.stat_date == stat_date)
-                    .where(Sun2RoomDailyStat.room == room)
-                )
-            ).scalars().first()
+            existing = next((candidate for candidate in same_day if candidate.room == room), None)
         if not existing:
-            same_day = (
-                await session.execute(
-                    select(Sun2RoomDailyStat).where(Sun2RoomDailyStat.stat_date == stat_date)
-                )
-            ).scalars().all()
             existing = next(
                 (
                     candidate for candidate in same_day
@@ -15503,6 +16288,7 @@ async def ingest_sun2_room_stats(session, data: Sun2RoomStatsIngestIn, batch_tim
         if not existing:
             existing = Sun2RoomDailyStat(stat_date=stat_date, room=room)
             session.add(existing)
+            same_day.append(existing)
             inserted += 1
         else:
             updated += 1
@@ -15771,21 +16557,64 @@ async def ingest_sun2_finance_settlements(session, data: Sun2FinanceSettlementsI
     return {"inserted": inserted, "updated": updated, "skipped": skipped}
 
 
-async def ingest_sun2_tanning_sessions(session, data: Sun2TanningSessionsIngestIn, batch_time: datetime) -> Dict[str, int]:
+SUN2_SESSION_CHANGE_FIELDS = (
+    "started_at",
+    "ended_at",
+    "room_id",
+    "sun2_bed_id",
+    "sun2_user_id",
+    "user_identifier",
+    "customer_type",
+    "payment_method",
+    "duration_minutes",
+    "paid_amount_kr",
+    "status",
+)
+
+
+def sun2_session_signature(item: Any) -> tuple:
+    return tuple(getattr(item, field) for field in SUN2_SESSION_CHANGE_FIELDS)
+
+
+async def ingest_sun2_tanning_sessions(
+    session,
+    data: Sun2TanningSessionsIngestIn,
+    batch_time: datetime,
+    changed_rows: Optional[list[Sun2TanningSessionIn]] = None,
+) -> Dict[str, int]:
+    """Upsert the posted sessions; rows that are new or differ from what was stored are appended to ``changed_rows``."""
     inserted = 0
     updated = 0
     skipped = 0
     source = data.source or "sun2_session_scraper"
     source_file = (repair_mojibake(data.source_file) or "").strip()
     replaced = 0
+    # A re-posted file deletes its rows before inserting them again; remember what they were.
+    removed_signatures: Dict[str, tuple] = {}
+    removed_columns = [Sun2TanningSession.source_session_id, *(getattr(Sun2TanningSession, field) for field in SUN2_SESSION_CHANGE_FIELDS)]
 
-    if source_file and data.rows:
+    keep_ids = {(repair_mojibake(value) or "").strip() for value in data.keep_source_session_ids or []} - {""}
+    if source_file and keep_ids:
         result = await session.execute(
             delete(Sun2TanningSession)
             .where(Sun2TanningSession.source == source)
             .where(Sun2TanningSession.source_file == source_file)
+            .where(Sun2TanningSession.source_session_id.not_in(keep_ids))
+            .returning(*removed_columns)
         )
-        replaced = int(result.rowcount or 0)
+        removed = result.all()
+        replaced = len(removed)
+        removed_signatures = {row[0]: tuple(row[1:]) for row in removed}
+    elif source_file and data.rows and data.replace_source_file:
+        result = await session.execute(
+            delete(Sun2TanningSession)
+            .where(Sun2TanningSession.source == source)
+            .where(Sun2TanningSession.source_file == source_file)
+            .returning(*removed_columns)
+        )
+        removed = result.all()
+        replaced = len(removed)
+        removed_signatures = {row[0]: tuple(row[1:]) for row in removed}
 
     for row in data.rows:
         source_session_id = (repair_mojibake(row.source_session_id) or "").strip()
@@ -15840,8 +16669,10 @@ async def ingest_sun2_tanning_sessions(session, data: Sun2TanningSessionsIngestI
             existing = Sun2TanningSession(source=source, source_session_id=source_session_id)
             session.add(existing)
             inserted += 1
+            previous_signature = removed_signatures.get(source_session_id)
         else:
             updated += 1
+            previous_signature = sun2_session_signature(existing)
 
         existing.source = source
         existing.source_session_id = source_session_id
@@ -15866,6 +16697,8 @@ async def ingest_sun2_tanning_sessions(session, data: Sun2TanningSessionsIngestI
         existing.source_file = source_file or data.source_file
         existing.imported_at = batch_time
         existing.raw = row.raw or {}
+        if changed_rows is not None and previous_signature != sun2_session_signature(existing):
+            changed_rows.append(row)
 
     return {"inserted": inserted, "updated": updated, "skipped": skipped, "replaced": replaced}
 
@@ -16026,6 +16859,8 @@ async def run_elvia_import_background(content: bytes, filename: str):
             )
             await session.commit()
         clear_summary_cache("energy")
+        if counts["inserted"] or counts["updated"]:
+            invalidate_analytics_replica("energy_hourly_consumption", [row["measured_at"] for row in parsed["rows"]])
     except (json.JSONDecodeError, UnicodeDecodeError):
         error = "Filen kunne ikke leses som gyldig JSON."
         async with async_session() as session:
@@ -16130,6 +16965,13 @@ def ai_dataset_schema(dataset_key: str) -> Dict[str, Any]:
     }
 
 
+def ai_sql_tables(sql: str) -> set[str]:
+    return {
+        match.group(1).split(".")[-1].strip('"').lower()
+        for match in re.finditer(r"(?is)\b(?:from|join)\s+([a-zA-Z_][\w.]*)", sql or "")
+    }
+
+
 def validate_ai_sql(sql: str) -> tuple[bool, str]:
     sql_clean = (sql or "").strip()
     if not re.match(r"(?is)^select\b", sql_clean):
@@ -16142,11 +16984,11 @@ def validate_ai_sql(sql: str) -> tuple[bool, str]:
     from_match = re.search(r"(?is)\bfrom\b(.*?)(\bwhere\b|\bgroup\b|\border\b|\blimit\b|$)", sql_clean)
     if from_match and "," in from_match.group(1):
         return False, "Bruk eksplisitt JOIN i stedet for kommaseparerte tabeller."
+    if re.search(r"""(?is)\b(?:from|join)\s*['"`]""", sql_clean):
+        # DuckDB reads quoted paths after FROM as files; only bare table names are allowed.
+        return False, "Tabellnavn må skrives uten anførselstegn."
     allowed_tables = {dataset["table"].lower() for dataset in AI_DATASETS.values()}
-    used_tables = {
-        match.group(1).split(".")[-1].strip('"').lower()
-        for match in re.finditer(r"(?is)\b(?:from|join)\s+([a-zA-Z_][\w.]*)", sql_clean)
-    }
+    used_tables = ai_sql_tables(sql_clean)
     if not used_tables:
         return False, "Fant ingen tabell i spørringen."
     unknown = sorted(table for table in used_tables if table not in allowed_tables)
@@ -16161,6 +17003,20 @@ async def run_safe_ai_sql(sql: str, limit: int = 200) -> Dict[str, Any]:
         return {"ok": False, "error": error, "rows": []}
     safe_limit = max(1, min(int_value(limit) or 200, 500))
     wrapped_sql = f"SELECT * FROM ({sql.strip()}) AS ai_query LIMIT {safe_limit}"
+    if ANALYTICS_REPLICA_ENABLED and analytics_replica.is_fresh(ai_sql_tables(sql)):
+        try:
+            rows = await asyncio.to_thread(analytics_replica.query, wrapped_sql)
+        except Exception as exc:
+            # DuckDB and Postgres SQL differ in places; let Postgres answer what the replica cannot.
+            logger.info("AI-spørring mot analysereplika feilet, bruker Postgres: %s", exc)
+        else:
+            return {
+                "ok": True,
+                "limit": safe_limit,
+                "count": len(rows),
+                "rows": ai_jsonable(rows),
+                "engine": "replica",
+            }
     async with async_session() as session:
         result = await session.execute(sql_text(wrapped_sql))
         rows = [dict(row._mapping) for row in result.fetchall()]
@@ -16169,6 +17025,7 @@ async def run_safe_ai_sql(sql: str, limit: int = 200) -> Dict[str, Any]:
         "limit": safe_limit,
         "count": len(rows),
         "rows": ai_jsonable(rows),
+        "engine": "postgres",
     }
 
 
@@ -16404,14 +17261,33 @@ async def recent_ai_logs(limit: int = 10) -> list[AiQueryLog]:
         return result.scalars().all()
 
 
+def core_schema_fingerprint() -> str:
+    return schema_fingerprint(
+        [
+            *metadata_schema_parts(Base.metadata),
+            sorted((table, tuple(columns)) for table, columns in STARTUP_COLUMNS.items()),
+            [statement for _, statement in PERFORMANCE_INDEXES],
+            data_version_trigger_statements(versioned_tables()),
+        ]
+    )
+
+
+async def apply_core_schema(conn) -> None:
+    await conn.run_sync(Base.metadata.create_all)
+    for table_name, columns in STARTUP_COLUMNS.items():
+        for column_name, column_type in columns:
+            await conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column_type}")
+    for _, statement in PERFORMANCE_INDEXES:
+        await conn.execute(sql_text(statement))
+    for statement in data_version_trigger_statements(versioned_tables()):
+        await conn.exec_driver_sql(statement)
+
+
 async def startup():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        for table_name, columns in STARTUP_COLUMNS.items():
-            for column_name, column_type in columns:
-                await conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column_type}")
-        for _, statement in PERFORMANCE_INDEXES:
-            await conn.execute(sql_text(statement))
+        if await ensure_schema(conn, "core", core_schema_fingerprint(), apply_core_schema, force=SCHEMA_SYNC_ALWAYS):
+            logger.info("Database schema synchronized for Fibaro10 process role %s", FIBARO10_PROCESS_ROLE)
+        # Data cleanup, not schema: it runs on every start even when the schema is unchanged.
         await conn.execute(delete(OutdoorLightEvent).where(OutdoorLightEvent.source == "CODEX TEST"))
         await conn.execute(delete(VentilationEvent).where(VentilationEvent.source == "CODEX TEST"))
     async with async_session() as session:
@@ -16492,6 +17368,19 @@ async def startup():
             await get_or_create_config(session, config_key)
         await seed_energy_circuits(session)
         await session.commit()
+    if sampling_profiler is not None:
+        sampling_profiler.start(route_codes(app.routes))
+    if LIVE_EVENTS_ENABLED and LIVE_EVENTS_LISTEN_ENABLED:
+        # Web processes serve the event stream, so they listen even without background tasks.
+        background_tasks.start("live-events-listen", live_event_listener)
+    if HC3_STATE_MIRROR_ENABLED and hc3_api_is_configured():
+        # The web processes serve the HC3 status reads, so each keeps its own mirror.
+        background_tasks.start("hc3-state-mirror", hc3_state_mirror_worker)
+    if LIVE_EVENTS_ENABLED:
+        background_tasks.start("sunroom-occupancy", sunroom_occupancy_listener)
+    if AUTOMATION_RULES_ENABLED:
+        # Ingest requests reach the web processes, so every process evaluates and flushes its own matches.
+        background_tasks.start("automation-rules", automation_rules_worker)
     if not FIBARO10_BACKGROUND_TASKS_ENABLED:
         logger.info("Background tasks disabled for Fibaro10 process role %s", FIBARO10_PROCESS_ROLE)
         return
@@ -16506,16 +17395,96 @@ async def startup():
     if OWNTRACKS_VISIT_SYNC_ENABLED:
         background_tasks.start("owntracks-visit-sync", owntracks_site_visit_sync_worker)
     background_tasks.start("ntfy-outbox", notification_outbox_worker)
+    if NTFY_OUTBOX_LISTEN_ENABLED:
+        background_tasks.start("ntfy-outbox-listen", notification_outbox_listener)
+    if LIVE_EVENTS_ENABLED and UNIFI_PROTECT_READ_API_TOKEN:
+        background_tasks.start("live-events-bollards", live_event_bollard_worker)
     if OPERATIONAL_RETENTION_ENABLED:
         background_tasks.start("operational-retention", operational_retention_worker)
+    if TIME_PARTITION_MAINTENANCE_ENABLED:
+        background_tasks.start("time-partitions", time_partition_worker)
     if SUNBED_POWER_CACHE_WARM_ENABLED:
         background_tasks.start("sunbed-power-cache-warm", sunbed_power_cache_warm_worker)
     if ROBOROCK_CONTROL_TOKEN:
         background_tasks.start("roborock-door-automation", roborock_door_automation_worker)
+    if ANALYTICS_REPLICA_ENABLED and replica_supported():
+        background_tasks.start("analytics-replica", analytics_replica_worker)
+
+
+def analytics_replica_month_bounds(month: str) -> tuple[datetime, datetime]:
+    start = datetime.strptime(month, "%Y-%m")
+    return start, datetime.strptime(shift_month(month, 1), "%Y-%m")
+
+
+async def analytics_replica_fingerprints(table: ReplicaTable, since: Optional[str]) -> Dict[str, list[Any]]:
+    time_column = f'"{table.time_column}"'
+    markers = [time_column] + [f'"{column}"' for column in ("id", "imported_at", "updated_at") if column in table.columns and column != table.time_column]
+    sql = (
+        f"SELECT to_char(date_trunc('month', {time_column}), 'YYYY-MM') AS month, count(*) AS row_count, "
+        + ", ".join(f"max({marker})" for marker in markers)
+        + f' FROM "{table.name}"'
+    )
+    params: Dict[str, Any] = {}
+    if since:
+        sql += f" WHERE {time_column} >= CAST(:since AS timestamp)"
+        params["since"] = analytics_replica_month_bounds(since)[0]
+    sql += " GROUP BY 1"
+    async with async_session() as session:
+        rows = (await session.execute(sql_text(sql), params)).all()
+    return {str(row[0] or NULL_PARTITION): [json_value(value) for value in row[1:]] for row in rows}
+
+
+async def analytics_replica_rows(table: ReplicaTable, month: str) -> list[Dict[str, Any]]:
+    time_column = f'"{table.time_column}"'
+    if month == NULL_PARTITION:
+        sql, params = f'SELECT * FROM "{table.name}" WHERE {time_column} IS NULL', {}
+    else:
+        start, end = analytics_replica_month_bounds(month)
+        sql = f'SELECT * FROM "{table.name}" WHERE {time_column} >= CAST(:start AS timestamp) AND {time_column} < CAST(:end AS timestamp)'
+        params = {"start": start, "end": end}
+    async with async_session() as session:
+        result = await session.execute(sql_text(sql), params)
+        return [dict(row._mapping) for row in result.fetchall()]
+
+
+def invalidate_analytics_replica(table: str, moments: Iterable[Any]) -> None:
+    """Mark the replica months an import touched; readers use Postgres until the worker has re-exported them."""
+    if not ANALYTICS_REPLICA_ENABLED:
+        return
+    months = {value.strftime("%Y-%m") for value in moments if isinstance(value, date)}
+    if not months:
+        return
+    try:
+        analytics_replica.invalidate(table, months)
+    except OSError as exc:
+        logger.warning("Kunne ikke markere analysereplika %s som utdatert: %s", table, exc)
+
+
+async def analytics_replica_worker() -> None:
+    await asyncio.sleep(60)
+    while True:
+        try:
+            summary = await analytics_replica.refresh(analytics_replica_fingerprints, analytics_replica_rows)
+            exported = sum(len(item["exported"]) for item in summary["tables"].values())
+            if exported:
+                logger.info("Analysereplika oppdatert: %s månedspartisjoner skrevet (full=%s)", exported, summary["full"])
+        except Exception as exc:
+            analytics_replica.last_error = str(exc)[:500]
+            logger.warning("Analysereplika kunne ikke oppdateres: %s", exc)
+        await asyncio.sleep(ANALYTICS_REPLICA_INTERVAL_MINUTES * 60)
 
 
 async def shutdown_application():
     await background_tasks.stop_all()
+    if sampling_profiler is not None:
+        await sampling_profiler.stop()
+    if AUTOMATION_RULES_ENABLED:
+        try:
+            await flush_automation_rule_evaluations()
+        except Exception as exc:
+            logger.warning("Automatiseringsregler kunne ikke lagres ved avslutning: %s", exc)
+    for item in (*engines.values(), listener_engine):
+        await item.dispose()
 
 
 def protect_ledger_client() -> ProtectLedgerClient:
@@ -17168,7 +18137,28 @@ async def health(details: bool = Query(False)):
                     "sentNotifications": NOTIFICATION_SENT_RETENTION_DAYS,
                     "expiredAuthSessions": AUTH_SESSION_RETENTION_DAYS,
                 },
-            }
+            },
+            "partitions": {
+                **TIME_PARTITION_STATE,
+                "enabled": TIME_PARTITION_MAINTENANCE_ENABLED,
+                "intervalHours": TIME_PARTITION_INTERVAL_HOURS,
+                "monthsAhead": TIME_PARTITION_MONTHS_AHEAD,
+                "backfillBatchIds": TIME_PARTITION_BACKFILL_BATCH_IDS,
+                "retentionDays": TIME_PARTITION_RETENTION_DAYS,
+            },
+            "hc3Mirror": {
+                **hc3_state_mirror.payload(),
+                "enabled": HC3_STATE_MIRROR_ENABLED and hc3_api_is_configured(),
+            },
+            "liveEvents": {**live_event_bus.payload(), "enabled": LIVE_EVENTS_ENABLED},
+            "sunroomOccupancy": sunroom_occupancy.payload(),
+            "automationRules": {**automation_rule_engine.payload(), "enabled": AUTOMATION_RULES_ENABLED},
+            "analyticsReplica": {**analytics_replica.payload(), "enabled": ANALYTICS_REPLICA_ENABLED},
+            "database": {
+                "pools": database_pools_payload(),
+                "compiledCache": compiled_cache_stats.payload(),
+                "slowQueries": slow_query_log.payload(),
+            },
         }
     if status_code == 200:
         return payload
@@ -17888,6 +18878,23 @@ async def api_admin_builds():
     return admin_builds_payload()
 
 
+@app.get("/api/admin/profile")
+async def api_admin_profile(
+    request: Request,
+    minutes: int = Query(5, ge=1, le=1440),
+    route: Optional[str] = Query(None),
+    format: str = Query("json"),
+):
+    forbidden = require_master(request)
+    if forbidden:
+        return forbidden
+    if sampling_profiler is None:
+        return {"enabled": False, "role": FIBARO10_PROCESS_ROLE}
+    if format == "folded":
+        return PlainTextResponse(sampling_profiler.folded(minutes, route))
+    return {**sampling_profiler.payload(minutes, route), "role": FIBARO10_PROCESS_ROLE}
+
+
 @app.get("/api/manual")
 async def api_manual():
     return admin_manual_payload()
@@ -18147,6 +19154,58 @@ async def build_operational_incident_center(
     }
 
 
+@app.get("/api/events/stream")
+async def api_live_event_stream(
+    request: Request,
+    topics: Optional[str] = None,
+    last_event_id: Optional[str] = Query(None, alias="lastEventId"),
+):
+    if not LIVE_EVENTS_ENABLED:
+        raise HTTPException(status_code=503, detail="Live-hendelser er slått av")
+    selected = live_event_topics(topics)
+    if not selected:
+        raise HTTPException(status_code=400, detail=f"Ukjent emne. Gyldige emner: {', '.join(LIVE_EVENT_TOPICS)}")
+    resume_from = request.headers.get("last-event-id") or last_event_id
+
+    async def stream():
+        with live_event_bus.subscribe(selected) as subscription:
+            replay = live_event_bus.events_after(resume_from, selected) if resume_from else None
+            sent = live_event_bus.sequence
+            yield "retry: 3000\n\n"
+            if replay is not None:
+                for event in replay:
+                    yield sse_frame(event)
+            elif resume_from:
+                # The cursor is older than the history: the client reloads a full snapshot once.
+                yield sse_control_frame("reset", live_event_bus.current_id, {"reason": "history", "topics": sorted(selected)})
+            else:
+                yield sse_control_frame("ready", live_event_bus.current_id, {"topics": sorted(selected)})
+            while True:
+                if subscription.lagged:
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    subscription.lagged = False
+                    sent = live_event_bus.sequence
+                    yield sse_control_frame("reset", live_event_bus.current_id, {"reason": "lagged", "topics": sorted(selected)})
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=LIVE_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if event["sequence"] <= sent:
+                    continue
+                sent = event["sequence"]
+                yield sse_frame(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/api/system/notifications")
 async def api_system_notifications():
     global bollard_incident_failure_started_at
@@ -18497,6 +19556,7 @@ async def api_system_automation_create(request: Request, payload: AutomationWork
         session.add(row)
         await session.commit()
         await session.refresh(row)
+    await load_automation_rules()
     return {"status": "ok", "message": "Automatiseringen er opprettet.", "automation": automation_workbench_payload(row)}
 
 
@@ -18512,9 +19572,134 @@ async def api_system_automation_update(request: Request, automation_id: int, pay
         apply_automation_workbench_input(row, payload, local_now_naive())
         await session.commit()
         await session.refresh(row)
+    await load_automation_rules()
     return {"status": "ok", "message": "Automatiseringen er oppdatert.", "automation": automation_workbench_payload(row)}
 
 
+async def load_automation_rules() -> None:
+    """Compile the enabled rules; other processes pick up edits within AUTOMATION_RULES_REFRESH_SECONDS."""
+    if not AUTOMATION_RULES_ENABLED:
+        return
+    async with async_session() as session:
+        rows = (
+            await session.execute(select(AutomationWorkbenchRule).where(AutomationWorkbenchRule.enabled.is_(True)))
+        ).scalars().all()
+    automation_rule_engine.load(rows, local_now_naive())
+
+
+def dispatch_automation_event(source: str, event_type: Optional[str], data: Dict[str, Any], devices: Iterable[Any] = ()) -> None:
+    """Evaluates the rules listening for an ingest event; database writes happen in the batched flush."""
+    if not AUTOMATION_RULES_ENABLED or not automation_rule_engine.listens(source):
+        return
+    now = local_now_naive()
+    event = RuleEvent(
+        source=source,
+        event_type=str(event_type or "changed"),
+        data=data,
+        devices=tuple(str(device) for device in devices if device is not None and device != ""),
+        at=now,
+    )
+    automation_rule_engine.dispatch(event, now)
+
+
+def automation_ntfy_action(match: RuleMatch) -> Optional[Dict[str, str]]:
+    action = match.actions.get("ntfy") or match.actions.get("varsel")
+    if not action:
+        return None
+    if not isinstance(action, dict):
+        action = {"melding": str(action)}
+    return {
+        "topic": str(action.get("topic") or action.get("emne") or AUTOMATION_NTFY_TOPICS.get(match.event.source) or ""),
+        "title": str(action.get("tittel") or action.get("title") or match.rule_name),
+        "message": str(action.get("melding") or action.get("message") or f"{match.rule_name}: {match.event.summary()}"),
+        "priority": str(action.get("prioritet") or action.get("priority") or "3"),
+    }
+
+
+async def flush_automation_rule_evaluations() -> int:
+    evaluated, matches = automation_rule_engine.drain()
+    if not evaluated and not matches:
+        return 0
+    try:
+        async with async_session() as session:
+            for match in matches:
+                # The row lock makes processes take turns; the loser sees the winner's time and is suppressed.
+                claimed = (
+                    await session.execute(
+                        update(AutomationWorkbenchRule)
+                        .where(AutomationWorkbenchRule.id == match.rule_id)
+                        .where(
+                            or_(
+                                AutomationWorkbenchRule.last_triggered_at.is_(None),
+                                AutomationWorkbenchRule.last_triggered_at <= match.matched_at - match.cooldown,
+                            )
+                        )
+                        .values(last_triggered_at=match.matched_at)
+                        .returning(AutomationWorkbenchRule.id)
+                    )
+                ).first()
+                if claimed is None and match.cooldown:
+                    automation_rule_engine.note_suppressed(match)
+                    if evaluated.get(match.rule_id, (None, ""))[0] == match.matched_at:
+                        evaluated[match.rule_id] = (match.matched_at, f"Oppfylt i ventetid (utløst av annen prosess): {match.event.summary()}")
+                    continue
+                result = "observert"
+                if match.mode == "Aktiv":
+                    action = automation_ntfy_action(match)
+                    unsupported = sorted(set(match.actions) - {"ntfy", "varsel", "beskrivelse"})
+                    if action and await enqueue_ntfy_message(
+                        action["topic"],
+                        action["title"],
+                        action["message"],
+                        tags="robot",
+                        priority=action["priority"],
+                        related_type="automation",
+                        related_id=match.rule_id,
+                        session=session,
+                    ):
+                        result = "varslet"
+                    elif unsupported:
+                        result = f"ikke støttet: {', '.join(unsupported)}"
+                    else:
+                        result = "ingen handling"
+                session.add(
+                    AutomationRuleEvaluation(
+                        rule_id=match.rule_id,
+                        rule_name=match.rule_name,
+                        mode=match.mode,
+                        source=match.event.source,
+                        event_type=match.event.event_type,
+                        device=match.event.devices[0] if match.event.devices else None,
+                        result=result,
+                        matched_at=match.matched_at,
+                    )
+                )
+            values = [
+                {"id": rule_id, "last_evaluated_at": evaluated_at, "last_result": result[:500]}
+                for rule_id, (evaluated_at, result) in evaluated.items()
+            ]
+            if values:
+                await session.execute(update(AutomationWorkbenchRule), values)
+            await session.commit()
+    except Exception:
+        automation_rule_engine.restore(evaluated, matches)
+        raise
+    return len(matches)
+
+
+async def automation_rules_worker() -> None:
+    while True:
+        try:
+            if automation_rule_engine.needs_load():
+                await load_automation_rules()
+            await flush_automation_rule_evaluations()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Automatiseringsregler kunne ikke lastes eller lagres: %s", exc)
+        await automation_rule_engine.wait_for_matches(AUTOMATION_RULES_FLUSH_SECONDS)
+
+
 @app.get("/api/system/search")
 async def api_system_search(q: str = Query(min_length=2, max_length=120)):
     needle = q.strip()
@@ -29862,8 +31047,21 @@ async def sun2_tanning_sessions_period_summary(session, start: date, end: date)
             .where(Sun2RoomDailyStat.stat_date <= end)
         )
     ).one()
-    count_value, amount_inc, first_started, last_started, last_imported = result
-    daily_count, daily_amount_inc, daily_imported = daily_result
+    return sun2_tanning_sessions_summary_payload(start, end, *result, *daily_result)
+
+
+def sun2_tanning_sessions_summary_payload(
+    start: date,
+    end: date,
+    count_value: Any,
+    amount_inc: Any,
+    first_started: Optional[datetime],
+    last_started: Optional[datetime],
+    last_imported: Optional[datetime],
+    daily_count: Any,
+    daily_amount_inc: Any,
+    daily_imported: Optional[datetime],
+) -> Dict[str, Any]:
     return {
         "period_start": start,
         "period_end": end,
@@ -29880,6 +31078,67 @@ async def sun2_tanning_sessions_period_summary(session, start: date, end: date)
     }
 
 
+def sun2_tanning_sessions_replica_query(periods: list[tuple[date, date]]) -> list[Dict[str, Any]]:
+    values = ", ".join("(CAST(? AS DATE), CAST(? AS DATE))" for _ in periods)
+    sql = f"""
+        WITH periods(period_start, period_end) AS (VALUES {values}),
+        sessions AS (
+            SELECT p.period_start, p.period_end,
+                   count(s.id) AS session_count, coalesce(sum(s.paid_amount_kr), 0) AS amount_inc,
+                   min(s.started_at) AS first_started, max(s.started_at) AS last_started,
+                   max(s.imported_at) AS last_imported
+            FROM periods p
+            LEFT JOIN sun2_tanning_sessions s ON s.stat_date BETWEEN p.period_start AND p.period_end
+            GROUP BY p.period_start, p.period_end
+        ),
+        daily AS (
+            SELECT p.period_start, p.period_end,
+                   coalesce(sum(d.totalt_antall_solinger), 0) AS daily_count,
+                   coalesce(sum(d.totalt_inntjent_kr), 0) AS daily_amount_inc,
+                   max(d.imported_at) AS daily_imported
+            FROM periods p
+            LEFT JOIN sun2_room_daily_stats d ON d.stat_date BETWEEN p.period_start AND p.period_end
+            GROUP BY p.period_start, p.period_end
+        )
+        SELECT * FROM sessions JOIN daily USING (period_start, period_end)
+    """
+    return analytics_replica.query(sql, [value for period in periods for value in period])
+
+
+async def sun2_tanning_sessions_replica_summaries(periods: list[tuple[date, date]]) -> Dict[tuple[date, date], Dict[str, Any]]:
+    """Session summaries for closed periods from the analytics replica, in one query.
+
+    Periods that end on or after the replica's refresh date are left out, so
+    the caller reads those from Postgres.
+    """
+    if not ANALYTICS_REPLICA_ENABLED or not analytics_replica.is_fresh(["sun2_tanning_sessions", "sun2_room_daily_stats"]):
+        return {}
+    refreshed_at = analytics_replica.refreshed_at()
+    closed = [period for period in periods if refreshed_at and period[1] < refreshed_at.date()]
+    if not closed:
+        return {}
+    try:
+        rows = await asyncio.to_thread(sun2_tanning_sessions_replica_query, closed)
+    except Exception as exc:
+        logger.info("Solingsoppsummering fra analysereplika feilet, bruker Postgres: %s", exc)
+        return {}
+    return {
+        (row["period_start"], row["period_end"]): sun2_tanning_sessions_summary_payload(
+            row["period_start"],
+            row["period_end"],
+            row["session_count"],
+            row["amount_inc"],
+            row["first_started"],
+            row["last_started"],
+            row["last_imported"],
+            row["daily_count"],
+            row["daily_amount_inc"],
+            row["daily_imported"],
+        )
+        for row in rows
+    }
+
+
 def settlement_form_rows(parsed: Any, source_summaries: Optional[Dict[str, Dict[str, Any]]] = None) -> list[Dict[str, Any]]:
     gross_coin_card = settlement_parsed_float(parsed, "gross_coin_card_ex_vat")
     easypark = settlement_parsed_float(parsed, "easypark_ex_vat")
@@ -31078,8 +32337,10 @@ async def revenue_settlement_reconciliation_rows(session, limit: int = 36) -> li
         periods.setdefault(key, {"start": row.period_start, "end": row.period_end})
         periods[key].setdefault("sun", row)
 
+    selected_periods = sorted(periods.values(), key=lambda value: value["start"], reverse=True)[:limit]
+    replica_sessions = await sun2_tanning_sessions_replica_summaries([(item["start"], item["end"]) for item in selected_periods])
     rows: list[Dict[str, Any]] = []
-    for item in sorted(periods.values(), key=lambda value: value["start"], reverse=True)[:limit]:
+    for item in selected_periods:
         start = item["start"]
         end = item["end"]
         parking_row: Optional[SettlementImport] = item.get("parking")
@@ -31111,7 +32372,7 @@ async def revenue_settlement_reconciliation_rows(session, limit: int = 36) -> li
         parking_status = reconciliation_status(parking_system_ex, parking_settlement_ex, parking_diff)
 
         finance_summary = await sun2_finance_settlement_period_summary(session, start, end)
-        sessions_summary = await sun2_tanning_sessions_period_summary(session, start, end)
+        sessions_summary = replica_sessions.get((start, end)) or await sun2_tanning_sessions_period_summary(session, start, end)
         sun_system_ex, _detail, _source, _source_label = sun2_tanning_revenue_control_expected(
             finance_summary,
             sessions_summary,
@@ -34382,7 +35643,7 @@ async def api_v2_module(request: Request, module: str, view: Optional[str] = Non
                 ).scalars().all()
 
             admin_tools = [
-                api_tool_row("Buildlogg", "/admin/build", "Klikkbar leveransehistorikk med detaljvisning per build.", len(BUILD_LOG)),
+                api_tool_row("Buildlogg", "/admin/build", "Klikkbar leveransehistorikk med detaljvisning per build.", len(load_build_log())),
                 api_tool_row("Teknisk", "/admin/teknisk", "Teknisk driftsside.", None),
                 api_tool_row("Manual", "/manual/oversikt", "Intern manual og driftsnotater.", None),
                 api_tool_row("Brukere og tilgang", "/admin/brukere", "Administrer brukere, roller og tilgang.", len(access_keys) if access_keys else None),
@@ -34409,7 +35670,7 @@ async def api_v2_module(request: Request, module: str, view: Optional[str] = Non
                     api_card("Datakilder", f"{ok_import_count}/{len(import_api_rows)}", "OK", "Alle ferske" if not problem_import_rows else f"{len(problem_import_rows)} krever kontroll", "danger" if problem_import_rows else "status", href="/admin/datakilder"),
                     api_card("Krever oppfølging", len(admin_task_rows), "stk", "Samlet arbeidsliste", "danger" if urgent_task_count else "status", href="/admin/oppgaver"),
                     api_card("Kritisk / høy", urgent_task_count, "stk", "Prioriteres først", "danger" if urgent_task_count else "status", href="/admin/oppgaver"),
-                    api_card("Siste build", APP_BUILD, "", BUILD_LOG[0]["title"], "status", href="/admin/build"),
+                    api_card("Siste build", APP_BUILD, "", load_build_log()[0]["title"], "status", href="/admin/build"),
                 ]
                 if problem_import_rows:
                     tables.append(
@@ -34423,7 +35684,7 @@ async def api_v2_module(request: Request, module: str, view: Optional[str] = Non
                     api_table(
                         "Siste endringer",
                         build_log_columns,
-                        [api_build_log_row(row) for row in BUILD_LOG[:8]],
+                        [api_build_log_row(row) for row in load_build_log()[:8]],
                     )
                 )
 
@@ -34679,16 +35940,16 @@ async def api_v2_module(request: Request, module: str, view: Optional[str] = Non
                 ]
                 charts = [relation_analysis["chart"]]
             elif view == "build":
-                current_build_row = BUILD_LOG[0]
-                builds_today = sum(1 for row in BUILD_LOG if row.get("date") == current_build_row.get("date"))
+                current_build_row = load_build_log()[0]
+                builds_today = sum(1 for row in load_build_log() if row.get("date") == current_build_row.get("date"))
                 admin_cards = [
                     api_card("Aktiv build", APP_BUILD, "", current_build_row.get("headline"), "status", href="/admin/build"),
-                    api_card("Loggførte builds", len(BUILD_LOG), "stk", "Komplett leveransehistorikk", "status", href="/admin/build"),
+                    api_card("Loggførte builds", len(load_build_log()), "stk", "Komplett leveransehistorikk", "status", href="/admin/build"),
                     api_card("I dag", builds_today, "stk", current_build_row.get("date"), "status", href="/admin/build"),
                     api_card("Berørte apper", len(current_build_row.get("applications") or []), "stk", "I aktiv build", "status", href="/admin/build"),
                 ]
                 tables = [
-                    api_table("Buildlogg", build_log_columns, [api_build_log_row(row) for row in BUILD_LOG[:80]]),
+                    api_table("Buildlogg", build_log_columns, [api_build_log_row(row) for row in load_build_log()[:80]]),
                     api_table("Buildverktøy", ["tool", "path", "description", "count"], [admin_tools[0], admin_tools[1], admin_tools[5]]),
                 ]
             elif view == "datakilder":
@@ -34795,7 +36056,7 @@ async def api_v2_module(request: Request, module: str, view: Optional[str] = Non
                     api_card("Manual", "V2", "", "Lenker og driftsinnganger samlet", "status", href="/manual/oversikt"),
                     api_card("Systemkart", inventory["components"], "stk", "Komponenter og underapper", "status", href="/admin/systemkart"),
                     api_card("Datakilder", len(import_rows), "stk", "Status og forklaring per kilde", "status", href="/admin/datakilder"),
-                    api_card("Build", APP_BUILD, "", BUILD_LOG[0]["title"], "status", href="/admin/build"),
+                    api_card("Build", APP_BUILD, "", load_build_log()[0]["title"], "status", href="/admin/build"),
                 ]
                 tables = [
                     api_table(
@@ -34805,7 +36066,7 @@ async def api_v2_module(request: Request, module: str, view: Optional[str] = Non
                             api_tool_row("Manual", "/manual/oversikt", "Intern manual med driftsrutiner og lenker til dagens flater.", None),
                             api_tool_row("Systemkart", "/admin/systemkart", "Oversikt over komponenter, underapper, webflater og health-lenker.", len(system_component_rows())),
                             api_tool_row("Datakilder", "/admin/datakilder", "Status for importjobber og eksterne datakilder.", len(import_rows)),
-                            api_tool_row("Buildlogg", "/admin/build", "Endringshistorikk for løsningen.", len(BUILD_LOG)),
+                            api_tool_row("Buildlogg", "/admin/build", "Endringshistorikk for løsningen.", len(load_build_log())),
                             api_tool_row("Teknisk", "/admin/teknisk", "Teknisk driftsflate.", None),
                             api_tool_row("Brukere", "/admin/brukere", "Brukere, roller og tilgangslogg.", len(access_keys)),
                         ],
@@ -35753,7 +37014,7 @@ async def validate_energy_node_hc3_values(values: Dict[str, Any]) -> None:
     summaries: Dict[int, Dict[str, Any]] = {}
     for device_id in sorted(set(selected.values())):
         try:
-            device = await asyncio.to_thread(hc3_cached_device_request, device_id, HC3_ENERGY_LIVE_TIMEOUT_SECONDS)
+            device = await hc3_live_device(device_id, HC3_ENERGY_LIVE_TIMEOUT_SECONDS)
         except Exception as exc:
             raise HTTPException(status_code=400, detail=f"HC3-enhet {device_id} kunne ikke kontrolleres: {exc}") from exc
         summaries[device_id] = hc3_energy_device_summary(device)
@@ -35933,7 +37194,10 @@ async def api_v2_energy_hc3_devices(
     source = "HC3 live"
     error = None
     try:
-        devices = await asyncio.to_thread(hc3_devices_request, HC3_ENERGY_LIVE_TIMEOUT_SECONDS)
+        # The mirror is updated on the event loop, so it is copied here rather than read from the thread.
+        devices = hc3_state_mirror.rows()
+        if devices is None:
+            devices = await asyncio.to_thread(hc3_devices_request, HC3_ENERGY_LIVE_TIMEOUT_SECONDS)
         rows = [hc3_energy_device_summary(device) for device in devices]
     except Exception as exc:
         source = "Lagret HC3-inventar"
@@ -36599,6 +37863,19 @@ async def hc3_meter_reading_log(data: Hc3MeterReadingIn):
 
 @app.post("/events")
 async def log_event(data: EventDataIn):
+    result = await save_event_payload(data)
+    rule_source = {
+        "utelys_events": "lights",
+        "utelys_samples": "lights",
+        "ventilasjon_events": "ventilation",
+        "ventilasjon_samples": "ventilation",
+    }.get(result["table"])
+    if rule_source and automation_rule_engine.listens(rule_source):
+        dispatch_automation_event(rule_source, data.event_type, json_safe_model_payload(data), (data.device_id, data.device_key))
+    return result
+
+
+async def save_event_payload(data: EventDataIn) -> Dict[str, Any]:
     system = (data.system or "").lower()
     if system in {"utelys", "ute_lys", "lys"}:
         if data.event_type in {"sample", "sample_5min", "learning_sample"}:
@@ -36663,6 +37940,7 @@ async def api_hc3_door_event(data: DoorEventIn):
     async with async_session() as session:
         session.add(row)
         await session.flush()
+        await publish_live_event("doors", "door_event", door_event_payload(row), session=session)
         await record_import_job(
             session,
             "hc3_door_events",
@@ -36681,6 +37959,8 @@ async def api_hc3_door_event(data: DoorEventIn):
         )
         await session.commit()
         await session.refresh(row)
+    sunroom_occupancy.record_door_event(row)
+    dispatch_automation_event("doors", row.event_type, door_event_payload(row), (row.device_id, row.device_key))
     return {"status": "ok", "id": row.id, "table": "door_events", "action": row.action, "state": row.state}
 
 
@@ -36773,6 +38053,7 @@ async def roborock_ingest(data: RoborockIngestIn):
     )
     import_job_name = "dreame_sync" if batch_provider == "dreame" else "roborock_sync"
     results = []
+    live_fingerprints: dict[str, tuple[Any, ...]] = {}
     async with async_session() as session:
         session.add(
             RoborockSyncRun(
@@ -36786,7 +38067,7 @@ async def roborock_ingest(data: RoborockIngestIn):
             )
         )
         for robot in data.robots:
-            results.append(await ingest_roborock_robot(session, robot, batch_time, data.source))
+            results.append(await ingest_roborock_robot(session, robot, batch_time, data.source, live_fingerprints))
         await record_import_job(
             session,
             import_job_name,
@@ -36798,6 +38079,7 @@ async def roborock_ingest(data: RoborockIngestIn):
             raw={"collector_id": data.collector_id, "provider": batch_provider, "extra": data.extra},
         )
         await session.commit()
+    roborock_live_fingerprints.update(live_fingerprints)
     return {"status": "ok", "robots": results}
 
 
@@ -36816,26 +38098,31 @@ async def roborock_telemetry_ingest(data: RoborockTelemetryIn):
     }
 
 
+async def store_sun2_room_stats_day(session, data: Sun2RoomStatsIngestIn, batch_time: datetime) -> Dict[str, int]:
+    counts = await ingest_sun2_room_stats(session, data, batch_time)
+    session.add(
+        Sun2ImportRun(
+            timestamp=batch_time,
+            collector_id=data.collector_id,
+            source=data.source,
+            ok=data.ok,
+            stat_date=data.stat_date,
+            source_file=data.source_file,
+            rows_count=len(data.rows),
+            inserted_count=counts["inserted"],
+            updated_count=counts["updated"],
+            message=data.message,
+            raw={"extra": data.extra},
+        )
+    )
+    return counts
+
+
 @app.post("/api/sun2/room-stats/ingest")
 async def sun2_room_stats_ingest(data: Sun2RoomStatsIngestIn):
     batch_time = data.timestamp or datetime.utcnow()
     async with async_session() as session:
-        counts = await ingest_sun2_room_stats(session, data, batch_time)
-        session.add(
-            Sun2ImportRun(
-                timestamp=batch_time,
-                collector_id=data.collector_id,
-                source=data.source,
-                ok=data.ok,
-                stat_date=data.stat_date,
-                source_file=data.source_file,
-                rows_count=len(data.rows),
-                inserted_count=counts["inserted"],
-                updated_count=counts["updated"],
-                message=data.message,
-                raw={"extra": data.extra},
-            )
-        )
+        counts = await store_sun2_room_stats_day(session, data, batch_time)
         await record_import_job(
             session,
             "sun2_room_daily_import",
@@ -36848,9 +38135,56 @@ async def sun2_room_stats_ingest(data: Sun2RoomStatsIngestIn):
         )
         await session.commit()
     clear_summary_cache("sun2")
+    if counts["inserted"] or counts["updated"]:
+        invalidate_analytics_replica("sun2_room_daily_stats", [row.stat_date or data.stat_date for row in data.rows])
     return {"status": "ok", **counts, "rows": len(data.rows)}
 
 
+@app.post("/api/sun2/room-stats/ingest-batch")
+async def sun2_room_stats_ingest_batch(request: Request):
+    """Several days from sun2_importer in one transaction; the body may be gzip-compressed."""
+    body = await request.body()
+    if "gzip" in request.headers.get("content-encoding", "").lower():
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError) as exc:
+            raise HTTPException(status_code=400, detail=f"Ugyldig gzip-innhold: {exc}") from exc
+    try:
+        data = Sun2RoomStatsBatchIn.model_validate_json(body)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False)) from exc
+    batch_time = data.timestamp or datetime.utcnow()
+    days = []
+    async with async_session() as session:
+        for day in data.days:
+            day.collector_id = day.collector_id or data.collector_id
+            counts = await store_sun2_room_stats_day(session, day, day.timestamp or batch_time)
+            days.append({"stat_date": day.stat_date, "source_file": day.source_file, **counts, "rows": len(day.rows)})
+        inserted = sum(item["inserted"] for item in days)
+        updated = sum(item["updated"] for item in days)
+        rows_total = sum(item["rows"] for item in days)
+        stat_dates = sorted(item["stat_date"] for item in days if item["stat_date"])
+        period = f"{stat_dates[0]} til {stat_dates[-1]}" if stat_dates else "-"
+        await record_import_job(
+            session,
+            "sun2_room_daily_import",
+            ok=data.ok,
+            source=data.source,
+            records_imported=inserted + updated,
+            records_total=rows_total,
+            message=data.message or f"{rows_total} romrader for {len(days)} dager ({period})",
+            raw={
+                "collector_id": data.collector_id,
+                "source_files": [item["source_file"] for item in days],
+                "counts": {"inserted": inserted, "updated": updated},
+            },
+        )
+        await session.commit()
+    clear_summary_cache("sun2")
+    invalidate_analytics_replica("sun2_room_daily_stats", stat_dates)
+    return {"status": "ok", "inserted": inserted, "updated": updated, "rows": rows_total, "days": days}
+
+
 @app.post("/api/sun2/sessions/ingest")
 async def sun2_sessions_ingest(data: Sun2TanningSessionsIngestIn):
     batch_time = data.timestamp or datetime.utcnow()
@@ -36897,8 +38231,9 @@ async def sun2_sessions_ingest(data: Sun2TanningSessionsIngestIn):
             await session.commit()
         raise HTTPException(status_code=409, detail=message)
 
+    changed_rows: list[Sun2TanningSessionIn] = []
     async with async_session() as session:
-        counts = await ingest_sun2_tanning_sessions(session, data, batch_time)
+        counts = await ingest_sun2_tanning_sessions(session, data, batch_time, changed_rows)
         session.add(
             Sun2SessionImportRun(
                 timestamp=batch_time,
@@ -36930,6 +38265,18 @@ async def sun2_sessions_ingest(data: Sun2TanningSessionsIngestIn):
     clear_summary_cache("sun2", "sun2_sessions", "sun2_session_options", "sun2_session_database_total")
     if counts["inserted"] or counts["updated"] or counts.get("replaced"):
         schedule_sun2_axis_snapshot_link("sun2_sessions_ingest")
+        sunroom_occupancy.invalidate_sessions()
+        invalidate_analytics_replica("sun2_tanning_sessions", [row.started_at for row in data.rows])
+        await publish_live_event("doors", "sunroom_sessions", {"source": data.source, "counts": counts})
+    if automation_rule_engine.listens("sun2_sessions"):
+        # Backfills and forced syncs re-post whole days; only new or changed sessions are events.
+        for session_row in changed_rows:
+            dispatch_automation_event(
+                "sun2_sessions",
+                "session",
+                json_safe_model_payload(session_row),
+                (session_row.room_id, session_row.sun2_bed_id),
+            )
     return {"status": "ok", **counts, "rows": len(data.rows)}
 
 
@@ -37003,6 +38350,8 @@ async def sun2_product_sales_ingest(data: Sun2ProductSalesIngestIn):
         )
         await session.commit()
     clear_summary_cache("sun2", "sun2_product_sales")
+    if counts["inserted"] or counts["updated"] or counts["replaced"]:
+        invalidate_analytics_replica("sun2_product_sales", [row.sold_at for row in data.rows])
     return {"status": "ok", **counts, "rows": len(data.rows)}
 
 
@@ -37028,6 +38377,8 @@ async def sun2_finance_settlements_ingest(data: Sun2FinanceSettlementsIngestIn):
         )
         await session.commit()
     clear_summary_cache("sun2", "sun2_finance_settlements")
+    if counts["inserted"] or counts["updated"]:
+        invalidate_analytics_replica("sun2_finance_settlements", [row.period_start for row in data.rows])
     return {"status": "ok", **counts, "rows": len(data.rows)}
 
 
@@ -37062,21 +38413,44 @@ EASYPARK_REQUIRED_COLUMNS = {
     "Parking ID",
     "Start date",
 }
+EASYPARK_STAGE_COLUMNS = {
+    "parking_area": "text",
+    "source_system": "text",
+    "area_number": "integer",
+    "parking_id": "bigint",
+    "start_time": "timestamp",
+    "end_time": "timestamp",
+    "parking_time_min": "double precision",
+    "fee_ex_vat": "double precision",
+    "fee_inc_vat": "double precision",
+    "fee_vat": "double precision",
+    "car_license_number": "text",
+    "user_interface": "text",
+    "subtype": "text",
+    "status": "text",
+    "imported_at": "timestamp",
+    "raw_filename": "text",
+}
+EASYPARK_KEY_COLUMNS = ("source_system", "parking_id")
+EASYPARK_COMPARED_COLUMNS = tuple(
+    column for column in EASYPARK_STAGE_COLUMNS if column not in {*EASYPARK_KEY_COLUMNS, "imported_at", "raw_filename"}
+)
+EASYPARK_OPEN_STATUSES = ("ongoing", "active", "started")
+EASYPARK_COPY_BATCH_ROWS = 10000
+EASYPARK_UPSERT_CHUNK_ROWS = 1000
 
 
-def decode_easypark_csv(content: bytes) -> str:
-    if not content:
-        return ""
-    if content.startswith(b"\xff\xfe") or content.startswith(b"\xfe\xff"):
-        return content.decode("utf-16", errors="replace")
-    if len(content) > 2 and content[1] == 0:
-        return content.decode("utf-16le", errors="replace")
-    for encoding in ("utf-8-sig", "utf-16", "cp1252", "latin-1"):
-        try:
-            return content.decode(encoding)
-        except UnicodeDecodeError:
-            continue
-    return content.decode("utf-8", errors="replace")
+def easypark_encoding(head: bytes) -> str:
+    if head.startswith(b"\xff\xfe") or head.startswith(b"\xfe\xff"):
+        return "utf-16"
+    if len(head) > 2 and head[1] == 0:
+        return "utf-16le"
+    try:
+        # Incremental, so a multi-byte character cut off at the end of the head is not an error.
+        codecs.getincrementaldecoder("utf-8-sig")().decode(head)
+    except UnicodeDecodeError:
+        return "cp1252"
+    return "utf-8-sig"
 
 
 def clean_easypark_value(value: Any) -> str:
@@ -37121,70 +38495,240 @@ def easypark_minutes(value: Any, start_at: Optional[datetime], end_at: Optional[
     return None
 
 
-def parse_easypark_csv(content: bytes, filename: str) -> Dict[str, Any]:
-    text_value = decode_easypark_csv(content)
-    sample = text_value[:4096]
+def easypark_row(raw_row: Mapping[Any, Any], filename: str, imported_at: datetime) -> Optional[Dict[str, Any]]:
+    row = {clean_easypark_value(key): clean_easypark_value(value) for key, value in raw_row.items() if key is not None}
+    parking_id = easypark_int(row.get("Parking ID"))
+    area_number = easypark_int(row.get("Area number"))
+    start_at = easypark_timestamp(row.get("Start date"))
+    if not parking_id or not area_number or not start_at:
+        return None
+    end_at = easypark_timestamp(row.get("End date"))
+    return {
+        "parking_area": row.get("Parking area") or "",
+        "source_system": row.get("Source parking system") or "EasyPark",
+        "area_number": area_number,
+        "parking_id": parking_id,
+        "start_time": start_at,
+        "end_time": end_at,
+        "parking_time_min": easypark_minutes(row.get("Parking time"), start_at, end_at),
+        "fee_ex_vat": easypark_float(row.get("Parking fee excluding VAT")),
+        "fee_inc_vat": easypark_float(row.get("Parking fee including VAT")),
+        "fee_vat": easypark_float(row.get("Parking fee VAT")),
+        "car_license_number": normalize_plate(row.get("Car license number")) or None,
+        "user_interface": row.get("User interface") or None,
+        "subtype": row.get("SubType") or None,
+        "status": row.get("Status") or "Ukjent",
+        "imported_at": imported_at,
+        "raw_filename": filename,
+    }
+
+
+def iter_easypark_csv(stream: BinaryIO, filename: str, stats: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+    """Parking rows from a seekable binary EasyPark export, decoded as they are read.
+
+    The header is checked before this returns. Rows without parking id, area
+    or start date are counted in ``stats["skipped"]``.
+    """
+    head = stream.read(16384)
+    stream.seek(0)
+    encoding = easypark_encoding(head)
+    sample = head.decode(encoding, errors="ignore")[:4096]
     try:
         dialect = csv.Sniffer().sniff(sample, delimiters=";,")
     except csv.Error:
         dialect = csv.excel()
         dialect.delimiter = ";"
-    reader = csv.DictReader(StringIO(text_value), dialect=dialect)
+    text_stream = TextIOWrapper(stream, encoding=encoding, errors="replace", newline="")
+    reader = csv.DictReader(text_stream, dialect=dialect)
     fieldnames = [clean_easypark_value(name) for name in (reader.fieldnames or [])]
     missing = sorted(EASYPARK_REQUIRED_COLUMNS - set(fieldnames))
     if missing:
+        text_stream.detach()
         raise ValueError(f"EasyPark-filen mangler kolonner: {', '.join(missing)}")
 
-    rows: list[Dict[str, Any]] = []
-    skipped = 0
-    for raw_row in reader:
-        row = {clean_easypark_value(key): clean_easypark_value(value) for key, value in raw_row.items() if key is not None}
-        parking_id = easypark_int(row.get("Parking ID"))
-        area_number = easypark_int(row.get("Area number"))
-        start_at = easypark_timestamp(row.get("Start date"))
-        if not parking_id or not area_number or not start_at:
-            skipped += 1
-            continue
-        end_at = easypark_timestamp(row.get("End date"))
-        rows.append(
-            {
-                "parking_area": row.get("Parking area") or "",
-                "source_system": row.get("Source parking system") or "EasyPark",
-                "area_number": area_number,
-                "parking_id": parking_id,
-                "start_time": start_at,
-                "end_time": end_at,
-                "parking_time_min": easypark_minutes(row.get("Parking time"), start_at, end_at),
-                "fee_ex_vat": easypark_float(row.get("Parking fee excluding VAT")),
-                "fee_inc_vat": easypark_float(row.get("Parking fee including VAT")),
-                "fee_vat": easypark_float(row.get("Parking fee VAT")),
-                "car_license_number": normalize_plate(row.get("Car license number")) or None,
-                "user_interface": row.get("User interface") or None,
-                "subtype": row.get("SubType") or None,
-                "status": row.get("Status") or "Ukjent",
-                "imported_at": datetime.utcnow(),
-                "raw_filename": filename,
-            }
-        )
-    return {"rows": rows, "skipped": skipped, "filename": filename}
+    def rows() -> Iterator[Dict[str, Any]]:
+        imported_at = datetime.utcnow()
+        try:
+            for raw_row in reader:
+                row = easypark_row(raw_row, filename, imported_at)
+                if row is None:
+                    stats["skipped"] = stats.get("skipped", 0) + 1
+                    continue
+                yield row
+        finally:
+            # Leave the upload file open for its owner.
+            text_stream.detach()
 
+    return rows()
 
-async def ingest_easypark_csv(session, content: bytes, filename: str) -> Dict[str, Any]:
-    parsed = parse_easypark_csv(content, filename)
-    rows = parsed["rows"]
-    if not rows:
-        return {"total": 0, "inserted": 0, "updated": 0, "unchanged": 0, "skipped": parsed["skipped"], "first_at": None, "last_at": None}
 
+def parse_easypark_csv(content: bytes, filename: str) -> Dict[str, Any]:
+    stats = {"skipped": 0}
+    rows = list(iter_easypark_csv(BytesIO(content), filename, stats))
+    return {"rows": rows, "skipped": stats["skipped"], "filename": filename}
+
+
+def easypark_changed_sql(current: str, incoming: str) -> str:
+    """When an existing parking row takes the incoming values: it is still open or a compared column differs."""
+    statuses = ", ".join(f"'{status}'" for status in EASYPARK_OPEN_STATUSES)
+    conditions = [
+        f"{current}.end_time IS NULL",
+        f"lower(coalesce({current}.status, '')) IN ({statuses})",
+        *(f"{current}.{column} IS DISTINCT FROM {incoming}.{column}" for column in EASYPARK_COMPARED_COLUMNS),
+    ]
+    return "(" + " OR ".join(conditions) + ")"
+
+
+def easypark_changed_ranges(days: Iterable[date]) -> list[Dict[str, str]]:
+    ranges: list[list[date]] = []
+    for day in sorted(set(days)):
+        if ranges and day - ranges[-1][1] <= timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [{"from": start.isoformat(), "to": end.isoformat()} for start, end in ranges]
+
+
+def easypark_import_counts(
+    total: int,
+    inserted: int,
+    updated: int,
+    first_at: Optional[datetime],
+    last_at: Optional[datetime],
+    changed_days: Iterable[date],
+    duplicates: int = 0,
+) -> Dict[str, Any]:
+    # ``duplicates`` are earlier lines for a parking id that appears again later in the file.
+    return {
+        "total": total,
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": total - inserted - updated - duplicates,
+        "duplicates": duplicates,
+        "skipped": 0,
+        "first_at": first_at,
+        "last_at": last_at,
+        "changed_ranges": easypark_changed_ranges(changed_days),
+    }
+
+
+async def merge_easypark_rows_via_copy(session, driver_connection, rows: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    stage = f"easypark_stage_{secrets.token_hex(4)}"
+    columns = list(EASYPARK_STAGE_COLUMNS)
+    definitions = ", ".join(f"{column} {column_type}" for column, column_type in EASYPARK_STAGE_COLUMNS.items())
+    await session.execute(sql_text(f"CREATE TEMP TABLE {stage} ({definitions}, line_no bigint NOT NULL) ON COMMIT DROP"))
+    staged = 0
+    while True:
+        batch = [
+            (*(row[column] for column in columns), staged + offset)
+            for offset, row in enumerate(islice(rows, EASYPARK_COPY_BATCH_ROWS))
+        ]
+        if not batch:
+            break
+        await driver_connection.copy_records_to_table(stage, records=batch, columns=[*columns, "line_no"])
+        staged += len(batch)
+    if not staged:
+        await session.execute(sql_text(f"DROP TABLE {stage}"))
+        return easypark_import_counts(0, 0, 0, None, None, [])
+
+    column_list = ", ".join(columns)
+    key_list = ", ".join(EASYPARK_KEY_COLUMNS)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column not in EASYPARK_KEY_COLUMNS)
+    # Every part of the statement sees parkering as it was before the upsert, so the
+    # classification describes exactly what ON CONFLICT ... WHERE is about to do.
+    # A parking id repeated in the file keeps its last line.
+    merge_sql = f"""
+        WITH incoming AS (
+            SELECT DISTINCT ON ({key_list}) {column_list}
+            FROM {stage}
+            ORDER BY {key_list}, line_no DESC
+        ),
+        classified AS (
+            SELECT
+                incoming.start_time,
+                parkering.start_time AS previous_start_time,
+                CASE
+                    WHEN parkering.id IS NULL THEN 'inserted'
+                    WHEN {easypark_changed_sql("parkering", "incoming")} THEN 'updated'
+                    ELSE 'unchanged'
+                END AS action
+            FROM incoming
+            LEFT JOIN parkering
+                ON parkering.source_system = incoming.source_system
+                AND parkering.parking_id = incoming.parking_id
+        ),
+        upserted AS (
+            INSERT INTO parkering ({column_list})
+            SELECT {column_list} FROM incoming
+            ON CONFLICT ({key_list}) DO UPDATE SET {updates}
+            WHERE {easypark_changed_sql("parkering", "EXCLUDED")}
+        )
+        SELECT action, start_time::date AS day, count(*) AS row_count, min(start_time) AS first_at, max(start_time) AS last_at
+        FROM classified
+        GROUP BY action, day
+        UNION ALL
+        SELECT 'moved', previous_start_time::date, 0, NULL, NULL
+        FROM classified
+        WHERE action = 'updated' AND previous_start_time::date <> start_time::date
+        GROUP BY 2
+    """
+    await session.execute(sql_text(f"ANALYZE {stage}"))
+    result = await session.execute(sql_text(merge_sql))
+    await session.execute(sql_text(f"DROP TABLE {stage}"))
+
+    action_counts: Dict[str, int] = defaultdict(int)
+    changed_days: set[date] = set()
+    first_at: Optional[datetime] = None
+    last_at: Optional[datetime] = None
+    merged = 0
+    for action, day, row_count, group_first, group_last in result.all():
+        merged += int(row_count)
+        action_counts[action] += int(row_count)
+        if action != "unchanged":
+            changed_days.add(day)
+        if group_first is not None and (first_at is None or group_first < first_at):
+            first_at = group_first
+        if group_last is not None and (last_at is None or group_last > last_at):
+            last_at = group_last
+    return easypark_import_counts(
+        staged,
+        action_counts["inserted"],
+        action_counts["updated"],
+        first_at,
+        last_at,
+        changed_days,
+        duplicates=staged - merged,
+    )
+
+
+async def merge_easypark_rows_chunked(session, rows: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    total = 0
     inserted_count = 0
     updated_count = 0
-    for start in range(0, len(rows), 1000):
-        chunk = rows[start:start + 1000]
+    duplicates = 0
+    changed_days: set[date] = set()
+    first_at: Optional[datetime] = None
+    last_at: Optional[datetime] = None
+    while True:
+        chunk = list(islice(rows, EASYPARK_UPSERT_CHUNK_ROWS))
+        if not chunk:
+            break
+        total += len(chunk)
+        chunk_first = min(row["start_time"] for row in chunk)
+        chunk_last = max(row["start_time"] for row in chunk)
+        first_at = chunk_first if first_at is None else min(first_at, chunk_first)
+        last_at = chunk_last if last_at is None else max(last_at, chunk_last)
+        # ON CONFLICT cannot touch the same row twice in one statement; the last line wins.
+        # A repeat in a later chunk is merged again and counted as updated or unchanged.
+        unique_rows = list({(row["source_system"], row["parking_id"]): row for row in chunk}.values())
+        duplicates += len(chunk) - len(unique_rows)
+        chunk = unique_rows
         keys = [(row["source_system"], row["parking_id"]) for row in chunk]
-        existing_keys = {
-            tuple(row)
-            for row in (
+        existing_starts = {
+            (source_system, parking_id): start_time
+            for source_system, parking_id, start_time in (
                 await session.execute(
-                    select(ParkingSession.source_system, ParkingSession.parking_id).where(
+                    select(ParkingSession.source_system, ParkingSession.parking_id, ParkingSession.start_time).where(
                         tuple_(ParkingSession.source_system, ParkingSession.parking_id).in_(keys)
                     )
                 )
@@ -37194,58 +38738,49 @@ async def ingest_easypark_csv(session, content: bytes, filename: str) -> Dict[st
         excluded = insert_stmt.excluded
         update_where = or_(
             ParkingSession.end_time.is_(None),
-            func.lower(func.coalesce(ParkingSession.status, "")).in_(["ongoing", "active", "started"]),
-            ParkingSession.parking_area.is_distinct_from(excluded.parking_area),
-            ParkingSession.area_number.is_distinct_from(excluded.area_number),
-            ParkingSession.start_time.is_distinct_from(excluded.start_time),
-            ParkingSession.end_time.is_distinct_from(excluded.end_time),
-            ParkingSession.parking_time_min.is_distinct_from(excluded.parking_time_min),
-            ParkingSession.fee_ex_vat.is_distinct_from(excluded.fee_ex_vat),
-            ParkingSession.fee_inc_vat.is_distinct_from(excluded.fee_inc_vat),
-            ParkingSession.fee_vat.is_distinct_from(excluded.fee_vat),
-            ParkingSession.car_license_number.is_distinct_from(excluded.car_license_number),
-            ParkingSession.user_interface.is_distinct_from(excluded.user_interface),
-            ParkingSession.subtype.is_distinct_from(excluded.subtype),
-            ParkingSession.status.is_distinct_from(excluded.status),
+            func.lower(func.coalesce(ParkingSession.status, "")).in_(EASYPARK_OPEN_STATUSES),
+            *(getattr(ParkingSession, column).is_distinct_from(getattr(excluded, column)) for column in EASYPARK_COMPARED_COLUMNS),
         )
         stmt = (
             insert_stmt
             .on_conflict_do_update(
-                index_elements=["source_system", "parking_id"],
-                set_={
-                    "parking_area": excluded.parking_area,
-                    "area_number": excluded.area_number,
-                    "start_time": excluded.start_time,
-                    "end_time": excluded.end_time,
-                    "parking_time_min": excluded.parking_time_min,
-                    "fee_ex_vat": excluded.fee_ex_vat,
-                    "fee_inc_vat": excluded.fee_inc_vat,
-                    "fee_vat": excluded.fee_vat,
-                    "car_license_number": excluded.car_license_number,
-                    "user_interface": excluded.user_interface,
-                    "subtype": excluded.subtype,
-                    "status": excluded.status,
-                    "imported_at": excluded.imported_at,
-                    "raw_filename": excluded.raw_filename,
-                },
+                index_elements=list(EASYPARK_KEY_COLUMNS),
+                set_={column: getattr(excluded, column) for column in EASYPARK_STAGE_COLUMNS if column not in EASYPARK_KEY_COLUMNS},
                 where=update_where,
             )
-            .returning(ParkingSession.source_system, ParkingSession.parking_id)
+            .returning(ParkingSession.source_system, ParkingSession.parking_id, ParkingSession.start_time)
         )
-        affected_keys = {tuple(row) for row in (await session.execute(stmt)).all()}
-        inserted_count += len(affected_keys - existing_keys)
-        updated_count += len(affected_keys & existing_keys)
-    first_at = min(row["start_time"] for row in rows)
-    last_at = max(row["start_time"] for row in rows)
-    return {
-        "total": len(rows),
-        "inserted": inserted_count,
-        "updated": updated_count,
-        "unchanged": len(rows) - inserted_count - updated_count,
-        "skipped": parsed["skipped"],
-        "first_at": first_at,
-        "last_at": last_at,
-    }
+        for source_system, parking_id, start_time in (await session.execute(stmt)).all():
+            changed_days.add(start_time.date())
+            previous_start = existing_starts.get((source_system, parking_id))
+            if previous_start is None:
+                inserted_count += 1
+            else:
+                updated_count += 1
+                changed_days.add(previous_start.date())
+    return easypark_import_counts(total, inserted_count, updated_count, first_at, last_at, changed_days, duplicates=duplicates)
+
+
+async def ingest_easypark_csv(session, source: Any, filename: str) -> Dict[str, Any]:
+    """Import an EasyPark export (bytes or a seekable binary file) into ``parkering``.
+
+    On asyncpg the rows are streamed with COPY into a temporary staging table
+    and merged with one set-based upsert; other drivers fall back to chunked
+    upserts. ``changed_ranges`` lists the start-date ranges with inserted or
+    updated rows, so callers only invalidate what the file actually changed.
+    """
+    stream = BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    stats = {"skipped": 0}
+    rows = iter_easypark_csv(stream, filename, stats)
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    if hasattr(driver_connection, "copy_records_to_table"):
+        counts = await merge_easypark_rows_via_copy(session, driver_connection, rows)
+    else:
+        counts = await merge_easypark_rows_chunked(session, rows)
+    counts["skipped"] = stats["skipped"]
+    return counts
 
 
 async def refresh_parking_vehicle_summary(session) -> int:
@@ -37306,6 +38841,39 @@ def svv_api_lookup_sync(plate: str) -> Dict[str, Any]:
     return json.loads(payload)
 
 
+def shared_svv_lookups_sync(plates: list[str]) -> Dict[str, Dict[str, Any]]:
+    """Resolve plates through the shared registry cache in car_info_lookup instead of asking SVV directly."""
+    body = json.dumps({"plates": [compact_plate(plate) for plate in plates], "registry": "svv"}).encode("utf-8")
+    request = urllib.request.Request(
+        f"{CAR_INFO_LOOKUP_URL}/api/resolve",
+        data=body,
+        method="POST",
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+    )
+    if CAR_INFO_APP_TOKEN:
+        request.add_header("x-car-info-token", CAR_INFO_APP_TOKEN)
+    # The service spaces SVV calls with its rate limit, so allow a couple of seconds per plate.
+    timeout = max(CAR_INFO_LOOKUP_TIMEOUT_SECONDS, 30 + 2 * len(plates))
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        payload = json.loads(response.read().decode("utf-8", errors="replace"))
+    return {str(row.get("plate")): row for row in payload.get("results") or [] if isinstance(row, dict)}
+
+
+def svv_raw_from_shared_lookup(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the SVV payload from a shared lookup, or raise like ``svv_api_lookup_sync`` would."""
+    status_code = int(result.get("http_status") or 0)
+    data = result.get("data") if isinstance(result.get("data"), dict) else {}
+    if status_code == 200 and data.get("raw"):
+        return data["raw"]
+    message = str(result.get("error") or "").strip()
+    if status_code in {200, 204}:
+        raise LookupError(message or "Ingen kjøretøydata fra SVV")
+    if status_code == 0:
+        raise RuntimeError(message or "Delt kjøretøyoppslag svarte uten status")
+    detail = message.removeprefix(f"HTTP {status_code}").lstrip(": ")
+    raise urllib.error.HTTPError(result.get("url") or SVV_API_URL, status_code, message, None, BytesIO(detail.encode("utf-8")))
+
+
 async def svv_candidate_plates(session, limit: int) -> list[str]:
     retry_before = datetime.utcnow() - timedelta(hours=SVV_RETRY_AFTER_HOURS)
     transient_retry_before = datetime.utcnow() - timedelta(minutes=SVV_TRANSIENT_RETRY_AFTER_MINUTES)
@@ -37441,10 +39009,20 @@ async def run_vehicle_svv_sync(limit: int = SVV_SYNC_BATCH_SIZE, source: str = "
                 )
                 await session.commit()
                 return {"ok": False, "processed": 0, "updated": 0, "no_data": 0, "failed": transient_waiting, "errors": [message]}
+        shared_lookups: Dict[str, Dict[str, Any]] = {}
+        if SVV_SHARED_LOOKUP_ENABLED and plates:
+            try:
+                shared_lookups = await asyncio.to_thread(shared_svv_lookups_sync, plates)
+            except Exception as exc:
+                logger.warning("Delt kjøretøyoppslag feilet, slår opp direkte hos SVV: %s", exc)
         for plate in plates:
             processed += 1
             try:
-                raw = await asyncio.to_thread(svv_api_lookup_sync, plate)
+                shared = shared_lookups.get(compact_plate(plate))
+                if shared is not None:
+                    raw = svv_raw_from_shared_lookup(shared)
+                else:
+                    raw = await asyncio.to_thread(svv_api_lookup_sync, plate)
                 if await upsert_vehicle_svv_data(session, plate, raw, 200, None):
                     updated += 1
             except LookupError as exc:
@@ -37532,12 +39110,16 @@ async def parking_easypark_import_csv(request: Request):
         if not upload or not hasattr(upload, "read"):
             raise ValueError("Velg en CSV-fil fra EasyPark.")
         filename = getattr(upload, "filename", None) or filename
-        content = await upload.read()
-        if not content:
+        # The form parser has already spooled the upload to a temporary file; read it from there.
+        stream = getattr(upload, "file", None) or BytesIO(await upload.read())
+        stream.seek(0, os.SEEK_END)
+        if not stream.tell():
             raise ValueError("Filen er tom.")
+        stream.seek(0)
         async with async_session() as session:
-            counts = await ingest_easypark_csv(session, content, filename)
-            vehicle_count = await refresh_parking_vehicle_summary(session)
+            counts = await ingest_easypark_csv(session, stream, filename)
+            # kjoretoy is derived from parkering alone; an import that changed nothing leaves it as is.
+            vehicle_count = await refresh_parking_vehicle_summary(session) if counts["changed_ranges"] else 0
             forecast_raw: Dict[str, Any] = {"saved": False}
             try:
                 forecast_raw = {"saved": True, **await save_parking_forecast_after_import(session)}
@@ -37545,7 +39127,7 @@ async def parking_easypark_import_csv(request: Request):
                 forecast_raw = {"saved": False, "error": str(forecast_exc)}
             message = (
                 f"{counts['inserted']} nye, {counts['updated']} oppdatert, {counts['unchanged']} uendret, "
-                f"{counts['skipped']} hoppet over fra {filename}"
+                f"{counts['duplicates']} duplikater, {counts['skipped']} hoppet over fra {filename}"
             )
             if forecast_raw.get("saved"):
                 message += ", prognose lagret"
@@ -37566,7 +39148,8 @@ async def parking_easypark_import_csv(request: Request):
                 },
             )
             await session.commit()
-        clear_summary_cache("parking")
+        if counts["changed_ranges"]:
+            clear_summary_cache("parking", "parking_forecast")
         if SVV_IMPORT_SYNC_BATCH_SIZE and SVV_API_KEY and SVV_SYNC_ENABLED:
             asyncio.create_task(run_vehicle_svv_sync(SVV_IMPORT_SYNC_BATCH_SIZE, "EasyPark import"))
         return {"status": "ok", **counts, "vehicles_refreshed": vehicle_count, "forecast": forecast_raw}
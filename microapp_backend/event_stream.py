@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, Optional
+
+import httpx
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+
+async def fibaro_event_stream(
+    base_url: str,
+    session_token_value: str,
+    topics: str,
+    last_event_id: Optional[str],
+    *,
+    user_agent: str,
+) -> StreamingResponse:
+    """Relay the core's /api/events/stream for the given topics to the browser."""
+    headers = {
+        "Accept": "text/event-stream",
+        "X-Session-Token": session_token_value,
+        "User-Agent": user_agent,
+    }
+    if last_event_id:
+        headers["Last-Event-ID"] = last_event_id
+    client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None))
+    try:
+        upstream = await client.send(
+            client.build_request("GET", f"{base_url.rstrip('/')}/api/events/stream", params={"topics": topics}, headers=headers),
+            stream=True,
+        )
+    except httpx.HTTPError as exc:
+        await client.aclose()
+        raise HTTPException(status_code=502, detail=f"Fibaro10 er ikke tilgjengelig: {exc}") from exc
+    if upstream.status_code != 200:
+        detail = (await upstream.aread()).decode("utf-8", errors="replace")
+        await upstream.aclose()
+        await client.aclose()
+        raise HTTPException(status_code=upstream.status_code, detail=detail or "Live-strømmen er ikke tilgjengelig")
+
+    async def relay() -> AsyncIterator[bytes]:
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+            await client.aclose()
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,328 @@
+"""Always-on sampling profiler for the event loop thread.
+
+A daemon thread reads the loop thread's Python stack every ``interval_ms``
+through ``sys._current_frames()`` and counts folded stacks per minute and
+route, so a slow period can be inspected afterwards as flame-graph data. A
+heartbeat task on the loop measures scheduling lag; when the heartbeat stops
+the sampler records the stack holding the loop, which is how a synchronous
+``urllib`` call or a heavy loop inside a handler shows up by name.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from dataclasses import dataclass, field
+import logging
+import os
+import sys
+import sysconfig
+import threading
+from time import monotonic, time
+from types import CodeType, FrameType
+from typing import Any, Iterable, Mapping, Optional
+
+
+MAX_STACK_DEPTH = 96
+IDLE_ROUTE = "(idle)"
+LOOP_ROUTE = "(loop)"
+
+# Innermost frames that mean the loop is waiting for work rather than running it.
+_IDLE_FRAMES = {
+    ("selectors", "select"),
+    ("base_events", "_run_once"),
+    ("base_events", "run_forever"),
+    ("base_events", "run_until_complete"),
+    ("runners", "run"),
+}
+_LIBRARY_PREFIXES = tuple(
+    sorted(
+        {
+            os.path.normcase(path)
+            for name in ("stdlib", "platstdlib", "purelib", "platlib")
+            if (path := sysconfig.get_paths().get(name))
+        }
+    )
+)
+
+
+def route_codes(routes: Iterable[Any]) -> dict[CodeType, str]:
+    """Code object of each route endpoint mapped to its path, for attributing samples to routes."""
+    codes: dict[CodeType, str] = {}
+    for route in routes:
+        code = getattr(getattr(route, "endpoint", None), "__code__", None)
+        path = getattr(route, "path", None)
+        if code is not None and path:
+            codes.setdefault(code, path)
+    return codes
+
+
+def _frame_label(code: CodeType) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _is_library(code: CodeType) -> bool:
+    filename = os.path.normcase(code.co_filename)
+    return filename.startswith("<") or filename.startswith(_LIBRARY_PREFIXES)
+
+
+@dataclass
+class _MinuteBucket:
+    samples: int = 0
+    idle: int = 0
+    stacks: Counter = field(default_factory=Counter)
+    lag_count: int = 0
+    lag_total_ms: float = 0.0
+    lag_max_ms: float = 0.0
+
+
+@dataclass
+class BlockingEvent:
+    started_at: float
+    duration_ms: float
+    route: str
+    stack: tuple[str, ...]
+    call: str
+    origin: Optional[str]
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "startedAt": self.started_at,
+            "durationMs": round(self.duration_ms, 1),
+            "route": self.route,
+            "call": self.call,
+            "origin": self.origin,
+            "stack": list(self.stack),
+        }
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        interval_ms: float = 50.0,
+        window_minutes: int = 60,
+        blocking_ms: float = 250.0,
+        logger: Optional[logging.Logger] = None,
+        blocking_limit: int = 50,
+    ) -> None:
+        self.interval = max(0.005, float(interval_ms) / 1000)
+        self.window_minutes = max(1, int(window_minutes))
+        self.blocking_seconds = max(self.interval, float(blocking_ms) / 1000)
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._buckets: dict[int, _MinuteBucket] = {}
+        self._blocking: deque[BlockingEvent] = deque(maxlen=max(1, blocking_limit))
+        self._current_block: Optional[BlockingEvent] = None
+        self._labels: dict[CodeType, str] = {}
+        self.routes: Mapping[CodeType, str] = {}
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._heartbeat_task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, routes: Mapping[CodeType, str]) -> None:
+        """Start sampling the thread running the current event loop."""
+        if self.running:
+            return
+        self.routes = dict(routes)
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = monotonic()
+        self._stop.clear()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat(), name="sampling-profiler-heartbeat")
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, self.interval * 4)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = monotonic() + self.interval
+            self._last_tick = monotonic()
+            await asyncio.sleep(self.interval)
+            self.record_lag(max(0.0, monotonic() - expected) * 1000)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            try:
+                self.sample(frame, stalled_seconds=monotonic() - self._last_tick - self.interval)
+            except Exception:
+                self.logger.exception("Sampling profiler failed to record a sample")
+            finally:
+                del frame
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _bucket(self, now: float) -> _MinuteBucket:
+        minute = int(now // 60)
+        bucket = self._buckets.get(minute)
+        if bucket is None:
+            bucket = self._buckets[minute] = _MinuteBucket()
+            oldest = minute - self.window_minutes
+            for key in [key for key in self._buckets if key <= oldest]:
+                del self._buckets[key]
+        return bucket
+
+    def sample(self, frame: FrameType, stalled_seconds: float = 0.0, now: Optional[float] = None) -> None:
+        """Record one stack of the loop thread; ``frame`` is its innermost frame."""
+        now = time() if now is None else now
+        codes: list[CodeType] = []
+        route: Optional[str] = None
+        current: Optional[FrameType] = frame
+        while current is not None:
+            code = current.f_code
+            if route is None:
+                route = self.routes.get(code)
+            codes.append(code)
+            current = current.f_back
+        innermost = codes[0]
+        module = os.path.splitext(os.path.basename(innermost.co_filename))[0]
+        idle = (module, innermost.co_name) in _IDLE_FRAMES
+        labels = tuple(self._label(code) for code in reversed(codes[:MAX_STACK_DEPTH]))
+        route = route or (IDLE_ROUTE if idle else LOOP_ROUTE)
+        with self._lock:
+            bucket = self._bucket(now)
+            bucket.samples += 1
+            if idle:
+                bucket.idle += 1
+            else:
+                bucket.stacks[(route, ";".join(labels))] += 1
+            self._track_blocking(stalled_seconds, now, route, labels, codes)
+
+    def _track_blocking(
+        self,
+        stalled_seconds: float,
+        now: float,
+        route: str,
+        labels: tuple[str, ...],
+        codes: list[CodeType],
+    ) -> None:
+        block = self._current_block
+        if stalled_seconds >= self.blocking_seconds:
+            if block is None:
+                origin = next((self._label(code) for code in codes if not _is_library(code)), None)
+                self._current_block = BlockingEvent(
+                    started_at=round(now - stalled_seconds, 3),
+                    duration_ms=stalled_seconds * 1000,
+                    route=route,
+                    stack=labels,
+                    call=labels[-1] if labels else "",
+                    origin=origin,
+                )
+            else:
+                block.duration_ms = stalled_seconds * 1000
+            return
+        if block is not None:
+            self._current_block = None
+            self._blocking.append(block)
+            self.logger.warning(
+                "Event loop blocked for %.0f ms in %s (%s) on %s",
+                block.duration_ms,
+                block.origin or block.call,
+                block.call,
+                block.route,
+            )
+
+    def record_lag(self, lag_ms: float, now: Optional[float] = None) -> None:
+        with self._lock:
+            bucket = self._bucket(time() if now is None else now)
+            bucket.lag_count += 1
+            bucket.lag_total_ms += lag_ms
+            bucket.lag_max_ms = max(bucket.lag_max_ms, lag_ms)
+
+    def _window(self, minutes: int, now: Optional[float]) -> list[_MinuteBucket]:
+        first = int((time() if now is None else now) // 60) - max(1, int(minutes)) + 1
+        return [bucket for minute, bucket in self._buckets.items() if minute >= first]
+
+    def stacks(self, minutes: int = 5, route: Optional[str] = None, now: Optional[float] = None) -> Counter:
+        totals: Counter = Counter()
+        with self._lock:
+            for bucket in self._window(minutes, now):
+                for (stack_route, stack), count in bucket.stacks.items():
+                    if route is None or stack_route == route:
+                        totals[stack] += count
+        return totals
+
+    def folded(self, minutes: int = 5, route: Optional[str] = None, now: Optional[float] = None) -> str:
+        """Brendan Gregg's collapsed format, readable by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks(minutes, route, now).most_common())
+
+    def payload(
+        self,
+        minutes: int = 5,
+        route: Optional[str] = None,
+        limit: int = 200,
+        now: Optional[float] = None,
+    ) -> dict[str, Any]:
+        minutes = max(1, min(int(minutes), self.window_minutes))
+        now = time() if now is None else now
+        routes: Counter = Counter()
+        with self._lock:
+            buckets = self._window(minutes, now)
+            samples = sum(bucket.samples for bucket in buckets)
+            idle = sum(bucket.idle for bucket in buckets)
+            lag_count = sum(bucket.lag_count for bucket in buckets)
+            lag_total = sum(bucket.lag_total_ms for bucket in buckets)
+            lag_max = max((bucket.lag_max_ms for bucket in buckets), default=0.0)
+            for bucket in buckets:
+                for (stack_route, _stack), count in bucket.stacks.items():
+                    routes[stack_route] += count
+            blocking = [event.payload() for event in self._blocking if event.started_at >= now - minutes * 60]
+        busy = samples - idle
+        stacks = self.stacks(minutes, route, now)
+        return {
+            "enabled": True,
+            "running": self.running,
+            "intervalMs": round(self.interval * 1000, 1),
+            "windowMinutes": self.window_minutes,
+            "minutes": minutes,
+            "route": route,
+            "samples": samples,
+            "idleSamples": idle,
+            "busyRatio": round(busy / samples, 3) if samples else None,
+            "loopLag": {
+                "avgMs": round(lag_total / lag_count, 1) if lag_count else None,
+                "maxMs": round(lag_max, 1),
+            },
+            "routes": [
+                {"route": name, "samples": count, "share": round(count / busy, 3) if busy else None}
+                for name, count in routes.most_common()
+            ],
+            "stacks": [{"stack": stack, "samples": count} for stack, count in stacks.most_common(max(1, limit))],
+            "blocking": blocking,
+        }
+
+
+def profiler_from_env(logger: Optional[logging.Logger] = None, env: Mapping[str, str] = os.environ) -> Optional[SamplingProfiler]:
+    """``PROFILER_ENABLED`` turns profiling on; ``PROFILER_*`` tune rate, window and blocking threshold."""
+    if str(env.get("PROFILER_ENABLED", "false")).strip().lower() not in {"1", "true", "yes", "ja"}:
+        return None
+    try:
+        return SamplingProfiler(
+            interval_ms=float(env.get("PROFILER_INTERVAL_MS", "50")),
+            window_minutes=int(env.get("PROFILER_WINDOW_MINUTES", "60")),
+            blocking_ms=float(env.get("PROFILER_BLOCKING_MS", "250")),
+            logger=logger,
+        )
+    except ValueError:
+        return SamplingProfiler(logger=logger)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Awaitable, Callable, Hashable, Mapping, Optional
+
+
+FORWARDED_HEADERS = ("content-type", "cache-control", "etag", "last-modified", "content-disposition")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    store: bool
+    ttl_seconds: float
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    content: bytes
+    headers: dict[str, str]
+    fresh_until: float = 0.0
+    shared: bool = False
+
+    @classmethod
+    def from_response(cls, response: Any) -> "CachedResponse":
+        headers = {name: value for name in FORWARDED_HEADERS if (value := response.headers.get(name))}
+        return cls(status_code=response.status_code, content=response.content, headers=headers)
+
+    def validators(self) -> dict[str, str]:
+        conditional: dict[str, str] = {}
+        if etag := self.headers.get("etag"):
+            conditional["If-None-Match"] = etag
+        if last_modified := self.headers.get("last-modified"):
+            conditional["If-Modified-Since"] = last_modified
+        return conditional
+
+
+@dataclass
+class CacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    coalesced: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    def payload(self, entries: int) -> dict[str, Any]:
+        served = self.hits + self.revalidated + self.coalesced
+        total = served + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "coalesced": self.coalesced,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hitRate": round(served / total, 4) if total else 0.0,
+        }
+
+
+def cache_policy(headers: Mapping[str, str], default_ttl_seconds: float = 0.0) -> CachePolicy:
+    directives: dict[str, Optional[str]] = {}
+    for part in str(headers.get("cache-control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.casefold()] = value.strip().strip('"') or None
+    # Per-user responses are never kept, not even for the session that asked.
+    if "no-store" in directives or "private" in directives:
+        return CachePolicy(store=False, ttl_seconds=0.0)
+    ttl = default_ttl_seconds
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                ttl = max(0.0, float(directives[name] or 0))
+            except ValueError:
+                continue
+            break
+    if "no-cache" in directives:
+        ttl = 0.0
+    has_validator = bool(headers.get("etag") or headers.get("last-modified"))
+    return CachePolicy(store=ttl > 0 or has_validator, ttl_seconds=ttl)
+
+
+class ProxyResponseCache:
+    """LRU cache for proxied core GETs with in-flight coalescing.
+
+    Responses marked private or no-store are passed through uncached. Other
+    entries are stored under the caller's role when it is known, and under the
+    caller's session otherwise. Stale entries with an ETag or Last-Modified are
+    revalidated with a conditional request.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        default_ttl_seconds: float = 0.0,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.default_ttl_seconds = max(0.0, float(default_ttl_seconds))
+        self.metrics = CacheMetrics()
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task[CachedResponse]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def payload(self) -> dict[str, Any]:
+        return self.metrics.payload(len(self._entries))
+
+    async def get(
+        self,
+        role_key: Optional[Hashable],
+        session_key: Hashable,
+        fetch: Callable[[dict[str, str]], Awaitable[Any]],
+    ) -> CachedResponse:
+        now = monotonic()
+        entry_key = role_key if role_key is not None else session_key
+        entry = self._entries.get(entry_key)
+        if entry is not None and entry.fresh_until > now:
+            self._entries.move_to_end(entry_key)
+            self.metrics.hits += 1
+            return entry
+        # Only coalesce across users once the core has let this resource be cached;
+        # a first response might still turn out to be private.
+        flight_key = entry_key if entry is not None and entry.shared else session_key
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            self.metrics.coalesced += 1
+            return await asyncio.shield(task)
+        task = asyncio.create_task(self._load(role_key, session_key, entry, fetch))
+        self._inflight[flight_key] = task
+        task.add_done_callback(lambda _done, key=flight_key: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        role_key: Optional[Hashable],
+        session_key: Hashable,
+        entry: Optional[CachedResponse],
+        fetch: Callable[[dict[str, str]], Awaitable[Any]],
+    ) -> CachedResponse:
+        response = await fetch(entry.validators() if entry is not None else {})
+        if response.status_code == 304 and entry is not None:
+            self.metrics.revalidated += 1
+            result = entry
+            result.headers.update(
+                {name: value for name in FORWARDED_HEADERS[1:] if (value := response.headers.get(name))}
+            )
+        else:
+            self.metrics.misses += 1
+            result = CachedResponse.from_response(response)
+        policy = cache_policy(result.headers, self.default_ttl_seconds)
+        if result.status_code != 200 or not policy.store:
+            return result
+        result.fresh_until = monotonic() + policy.ttl_seconds
+        result.shared = role_key is not None
+        self._store(role_key if role_key is not None else session_key, result)
+        return result
+
+    def _store(self, key: Hashable, entry: CachedResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self.metrics.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics.evictions += 1
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
 import secrets
 from contextlib import asynccontextmanager
@@ -7,13 +9,14 @@ from dataclasses import dataclass, field
 from functools import lru_cache
 from http.cookiejar import CookieJar, DefaultCookiePolicy
 from pathlib import Path
+from time import monotonic
 from typing import Any, AsyncIterator, Awaitable, Callable, Pattern
 from urllib.parse import urlsplit
 
 import httpx
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, Response
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from .auth import (
@@ -24,6 +27,8 @@ from .auth import (
     request_public_host,
 )
 from .login import render_login_page
+from .profiler import profiler_from_env, route_codes
+from .proxy_cache import CachedResponse, ProxyResponseCache
 from .pwa import PWA_ICON_PATH, PwaConfig, inject_pwa_head, register_pwa
 
 
@@ -69,7 +74,12 @@ def create_domain_app(config: DomainAppConfig) -> FastAPI:
     build = config.build()
     commit = os.getenv(config.commit_env, os.getenv("APP_COMMIT", "unknown"))
     started_at = os.getenv(f"{config.service.upper()}_STARTED_AT", "runtime")
+    cache_enabled = os.getenv("MICROAPP_PROXY_CACHE_ENABLED", "true").strip().lower() in {"1", "true", "yes", "ja"}
+    cache_max_entries = int(os.getenv("MICROAPP_PROXY_CACHE_MAX_ENTRIES", "512"))
+    cache_default_ttl = float(os.getenv("MICROAPP_PROXY_CACHE_DEFAULT_TTL_SECONDS", "0"))
+    role_ttl = max(1.0, float(os.getenv("MICROAPP_PROXY_ROLE_TTL_SECONDS", "60")))
     static_dir = config.app_dir / "app" / "static" / "dist"
+    profiler = profiler_from_env(logging.getLogger(config.service))
     pwa = PwaConfig(
         name=config.name,
         short_name=config.short_name,
@@ -88,7 +98,13 @@ def create_domain_app(config: DomainAppConfig) -> FastAPI:
             limits=httpx.Limits(max_connections=30, max_keepalive_connections=10),
             cookies=CookieJar(policy=_RejectAllCookiesPolicy()),
         )
+        application.state.core_cache = ProxyResponseCache(cache_max_entries, cache_default_ttl)
+        application.state.session_roles = {}
+        if profiler is not None:
+            profiler.start(route_codes(application.routes))
         yield
+        if profiler is not None:
+            await profiler.stop()
         await application.state.core_client.aclose()
 
     app = FastAPI(title=config.name, docs_url=None, redoc_url=None, lifespan=lifespan)
@@ -113,12 +129,67 @@ def create_domain_app(config: DomainAppConfig) -> FastAPI:
         except httpx.RequestError as exc:
             raise HTTPException(status_code=502, detail=f"Fibaro10 er ikke tilgjengelig: {exc}") from exc
 
-    def proxy_response(response: httpx.Response) -> Response:
+    def session_role(request: Request, session_hash: str) -> str | None:
+        """Remembered role for the session, "" when the core named none, or None when unknown."""
+        roles: dict[str, tuple[str, float]] = request.app.state.session_roles
+        cached = roles.get(session_hash)
+        if cached is None or cached[1] <= monotonic():
+            roles.pop(session_hash, None)
+            return None
+        return cached[0]
+
+    def remember_session_role(request: Request, session_hash: str, role: str) -> None:
+        roles: dict[str, tuple[str, float]] = request.app.state.session_roles
+        now = monotonic()
+        if len(roles) >= 1024:
+            for key in [key for key, (_, expires) in roles.items() if expires <= now]:
+                roles.pop(key, None)
+        roles[session_hash] = (role, now + role_ttl)
+
+    async def cached_core_get(request: Request, path: str) -> CachedResponse:
+        # Sessions with the same role share entries. The role comes from /api/auth/me and is
+        # remembered for a short while, as is a session without one; such sessions only read
+        # their own entries. Without a cookie there is no credential to ask about.
+        cookie = request.headers.get("cookie", "")
+        session_hash = hashlib.sha256(cookie.encode("utf-8")).hexdigest()
+        client: httpx.AsyncClient = request.app.state.core_client
+        headers = forwarded_headers(request)
+        role = session_role(request, session_hash) if cookie else ""
+        if role is None:
+            try:
+                me = await client.request("GET", "/api/auth/me", headers=headers)
+            except httpx.RequestError as exc:
+                raise HTTPException(status_code=502, detail=f"Fibaro10 er ikke tilgjengelig: {exc}") from exc
+            if me.status_code < 500:
+                role = str(me.json().get("role") or "") if me.status_code == 200 else ""
+                remember_session_role(request, session_hash, role)
+        query = tuple(sorted(request.query_params.multi_items()))
+
+        async def fetch(conditional: dict[str, str]) -> httpx.Response:
+            try:
+                response = await client.request(
+                    "GET",
+                    f"/{path}",
+                    params=request.query_params,
+                    headers={**headers, **conditional},
+                )
+            except httpx.RequestError as exc:
+                raise HTTPException(status_code=502, detail=f"Fibaro10 er ikke tilgjengelig: {exc}") from exc
+            return response
+
+        cache: ProxyResponseCache = request.app.state.core_cache
+        role_key = ("role", role, path, query) if role else None
+        return await cache.get(role_key, ("session", session_hash, path, query), fetch)
+
+    def proxy_response(response: httpx.Response | CachedResponse, request: Request | None = None) -> Response:
         headers = {
             name: value
             for name in ("cache-control", "etag", "last-modified", "content-disposition")
             if (value := response.headers.get(name))
         }
+        etag = headers.get("etag")
+        if request is not None and etag and response.status_code == 200 and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
         return Response(
             content=response.content,
             status_code=response.status_code,
@@ -204,6 +275,28 @@ def create_domain_app(config: DomainAppConfig) -> FastAPI:
     async def app_config() -> dict[str, str]:
         return {"name": config.name, "build": build, "commit": commit, "fibaro10AppUrl": core_app_url, "shellAppUrl": shell_app_url}
 
+    @app.get("/api/app/cache")
+    async def app_cache(request: Request) -> dict[str, object]:
+        cache: ProxyResponseCache = request.app.state.core_cache
+        return {"enabled": cache_enabled, **cache.payload()}
+
+    @app.get("/api/app/profile")
+    async def app_profile(request: Request, minutes: int = 5, route: str | None = None, format: str = "json") -> Response:
+        # The core decides who may read stacks; this app only forwards the session.
+        client: httpx.AsyncClient = request.app.state.core_client
+        try:
+            me = await client.get("/api/auth/me", headers=forwarded_headers(request))
+        except httpx.RequestError as exc:
+            raise HTTPException(status_code=502, detail=f"Fibaro10 er ikke tilgjengelig: {exc}") from exc
+        if me.status_code != 200 or not me.json().get("isMaster"):
+            raise HTTPException(status_code=403, detail="Masterbruker kreves")
+        if profiler is None:
+            return JSONResponse({"enabled": False, "service": config.service})
+        minutes = max(1, min(minutes, 1440))
+        if format == "folded":
+            return PlainTextResponse(profiler.folded(minutes, route))
+        return JSONResponse({**profiler.payload(minutes, route), "service": config.service})
+
     @app.api_route("/api/{core_path:path}", methods=list(PROXY_METHODS))
     async def proxy_core_api(core_path: str, request: Request) -> Response:
         clean_path = core_path.strip("/")
@@ -219,7 +312,13 @@ def create_domain_app(config: DomainAppConfig) -> FastAPI:
             return JSONResponse(payload)
         if not path_allowed(request.method, normalized):
             raise HTTPException(status_code=404, detail=f"Endepunktet er ikke tilgjengelig i {config.short_name}")
-        return proxy_response(await core_request(request, f"api/{clean_path}"))
+        if request.method == "GET" and cache_enabled:
+            return proxy_response(await cached_core_get(request, f"api/{clean_path}"), request)
+        response = await core_request(request, f"api/{clean_path}")
+        if request.method != "GET" and response.status_code < 400:
+            # Writes may change any cached read of this app.
+            request.app.state.core_cache.clear()
+        return proxy_response(response)
 
     @app.get("/auth/login", response_class=HTMLResponse)
     async def login_view(request: Request) -> Response:
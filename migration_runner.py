@@ -1,10 +1,18 @@
 from dataclasses import dataclass
+import hashlib
 from pathlib import Path
 import re
-from typing import Iterable, List, Optional
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
 
 
 DEFAULT_MIGRATIONS_DIR = Path(__file__).parent / "migrations" / "versions"
+SCHEMA_STATE_DDL = """
+CREATE TABLE IF NOT EXISTS schema_state (
+    component TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
 
 
 @dataclass(frozen=True)
@@ -202,6 +210,65 @@ async def apply_migrations(database_url: str, versions_dir: Path = DEFAULT_MIGRA
     return applied_now
 
 
+def metadata_schema_parts(metadata: Any) -> List[tuple]:
+    """Tables, columns, indexes and constraints of SQLAlchemy ``metadata`` as comparable tuples."""
+    parts = []
+    for table in metadata.sorted_tables:
+        columns = tuple((column.name, str(column.type), column.nullable, column.primary_key) for column in table.columns)
+        indexes = tuple(sorted((index.name or "", index.unique, tuple(column.name for column in index.columns)) for index in table.indexes))
+        constraints = tuple(sorted((type(item).__name__, str(item.name or ""), tuple(column.name for column in item.columns)) for item in table.constraints))
+        parts.append((table.name, columns, indexes, constraints))
+    return parts
+
+
+def schema_fingerprint(parts: Iterable[Any]) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def ensure_schema(
+    conn: Any,
+    component: str,
+    fingerprint: str,
+    apply: Callable[[Any], Awaitable[None]],
+    force: bool = False,
+) -> bool:
+    """Run ``apply(conn)`` unless ``component`` is already recorded at ``fingerprint``.
+
+    Returns True when the schema work ran; an unchanged schema costs two
+    statements instead of the full DDL pass.
+    """
+    from sqlalchemy import text
+
+    await conn.execute(text(SCHEMA_STATE_DDL))
+    if not force:
+        stored = (
+            await conn.execute(
+                text("SELECT fingerprint FROM schema_state WHERE component = :component"),
+                {"component": component},
+            )
+        ).scalar()
+        if stored == fingerprint:
+            return False
+    await apply(conn)
+    await conn.execute(
+        text(
+            """
+            INSERT INTO schema_state (component, fingerprint, updated_at)
+            VALUES (:component, :fingerprint, CURRENT_TIMESTAMP)
+            ON CONFLICT (component) DO UPDATE SET
+                fingerprint = EXCLUDED.fingerprint,
+                updated_at = EXCLUDED.updated_at
+            """
+        ),
+        {"component": component, "fingerprint": fingerprint},
+    )
+    return True
+
+
 def format_migration_list(migrations: Iterable[MigrationFile]) -> str:
     rows = list(migrations)
     if not rows:
@@ -0,0 +1,331 @@
+-- Monthly range partitioning for high-volume sample and event tables.
+--
+-- The conversion is online. This migration only builds an empty partitioned
+-- copy (<table>_partitioned) with one partition per month of existing history,
+-- and a trigger that mirrors every write on the live table into the copy.
+-- The time-partitions background task then copies history in id batches
+-- (fibaro10_fill_partitioned_copy) and swaps the tables under a short
+-- lock_timeout-guarded lock (fibaro10_swap_partitioned_copy). The old heap is
+-- kept as <table>_retired until it is dropped by hand after checking counts.
+-- Progress is tracked in time_partition_backfills.
+
+CREATE TABLE IF NOT EXISTS time_partition_backfills (
+    table_name TEXT PRIMARY KEY,
+    time_column TEXT NOT NULL,
+    id_column TEXT NOT NULL,
+    copied_id BIGINT NOT NULL,
+    max_id BIGINT NOT NULL,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    swapped_at TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION fibaro10_ensure_month_partition(
+    parent_table TEXT,
+    time_column TEXT,
+    month_start DATE,
+    partition_prefix TEXT DEFAULT NULL
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    first_day DATE := date_trunc('month', month_start)::date;
+    next_day DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    partition_table TEXT := COALESCE(partition_prefix, parent_table) || '_p' || to_char(month_start, 'YYYYMM');
+    default_table TEXT;
+    has_stray BOOLEAN := FALSE;
+BEGIN
+    IF to_regclass(partition_table) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    SELECT p.partdefid::regclass::text INTO default_table
+    FROM pg_partitioned_table p
+    WHERE p.partrelid = to_regclass(parent_table) AND p.partdefid <> 0;
+    IF default_table IS NOT NULL THEN
+        EXECUTE format('SELECT EXISTS (SELECT 1 FROM %s WHERE %I >= $1 AND %I < $2)', default_table, time_column, time_column)
+            INTO has_stray
+            USING first_day, next_day;
+    END IF;
+    IF has_stray THEN
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_table, parent_table);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %s WHERE %I >= $1 AND %I < $2 RETURNING *) INSERT INTO %I SELECT * FROM moved',
+            default_table, time_column, time_column, partition_table
+        ) USING first_day, next_day;
+        EXECUTE format(
+            'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            parent_table, partition_table, first_day, next_day
+        );
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            partition_table, parent_table, first_day, next_day
+        );
+    END IF;
+    RETURN TRUE;
+END
+$$;
+
+-- Column list of the live table, with the partition key parked at the epoch
+-- when it is NULL (the key is NOT NULL in the copy). ``source_alias`` is the
+-- row variable or table alias the values are read from.
+CREATE OR REPLACE FUNCTION fibaro10_partition_copy_columns(parent_table TEXT, time_column TEXT, source_alias TEXT)
+RETURNS TEXT[]
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT ARRAY[
+        string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum),
+        string_agg(
+            CASE
+                WHEN a.attname = time_column
+                    THEN format('COALESCE(%s.%I, TIMESTAMP ''1970-01-01'')', source_alias, a.attname)
+                ELSE format('%s.%I', source_alias, a.attname)
+            END,
+            ', ' ORDER BY a.attnum
+        )
+    ]
+    FROM pg_attribute a
+    WHERE a.attrelid = to_regclass(parent_table) AND a.attnum > 0 AND NOT a.attisdropped AND a.attgenerated = ''
+$$;
+
+CREATE OR REPLACE FUNCTION fibaro10_prepare_partitioned_copy(parent_table TEXT, time_column TEXT, months_ahead INTEGER DEFAULT 3)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    copy_table TEXT := parent_table || '_partitioned';
+    mirror_name TEXT := parent_table || '_partition_mirror';
+    item RECORD;
+    statements TEXT[] := ARRAY[]::TEXT[];
+    statement TEXT;
+    key_columns TEXT[];
+    primary_key_columns TEXT;
+    primary_key_name TEXT;
+    key_match TEXT;
+    columns TEXT[];
+    first_month DATE;
+    last_month DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => GREATEST(0, months_ahead)))::date;
+    id_range RECORD;
+BEGIN
+    IF to_regclass(parent_table) IS NULL OR to_regclass(copy_table) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(parent_table)) THEN
+        RETURN FALSE;
+    END IF;
+
+    FOR item IN
+        SELECT
+            c.conname,
+            c.contype,
+            pg_get_constraintdef(c.oid) AS definition,
+            ARRAY(
+                SELECT a.attname::text
+                FROM unnest(c.conkey) WITH ORDINALITY AS k(attnum, ordinality)
+                JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                ORDER BY k.ordinality
+            ) AS columns
+        FROM pg_constraint c
+        WHERE c.conrelid = to_regclass(parent_table) AND c.contype IN ('p', 'u')
+    LOOP
+        IF item.contype = 'p' THEN
+            key_columns := item.columns;
+            primary_key_name := left(item.conname, 58) || '_next';
+            SELECT string_agg(quote_ident(name), ', ') INTO primary_key_columns
+            FROM unnest(item.columns || CASE WHEN time_column = ANY(item.columns) THEN ARRAY[]::TEXT[] ELSE ARRAY[time_column] END) AS name;
+        ELSIF time_column = ANY(item.columns) THEN
+            statements := statements || format('ALTER TABLE %I ADD CONSTRAINT %I %s', copy_table, left(item.conname, 58) || '_next', item.definition);
+        ELSE
+            RAISE EXCEPTION 'Unique constraint % on % does not include partition column %', item.conname, parent_table, time_column;
+        END IF;
+    END LOOP;
+    key_columns := array_remove(key_columns, time_column);
+    IF key_columns IS NULL OR cardinality(key_columns) <> 1 THEN
+        RAISE EXCEPTION 'Table % needs a single-column primary key to be copied in batches', parent_table;
+    END IF;
+
+    FOR item IN
+        SELECT c.relname AS name, pg_get_indexdef(i.indexrelid) AS definition
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(parent_table)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+    LOOP
+        statements := statements || regexp_replace(
+            item.definition,
+            '^CREATE (UNIQUE )?INDEX \S+ ON \S+ ',
+            format('CREATE \1INDEX %I ON %I ', left(item.name, 58) || '_next', copy_table)
+        );
+    END LOOP;
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING GENERATED) PARTITION BY RANGE (%I)',
+        copy_table, parent_table, time_column
+    );
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET NOT NULL', copy_table, time_column);
+    EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I PRIMARY KEY (%s)', copy_table, primary_key_name, primary_key_columns);
+
+    -- One partition per month of history; the partition key is indexed on every table.
+    EXECUTE format('SELECT date_trunc(''month'', min(%I))::date FROM %I WHERE %I > TIMESTAMP ''1970-01-01''', time_column, parent_table, time_column)
+        INTO first_month;
+    first_month := LEAST(COALESCE(first_month, last_month), last_month);
+    WHILE first_month <= last_month LOOP
+        PERFORM fibaro10_ensure_month_partition(copy_table, time_column, first_month, parent_table);
+        first_month := (first_month + INTERVAL '1 month')::date;
+    END LOOP;
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent_table || '_default', copy_table);
+
+    FOREACH statement IN ARRAY statements LOOP
+        EXECUTE statement;
+    END LOOP;
+    EXECUTE format('CREATE INDEX %I ON %I USING BRIN (%I)', 'ix_' || parent_table || '_' || time_column || '_brin', copy_table, time_column);
+
+    -- Every write from here on lands in both tables; the fill only has to cover ids up to max_id.
+    columns := fibaro10_partition_copy_columns(parent_table, time_column, 'NEW');
+    key_match := format('%I = OLD.%I AND %I = COALESCE(OLD.%I, TIMESTAMP ''1970-01-01'')', key_columns[1], key_columns[1], time_column, time_column);
+    EXECUTE format(
+        $mirror$
+        CREATE OR REPLACE FUNCTION %I() RETURNS trigger LANGUAGE plpgsql AS $body$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM %I WHERE %s;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO %I (%s) VALUES (%s) ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END
+        $body$
+        $mirror$,
+        mirror_name, copy_table, key_match, copy_table, columns[1], columns[2]
+    );
+    EXECUTE format(
+        'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE ON %I FOR EACH ROW EXECUTE FUNCTION %I()',
+        mirror_name, parent_table, mirror_name
+    );
+
+    EXECUTE format('SELECT min(%I) AS first_id, max(%I) AS last_id FROM %I', key_columns[1], key_columns[1], parent_table) INTO id_range;
+    INSERT INTO time_partition_backfills (table_name, time_column, id_column, copied_id, max_id)
+    VALUES (parent_table, time_column, key_columns[1], COALESCE(id_range.first_id - 1, 0), COALESCE(id_range.last_id, 0))
+    ON CONFLICT (table_name) DO UPDATE SET
+        time_column = EXCLUDED.time_column,
+        id_column = EXCLUDED.id_column,
+        copied_id = EXCLUDED.copied_id,
+        max_id = EXCLUDED.max_id,
+        started_at = CURRENT_TIMESTAMP,
+        swapped_at = NULL;
+    RETURN TRUE;
+END
+$$;
+
+-- Copies the next batch of history ids into the partitioned copy and returns
+-- how many ids are left; rows already mirrored by the trigger are skipped.
+CREATE OR REPLACE FUNCTION fibaro10_fill_partitioned_copy(parent_table TEXT, batch_ids INTEGER)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    state time_partition_backfills%ROWTYPE;
+    upper_id BIGINT;
+    columns TEXT[];
+BEGIN
+    SELECT * INTO state FROM time_partition_backfills WHERE table_name = parent_table AND swapped_at IS NULL FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN 0;
+    END IF;
+    upper_id := LEAST(state.copied_id + GREATEST(1, batch_ids), state.max_id);
+    IF upper_id > state.copied_id THEN
+        columns := fibaro10_partition_copy_columns(parent_table, state.time_column, 'source');
+        -- FOR SHARE makes concurrent updates wait for the batch, so their mirrored row replaces the copied one.
+        EXECUTE format(
+            'INSERT INTO %I (%s) SELECT %s FROM %I AS source WHERE source.%I > $1 AND source.%I <= $2 FOR SHARE ON CONFLICT DO NOTHING',
+            parent_table || '_partitioned', columns[1], columns[2], parent_table, state.id_column, state.id_column
+        ) USING state.copied_id, upper_id;
+        UPDATE time_partition_backfills SET copied_id = upper_id WHERE table_name = parent_table;
+    END IF;
+    RETURN state.max_id - upper_id;
+END
+$$;
+
+-- Swaps a fully copied table in. The caller sets lock_timeout so a long reader
+-- makes the swap retry on the next run instead of queueing every query.
+CREATE OR REPLACE FUNCTION fibaro10_swap_partitioned_copy(parent_table TEXT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    copy_table TEXT := parent_table || '_partitioned';
+    retired_table TEXT := parent_table || '_retired';
+    mirror_name TEXT := parent_table || '_partition_mirror';
+    state time_partition_backfills%ROWTYPE;
+    item RECORD;
+    trigger_definitions TEXT[];
+    trigger_definition TEXT;
+BEGIN
+    SELECT * INTO state FROM time_partition_backfills WHERE table_name = parent_table AND swapped_at IS NULL FOR UPDATE;
+    IF NOT FOUND OR state.copied_id < state.max_id OR to_regclass(copy_table) IS NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format('LOCK TABLE %I IN ACCESS EXCLUSIVE MODE', parent_table);
+    EXECUTE format('DROP TRIGGER %I ON %I', mirror_name, parent_table);
+    EXECUTE format('DROP FUNCTION %I()', mirror_name);
+
+    -- The table's own triggers (data_versions counters and the like) move to the new
+    -- parent. Their definitions name the table, which resolves to the copy after the rename.
+    SELECT COALESCE(array_agg(pg_get_triggerdef(t.oid) ORDER BY t.tgname), ARRAY[]::TEXT[]) INTO trigger_definitions
+    FROM pg_trigger t
+    WHERE t.tgrelid = to_regclass(parent_table) AND NOT t.tgisinternal;
+    FOR item IN SELECT t.tgname::text AS name FROM pg_trigger t WHERE t.tgrelid = to_regclass(parent_table) AND NOT t.tgisinternal
+    LOOP
+        EXECUTE format('DROP TRIGGER %I ON %I', item.name, parent_table);
+    END LOOP;
+
+    FOR item IN
+        SELECT c.conname AS name, TRUE AS is_constraint
+        FROM pg_constraint c
+        WHERE c.conrelid = to_regclass(parent_table) AND c.contype IN ('p', 'u')
+        UNION ALL
+        SELECT c.relname::text, FALSE
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(parent_table)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+    LOOP
+        IF item.is_constraint THEN
+            EXECUTE format('ALTER TABLE %I RENAME CONSTRAINT %I TO %I', parent_table, item.name, left(item.name, 55) || '_retired');
+            EXECUTE format('ALTER TABLE %I RENAME CONSTRAINT %I TO %I', copy_table, left(item.name, 58) || '_next', item.name);
+        ELSE
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', item.name, left(item.name, 55) || '_retired');
+            EXECUTE format('ALTER INDEX IF EXISTS %I RENAME TO %I', left(item.name, 58) || '_next', item.name);
+        END IF;
+    END LOOP;
+
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', parent_table, retired_table);
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', copy_table, parent_table);
+    FOREACH trigger_definition IN ARRAY trigger_definitions
+    LOOP
+        EXECUTE trigger_definition;
+    END LOOP;
+
+    FOR item IN
+        SELECT a.attname, pg_get_serial_sequence(quote_ident(retired_table), a.attname) AS sequence_name
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(retired_table) AND a.attnum > 0 AND NOT a.attisdropped
+    LOOP
+        IF item.sequence_name IS NOT NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.%I', item.sequence_name, parent_table, item.attname);
+        END IF;
+    END LOOP;
+
+    UPDATE time_partition_backfills SET swapped_at = CURRENT_TIMESTAMP WHERE table_name = parent_table;
+    RETURN TRUE;
+END
+$$;
+
+SELECT fibaro10_prepare_partitioned_copy('energy_fibaro_samples', 'bucket_start');
+SELECT fibaro10_prepare_partitioned_copy('utelys_samples', 'bucket_start');
+SELECT fibaro10_prepare_partitioned_copy('ventilasjon_samples', 'bucket_start');
+SELECT fibaro10_prepare_partitioned_copy('door_events', 'timestamp');
+SELECT fibaro10_prepare_partitioned_copy('access_logs', 'timestamp');
@@ -0,0 +1,22 @@
+-- Migration: add-sunroom-occupancy-state
+-- Created: 2026-10-19 11:00:00
+-- Notes:
+--   One compact row per sunroom with the door state and session the alarm
+--   monitor last evaluated. A restarted process reads only door events from
+--   the stored door_event_id onwards instead of the full recent history.
+
+CREATE TABLE IF NOT EXISTS sunroom_occupancy_state (
+    id SERIAL PRIMARY KEY,
+    room_id VARCHAR NOT NULL UNIQUE,
+    device_id INTEGER,
+    door_state VARCHAR,
+    door_changed_at TIMESTAMP,
+    door_event_id INTEGER,
+    session_id INTEGER,
+    severity VARCHAR,
+    alarm_reason VARCHAR,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_sunroom_occupancy_state_device_id ON sunroom_occupancy_state (device_id);
+CREATE INDEX IF NOT EXISTS ix_sunroom_occupancy_state_updated_at ON sunroom_occupancy_state (updated_at);
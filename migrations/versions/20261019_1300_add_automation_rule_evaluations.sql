@@ -0,0 +1,23 @@
+-- Migration: add-automation-rule-evaluations
+-- Created: 2026-10-19 13:00:00
+-- Notes:
+--   Matches from the automation rule engine. Observer rules only log here;
+--   Aktiv rules also record the outcome of their actions.
+
+CREATE TABLE IF NOT EXISTS automation_rule_evaluations (
+    id SERIAL PRIMARY KEY,
+    rule_id INTEGER NOT NULL,
+    rule_name VARCHAR,
+    mode VARCHAR NOT NULL,
+    source VARCHAR NOT NULL,
+    event_type VARCHAR,
+    device VARCHAR,
+    result VARCHAR NOT NULL,
+    matched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_automation_rule_evaluations_rule_id ON automation_rule_evaluations (rule_id);
+CREATE INDEX IF NOT EXISTS ix_automation_rule_evaluations_mode ON automation_rule_evaluations (mode);
+CREATE INDEX IF NOT EXISTS ix_automation_rule_evaluations_source ON automation_rule_evaluations (source);
+CREATE INDEX IF NOT EXISTS ix_automation_rule_evaluations_device ON automation_rule_evaluations (device);
+CREATE INDEX IF NOT EXISTS ix_automation_rule_evaluations_matched_at ON automation_rule_evaluations (matched_at);
@@ -0,0 +1,12 @@
+-- Migration: add-data-versions
+-- Created: 2026-10-19 14:00:00
+-- Notes:
+--   Write counters per table behind the conditional GET ETags. Statement
+--   triggers (installed with the core schema, see response_versions.py)
+--   bump the row in the writing transaction.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name VARCHAR PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
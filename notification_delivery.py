@@ -0,0 +1,85 @@
+"""Building blocks for the concurrent ntfy outbox worker."""
+
+import asyncio
+from collections.abc import Iterable, Mapping
+from time import monotonic
+from typing import Any, Optional
+
+
+NOTIFICATION_OUTBOX_CHANNEL = "fibaro10_notification_outbox"
+COALESCE_FIELDS = ("topic", "title", "message", "tags", "priority", "click_url")
+
+
+def ntfy_headers(title: str, priority: str, tags: str = "", click_url: str = "") -> dict[str, str]:
+    headers = {"Title": title, "Priority": priority}
+    if tags:
+        headers["Tags"] = tags
+    if click_url:
+        headers["Click"] = click_url
+    return headers
+
+
+def notification_coalesce_key(item: Mapping[str, Any]) -> tuple[str, ...]:
+    return tuple(str(item.get(field) or "") for field in COALESCE_FIELDS)
+
+
+def coalesce_notification_items(
+    items: Iterable[Mapping[str, Any]],
+) -> list[tuple[Mapping[str, Any], list[Mapping[str, Any]]]]:
+    groups: dict[tuple[str, ...], tuple[Mapping[str, Any], list[Mapping[str, Any]]]] = {}
+    for item in items:
+        key = notification_coalesce_key(item)
+        if key in groups:
+            groups[key][1].append(item)
+        else:
+            groups[key] = (item, [])
+    return list(groups.values())
+
+
+class TopicRateLimiter:
+    """Token bucket per ntfy topic.
+
+    ``reserve`` takes a token and returns 0 when the topic may send now,
+    otherwise it returns the seconds until the next token without taking one.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int) -> None:
+        self._rate_per_second = max(0.001, float(rate_per_minute)) / 60.0
+        self._burst = max(1, int(burst))
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def reserve(self, topic: str) -> float:
+        now = monotonic()
+        tokens, updated_at = self._buckets.get(topic, (float(self._burst), now))
+        tokens = min(float(self._burst), tokens + (now - updated_at) * self._rate_per_second)
+        if tokens >= 1.0:
+            self._buckets[topic] = (tokens - 1.0, now)
+            return 0.0
+        self._buckets[topic] = (tokens, now)
+        return (1.0 - tokens) / self._rate_per_second
+
+
+class OutboxWakeup:
+    """Single-waiter wake-up signal that remembers a notify sent while nobody waits."""
+
+    def __init__(self) -> None:
+        self._pending = False
+        self._event: Optional[asyncio.Event] = None
+
+    def notify(self) -> None:
+        self._pending = True
+        if self._event is not None:
+            self._event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        if not self._pending:
+            event = asyncio.Event()
+            self._event = event
+            try:
+                await asyncio.wait_for(event.wait(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self._event = None
+        self._pending = False
+        return True
@@ -16,10 +16,17 @@ def cache_control_for_path(path: str) -> Optional[str]:
     return None
 
 
-def response_timing_headers(duration_ms: float) -> dict[str, str]:
+def response_timing_headers(
+    duration_ms: float,
+    db_queries: Optional[int] = None,
+    db_duration_ms: Optional[float] = None,
+) -> dict[str, str]:
     normalized = max(0.0, float(duration_ms))
+    server_timing = f"app;dur={normalized:.1f}"
+    if db_queries:
+        server_timing += f', db;dur={max(0.0, float(db_duration_ms or 0)):.1f};desc="{int(db_queries)} queries"'
     return {
-        "Server-Timing": f"app;dur={normalized:.1f}",
+        "Server-Timing": server_timing,
         "X-Response-Time": f"{normalized:.1f}ms",
     }
 
@@ -27,9 +34,9 @@ def response_timing_headers(duration_ms: float) -> dict[str, str]:
 STORAGE_TABLES = [
     "utelys_events", "utelys_samples", "ventilasjon_events", "ventilasjon_samples",
     "yr_forecast_samples", "control_configs", "control_config_history", "event_data", "door_events", "alarm_events",
-    "notification_outbox", "operational_incident_reviews", "asset_registry_items", "automation_workbench_rules",
-    "roborock_robots", "roborock_status_samples", "roborock_clean_jobs",
-    "roborock_schedules", "roborock_consumables", "roborock_maps",
+    "sunroom_occupancy_state", "notification_outbox", "operational_incident_reviews", "asset_registry_items",
+    "automation_workbench_rules", "automation_rule_evaluations", "roborock_robots", "roborock_status_samples",
+    "roborock_clean_jobs", "roborock_schedules", "roborock_consumables", "roborock_maps",
     "import_job_status", "import_job_runs", "owntracks_devices", "owntracks_locations",
     "owntracks_waypoints", "owntracks_waypoint_events",
     "sun2_room_daily_stats", "sun2_import_runs", "sun2_tanning_sessions",
@@ -0,0 +1,288 @@
+"""Reverse geocoding that never blocks a request.
+
+Lookups are answered from an in-memory cache of earlier results, matched to
+the nearest cached point within ``radius_m``. Misses are queued for an asyncio
+worker that asks the provider at most once per ``min_interval_seconds``,
+stores the results in batches and makes them available on the next call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import json
+import logging
+import math
+from pathlib import Path
+import threading
+from time import monotonic
+from typing import Any, Callable, Iterable, Optional, Protocol
+import urllib.parse
+import urllib.request
+
+from .tracks import METERS_PER_DEGREE
+
+
+def name_from_geocode(data: dict[str, Any]) -> Optional[str]:
+    for key in ("name", "amenity", "shop", "building", "leisure", "tourism"):
+        value = data.get(key)
+        if value:
+            return str(value)
+    address = data.get("address") if isinstance(data.get("address"), dict) else {}
+    road = address.get("road") or address.get("pedestrian") or address.get("footway")
+    house_number = address.get("house_number")
+    if road and house_number:
+        return f"{road} {house_number}"
+    if road:
+        return str(road)
+    for key in ("suburb", "neighbourhood", "village", "town", "city"):
+        if address.get(key):
+            return str(address[key])
+    return None
+
+
+def _distance_m(lat_a: float, lon_a: float, lat_b: float, lon_b: float) -> float:
+    x = (lon_b - lon_a) * METERS_PER_DEGREE * math.cos(math.radians((lat_a + lat_b) / 2))
+    y = (lat_b - lat_a) * METERS_PER_DEGREE
+    return math.hypot(x, y)
+
+
+class GeocodeProvider(Protocol):
+    name: str
+
+    async def reverse(self, lat: float, lon: float) -> dict[str, Any]:
+        """Nominatim-shaped result; an empty dict means the place has no address."""
+        ...
+
+
+class NominatimProvider:
+    name = "nominatim"
+
+    def __init__(self, url: str, user_agent: str, timeout: float = 4.0) -> None:
+        self.url = url
+        self.user_agent = user_agent
+        self.timeout = timeout
+
+    def _fetch(self, lat: float, lon: float) -> dict[str, Any]:
+        params = urllib.parse.urlencode({"format": "jsonv2", "lat": f"{lat:.7f}", "lon": f"{lon:.7f}", "addressdetails": 1, "zoom": 18})
+        request = urllib.request.Request(
+            f"{self.url}?{params}",
+            headers={"User-Agent": self.user_agent, "Accept": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.loads(response.read().decode("utf-8"))
+        return data if isinstance(data, dict) and "error" not in data else {}
+
+    async def reverse(self, lat: float, lon: float) -> dict[str, Any]:
+        return await asyncio.to_thread(self._fetch, lat, lon)
+
+
+class LocalGeocodeProvider:
+    """Nearest named place from a fixed list, for tests and offline installs."""
+
+    name = "local"
+
+    def __init__(self, places: Iterable[dict[str, Any]], max_distance_m: float = 250.0) -> None:
+        self.places = [place for place in places if place.get("lat") is not None and place.get("lon") is not None]
+        self.max_distance_m = max_distance_m
+
+    @classmethod
+    def from_file(cls, path: Path, max_distance_m: float = 250.0) -> "LocalGeocodeProvider":
+        return cls(json.loads(path.read_text(encoding="utf-8")), max_distance_m)
+
+    async def reverse(self, lat: float, lon: float) -> dict[str, Any]:
+        best: Optional[dict[str, Any]] = None
+        best_distance = self.max_distance_m
+        for place in self.places:
+            distance = _distance_m(lat, lon, float(place["lat"]), float(place["lon"]))
+            if distance <= float(place.get("radiusM") or best_distance) and distance <= best_distance:
+                best, best_distance = place, distance
+        if best is None:
+            return {}
+        return {"name": best.get("name"), "display_name": best.get("address") or best.get("display_name") or best.get("name")}
+
+
+@dataclass
+class GeocodeEntry:
+    lat: float
+    lon: float
+    name: Optional[str]
+    address: Optional[str]
+    raw: dict[str, Any] = field(default_factory=dict)
+    resolved_at: Optional[datetime] = None
+
+
+class Geocoder:
+    def __init__(
+        self,
+        provider: Optional[GeocodeProvider],
+        radius_m: float = 30.0,
+        min_interval_seconds: float = 1.0,
+        retry_seconds: float = 3600.0,
+        batch_size: int = 20,
+        store: Optional[Callable[[list[GeocodeEntry]], None]] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.provider = provider
+        self.radius_m = max(1.0, radius_m)
+        self.min_interval_seconds = max(0.0, min_interval_seconds)
+        self.retry_seconds = max(0.0, retry_seconds)
+        self.batch_size = max(1, batch_size)
+        self.store = store
+        self.logger = logger or logging.getLogger(__name__)
+        self.cell_deg = self.radius_m / METERS_PER_DEGREE
+        self.lock = threading.Lock()
+        self._cells: dict[tuple[int, int], list[GeocodeEntry]] = {}
+        self._pending: set[tuple[int, int]] = set()
+        self._failed_until: dict[tuple[int, int], float] = {}
+        self._queue: Optional[asyncio.Queue[tuple[float, float]]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._last_request = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.resolved = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.provider is not None
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def load(self, entries: Iterable[GeocodeEntry]) -> None:
+        with self.lock:
+            self._cells.clear()
+            for entry in entries:
+                self._cells.setdefault(self._cell(entry.lat, entry.lon), []).append(entry)
+
+    def add(self, entry: GeocodeEntry) -> None:
+        with self.lock:
+            cell = self._cell(entry.lat, entry.lon)
+            self._cells.setdefault(cell, []).append(entry)
+            self._pending.discard(cell)
+
+    def nearest(self, lat: float, lon: float) -> Optional[GeocodeEntry]:
+        row, column = self._cell(lat, lon)
+        lon_cells = math.ceil(1 / max(0.01, math.cos(math.radians(min(89.0, abs(lat) + self.cell_deg)))))
+        best: Optional[GeocodeEntry] = None
+        best_distance = self.radius_m
+        with self.lock:
+            for cell_row in range(row - 1, row + 2):
+                for cell_column in range(column - lon_cells, column + lon_cells + 1):
+                    for entry in self._cells.get((cell_row, cell_column), ()):
+                        distance = _distance_m(lat, lon, entry.lat, entry.lon)
+                        if distance <= best_distance:
+                            best, best_distance = entry, distance
+        return best
+
+    def lookup(self, lat: float, lon: float) -> Optional[GeocodeEntry]:
+        """Cached result near the point, or None after queueing it for the worker. Safe from any thread."""
+        if not self.enabled:
+            return None
+        entry = self.nearest(lat, lon)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        cell = self._cell(lat, lon)
+        loop, queue = self._loop, self._queue
+        if loop is None or queue is None or loop.is_closed():
+            # No worker to resolve it; a pending mark would block the cell until the next start.
+            return None
+        with self.lock:
+            if cell in self._pending or self._failed_until.get(cell, 0.0) > monotonic():
+                return None
+            self._pending.add(cell)
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (lat, lon))
+        except RuntimeError:
+            # The loop closed after the check above.
+            with self.lock:
+                self._pending.discard(cell)
+        return None
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        with self.lock:
+            self._pending.clear()
+        self._task = self._loop.create_task(self._run(), name="owntracks-geocoder")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        self._loop = None
+        self._queue = None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _resolve(self, lat: float, lon: float) -> Optional[GeocodeEntry]:
+        assert self.provider is not None
+        wait = self._last_request + self.min_interval_seconds - monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_request = monotonic()
+        try:
+            data = await self.provider.reverse(lat, lon)
+        except Exception as exc:
+            self.failures += 1
+            self.logger.info("reverse geocode failed for %.5f,%.5f: %s", lat, lon, exc)
+            with self.lock:
+                cell = self._cell(lat, lon)
+                self._pending.discard(cell)
+                self._failed_until[cell] = monotonic() + self.retry_seconds
+            return None
+        self.resolved += 1
+        return GeocodeEntry(
+            lat=lat,
+            lon=lon,
+            name=name_from_geocode(data),
+            address=str(data.get("display_name") or "") or None,
+            raw=data,
+            resolved_at=datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0),
+        )
+
+    async def _run(self) -> None:
+        queue = self._queue
+        assert queue is not None
+        while True:
+            requests = [await queue.get()]
+            while len(requests) < self.batch_size and not queue.empty():
+                requests.append(queue.get_nowait())
+            batch: list[GeocodeEntry] = []
+            for lat, lon in requests:
+                if self.nearest(lat, lon) is not None:
+                    with self.lock:
+                        self._pending.discard(self._cell(lat, lon))
+                    continue
+                entry = await self._resolve(lat, lon)
+                if entry is not None:
+                    batch.append(entry)
+                    self.add(entry)
+            if batch and self.store is not None:
+                try:
+                    await asyncio.to_thread(self.store, batch)
+                except Exception:
+                    self.logger.exception("Could not store %s reverse geocode results", len(batch))
+
+    def payload(self) -> dict[str, Any]:
+        with self.lock:
+            cached = sum(len(entries) for entries in self._cells.values())
+            pending = len(self._pending)
+        return {
+            "enabled": self.enabled,
+            "provider": self.provider.name if self.provider is not None else None,
+            "running": self._task is not None and not self._task.done(),
+            "radiusM": self.radius_m,
+            "cached": cached,
+            "pending": pending,
+            "hits": self.hits,
+            "misses": self.misses,
+            "resolved": self.resolved,
+            "failures": self.failures,
+        }
@@ -0,0 +1,179 @@
+"""Queue between ``/pub`` and the database.
+
+HTTP handlers only parse and enqueue; a single worker takes everything that
+arrived within ``max_delay_seconds`` (up to ``max_batch`` messages) and hands
+it to ``process`` in a worker thread, so a phone flushing hundreds of queued
+points after a reconnect is stored in one transaction. Batches are processed
+one at a time in arrival order, which keeps each device's messages ordered.
+
+When nothing in a batch can be stored (typically the database is down),
+callers that wait get the error, so the phone keeps its points and sends them
+again. Messages nobody waits for are put back at the front of the queue and
+retried with backoff instead of being dropped.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+from time import monotonic
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class IngestMessage:
+    topic: str
+    payload_text: str
+    received_at: datetime
+
+
+class IngestQueue:
+    def __init__(
+        self,
+        process: Callable[[list[IngestMessage]], Any],
+        max_batch: int = 500,
+        max_delay_seconds: float = 0.05,
+        max_pending: int = 5000,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 30.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.process = process
+        self.max_batch = max(1, max_batch)
+        self.max_delay_seconds = max(0.0, max_delay_seconds)
+        self.max_pending = max(self.max_batch, max_pending)
+        self.retry_base_seconds = max(0.0, retry_base_seconds)
+        self.retry_max_seconds = max(self.retry_base_seconds, retry_max_seconds)
+        self.retry_delay = 0.0
+        self.logger = logger or logging.getLogger(__name__)
+        self._pending: deque[tuple[IngestMessage, Optional[asyncio.Future[None]]]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self.batches = 0
+        self.messages = 0
+        self.largest_batch = 0
+        self.last_batch_ms: Optional[float] = None
+        self.failures = 0
+        self.requeued = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="owntracks-ingest")
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Store whatever is still queued (for at most ``timeout`` seconds), then stop the worker."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.wait_idle(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.error("OwnTracks ingest stopped with %s messages still queued", len(self._pending))
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def submit(self, message: IngestMessage, wait: bool = False) -> None:
+        """Queue a message; waits for its batch when ``wait`` is set or the queue is full."""
+        if not self.running:
+            await asyncio.to_thread(self.process, [message])
+            return
+        future: Optional[asyncio.Future[None]] = None
+        if wait or len(self._pending) >= self.max_pending:
+            future = asyncio.get_running_loop().create_future()
+        self._pending.append((message, future))
+        assert self._wakeup is not None and self._idle is not None
+        self._idle.clear()
+        self._wakeup.set()
+        if future is not None:
+            await future
+
+    async def wait_idle(self) -> None:
+        if self._idle is not None and self.running:
+            await self._idle.wait()
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None and self._idle is not None
+        while True:
+            if not self._pending:
+                self._idle.set()
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            # Only fire-and-forget messages can arrive in bursts; a caller waiting for its store is not delayed.
+            if len(self._pending) < self.max_batch and self.max_delay_seconds and any(future is None for _message, future in self._pending):
+                await asyncio.sleep(self.max_delay_seconds)
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            started = monotonic()
+            errors = await self._process(batch)
+            self.batches += 1
+            self.messages += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.last_batch_ms = round((monotonic() - started) * 1000, 1)
+            for index, (_message, future) in enumerate(batch):
+                if future is None or future.done():
+                    continue
+                error = errors.get(index)
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+            if len(errors) < len(batch):
+                # Something was stored, so the failures are bad messages rather than an outage.
+                self.retry_delay = 0.0
+                continue
+            retry = [(message, None) for message, future in batch if future is None]
+            if not retry:
+                continue
+            self._pending.extendleft(reversed(retry))
+            self.requeued += len(retry)
+            self.retry_delay = min(self.retry_max_seconds, max(self.retry_base_seconds, self.retry_delay * 2))
+            self.logger.warning("OwnTracks ingest kept %s messages for a retry in %.1f s", len(retry), self.retry_delay)
+            await asyncio.sleep(self.retry_delay)
+
+    async def _process(self, batch: list[tuple[IngestMessage, Optional[asyncio.Future[None]]]]) -> dict[int, Exception]:
+        """Store the batch in one call; if that fails, store its messages one by one so one bad message costs only itself."""
+        try:
+            await asyncio.to_thread(self.process, [message for message, _future in batch])
+            return {}
+        except Exception as exc:
+            if len(batch) == 1:
+                self.failures += 1
+                self.logger.exception("OwnTracks ingest failed for %s", batch[0][0].topic)
+                return {0: exc}
+            self.logger.warning("OwnTracks ingest batch of %s messages failed, retrying one by one: %s", len(batch), exc)
+        errors: dict[int, Exception] = {}
+        for index, (message, _future) in enumerate(batch):
+            try:
+                await asyncio.to_thread(self.process, [message])
+            except Exception as exc:
+                errors[index] = exc
+                self.failures += 1
+                self.logger.exception("OwnTracks ingest failed for %s", message.topic)
+        return errors
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "messages": self.messages,
+            "largestBatch": self.largest_batch,
+            "lastBatchMs": self.last_batch_ms,
+            "failures": self.failures,
+            "requeued": self.requeued,
+            "retryDelaySeconds": self.retry_delay,
+            "maxBatch": self.max_batch,
+            "maxDelayMs": round(self.max_delay_seconds * 1000, 1),
+        }
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Iterable, Optional
 import base64
@@ -12,8 +15,6 @@ import math
 import os
 import threading
 import time
-import urllib.parse
-import urllib.request
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
@@ -41,9 +42,25 @@ from sqlalchemy import (
     select,
     text,
 )
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from .build_log import owntracks_build_log_payload, owntracks_build_summary
+from .geocoding import GeocodeEntry, GeocodeProvider, Geocoder, LocalGeocodeProvider, NominatimProvider
+from .ingest import IngestMessage, IngestQueue
+from .tracks import (
+    MAX_TRACK_ZOOM,
+    METERS_PER_DEGREE,
+    MIN_TRACK_ZOOM,
+    clip_runs,
+    delta_encode,
+    encode_polyline,
+    meters_per_pixel,
+    parse_bbox,
+    simplify_track,
+    tile_bbox,
+)
 
 
 load_dotenv()
@@ -70,6 +87,10 @@ STOP_SUGGESTION_MIN_MINUTES = max(1, int(os.getenv("OWNTRACKS_STOP_SUGGESTION_MI
 STOP_SUGGESTION_RADIUS_M = max(15.0, float(os.getenv("OWNTRACKS_STOP_SUGGESTION_RADIUS_M", "80")))
 STOP_SUGGESTION_MAX_ACCURACY_M = max(1.0, float(os.getenv("OWNTRACKS_STOP_SUGGESTION_MAX_ACCURACY_M", str(MAX_CALCULATION_ACCURACY_M))))
 STOP_SUGGESTION_MAX_GAP_MINUTES = max(10, int(os.getenv("OWNTRACKS_STOP_SUGGESTION_MAX_GAP_MINUTES", "180")))
+TRACK_SIMPLIFY_PIXELS = max(0.25, float(os.getenv("OWNTRACKS_TRACK_SIMPLIFY_PIXELS", "1.5")))
+TRACK_STOP_MIN_MINUTES = max(1, int(os.getenv("OWNTRACKS_TRACK_STOP_MIN_MINUTES", "5")))
+TRACK_STOP_RADIUS_M = max(15.0, float(os.getenv("OWNTRACKS_TRACK_STOP_RADIUS_M", "60")))
+TRACK_CACHE_MAX_DAYS = max(16, int(os.getenv("OWNTRACKS_TRACK_CACHE_MAX_DAYS", "1024")))
 DATA_QUALITY_STALE_MINUTES = max(1, int(os.getenv("OWNTRACKS_DATA_QUALITY_STALE_MINUTES", "10")))
 DATA_QUALITY_GAP_MINUTES = max(1, int(os.getenv("OWNTRACKS_DATA_QUALITY_GAP_MINUTES", "20")))
 DATA_QUALITY_MAX_ACCURACY_M = max(1.0, float(os.getenv("OWNTRACKS_DATA_QUALITY_MAX_ACCURACY_M", str(MAX_CALCULATION_ACCURACY_M))))
@@ -78,6 +99,15 @@ MIN_OVERVIEW_VISIT_SECONDS = max(0, int(os.getenv("OWNTRACKS_MIN_OVERVIEW_VISIT_
 REVERSE_GEOCODE_ENABLED = os.getenv("OWNTRACKS_REVERSE_GEOCODE_ENABLED", "true").strip().lower() not in {"0", "false", "no", "nei"}
 NOMINATIM_REVERSE_URL = os.getenv("OWNTRACKS_NOMINATIM_REVERSE_URL", "https://nominatim.openstreetmap.org/reverse").strip()
 NOMINATIM_USER_AGENT = os.getenv("OWNTRACKS_NOMINATIM_USER_AGENT", "fibaro10-owntracks/1.0").strip() or "fibaro10-owntracks/1.0"
+INGEST_WAIT_FOR_STORE = os.getenv("OWNTRACKS_INGEST_WAIT_FOR_STORE", "true").strip().lower() not in {"0", "false", "no", "nei"}
+INGEST_MAX_BATCH = max(1, int(os.getenv("OWNTRACKS_INGEST_MAX_BATCH", "500")))
+INGEST_MAX_DELAY_MS = max(0.0, float(os.getenv("OWNTRACKS_INGEST_MAX_DELAY_MS", "50")))
+INGEST_MAX_PENDING = max(1, int(os.getenv("OWNTRACKS_INGEST_MAX_PENDING", "5000")))
+GEOCODE_PROVIDER = os.getenv("OWNTRACKS_GEOCODE_PROVIDER", "nominatim").strip().lower()
+GEOCODE_LOCAL_FILE = os.getenv("OWNTRACKS_GEOCODE_LOCAL_FILE", "").strip()
+GEOCODE_CACHE_RADIUS_M = max(5.0, float(os.getenv("OWNTRACKS_GEOCODE_CACHE_RADIUS_M", "30")))
+GEOCODE_MIN_INTERVAL_SECONDS = max(1.0, float(os.getenv("OWNTRACKS_GEOCODE_MIN_INTERVAL_SECONDS", "1.1")))
+GEOCODE_RETRY_MINUTES = max(1, int(os.getenv("OWNTRACKS_GEOCODE_RETRY_MINUTES", "60")))
 POSITION_MESSAGE_TYPES = {"", "location", "transition"}
 SOURCE_ORDER = {"transition": 0, "inregions": 1, "computed-position": 2}
 
@@ -591,101 +621,228 @@ def number_is_finite(value: Any) -> bool:
         return False
 
 
-def close_stop_cluster(cluster: list[OwnTracksLocation], radius_m: float, min_duration_seconds: int) -> Optional[StopCandidate]:
-    if len(cluster) < 2:
-        return None
-    first = location_time(cluster[0])
-    last = location_time(cluster[-1])
-    duration_seconds = int((last - first).total_seconds())
-    if duration_seconds < min_duration_seconds:
-        return None
-    lat = sum(float(row.lat) for row in cluster if row.lat is not None) / len(cluster)
-    lon = sum(float(row.lon) for row in cluster if row.lon is not None) / len(cluster)
-    spread_m = max(distance_meters(lat, lon, float(row.lat), float(row.lon)) for row in cluster if row.lat is not None and row.lon is not None)
-    if spread_m > radius_m * 1.4:
-        return None
-    max_accuracy = max((float(row.accuracy_m) for row in cluster if row.accuracy_m is not None), default=None)
-    return StopCandidate(
-        topic=cluster[0].topic,
-        username=cluster[0].username,
-        device=cluster[0].device,
-        lat=round(lat, 7),
-        lon=round(lon, 7),
-        sample_count=len(cluster),
-        visits=1,
-        total_duration_seconds=duration_seconds,
-        first_seen_at=first,
-        last_seen_at=last,
-        radius_m=max(DEFAULT_LOCAL_WAYPOINT_RADIUS_M, min(250.0, round(max(radius_m, spread_m + 25.0), 1))),
-        max_accuracy_m=max_accuracy,
-        confidence=round(min(0.99, 0.45 + min(duration_seconds / 7200, 0.3) + min(len(cluster) / 20, 0.2) + min(max(0, radius_m - spread_m) / radius_m, 1) * 0.04), 3),
+@dataclass
+class StopPoint:
+    topic: str
+    username: Optional[str]
+    device: Optional[str]
+    at: datetime
+    lat: float
+    lon: float
+    accuracy_m: Optional[float]
+
+
+class StopDetector:
+    """Streaming stop detection for one topic; points must arrive in time order.
+
+    The cluster centroid is a running mean, and member positions are kept as
+    metres east/north of the cluster's first point, so each point costs O(1)
+    and the spread check at the end is one pass over the cluster.
+    """
+
+    def __init__(self, radius_m: float, min_duration_seconds: int, max_gap_seconds: int) -> None:
+        self.radius_m = radius_m
+        self.min_duration_seconds = min_duration_seconds
+        self.max_gap_seconds = max_gap_seconds
+        self._first: Optional[StopPoint] = None
+        self._reset()
+
+    def _reset(self, point: Optional[StopPoint] = None) -> None:
+        self._first = point
+        self._xs = array("d")
+        self._ys = array("d")
+        self._sum_x = 0.0
+        self._sum_y = 0.0
+        self._max_accuracy: Optional[float] = None
+        self._last_at = point.at if point else None
+        if point is not None:
+            self._origin_lat = point.lat
+            self._origin_lon = point.lon
+            self._meters_per_lon = METERS_PER_DEGREE * math.cos(math.radians(point.lat))
+            self._append(0.0, 0.0, point.accuracy_m)
+
+    def _append(self, x: float, y: float, accuracy_m: Optional[float]) -> None:
+        self._xs.append(x)
+        self._ys.append(y)
+        self._sum_x += x
+        self._sum_y += y
+        if accuracy_m is not None and (self._max_accuracy is None or accuracy_m > self._max_accuracy):
+            self._max_accuracy = accuracy_m
+
+    @property
+    def samples(self) -> int:
+        """Points in the open cluster; 1 right after a point started a new one."""
+        return len(self._xs)
+
+    def add(self, point: StopPoint) -> Optional[StopCandidate]:
+        """Add the next point; returns the stop it closed, if that cluster qualified."""
+        if self._first is None:
+            self._reset(point)
+            return None
+        x = (point.lon - self._origin_lon) * self._meters_per_lon
+        y = (point.lat - self._origin_lat) * METERS_PER_DEGREE
+        count = len(self._xs)
+        gap_seconds = (point.at - self._last_at).total_seconds()
+        if gap_seconds <= self.max_gap_seconds and math.hypot(x - self._sum_x / count, y - self._sum_y / count) <= self.radius_m:
+            self._append(x, y, point.accuracy_m)
+            self._last_at = point.at
+            return None
+        candidate = self.finish()
+        self._reset(point)
+        return candidate
+
+    def finish(self) -> Optional[StopCandidate]:
+        first = self._first
+        count = len(self._xs)
+        if first is None or count < 2 or self._last_at is None:
+            return None
+        duration_seconds = int((self._last_at - first.at).total_seconds())
+        if duration_seconds < self.min_duration_seconds:
+            return None
+        center_x = self._sum_x / count
+        center_y = self._sum_y / count
+        spread_m = max(math.hypot(x - center_x, y - center_y) for x, y in zip(self._xs, self._ys))
+        radius_m = self.radius_m
+        if spread_m > radius_m * 1.4:
+            return None
+        lat = self._origin_lat + center_y / METERS_PER_DEGREE
+        lon = self._origin_lon + (center_x / self._meters_per_lon if self._meters_per_lon else 0.0)
+        return StopCandidate(
+            topic=first.topic,
+            username=first.username,
+            device=first.device,
+            lat=round(lat, 7),
+            lon=round(lon, 7),
+            sample_count=count,
+            visits=1,
+            total_duration_seconds=duration_seconds,
+            first_seen_at=first.at,
+            last_seen_at=self._last_at,
+            radius_m=max(DEFAULT_LOCAL_WAYPOINT_RADIUS_M, min(250.0, round(max(radius_m, spread_m + 25.0), 1))),
+            max_accuracy_m=self._max_accuracy,
+            confidence=round(min(0.99, 0.45 + min(duration_seconds / 7200, 0.3) + min(count / 20, 0.2) + min(max(0, radius_m - spread_m) / radius_m, 1) * 0.04), 3),
+        )
+
+
+def usable_location_columns(max_accuracy_m: float, *columns: Any) -> Any:
+    return (
+        select(*columns)
+        .where(OwnTracksLocation.lat.isnot(None))
+        .where(OwnTracksLocation.lon.isnot(None))
+        .where(or_(OwnTracksLocation.message_type.is_(None), func.lower(OwnTracksLocation.message_type).in_(POSITION_MESSAGE_TYPES)))
+        .where(or_(OwnTracksLocation.accuracy_m.is_(None), OwnTracksLocation.accuracy_m <= max_accuracy_m))
     )
 
 
+def read_stop_points(session: Session, since: Optional[datetime], max_accuracy_m: float) -> Iterable[StopPoint]:
+    """Only the columns stop detection needs, filtered in SQL and ordered by topic and time."""
+    location_time_expr = func.coalesce(OwnTracksLocation.timestamp, OwnTracksLocation.received_at)
+    stmt = (
+        usable_location_columns(
+            max_accuracy_m,
+            OwnTracksLocation.topic,
+            OwnTracksLocation.username,
+            OwnTracksLocation.device,
+            location_time_expr,
+            OwnTracksLocation.lat,
+            OwnTracksLocation.lon,
+            OwnTracksLocation.accuracy_m,
+        )
+        .order_by(OwnTracksLocation.topic, location_time_expr, OwnTracksLocation.received_at, OwnTracksLocation.id)
+        .execution_options(yield_per=5000)
+    )
+    if since is not None:
+        stmt = stmt.where(or_(OwnTracksLocation.timestamp >= since, OwnTracksLocation.received_at >= since))
+    isfinite = math.isfinite
+    for topic, username, device, at, lat, lon, accuracy_m in session.execute(stmt):
+        if isfinite(lat) and isfinite(lon) and (accuracy_m is None or isfinite(accuracy_m)):
+            yield StopPoint(topic, username, device, at, lat, lon, accuracy_m)
+
+
 def stop_clusters_from_locations(
-    rows: Iterable[OwnTracksLocation],
+    points: Iterable[StopPoint],
     *,
     min_duration_minutes: int,
     radius_m: float,
-    max_accuracy_m: float,
     max_gap_minutes: int,
 ) -> list[StopCandidate]:
-    points = safe_location_points(rows, max_accuracy_m)
-    min_duration_seconds = int(min_duration_minutes * 60)
-    max_gap_seconds = int(max_gap_minutes * 60)
+    """Stops per topic; ``points`` must be in time order within each topic (see ``read_stop_points``)."""
+    detectors: dict[str, StopDetector] = {}
     clusters: list[StopCandidate] = []
-    current: list[OwnTracksLocation] = []
-    current_lat: Optional[float] = None
-    current_lon: Optional[float] = None
-    last_time: Optional[datetime] = None
-
-    for row in points:
-        row_time = location_time(row)
-        if not current:
-            current = [row]
-            current_lat = float(row.lat)
-            current_lon = float(row.lon)
-            last_time = row_time
-            continue
-        assert current_lat is not None and current_lon is not None and last_time is not None
-        gap_seconds = int((row_time - last_time).total_seconds())
-        distance_m = distance_meters(float(row.lat), float(row.lon), current_lat, current_lon)
-        if gap_seconds <= max_gap_seconds and distance_m <= radius_m:
-            current.append(row)
-            current_lat = sum(float(item.lat) for item in current if item.lat is not None) / len(current)
-            current_lon = sum(float(item.lon) for item in current if item.lon is not None) / len(current)
-        else:
-            candidate = close_stop_cluster(current, radius_m, min_duration_seconds)
-            if candidate:
-                clusters.append(candidate)
-            current = [row]
-            current_lat = float(row.lat)
-            current_lon = float(row.lon)
-        last_time = row_time
-
-    candidate = close_stop_cluster(current, radius_m, min_duration_seconds)
-    if candidate:
-        clusters.append(candidate)
+    for point in points:
+        detector = detectors.get(point.topic)
+        if detector is None:
+            detector = detectors[point.topic] = StopDetector(radius_m, int(min_duration_minutes * 60), int(max_gap_minutes * 60))
+        candidate = detector.add(point)
+        if candidate:
+            clusters.append(candidate)
+    for detector in detectors.values():
+        candidate = detector.finish()
+        if candidate:
+            clusters.append(candidate)
     return clusters
 
 
+class SpatialGrid:
+    """Equal-angle lat/lon grid per topic; lookups visit only the cells within the search radius."""
+
+    def __init__(self, cell_m: float) -> None:
+        self.cell_deg = max(1.0, cell_m) / METERS_PER_DEGREE
+        self._cells: dict[tuple[str, int, int], list[tuple[int, Any]]] = {}
+        self._positions: dict[int, tuple[str, int, int]] = {}
+        self._order = 0
+
+    def _cell(self, topic: str, lat: float, lon: float) -> tuple[str, int, int]:
+        return (topic, math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def add(self, topic: str, lat: float, lon: float, item: Any) -> None:
+        cell = self._cell(topic, lat, lon)
+        self._cells.setdefault(cell, []).append((self._order, item))
+        self._positions[id(item)] = cell
+        self._order += 1
+
+    def move(self, topic: str, lat: float, lon: float, item: Any) -> None:
+        cell = self._cell(topic, lat, lon)
+        previous = self._positions.get(id(item))
+        if previous == cell:
+            return
+        entry = next(entry for entry in self._cells[previous] if entry[1] is item)
+        self._cells[previous].remove(entry)
+        self._cells.setdefault(cell, []).append(entry)
+        self._positions[id(item)] = cell
+
+    def near(self, topic: str, lat: float, lon: float, radius_m: float) -> list[Any]:
+        """Items in the cells covering ``radius_m`` around the point, in insertion order; callers check the exact distance."""
+        lat_span = radius_m / METERS_PER_DEGREE
+        lon_span = lat_span / max(0.01, math.cos(math.radians(min(89.0, abs(lat) + lat_span))))
+        found: list[tuple[int, Any]] = []
+        for row in range(math.floor((lat - lat_span) / self.cell_deg), math.floor((lat + lat_span) / self.cell_deg) + 1):
+            for column in range(math.floor((lon - lon_span) / self.cell_deg), math.floor((lon + lon_span) / self.cell_deg) + 1):
+                found.extend(self._cells.get((topic, row, column), ()))
+        found.sort(key=lambda entry: entry[0])
+        return [item for _order, item in found]
+
+
 def merge_stop_candidates(candidates: Iterable[StopCandidate], merge_radius_m: float) -> list[StopCandidate]:
     merged: list[StopCandidate] = []
+    grid = SpatialGrid(merge_radius_m)
     for candidate in sorted(candidates, key=lambda item: item.total_duration_seconds, reverse=True):
         match = next(
             (
                 item
-                for item in merged
-                if item.topic == candidate.topic and distance_meters(item.lat, item.lon, candidate.lat, candidate.lon) <= merge_radius_m
+                for item in grid.near(candidate.topic, candidate.lat, candidate.lon, merge_radius_m)
+                if distance_meters(item.lat, item.lon, candidate.lat, candidate.lon) <= merge_radius_m
             ),
             None,
         )
         if match is None:
             merged.append(candidate)
+            grid.add(candidate.topic, candidate.lat, candidate.lon, candidate)
             continue
         total_samples = match.sample_count + candidate.sample_count
         match.lat = round((match.lat * match.sample_count + candidate.lat * candidate.sample_count) / total_samples, 7)
         match.lon = round((match.lon * match.sample_count + candidate.lon * candidate.sample_count) / total_samples, 7)
+        grid.move(match.topic, match.lat, match.lon, match)
         match.sample_count = total_samples
         match.visits += candidate.visits
         match.total_duration_seconds += candidate.total_duration_seconds
@@ -699,70 +856,320 @@ def merge_stop_candidates(candidates: Iterable[StopCandidate], merge_radius_m: f
     return merged
 
 
-def candidate_is_near_existing_waypoint(candidate: StopCandidate, waypoints: Iterable[OwnTracksWaypointState], radius_m: float) -> bool:
-    for waypoint in waypoints:
-        if waypoint.topic != candidate.topic or waypoint.lat is None or waypoint.lon is None:
-            continue
+class WaypointIndex:
+    def __init__(self, waypoints: Iterable[OwnTracksWaypointState]) -> None:
+        self.grid = SpatialGrid(DEFAULT_LOCAL_WAYPOINT_RADIUS_M)
+        self.max_radius_m = DEFAULT_LOCAL_WAYPOINT_RADIUS_M
+        for waypoint in waypoints:
+            if waypoint.lat is None or waypoint.lon is None:
+                continue
+            self.grid.add(waypoint.topic, float(waypoint.lat), float(waypoint.lon), waypoint)
+            self.max_radius_m = max(self.max_radius_m, float(waypoint.radius_m or 0))
+
+
+def candidate_is_near_existing_waypoint(candidate: StopCandidate, waypoints: WaypointIndex, radius_m: float) -> bool:
+    for waypoint in waypoints.grid.near(candidate.topic, candidate.lat, candidate.lon, max(radius_m, waypoints.max_radius_m)):
         threshold = max(radius_m, float(waypoint.radius_m or 0), DEFAULT_LOCAL_WAYPOINT_RADIUS_M)
         if distance_meters(candidate.lat, candidate.lon, float(waypoint.lat), float(waypoint.lon)) <= threshold:
             return True
     return False
 
 
-def geocode_cache_key(lat: float, lon: float) -> str:
-    return f"{lat:.5f},{lon:.5f}"
+@dataclass
+class TrackDay:
+    topic: str
+    username: Optional[str]
+    device: Optional[str]
+    signature: tuple[int, int]
+    raw_points: int
+    times: list[int]
+    lats: list[float]
+    lons: list[float]
+    stops: list[dict[str, Any]]
 
 
-def name_from_geocode(data: dict[str, Any]) -> Optional[str]:
-    for key in ("name", "amenity", "shop", "building", "leisure", "tourism"):
-        value = data.get(key)
-        if value:
-            return str(value)
-    address = data.get("address") if isinstance(data.get("address"), dict) else {}
-    road = address.get("road") or address.get("pedestrian") or address.get("footway")
-    house_number = address.get("house_number")
-    if road and house_number:
-        return f"{road} {house_number}"
-    if road:
-        return str(road)
-    for key in ("suburb", "neighbourhood", "village", "town", "city"):
-        if address.get(key):
-            return str(address[key])
-    return None
+class TrackDayCache:
+    """Simplified day tracks per (topic, UTC day, zoom), valid while the day's row count and max id are unchanged."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, date, int], TrackDay] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, date, int], signature: tuple[int, int]) -> Optional[TrackDay]:
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.signature != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple[str, date, int], entry: TrackDay) -> None:
+        with self.lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            return {"entries": len(self._entries), "maxEntries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+TRACK_DAY_CACHE = TrackDayCache(TRACK_CACHE_MAX_DAYS)
+
 
+def epoch_seconds(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
 
-def reverse_geocode(session: Session, lat: float, lon: float) -> dict[str, Optional[str]]:
-    if not REVERSE_GEOCODE_ENABLED or not NOMINATIM_REVERSE_URL:
-        return {"name": None, "address": None}
-    key = geocode_cache_key(lat, lon)
-    cached = session.execute(select(OwnTracksGeocodeCache).where(OwnTracksGeocodeCache.cache_key == key)).scalar_one_or_none()
-    if cached:
-        return {"name": cached.name, "address": cached.display_name}
-    params = urllib.parse.urlencode({"format": "jsonv2", "lat": f"{lat:.7f}", "lon": f"{lon:.7f}", "addressdetails": 1, "zoom": 18})
-    request = urllib.request.Request(
-        f"{NOMINATIM_REVERSE_URL}?{params}",
-        headers={"User-Agent": NOMINATIM_USER_AGENT, "Accept": "application/json"},
+
+def track_day_signatures(
+    session: Session,
+    since: datetime,
+    until: datetime,
+    topic: Optional[str],
+) -> dict[tuple[str, date], tuple[int, int]]:
+    location_time_expr = func.coalesce(OwnTracksLocation.timestamp, OwnTracksLocation.received_at)
+    day_expr = func.date(location_time_expr)
+    stmt = (
+        usable_location_columns(MAX_CALCULATION_ACCURACY_M, OwnTracksLocation.topic, day_expr, func.count(OwnTracksLocation.id), func.max(OwnTracksLocation.id))
+        .where(location_time_expr >= since)
+        .where(location_time_expr < until)
+        .group_by(OwnTracksLocation.topic, day_expr)
     )
-    try:
-        with urllib.request.urlopen(request, timeout=4) as response:
-            data = json.loads(response.read().decode("utf-8"))
-    except Exception as exc:
-        logger.info("reverse geocode failed for %s: %s", key, exc)
-        return {"name": None, "address": None}
-    display_name = str(data.get("display_name") or "") or None
-    name = name_from_geocode(data)
-    session.add(
-        OwnTracksGeocodeCache(
-            cache_key=key,
-            lat=lat,
-            lon=lon,
-            name=name,
-            display_name=display_name,
-            raw=data,
-            updated_at=utc_now(),
-        )
+    if topic:
+        stmt = stmt.where(OwnTracksLocation.topic == topic)
+    signatures: dict[tuple[str, date], tuple[int, int]] = {}
+    for row_topic, day, count, max_id in session.execute(stmt):
+        day_value = day if isinstance(day, date) else date.fromisoformat(str(day)[:10])
+        signatures[(row_topic, day_value)] = (int(count), int(max_id))
+    return signatures
+
+
+def build_track_day(points: list[StopPoint], signature: tuple[int, int], zoom: int) -> TrackDay:
+    """Stops collapse to their arrival and departure points; the rest is simplified for ``zoom``."""
+    detector = StopDetector(TRACK_STOP_RADIUS_M, TRACK_STOP_MIN_MINUTES * 60, STOP_SUGGESTION_MAX_GAP_MINUTES * 60)
+    stop_ranges: list[tuple[int, int, StopCandidate]] = []
+    cluster_start = 0
+    for index, point in enumerate(points):
+        candidate = detector.add(point)
+        if candidate:
+            stop_ranges.append((cluster_start, index - 1, candidate))
+        if detector.samples == 1:
+            cluster_start = index
+    candidate = detector.finish()
+    if candidate:
+        stop_ranges.append((cluster_start, len(points) - 1, candidate))
+
+    inside_stop = [False] * len(points)
+    anchors: set[int] = set()
+    for first, last, _candidate in stop_ranges:
+        for index in range(first + 1, last):
+            inside_stop[index] = True
+        anchors.update((first, last))
+    remaining = [index for index in range(len(points)) if not inside_stop[index]]
+    position = {index: offset for offset, index in enumerate(remaining)}
+    lats = [points[index].lat for index in remaining]
+    lons = [points[index].lon for index in remaining]
+    tolerance_m = meters_per_pixel(zoom, lats[0]) * TRACK_SIMPLIFY_PIXELS if lats else 0.0
+    kept = simplify_track(
+        lats,
+        lons,
+        [points[index].accuracy_m for index in remaining],
+        tolerance_m,
+        keep=[position[index] for index in anchors],
+    )
+    first_point = points[0]
+    return TrackDay(
+        topic=first_point.topic,
+        username=first_point.username,
+        device=first_point.device,
+        signature=signature,
+        raw_points=len(points),
+        times=[epoch_seconds(points[remaining[offset]].at) for offset in kept],
+        lats=[round(lats[offset], 6) for offset in kept],
+        lons=[round(lons[offset], 6) for offset in kept],
+        stops=[
+            {
+                "lat": candidate.lat,
+                "lon": candidate.lon,
+                "start": epoch_seconds(candidate.first_seen_at),
+                "end": epoch_seconds(candidate.last_seen_at),
+                "durationSeconds": candidate.total_duration_seconds,
+                "samples": candidate.sample_count,
+            }
+            for _first, _last, candidate in stop_ranges
+        ],
     )
-    return {"name": name, "address": display_name}
+
+
+def load_track_days(session: Session, since: datetime, until: datetime, topic: Optional[str], zoom: int) -> tuple[list[TrackDay], int]:
+    """Simplified day tracks covering ``since``..``until``; only days whose rows changed are read and simplified again."""
+    first_day = since.date()
+    day_start = datetime.combine(first_day, datetime.min.time())
+    day_end = datetime.combine(until.date() + timedelta(days=1), datetime.min.time())
+    signatures = track_day_signatures(session, day_start, day_end, topic)
+    days: dict[tuple[str, date], TrackDay] = {}
+    stale: list[tuple[str, date]] = []
+    for key, signature in signatures.items():
+        cached = TRACK_DAY_CACHE.get((key[0], key[1], zoom), signature)
+        if cached is None:
+            stale.append(key)
+        else:
+            days[key] = cached
+    if stale:
+        stale_topics = sorted({key[0] for key in stale})
+        stale_days = [key[1] for key in stale]
+        location_time_expr = func.coalesce(OwnTracksLocation.timestamp, OwnTracksLocation.received_at)
+        stmt = (
+            usable_location_columns(
+                MAX_CALCULATION_ACCURACY_M,
+                OwnTracksLocation.topic,
+                OwnTracksLocation.username,
+                OwnTracksLocation.device,
+                location_time_expr,
+                OwnTracksLocation.lat,
+                OwnTracksLocation.lon,
+                OwnTracksLocation.accuracy_m,
+            )
+            .where(OwnTracksLocation.topic.in_(stale_topics))
+            .where(location_time_expr >= datetime.combine(min(stale_days), datetime.min.time()))
+            .where(location_time_expr < datetime.combine(max(stale_days) + timedelta(days=1), datetime.min.time()))
+            .order_by(OwnTracksLocation.topic, location_time_expr, OwnTracksLocation.received_at, OwnTracksLocation.id)
+            .execution_options(yield_per=5000)
+        )
+        wanted = set(stale)
+        points_by_day: dict[tuple[str, date], list[StopPoint]] = {}
+        for row_topic, username, device, at, lat, lon, accuracy_m in session.execute(stmt):
+            key = (row_topic, at.date())
+            if key in wanted and math.isfinite(lat) and math.isfinite(lon):
+                points_by_day.setdefault(key, []).append(StopPoint(row_topic, username, device, at, lat, lon, accuracy_m))
+        for key, points in points_by_day.items():
+            day = build_track_day(points, signatures[key], zoom)
+            TRACK_DAY_CACHE.put((key[0], key[1], zoom), day)
+            days[key] = day
+    return [days[key] for key in sorted(days)], len(signatures) - len(stale)
+
+
+def track_segment_payload(day_parts: list[tuple[TrackDay, int, int]], output_format: str) -> dict[str, Any]:
+    lats = [lat for day, first, last in day_parts for lat in day.lats[first:last]]
+    lons = [lon for day, first, last in day_parts for lon in day.lons[first:last]]
+    times = delta_encode(moment for day, first, last in day_parts for moment in day.times[first:last])
+    if output_format == "arrays":
+        return {"lat": lats, "lon": lons, "t": times}
+    return {"polyline": encode_polyline(lats, lons), "t": times}
+
+
+def track_payload(
+    days: list[TrackDay],
+    since: datetime,
+    until: datetime,
+    bbox: Optional[tuple[float, float, float, float]],
+    output_format: str,
+) -> list[dict[str, Any]]:
+    since_epoch = epoch_seconds(since)
+    until_epoch = epoch_seconds(until)
+    by_topic: dict[str, list[TrackDay]] = {}
+    for day in days:
+        by_topic.setdefault(day.topic, []).append(day)
+    tracks: list[dict[str, Any]] = []
+    for topic, topic_days in by_topic.items():
+        parts: list[tuple[TrackDay, int, int]] = []
+        for day in topic_days:
+            first = bisect_left(day.times, since_epoch)
+            last = bisect_right(day.times, until_epoch)
+            for run_first, run_last in clip_runs(day.lats[first:last], day.lons[first:last], bbox):
+                parts.append((day, first + run_first, first + run_last))
+        # Runs continue across midnight unless the bbox cut them.
+        segments: list[list[tuple[TrackDay, int, int]]] = []
+        for part in parts:
+            previous = segments[-1][-1] if segments else None
+            if previous is not None and previous[0] is not part[0] and previous[2] == len(previous[0].times) and part[1] == 0:
+                segments[-1].append(part)
+            else:
+                segments.append([part])
+        stops = [
+            stop
+            for day in topic_days
+            for stop in day.stops
+            if stop["end"] >= since_epoch
+            and stop["start"] <= until_epoch
+            and (bbox is None or (bbox[1] <= stop["lat"] <= bbox[3] and bbox[0] <= stop["lon"] <= bbox[2]))
+        ]
+        point_count = sum(last - first for day, first, last in parts)
+        if not point_count and not stops:
+            continue
+        tracks.append(
+            {
+                "topic": topic,
+                "username": topic_days[0].username,
+                "device": topic_days[0].device,
+                "rawPoints": sum(day.raw_points for day in topic_days),
+                "points": point_count,
+                "segments": [track_segment_payload(segment, output_format) for segment in segments],
+                "stops": stops,
+            }
+        )
+    return tracks
+
+
+def geocode_cache_key(lat: float, lon: float) -> str:
+    return f"{lat:.5f},{lon:.5f}"
+
+
+def geocode_provider_from_env() -> Optional[GeocodeProvider]:
+    if not REVERSE_GEOCODE_ENABLED or GEOCODE_PROVIDER in {"off", "none", ""}:
+        return None
+    if GEOCODE_PROVIDER == "local":
+        if not GEOCODE_LOCAL_FILE or not Path(GEOCODE_LOCAL_FILE).exists():
+            logger.warning("OWNTRACKS_GEOCODE_LOCAL_FILE is missing; reverse geocoding is disabled")
+            return None
+        return LocalGeocodeProvider.from_file(Path(GEOCODE_LOCAL_FILE))
+    if not NOMINATIM_REVERSE_URL:
+        return None
+    return NominatimProvider(NOMINATIM_REVERSE_URL, NOMINATIM_USER_AGENT)
+
+
+def store_geocode_entries(entries: list[GeocodeEntry]) -> None:
+    """Persist resolved lookups so the cache survives restarts; runs in a worker thread."""
+    by_key = {geocode_cache_key(entry.lat, entry.lon): entry for entry in entries}
+    with SessionLocal() as session:
+        existing = {
+            row.cache_key: row
+            for row in session.execute(select(OwnTracksGeocodeCache).where(OwnTracksGeocodeCache.cache_key.in_(by_key))).scalars()
+        }
+        for key, entry in by_key.items():
+            row = existing.get(key)
+            if row is None:
+                row = OwnTracksGeocodeCache(cache_key=key, lat=entry.lat, lon=entry.lon)
+                session.add(row)
+            row.name = entry.name
+            row.display_name = entry.address
+            row.raw = entry.raw
+            row.updated_at = entry.resolved_at or utc_now()
+        session.commit()
+
+
+def load_geocode_cache() -> None:
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(OwnTracksGeocodeCache.lat, OwnTracksGeocodeCache.lon, OwnTracksGeocodeCache.name, OwnTracksGeocodeCache.display_name)
+        ).all()
+    GEOCODER.load(GeocodeEntry(lat=lat, lon=lon, name=name, address=address) for lat, lon, name, address in rows)
+
+
+GEOCODER = Geocoder(
+    geocode_provider_from_env(),
+    radius_m=GEOCODE_CACHE_RADIUS_M,
+    min_interval_seconds=GEOCODE_MIN_INTERVAL_SECONDS,
+    retry_seconds=GEOCODE_RETRY_MINUTES * 60,
+    store=store_geocode_entries,
+    logger=logger,
+)
 
 
 def default_topic(session: Session, requested_topic: Optional[str] = None) -> str:
@@ -1227,68 +1634,133 @@ def materialize_waypoints(session: Session, location: OwnTracksLocation, payload
                 open_zone_visit(session, location, waypoint, source="inregions", confidence=0.9)
 
 
-def store_message(topic: str, payload_text: str) -> dict[str, Any]:
-    topic = canonical_owntracks_topic(topic)
-    received_at = utc_now()
-    with STATE.lock:
-        STATE.messages_received += 1
-        STATE.last_message_at = received_at
-    try:
-        payload = json.loads(payload_text)
-        if not isinstance(payload, dict):
-            raise ValueError("Payload is not a JSON object")
-    except Exception as exc:
-        with STATE.lock:
-            STATE.last_store_error = f"Invalid JSON: {exc}"
-        raise HTTPException(status_code=400, detail="Payload must be a JSON object") from exc
-
+def location_values(topic: str, payload: dict[str, Any], payload_text: str, received_at: datetime) -> dict[str, Any]:
     username, device = topic_identity(topic)
-    message_type = str(payload.get("_type") or payload.get("type") or "").strip().lower() or None
-    event_type = str(payload.get("event") or payload.get("transition") or "").strip().lower() or None
-    timestamp = payload_timestamp(payload, received_at)
-    lat = float_value(payload.get("lat"))
-    lon = float_value(payload.get("lon") or payload.get("lng"))
-    accuracy_m = float_value(payload.get("acc") or payload.get("accuracy"))
-    digest = message_hash(topic, payload_text)
+    return {
+        "topic": topic,
+        "username": username,
+        "device": device,
+        "message_hash": message_hash(topic, payload_text),
+        "received_at": received_at,
+        "timestamp": payload_timestamp(payload, received_at),
+        "message_type": str(payload.get("_type") or payload.get("type") or "").strip().lower() or None,
+        "event": str(payload.get("event") or payload.get("transition") or "").strip().lower() or None,
+        "tracker_id": str(payload.get("tid") or payload.get("t") or "")[:80] or None,
+        "lat": float_value(payload.get("lat")),
+        "lon": float_value(payload.get("lon") or payload.get("lng")),
+        "accuracy_m": float_value(payload.get("acc") or payload.get("accuracy")),
+        "velocity_kmh": float_value(payload.get("vel") or payload.get("velocity")),
+        "battery_percent": float_value(payload.get("batt") or payload.get("battery")),
+        "connection": str(payload.get("conn") or "")[:40] or None,
+        "regions": payload.get("inregions") or payload.get("regions"),
+        "payload": payload,
+    }
 
-    with SessionLocal() as session:
-        duplicate = session.execute(select(OwnTracksLocation.id).where(OwnTracksLocation.message_hash == digest)).scalar_one_or_none()
-        if duplicate is not None:
-            with STATE.lock:
-                STATE.messages_duplicate += 1
-            return {"stored": False, "duplicate": True, "id": duplicate}
 
-        location = OwnTracksLocation(
-            topic=topic,
-            username=username,
-            device=device,
-            message_hash=digest,
-            received_at=received_at,
-            timestamp=timestamp,
-            message_type=message_type,
-            event=event_type,
-            tracker_id=str(payload.get("tid") or payload.get("t") or "")[:80] or None,
-            lat=lat,
-            lon=lon,
-            accuracy_m=accuracy_m,
-            velocity_kmh=float_value(payload.get("vel") or payload.get("velocity")),
-            battery_percent=float_value(payload.get("batt") or payload.get("battery")),
-            connection=str(payload.get("conn") or "")[:40] or None,
-            regions=payload.get("inregions") or payload.get("regions"),
-            payload=payload,
+def insert_new_locations(session: Session, rows: list[dict[str, Any]]) -> dict[str, int]:
+    """Insert rows whose message hash is new; returns the new ids by hash."""
+    if engine.dialect.name in {"postgresql", "sqlite"}:
+        dialect_insert = postgresql_insert if engine.dialect.name == "postgresql" else sqlite_insert
+        stmt = (
+            dialect_insert(OwnTracksLocation)
+            .on_conflict_do_nothing(index_elements=[OwnTracksLocation.message_hash])
+            .returning(OwnTracksLocation.id, OwnTracksLocation.message_hash)
         )
-        session.add(location)
-        session.flush()
-        materialize_waypoints(session, location, payload)
-        materialize_zone_visits_for_location(session, location)
-
-        update_device_from_location(session, location)
-        session.commit()
+        return {digest: row_id for row_id, digest in session.execute(stmt, rows)}
+    existing = set(
+        session.execute(
+            select(OwnTracksLocation.message_hash).where(OwnTracksLocation.message_hash.in_([row["message_hash"] for row in rows]))
+        ).scalars()
+    )
+    inserted: dict[str, int] = {}
+    for row in rows:
+        if row["message_hash"] not in existing:
+            location = OwnTracksLocation(**row)
+            session.add(location)
+            session.flush()
+            inserted[row["message_hash"]] = location.id
+    return inserted
+
+
+def store_messages(messages: list[IngestMessage]) -> list[dict[str, Any]]:
+    """Store a micro-batch in one transaction; duplicates are skipped by the message hash constraint.
+
+    Messages are materialized device by device in arrival order, with a flush
+    after each so zone visits and waypoint events see the previous message.
+    """
+    results: list[dict[str, Any]] = []
+    rows: dict[str, dict[str, Any]] = {}
+    for message in messages:
+        topic = canonical_owntracks_topic(message.topic)
+        try:
+            payload = json.loads(message.payload_text)
+            if not isinstance(payload, dict):
+                raise ValueError("Payload is not a JSON object")
+        except Exception as exc:
+            with STATE.lock:
+                STATE.last_store_error = f"Invalid JSON: {exc}"
+            results.append({"stored": False, "duplicate": False, "topic": topic, "error": "Payload must be a JSON object"})
+            continue
+        values = location_values(topic, payload, message.payload_text, message.received_at)
+        results.append({"stored": False, "duplicate": True, "topic": topic, "messageType": values["message_type"], "hash": values["message_hash"]})
+        rows.setdefault(values["message_hash"], values)
+
+    stored = 0
+    if rows:
+        with SessionLocal() as session:
+            inserted = insert_new_locations(session, list(rows.values()))
+            locations = {
+                row.id: row
+                for row in session.execute(select(OwnTracksLocation).where(OwnTracksLocation.id.in_(list(inserted.values())))).scalars()
+            } if inserted else {}
+            by_topic: dict[str, list[OwnTracksLocation]] = {}
+            for digest, values in rows.items():
+                if digest in inserted:
+                    by_topic.setdefault(values["topic"], []).append(locations[inserted[digest]])
+            for topic_locations in by_topic.values():
+                for location in topic_locations:
+                    materialize_waypoints(session, location, location.payload or {})
+                    materialize_zone_visits_for_location(session, location)
+                    update_device_from_location(session, location)
+                    session.flush()
+            session.commit()
+        stored = len(inserted)
+        for result in results:
+            digest = result.pop("hash", None)
+            if digest is not None and digest in inserted:
+                result.update(stored=True, duplicate=False, id=inserted.pop(digest))
 
     with STATE.lock:
-        STATE.messages_stored += 1
-        STATE.last_store_error = None
-    return {"stored": True, "duplicate": False, "topic": topic, "messageType": message_type}
+        STATE.messages_received += len(messages)
+        STATE.messages_stored += stored
+        STATE.messages_duplicate += sum(1 for result in results if result.get("duplicate"))
+        if messages:
+            STATE.last_message_at = max(message.received_at for message in messages)
+        if stored:
+            STATE.last_store_error = None
+    return results
+
+
+def store_message(topic: str, payload_text: str) -> dict[str, Any]:
+    try:
+        payload = json.loads(payload_text)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        with STATE.lock:
+            STATE.messages_received += 1
+            STATE.last_store_error = "Invalid JSON: Payload is not a JSON object"
+        raise HTTPException(status_code=400, detail="Payload must be a JSON object")
+    return store_messages([IngestMessage(topic, payload_text, utc_now())])[0]
+
+
+INGEST_QUEUE = IngestQueue(
+    store_messages,
+    max_batch=INGEST_MAX_BATCH,
+    max_delay_seconds=INGEST_MAX_DELAY_MS / 1000,
+    max_pending=INGEST_MAX_PENDING,
+    logger=logger,
+)
 
 
 def update_device_from_location(session: Session, location: OwnTracksLocation) -> OwnTracksDevice:
@@ -2138,7 +2610,7 @@ OWNTRACKS_ADMIN_HTML = """
   <script>
     const params = new URLSearchParams(window.location.search);
     const token = params.get("token") || "";
-    const state = { map: null, layers: [] };
+    const state = { map: null, layers: [], trackLayer: null, trackHours: null, trackRequest: 0, locationOffset: 0 };
 
     function api(path, extra = {}) {
       const url = new URL(path, window.location.origin);
@@ -2241,17 +2713,6 @@ OWNTRACKS_ADMIN_HTML = """
         { label: "Varighet", key: "duration" },
         { label: "Status", render: row => `<span class="pill ${row.status === "open" ? "ok" : ""}">${esc(row.status)}</span>` },
       ]);
-      tablePanel("locationsPanel", "Siste posisjoner", [...(mapData.locations || [])].reverse().slice(0, 200), [
-        { label: "Tid", render: row => fmtTime(row.timestamp || row.receivedAt) },
-        { label: "Enhet", key: "topic" },
-        { label: "Type", key: "messageType" },
-        { label: "Event", key: "event" },
-        { label: "Opprinnelse", render: row => row.isSynthetic ? "Server" : "Telefon" },
-        { label: "Posisjon", render: row => mapsLink(row.lat, row.lon) },
-        { label: "Fra forrige", render: row => row.distanceFromPreviousM == null ? "-" : `${fmtNum(row.distanceFromPreviousM)} m` },
-        { label: "Noyaktighet", render: row => `${fmtNum(row.accuracyM)} m` },
-        { label: "Batteri", render: row => row.batteryPercent == null ? "-" : `${fmtNum(row.batteryPercent)} %` },
-      ]);
       tablePanel("waypointsPanel", "Waypoints", mapData.waypoints || [], [
         { label: "Navn", key: "waypointName" },
         { label: "Kategori", key: "category" },
@@ -2280,6 +2741,34 @@ OWNTRACKS_ADMIN_HTML = """
       ]);
     }
 
+    const LOCATION_PAGE_SIZE = 200;
+
+    async function loadLocations(offset = 0) {
+      const page = await fetchJson("/owntracks/api/map/locations", { hours: state.trackHours ?? 24, offset, limit: LOCATION_PAGE_SIZE });
+      state.locationOffset = page.offset;
+      tablePanel("locationsPanel", `Siste posisjoner ${page.total ? page.offset + 1 : 0}-${page.offset + page.locations.length} av ${page.total}`, page.locations, [
+        { label: "Tid", render: row => fmtTime(row.timestamp || row.receivedAt) },
+        { label: "Enhet", key: "topic" },
+        { label: "Type", key: "messageType" },
+        { label: "Event", key: "event" },
+        { label: "Opprinnelse", render: row => row.isSynthetic ? "Server" : "Telefon" },
+        { label: "Posisjon", render: row => mapsLink(row.lat, row.lon) },
+        { label: "Fra forrige", render: row => row.distanceFromPreviousM == null ? "-" : `${fmtNum(row.distanceFromPreviousM)} m` },
+        { label: "Noyaktighet", render: row => `${fmtNum(row.accuracyM)} m` },
+        { label: "Batteri", render: row => row.batteryPercent == null ? "-" : `${fmtNum(row.batteryPercent)} %` },
+      ]);
+      const pager = document.createElement("div");
+      pager.className = "actions";
+      [["Nyere", page.offset > 0, page.offset - LOCATION_PAGE_SIZE], ["Eldre", page.hasMore, page.offset + LOCATION_PAGE_SIZE]].forEach(([label, enabled, next]) => {
+        const button = document.createElement("button");
+        button.textContent = label;
+        button.disabled = !enabled;
+        button.addEventListener("click", () => loadLocations(Math.max(0, next)).catch(error => status(error.message || "Feil ved lasting", "err")));
+        pager.appendChild(button);
+      });
+      document.getElementById("locationsPanel").appendChild(pager);
+    }
+
     function ensureMap() {
       if (state.map || !window.L) return state.map;
       state.map = L.map("map", { scrollWheelZoom: true });
@@ -2288,9 +2777,58 @@ OWNTRACKS_ADMIN_HTML = """
         attribution: "&copy; OpenStreetMap"
       }).addTo(state.map);
       state.map.setView([61.115, 10.466], 13);
+      state.map.on("moveend", () => renderTracks().catch(error => console.error(error)));
       return state.map;
     }
 
+    function decodePolyline(value, precision) {
+      const factor = 10 ** precision;
+      const points = [];
+      let index = 0;
+      let lat = 0;
+      let lon = 0;
+      const nextDelta = () => {
+        let result = 0;
+        let shift = 0;
+        let byte = 0;
+        do {
+          byte = value.charCodeAt(index++) - 63;
+          result |= (byte & 0x1f) << shift;
+          shift += 5;
+        } while (byte >= 0x20);
+        return result & 1 ? ~(result >> 1) : result >> 1;
+      };
+      while (index < value.length) {
+        lat += nextDelta();
+        lon += nextDelta();
+        points.push([lat / factor, lon / factor]);
+      }
+      return points;
+    }
+
+    async function renderTracks() {
+      // The line is the simplified track for the visible area, refetched when the map moves.
+      const map = state.map;
+      if (!map || state.trackHours === null) return;
+      const request = ++state.trackRequest;
+      const bounds = map.getBounds();
+      const clamp = (value, limit) => Math.max(-limit, Math.min(limit, value)).toFixed(5);
+      const data = await fetchJson("/owntracks/api/map/tracks", {
+        hours: state.trackHours,
+        zoom: Math.round(map.getZoom()),
+        bbox: [clamp(bounds.getWest(), 180), clamp(bounds.getSouth(), 90), clamp(bounds.getEast(), 180), clamp(bounds.getNorth(), 90)].join(",")
+      });
+      if (request !== state.trackRequest) return;
+      const lines = (data.tracks || [])
+        .flatMap(track => track.segments.map(segment => segment.polyline !== undefined
+          ? decodePolyline(segment.polyline, data.precision)
+          : segment.lat.map((lat, index) => [lat, segment.lon[index]])))
+        .filter(line => line.length > 1);
+      if (state.trackLayer) map.removeLayer(state.trackLayer);
+      state.trackLayer = lines.length ? L.polyline(lines, { color: "#2563eb", weight: 3, opacity: 0.65 }).addTo(map) : null;
+      if (state.trackLayer) state.trackLayer.bringToBack();
+    }
+
     function clearMap() {
       if (!state.map) return;
       state.layers.forEach(layer => state.map.removeLayer(layer));
@@ -2303,7 +2841,7 @@ OWNTRACKS_ADMIN_HTML = """
       return layer;
     }
 
-    function renderMap(data) {
+    function renderMap(data, hours) {
       const map = ensureMap();
       if (!map) {
         document.getElementById("mapMeta").textContent = "Kartbibliotek kunne ikke lastes";
@@ -2311,18 +2849,13 @@ OWNTRACKS_ADMIN_HTML = """
       }
       clearMap();
       const bounds = [];
-      const locations = data.locations || [];
-      const points = locations.filter(row => Number.isFinite(Number(row.lat)) && Number.isFinite(Number(row.lon)));
-      if (points.length > 1) {
-        addLayer(L.polyline(points.map(row => [row.lat, row.lon]), { color: "#2563eb", weight: 3, opacity: 0.65 }));
+      // The line comes from the track endpoint; the map payload only carries the latest point and the bounds.
+      if (data.mapBounds) bounds.push([data.mapBounds[1], data.mapBounds[0]], [data.mapBounds[3], data.mapBounds[2]]);
+      const latest = (data.mapLocations || []).filter(row => Number.isFinite(Number(row.lat)) && Number.isFinite(Number(row.lon))).pop();
+      if (latest) {
+        addLayer(L.circleMarker([latest.lat, latest.lon], { radius: 7, color: "#2563eb", fillColor: "#2563eb", fillOpacity: 0.9 })
+          .bindPopup(`<b>${esc(latest.topic)}</b><br>${fmtTime(latest.timestamp || latest.receivedAt)}<br>${fmtNum(latest.accuracyM)} m`));
       }
-      points.forEach((row, index) => {
-        bounds.push([row.lat, row.lon]);
-        if (index === points.length - 1) {
-          addLayer(L.circleMarker([row.lat, row.lon], { radius: 7, color: "#2563eb", fillColor: "#2563eb", fillOpacity: 0.9 })
-            .bindPopup(`<b>${esc(row.topic)}</b><br>${fmtTime(row.timestamp || row.receivedAt)}<br>${fmtNum(row.accuracyM)} m`));
-        }
-      });
       (data.devices || []).forEach(row => {
         if (!Number.isFinite(Number(row.lastLat)) || !Number.isFinite(Number(row.lastLon))) return;
         bounds.push([row.lastLat, row.lastLon]);
@@ -2340,7 +2873,9 @@ OWNTRACKS_ADMIN_HTML = """
         }).bindPopup(`<b>${esc(row.waypointName)}</b><br>${row.isInside ? "Inne" : "Ute"}<br>Radius ${fmtNum(row.radiusM)} m`));
       });
       if (bounds.length) map.fitBounds(bounds, { padding: [28, 28], maxZoom: 16 });
-      document.getElementById("mapMeta").textContent = `${points.length} posisjoner, ${(data.waypoints || []).length} waypoints`;
+      state.trackHours = hours;
+      renderTracks().catch(error => console.error(error));
+      document.getElementById("mapMeta").textContent = `${data.qualityPolicy?.mapLocations ?? 0} posisjoner, ${(data.waypoints || []).length} waypoints`;
     }
 
     async function refresh() {
@@ -2348,14 +2883,16 @@ OWNTRACKS_ADMIN_HTML = """
       button.disabled = true;
       try {
         const hours = document.getElementById("hours").value;
+        const samePeriod = state.trackHours === hours;
         const [health, moduleData, mapData] = await Promise.all([
           fetchJson("/owntracks/health"),
           fetchJson("/owntracks/api/module"),
-          fetchJson("/owntracks/api/map", { hours, limit: 5000 })
+          fetchJson("/owntracks/api/map", { hours, limit: 5000, points: 0 })
         ]);
         renderMetrics(health, moduleData);
         renderTables(moduleData, mapData);
-        renderMap(mapData);
+        renderMap(mapData, hours);
+        await loadLocations(samePeriod ? state.locationOffset : 0);
         status(`Oppdatert ${new Date().toLocaleTimeString("no-NO")}`);
       } catch (error) {
         console.error(error);
@@ -2398,7 +2935,14 @@ async def lifespan(_: FastAPI):
     Base.metadata.create_all(engine)
     ensure_owntracks_schema()
     normalize_existing_owntracks_data()
-    yield
+    load_geocode_cache()
+    GEOCODER.start()
+    INGEST_QUEUE.start()
+    try:
+        yield
+    finally:
+        await INGEST_QUEUE.stop()
+        await GEOCODER.stop()
 
 
 app = FastAPI(title="OwnTracks service", lifespan=lifespan)
@@ -2494,6 +3038,9 @@ def service_root() -> dict[str, Any]:
         "admin": "/",
         "publish": "/pub",
         "map": "/owntracks/api/map",
+        "mapLocations": "/owntracks/api/map/locations",
+        "mapTracks": "/owntracks/api/map/tracks",
+        "mapTiles": "/owntracks/api/map/tiles/{z}/{x}/{y}",
         "fibaroSummary": "/api/owntracks/fibaro-summary",
     }
 
@@ -2528,7 +3075,13 @@ def health_payload() -> dict[str, Any]:
         "service": "owntracks_service",
         "app": owntracks_build_summary(),
         "database": "ok",
-        "ingest": {"mode": "http", "path": "/pub", "authTokenEnabled": bool(HTTP_TOKEN)},
+        "ingest": {
+            "mode": "http",
+            "path": "/pub",
+            "authTokenEnabled": bool(HTTP_TOKEN),
+            "waitForStore": INGEST_WAIT_FOR_STORE,
+            "queue": INGEST_QUEUE.payload(),
+        },
         "public": {
             "baseUrl": OWNTRACKS_PUBLIC_BASE_URL,
             "publishUrl": f"{OWNTRACKS_PUBLIC_BASE_URL}/pub",
@@ -2542,6 +3095,8 @@ def health_payload() -> dict[str, Any]:
         },
         "state": state,
         "counts": counts,
+        "trackCache": TRACK_DAY_CACHE.snapshot(),
+        "geocoding": GEOCODER.payload(),
         "time": iso_dt(utc_now()),
     }
 
@@ -2594,7 +3149,7 @@ async def owntracks_http_publish(request: Request) -> list[Any]:
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     topic = http_topic(request, normalized_payload)
-    store_message(topic, json_string(normalized_payload))
+    await INGEST_QUEUE.submit(IngestMessage(topic, json_string(normalized_payload), utc_now()), wait=INGEST_WAIT_FOR_STORE)
     return []
 
 
@@ -2792,16 +3347,7 @@ def api_waypoint_suggestions(
 ) -> dict[str, Any]:
     since = utc_now() - timedelta(hours=hours) if hours else None
     with SessionLocal() as session:
-        location_stmt = (
-            select(OwnTracksLocation)
-            .where(OwnTracksLocation.lat.isnot(None))
-            .where(OwnTracksLocation.lon.isnot(None))
-            .order_by(OwnTracksLocation.timestamp.asc().nullslast(), OwnTracksLocation.received_at.asc())
-        )
-        if since is not None:
-            location_stmt = location_stmt.where(or_(OwnTracksLocation.timestamp >= since, OwnTracksLocation.received_at >= since))
-        locations = list(session.execute(location_stmt).scalars())
-        existing_waypoints = list(
+        existing_waypoints = WaypointIndex(
             session.execute(
                 select(OwnTracksWaypointState)
                 .where(OwnTracksWaypointState.lat.isnot(None))
@@ -2810,27 +3356,29 @@ def api_waypoint_suggestions(
             ).scalars()
         )
         clusters = stop_clusters_from_locations(
-            locations,
+            read_stop_points(session, since, max_accuracy_m),
             min_duration_minutes=min_minutes,
             radius_m=radius_m,
-            max_accuracy_m=max_accuracy_m,
             max_gap_minutes=STOP_SUGGESTION_MAX_GAP_MINUTES,
         )
         merged = merge_stop_candidates(clusters, merge_radius_m=max(radius_m, DEFAULT_LOCAL_WAYPOINT_RADIUS_M))
         suggestions: list[StopCandidate] = []
+        addresses_pending = 0
         for candidate in merged:
             if candidate_is_near_existing_waypoint(candidate, existing_waypoints, radius_m=max(radius_m, candidate.radius_m)):
                 continue
             if include_address:
-                geocode = reverse_geocode(session, candidate.lat, candidate.lon)
-                candidate.suggested_name = geocode.get("name")
-                candidate.address = geocode.get("address")
+                geocode = GEOCODER.lookup(candidate.lat, candidate.lon)
+                if geocode is not None:
+                    candidate.suggested_name = geocode.name
+                    candidate.address = geocode.address
+                elif GEOCODER.enabled:
+                    addresses_pending += 1
             if not candidate.suggested_name:
                 candidate.suggested_name = f"Stopp {candidate.lat:.5f}, {candidate.lon:.5f}"
             suggestions.append(candidate)
             if len(suggestions) >= limit:
                 break
-        session.commit()
         return {
             "parameters": {
                 "hours": hours,
@@ -2840,6 +3388,7 @@ def api_waypoint_suggestions(
                 "limit": limit,
                 "includeAddress": include_address,
             },
+            "addressesPending": addresses_pending,
             "suggestions": [row_stop_candidate(candidate) for candidate in suggestions],
         }
 
@@ -2865,6 +3414,15 @@ def owntracks_external_waypoint_suggestions(
     )
 
 
+def location_bounds(rows: list[OwnTracksLocation]) -> Optional[list[float]]:
+    """[min_lon, min_lat, max_lon, max_lat] of the rows, or None without rows."""
+    lats = [float(row.lat) for row in rows]
+    lons = [float(row.lon) for row in rows]
+    if not lats:
+        return None
+    return [min(lons), min(lats), max(lons), max(lats)]
+
+
 @app.get("/api/owntracks/map")
 def api_map(
     hours: int = Query(24, ge=0, le=24 * 365),
@@ -2873,7 +3431,14 @@ def api_map(
     end: Optional[str] = Query(None),
     from_time: Optional[str] = Query(None, alias="from"),
     to_time: Optional[str] = Query(None, alias="to"),
+    points: bool = Query(True),
 ) -> dict[str, Any]:
+    """Markers, zone visits and location counts for the period.
+
+    ``points=false`` is for clients that draw the line from the track tiles:
+    only the latest usable location and the bounds of the rest are returned,
+    and the raw rows are paged from /api/owntracks/map/locations.
+    """
     range_start = parse_query_datetime(start or from_time, "start")
     range_end = parse_query_datetime(end or to_time, "end")
     validate_time_range(range_start, range_end)
@@ -2939,8 +3504,10 @@ def api_map(
             "start": iso_dt(since),
             "end": iso_dt(range_end),
             "filterMode": "custom" if range_start is not None or range_end is not None else "relative",
-            "locations": row_locations_with_distances(locations),
-            "mapLocations": row_locations_with_distances(map_locations),
+            "locations": row_locations_with_distances(locations) if points else [],
+            "mapLocations": row_locations_with_distances(map_locations if points else map_locations[-1:]),
+            "mapBounds": location_bounds(map_locations),
+            "pointsIncluded": points,
             "devices": [row_device(row) for row in devices],
             "waypoints": waypoint_list,
             "waypointDefinitions": waypoint_list,
@@ -2968,9 +3535,250 @@ def owntracks_external_map(
     end: Optional[str] = Query(None),
     from_time: Optional[str] = Query(None, alias="from"),
     to_time: Optional[str] = Query(None, alias="to"),
+    points: bool = Query(True),
+) -> dict[str, Any]:
+    require_owntracks_admin(request)
+    return api_map(hours=hours, limit=limit, start=start, end=end, from_time=from_time, to_time=to_time, points=points)
+
+
+@app.get("/api/owntracks/map/locations")
+def api_map_locations(
+    hours: int = Query(24, ge=0, le=24 * 365),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    from_time: Optional[str] = Query(None, alias="from"),
+    to_time: Optional[str] = Query(None, alias="to"),
+) -> dict[str, Any]:
+    """One page of raw locations, newest first, with the distance from the topic's previous location."""
+    range_start = parse_query_datetime(start or from_time, "start")
+    range_end = parse_query_datetime(end or to_time, "end")
+    validate_time_range(range_start, range_end)
+    since = range_start or (utc_now() - timedelta(hours=hours) if hours else None)
+    location_time_expr = func.coalesce(OwnTracksLocation.timestamp, OwnTracksLocation.received_at)
+    conditions = [OwnTracksLocation.lat.isnot(None), OwnTracksLocation.lon.isnot(None)]
+    if since is not None:
+        conditions.append(location_time_expr >= since)
+    if range_end is not None:
+        conditions.append(location_time_expr <= range_end)
+    # The previous location is looked up over the whole period, so a page never starts without distances.
+    chronological = {"partition_by": OwnTracksLocation.topic, "order_by": (location_time_expr, OwnTracksLocation.id)}
+    previous = (
+        select(
+            OwnTracksLocation.id.label("id"),
+            func.lag(OwnTracksLocation.lat).over(**chronological).label("previous_lat"),
+            func.lag(OwnTracksLocation.lon).over(**chronological).label("previous_lon"),
+        )
+        .where(*conditions)
+        .subquery()
+    )
+    with SessionLocal() as session:
+        total = session.execute(select(func.count()).select_from(OwnTracksLocation).where(*conditions)).scalar_one()
+        rows = session.execute(
+            select(OwnTracksLocation, previous.c.previous_lat, previous.c.previous_lon)
+            .join(previous, previous.c.id == OwnTracksLocation.id)
+            .order_by(location_time_expr.desc(), OwnTracksLocation.id.desc())
+            .offset(offset)
+            .limit(limit)
+        ).all()
+        locations = [
+            row_location(
+                row,
+                distance_meters(float(previous_lat), float(previous_lon), float(row.lat), float(row.lon))
+                if previous_lat is not None and previous_lon is not None
+                else None,
+            )
+            for row, previous_lat, previous_lon in rows
+        ]
+    return {
+        "start": iso_dt(since),
+        "end": iso_dt(range_end),
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "hasMore": offset + len(locations) < total,
+        "locations": locations,
+    }
+
+
+@app.get("/owntracks/api/map/locations")
+def owntracks_external_map_locations(
+    request: Request,
+    hours: int = Query(24, ge=0, le=24 * 365),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    from_time: Optional[str] = Query(None, alias="from"),
+    to_time: Optional[str] = Query(None, alias="to"),
+) -> dict[str, Any]:
+    require_owntracks_admin(request)
+    return api_map_locations(
+        hours=hours,
+        offset=offset,
+        limit=limit,
+        start=start,
+        end=end,
+        from_time=from_time,
+        to_time=to_time,
+    )
+
+
+def map_tracks_payload(
+    *,
+    hours: int,
+    start: Optional[str],
+    end: Optional[str],
+    zoom: int,
+    bbox: Optional[tuple[float, float, float, float]],
+    topic: Optional[str],
+    output_format: str,
+) -> dict[str, Any]:
+    if output_format not in {"polyline", "arrays"}:
+        raise HTTPException(status_code=400, detail="format må være polyline eller arrays")
+    range_start = parse_query_datetime(start, "start")
+    range_end = parse_query_datetime(end, "end")
+    validate_time_range(range_start, range_end)
+    until = range_end or utc_now()
+    zoom = max(MIN_TRACK_ZOOM, min(MAX_TRACK_ZOOM, zoom))
+    with SessionLocal() as session:
+        since = range_start or (until - timedelta(hours=hours) if hours else None)
+        if since is None:
+            location_time_expr = func.coalesce(OwnTracksLocation.timestamp, OwnTracksLocation.received_at)
+            since = session.execute(select(func.min(location_time_expr))).scalar_one_or_none() or until
+        days, cached_days = load_track_days(session, since, until, topic or None, zoom)
+    tracks = track_payload(days, since, until, bbox, output_format)
+    return {
+        "start": iso_dt(since),
+        "end": iso_dt(until),
+        "zoom": zoom,
+        "bbox": list(bbox) if bbox else None,
+        "format": output_format,
+        "precision": 5 if output_format == "polyline" else 6,
+        "tracks": tracks,
+        "summary": {
+            "days": len(days),
+            "cachedDays": cached_days,
+            "rawPoints": sum(track["rawPoints"] for track in tracks),
+            "points": sum(track["points"] for track in tracks),
+            "stops": sum(len(track["stops"]) for track in tracks),
+            "simplifyPixels": TRACK_SIMPLIFY_PIXELS,
+            "maxCalculationAccuracyM": MAX_CALCULATION_ACCURACY_M,
+        },
+    }
+
+
+def bbox_query(value: Optional[str]) -> Optional[tuple[float, float, float, float]]:
+    try:
+        return parse_bbox(value)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="bbox må være min_lon,min_lat,max_lon,max_lat") from exc
+
+
+@app.get("/api/owntracks/map/tracks")
+def api_map_tracks(
+    hours: int = Query(168, ge=0, le=24 * 365),
+    zoom: int = Query(14, ge=0, le=22),
+    bbox: Optional[str] = Query(None),
+    topic: Optional[str] = Query(None),
+    output_format: str = Query("polyline", alias="format"),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    from_time: Optional[str] = Query(None, alias="from"),
+    to_time: Optional[str] = Query(None, alias="to"),
+) -> dict[str, Any]:
+    return map_tracks_payload(
+        hours=hours,
+        start=start or from_time,
+        end=end or to_time,
+        zoom=zoom,
+        bbox=bbox_query(bbox),
+        topic=topic,
+        output_format=output_format,
+    )
+
+
+@app.get("/api/owntracks/map/tiles/{z}/{x}/{y}")
+def api_map_tile(
+    z: int,
+    x: int,
+    y: int,
+    hours: int = Query(168, ge=0, le=24 * 365),
+    topic: Optional[str] = Query(None),
+    output_format: str = Query("polyline", alias="format"),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    from_time: Optional[str] = Query(None, alias="from"),
+    to_time: Optional[str] = Query(None, alias="to"),
+) -> dict[str, Any]:
+    if not 0 <= z <= 22 or not 0 <= x < 2**z or not 0 <= y < 2**z:
+        raise HTTPException(status_code=400, detail="Ugyldig kartflis")
+    return map_tracks_payload(
+        hours=hours,
+        start=start or from_time,
+        end=end or to_time,
+        zoom=z,
+        bbox=tile_bbox(z, x, y),
+        topic=topic,
+        output_format=output_format,
+    )
+
+
+@app.get("/owntracks/api/map/tracks")
+def owntracks_external_map_tracks(
+    request: Request,
+    hours: int = Query(168, ge=0, le=24 * 365),
+    zoom: int = Query(14, ge=0, le=22),
+    bbox: Optional[str] = Query(None),
+    topic: Optional[str] = Query(None),
+    output_format: str = Query("polyline", alias="format"),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    from_time: Optional[str] = Query(None, alias="from"),
+    to_time: Optional[str] = Query(None, alias="to"),
 ) -> dict[str, Any]:
     require_owntracks_admin(request)
-    return api_map(hours=hours, limit=limit, start=start, end=end, from_time=from_time, to_time=to_time)
+    return api_map_tracks(
+        hours=hours,
+        zoom=zoom,
+        bbox=bbox,
+        topic=topic,
+        output_format=output_format,
+        start=start,
+        end=end,
+        from_time=from_time,
+        to_time=to_time,
+    )
+
+
+@app.get("/owntracks/api/map/tiles/{z}/{x}/{y}")
+def owntracks_external_map_tile(
+    request: Request,
+    z: int,
+    x: int,
+    y: int,
+    hours: int = Query(168, ge=0, le=24 * 365),
+    topic: Optional[str] = Query(None),
+    output_format: str = Query("polyline", alias="format"),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    from_time: Optional[str] = Query(None, alias="from"),
+    to_time: Optional[str] = Query(None, alias="to"),
+) -> dict[str, Any]:
+    require_owntracks_admin(request)
+    return api_map_tile(
+        z=z,
+        x=x,
+        y=y,
+        hours=hours,
+        topic=topic,
+        output_format=output_format,
+        start=start,
+        end=end,
+        from_time=from_time,
+        to_time=to_time,
+    )
 
 
 @app.get("/api/owntracks/visits")
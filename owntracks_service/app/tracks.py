@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import math
+from typing import Iterable, Optional, Sequence
+
+
+METERS_PER_DEGREE = 6371000.0 * math.pi / 180
+# Ground resolution of a 256 px web mercator tile at zoom 0, in metres per pixel at the equator.
+EQUATOR_METERS_PER_PIXEL = 156543.03392
+MIN_TRACK_ZOOM = 3
+MAX_TRACK_ZOOM = 19
+
+
+def meters_per_pixel(zoom: int, lat: float) -> float:
+    return EQUATOR_METERS_PER_PIXEL * math.cos(math.radians(lat)) / (2**zoom)
+
+
+def simplify_track(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    accuracies: Sequence[Optional[float]],
+    tolerance_m: float,
+    keep: Iterable[int] = (),
+) -> list[int]:
+    """Douglas-Peucker over metre offsets; returns the indexes to keep, in order.
+
+    A point only counts as a corner when it lies further from the simplified
+    line than its own accuracy radius plus ``tolerance_m``, so GPS jitter is
+    dropped before real turns. ``keep`` indexes (stop arrivals and departures)
+    always survive and split the track into independently simplified parts.
+    """
+    count = len(lats)
+    if count <= 2:
+        return list(range(count))
+    origin_lat = lats[0]
+    origin_lon = lons[0]
+    meters_per_lon = METERS_PER_DEGREE * math.cos(math.radians(origin_lat))
+    xs = [(lon - origin_lon) * meters_per_lon for lon in lons]
+    ys = [(lat - origin_lat) * METERS_PER_DEGREE for lat in lats]
+    kept = [False] * count
+    anchors = sorted({0, count - 1, *(index for index in keep if 0 <= index < count)})
+    for index in anchors:
+        kept[index] = True
+    stack = list(zip(anchors, anchors[1:]))
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        length = math.hypot(dx, dy)
+        worst_index = -1
+        worst_excess = tolerance_m
+        for index in range(first + 1, last):
+            px, py = xs[index] - ax, ys[index] - ay
+            if length:
+                along = max(0.0, min(1.0, (px * dx + py * dy) / (length * length)))
+                distance = math.hypot(px - along * dx, py - along * dy)
+            else:
+                distance = math.hypot(px, py)
+            excess = distance - (accuracies[index] or 0.0)
+            if excess > worst_excess:
+                worst_index = index
+                worst_excess = excess
+        if worst_index >= 0:
+            kept[worst_index] = True
+            stack.append((first, worst_index))
+            stack.append((worst_index, last))
+    return [index for index in range(count) if kept[index]]
+
+
+def _encode_value(value: int, out: list[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(lats: Iterable[float], lons: Iterable[float], precision: int = 5) -> str:
+    """Google encoded polyline format, readable by Leaflet/MapLibre polyline decoders."""
+    factor = 10**precision
+    out: list[str] = []
+    previous_lat = previous_lon = 0
+    for lat, lon in zip(lats, lons):
+        scaled_lat = int(round(lat * factor))
+        scaled_lon = int(round(lon * factor))
+        _encode_value(scaled_lat - previous_lat, out)
+        _encode_value(scaled_lon - previous_lon, out)
+        previous_lat, previous_lon = scaled_lat, scaled_lon
+    return "".join(out)
+
+
+def decode_polyline(value: str, precision: int = 5) -> list[tuple[float, float]]:
+    factor = 10**precision
+    points: list[tuple[float, float]] = []
+    index = lat = lon = 0
+    while index < len(value):
+        deltas = []
+        for _axis in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(value[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
+
+
+def delta_encode(values: Iterable[int]) -> list[int]:
+    """First value absolute, the rest as differences; small integers keep JSON short."""
+    result: list[int] = []
+    previous = 0
+    for value in values:
+        result.append(value - previous)
+        previous = value
+    return result
+
+
+def tile_bbox(zoom: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(min_lon, min_lat, max_lon, max_lat) of an XYZ web mercator tile."""
+    scale = 2**zoom
+
+    def lat_at(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / scale))))
+
+    return (x / scale * 360.0 - 180.0, lat_at(y + 1), (x + 1) / scale * 360.0 - 180.0, lat_at(y))
+
+
+def parse_bbox(value: Optional[str]) -> Optional[tuple[float, float, float, float]]:
+    """``min_lon,min_lat,max_lon,max_lat``; raises ValueError for anything else."""
+    if not value:
+        return None
+    parts = [float(part) for part in value.split(",")]
+    if len(parts) != 4 or not all(math.isfinite(part) for part in parts):
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox minimum must not exceed maximum")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def clip_runs(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    bbox: Optional[tuple[float, float, float, float]],
+) -> list[tuple[int, int]]:
+    """Index ranges (inclusive start, exclusive end) that touch ``bbox``.
+
+    The point before and after each inside run is included, so lines that
+    cross the edge of a tile still reach it.
+    """
+    count = len(lats)
+    if bbox is None:
+        return [(0, count)] if count else []
+    min_lon, min_lat, max_lon, max_lat = bbox
+    runs: list[tuple[int, int]] = []
+    start: Optional[int] = None
+    for index in range(count):
+        inside = min_lat <= lats[index] <= max_lat and min_lon <= lons[index] <= max_lon
+        if inside and start is None:
+            start = max(0, index - 1)
+        elif not inside and start is not None:
+            runs.append((start, index + 1))
+            start = None
+    if start is not None:
+        runs.append((start, count))
+    merged: list[tuple[int, int]] = []
+    for run_start, run_end in runs:
+        if merged and run_start < merged[-1][1]:
+            merged[-1] = (merged[-1][0], run_end)
+        else:
+            merged.append((run_start, run_end))
+    return merged
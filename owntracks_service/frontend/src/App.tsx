@@ -53,7 +53,10 @@ import type {
   EventRow,
   HealthPayload,
   LocationRow,
+  MapLocationsPage,
   MapPayload,
+  MapTrackSegment,
+  MapTracksPayload,
   MessageGroupRow,
   ModulePayload,
   TimeFilterMode,
@@ -71,6 +74,9 @@ const { Header, Sider, Content } = Layout;
 const MENU_HIDDEN_STORAGE_KEY = "owntracks:mainMenuHidden";
 const MAP_LAYER_IDS = ["owntracks-waypoints-fill", "owntracks-waypoints-line", "owntracks-track-line"];
 const MAP_SOURCE_IDS = ["owntracks-waypoints", "owntracks-track"];
+const TRACK_TILES_SOURCE_ID = "owntracks-track-tiles";
+const TRACK_TILES_LAYER_ID = "owntracks-track-tiles-line";
+const LOCATION_PAGE_SIZE = 200;
 const CATEGORY_ALL = "__all__";
 const CATEGORY_NONE = "__none__";
 
@@ -275,6 +281,58 @@ function circlePolygon(lon: number, lat: number, radiusM: number, steps = 64) {
   return coordinates;
 }
 
+function decodePolyline(value: string, precision: number) {
+  const factor = 10 ** precision;
+  const coordinates: Array<[number, number]> = [];
+  let index = 0;
+  let lat = 0;
+  let lon = 0;
+  const nextDelta = () => {
+    let result = 0;
+    let shift = 0;
+    let byte = 0;
+    do {
+      byte = value.charCodeAt(index) - 63;
+      index += 1;
+      result |= (byte & 0x1f) << shift;
+      shift += 5;
+    } while (byte >= 0x20);
+    return result & 1 ? ~(result >> 1) : result >> 1;
+  };
+  while (index < value.length) {
+    lat += nextDelta();
+    lon += nextDelta();
+    coordinates.push([lon / factor, lat / factor]);
+  }
+  return coordinates;
+}
+
+function trackSegmentCoordinates(segment: MapTrackSegment, precision: number) {
+  if (segment.polyline !== undefined) return decodePolyline(segment.polyline, precision);
+  const lats = segment.lat || [];
+  const lons = segment.lon || [];
+  return lats.map((lat, index) => [lons[index], lat] as [number, number]);
+}
+
+function visibleTrackTiles(map: maplibregl.Map) {
+  // Whole slippy-map tiles at the current zoom, so panning reuses tiles already fetched.
+  const zoom = Math.max(0, Math.min(22, Math.floor(map.getZoom())));
+  const size = 2 ** zoom;
+  const bounds = map.getBounds();
+  const tileX = (lon: number) => Math.max(0, Math.min(size - 1, Math.floor(((lon + 180) / 360) * size)));
+  const tileY = (lat: number) => {
+    const latRad = (Math.max(-85.0511, Math.min(85.0511, lat)) * Math.PI) / 180;
+    return Math.max(0, Math.min(size - 1, Math.floor(((1 - Math.log(Math.tan(latRad) + 1 / Math.cos(latRad)) / Math.PI) / 2) * size)));
+  };
+  const tiles: string[] = [];
+  for (let x = tileX(bounds.getWest()); x <= tileX(bounds.getEast()); x += 1) {
+    for (let y = tileY(bounds.getNorth()); y <= tileY(bounds.getSouth()); y += 1) {
+      tiles.push(`${zoom}/${x}/${y}`);
+    }
+  }
+  return tiles;
+}
+
 function createMapMarker(className: string, label?: string) {
   const element = document.createElement("div");
   element.className = `map-marker ${className}`;
@@ -436,7 +494,15 @@ function DataTable<T extends { id?: number | string }>({ columns, data, rowKey,
   return <Table<T> size="small" columns={columns} dataSource={data} rowKey={rowKey || "id"} pagination={{ pageSize: 20, showSizeChanger: false }} scroll={{ x: true }} />;
 }
 
-function OwnTracksMap({ data, large = false }: { data?: MapPayload | null; large?: boolean }) {
+function OwnTracksMap({
+  data,
+  trackParams,
+  large = false,
+}: {
+  data?: MapPayload | null;
+  trackParams?: Record<string, string | number> | null;
+  large?: boolean;
+}) {
   const mapElementRef = useRef<HTMLDivElement | null>(null);
   const mapRef = useRef<maplibregl.Map | null>(null);
   const markerRef = useRef<maplibregl.Marker[]>([]);
@@ -507,7 +573,8 @@ function OwnTracksMap({ data, large = false }: { data?: MapPayload | null; large
       lastFallbackPoint = [lon, lat];
     };
     const points = (data?.mapLocations || []).filter((row) => Number.isFinite(Number(row.lat)) && Number.isFinite(Number(row.lon)));
-    if (points.length > 1) {
+    // With trackParams the line comes from the simplified track tiles below.
+    if (!trackParams && points.length > 1) {
       map.addSource("owntracks-track", {
         type: "geojson",
         data: {
@@ -527,9 +594,15 @@ function OwnTracksMap({ data, large = false }: { data?: MapPayload | null; large
         paint: { "line-color": "#2563eb", "line-opacity": 0.7, "line-width": 3 },
       });
     }
+    if (data?.mapBounds) {
+      // Without raw points the server sends the bounds of the usable ones.
+      const [minLon, minLat, maxLon, maxLat] = data.mapBounds;
+      extendPrimaryBounds(minLon, minLat);
+      extendPrimaryBounds(maxLon, maxLat);
+    }
     points.forEach((row, index) => {
       if (row.lat === undefined || row.lon === undefined) return;
-      extendPrimaryBounds(Number(row.lon), Number(row.lat));
+      if (!data?.mapBounds) extendPrimaryBounds(Number(row.lon), Number(row.lat));
       if (index === points.length - 1) {
         const marker = new maplibregl.Marker({ element: createMapMarker("location-marker"), anchor: "center" })
           .setLngLat([Number(row.lon), Number(row.lat)])
@@ -623,7 +696,72 @@ function OwnTracksMap({ data, large = false }: { data?: MapPayload | null; large
     } else if (fallbackPointCount > 1) {
       map.fitBounds(fallbackBounds, { padding: fitPadding, maxZoom: 17, duration: 300 });
     }
-  }, [data, large, mapReady]);
+  }, [data, large, mapReady, trackParams]);
+
+  useEffect(() => {
+    const map = mapRef.current;
+    if (!map || !mapReady) return undefined;
+    if (!trackParams) {
+      if (map.getLayer(TRACK_TILES_LAYER_ID)) map.removeLayer(TRACK_TILES_LAYER_ID);
+      if (map.getSource(TRACK_TILES_SOURCE_ID)) map.removeSource(TRACK_TILES_SOURCE_ID);
+      return undefined;
+    }
+    // New map data means new points, so tiles are refetched rather than reused.
+    const tiles = new Map<string, Promise<MapTracksPayload | null>>();
+    let cancelled = false;
+    const render = async () => {
+      const keys = visibleTrackTiles(map);
+      keys.forEach((key) => {
+        if (!tiles.has(key)) {
+          tiles.set(
+            key,
+            fetchJson<MapTracksPayload>(`/owntracks/api/map/tiles/${key}`, trackParams).catch(() => {
+              tiles.delete(key);
+              return null;
+            }),
+          );
+        }
+      });
+      const payloads = await Promise.all(keys.map((key) => tiles.get(key)));
+      if (cancelled) return;
+      const features = payloads.flatMap((payload) =>
+        (payload?.tracks || []).flatMap((track) =>
+          track.segments
+            .map((segment) => trackSegmentCoordinates(segment, payload?.precision ?? 5))
+            .filter((coordinates) => coordinates.length > 1)
+            .map((coordinates) => ({
+              type: "Feature" as const,
+              properties: { topic: track.topic },
+              geometry: { type: "LineString" as const, coordinates },
+            })),
+        ),
+      );
+      const collection = { type: "FeatureCollection" as const, features };
+      const source = map.getSource(TRACK_TILES_SOURCE_ID) as maplibregl.GeoJSONSource | undefined;
+      if (source) {
+        source.setData(collection);
+        return;
+      }
+      map.addSource(TRACK_TILES_SOURCE_ID, { type: "geojson", data: collection });
+      map.addLayer(
+        {
+          id: TRACK_TILES_LAYER_ID,
+          type: "line",
+          source: TRACK_TILES_SOURCE_ID,
+          layout: { "line-cap": "round", "line-join": "round" },
+          paint: { "line-color": "#2563eb", "line-opacity": 0.7, "line-width": 3 },
+        },
+        map.getLayer("owntracks-waypoints-fill") ? "owntracks-waypoints-fill" : undefined,
+      );
+    };
+    const onMoveEnd = () => void render();
+    map.on("moveend", onMoveEnd);
+    void render();
+    return () => {
+      cancelled = true;
+      map.off("moveend", onMoveEnd);
+    };
+  }, [data, mapReady, trackParams]);
 
   return <div className={large ? "owntracks-map large" : "owntracks-map"} ref={mapElementRef} />;
 }
@@ -737,6 +875,8 @@ export default function App() {
   const [health, setHealth] = useState<HealthPayload | null>(null);
   const [moduleData, setModuleData] = useState<ModulePayload | null>(null);
   const [mapData, setMapData] = useState<MapPayload | null>(null);
+  const [locationPages, setLocationPages] = useState<MapLocationsPage | null>(null);
+  const [locationsLoading, setLocationsLoading] = useState(false);
   const [zoneSummary, setZoneSummary] = useState<ZoneSummaryPayload | null>(null);
   const [diagnostics, setDiagnostics] = useState<DiagnosticsPayload | null>(null);
   const [suggestions, setSuggestions] = useState<WaypointSuggestionRow[]>([]);
@@ -777,7 +917,8 @@ export default function App() {
       const [nextHealth, nextModule, nextMap, nextZoneSummary, nextDiagnostics] = await Promise.all([
         fetchJson<HealthPayload>("/owntracks/health"),
         fetchJson<ModulePayload>("/owntracks/api/module"),
-        fetchJson<MapPayload>("/owntracks/api/map", { ...timeParams, limit: 5000 }),
+        // The line comes from the track tiles and the message table pages on demand, so no raw points here.
+        fetchJson<MapPayload>("/owntracks/api/map", { ...timeParams, limit: 5000, points: 0 }),
         fetchJson<ZoneSummaryPayload>("/owntracks/api/zone-summary", { ...timeParams, limit: 100 }),
         fetchJson<DiagnosticsPayload>("/owntracks/api/diagnostics", timeParams),
       ]);
@@ -799,6 +940,27 @@ export default function App() {
     return () => window.clearInterval(timer);
   }, [load]);
 
+  const loadLocations = useCallback(
+    async (offset: number) => {
+      setLocationsLoading(true);
+      try {
+        const page = await fetchJson<MapLocationsPage>("/owntracks/api/map/locations", { ...timeParams, offset, limit: LOCATION_PAGE_SIZE });
+        setLocationPages((previous) =>
+          offset > 0 && previous ? { ...page, offset: previous.offset, locations: [...previous.locations, ...page.locations] } : page,
+        );
+      } catch (err) {
+        message.error(err instanceof Error ? err.message : "Kunne ikke hente meldinger");
+      } finally {
+        setLocationsLoading(false);
+      }
+    },
+    [timeParams],
+  );
+
+  useEffect(() => {
+    if (view === "messages") void loadLocations(0);
+  }, [loadLocations, view]);
+
   useEffect(() => {
     window.location.hash = view;
   }, [view]);
@@ -822,7 +984,6 @@ export default function App() {
     const topics = new Set<string>();
     (mapData?.devices || []).forEach((row) => row.topic && topics.add(row.topic));
     (mapData?.waypoints || []).forEach((row) => row.topic && topics.add(row.topic));
-    (mapData?.locations || []).forEach((row) => row.topic && topics.add(row.topic));
     return Array.from(topics).map((topic) => ({ value: topic, label: topic }));
   }, [mapData]);
 
@@ -830,6 +991,10 @@ export default function App() {
   const waypoints = mapData?.waypoints || [];
   const locations = mapData?.locations || [];
   const mapLocations = mapData?.mapLocations || locations.filter((row) => row.usableForCalculation !== false);
+  const rawLocationCount = mapData?.qualityPolicy?.rawLocations ?? locations.length;
+  const mapLocationCount = mapData?.qualityPolicy?.mapLocations ?? mapLocations.length;
+  // Newest first from the server; the grouping walks them in time order.
+  const messageRows = locationPages?.locations || [];
   const qualityPolicy = mapData?.qualityPolicy || health?.qualityPolicy;
   const maxCalculationAccuracyM = qualityPolicy?.maxCalculationAccuracyM ?? 30;
   const minOverviewVisitSeconds = qualityPolicy?.minOverviewVisitSeconds ?? 60;
@@ -936,7 +1101,7 @@ export default function App() {
     }
   }
 
-  const groupedMessages = useMemo(() => compactMessageRows(locations), [locations]);
+  const groupedMessages = useMemo(() => compactMessageRows([...messageRows].reverse()), [messageRows]);
   const events = (moduleData?.tables.find((table) => table.title === "Waypoint-hendelser")?.rows || []) as EventRow[];
   const filteredEvents = events.filter((row) => {
     const rowMs = timestampMs(row.timestamp || row.receivedAt);
@@ -1399,19 +1564,19 @@ export default function App() {
             <MetricCard title="Sonetid" value={durationSecondsLabel(occupancyTotalSeconds)} subtitle={`${filteredVisits.length} besok, ${timeFilterLabel}`} tone="#7c3aed" />
           </Col>
           <Col xs={24} md={8} xl={4}>
-            <MetricCard title="Kartpunkter" value={mapLocations.length} subtitle={`${ignoredForAccuracy} ignorert i beregning`} tone="#0891b2" />
+            <MetricCard title="Kartpunkter" value={mapLocationCount} subtitle={`${ignoredForAccuracy} ignorert i beregning`} tone="#0891b2" />
           </Col>
           <Col xs={24} md={8} xl={4}>
             <MetricCard title="Siste brukte posisjon" value={formatDateTime(latestUsableLocation?.timestamp || latestUsableLocation?.receivedAt)} subtitle={latestUsableLocation?.topic || "Ingen posisjon"} tone="#0891b2" />
           </Col>
           <Col xs={24} md={8} xl={4}>
-            <MetricCard title="Presisjonsfilter" value={`${formatNumber(maxCalculationAccuracyM)} m`} subtitle={`Raadata beholdt: ${locations.length}`} tone="#475569" />
+            <MetricCard title="Presisjonsfilter" value={`${formatNumber(maxCalculationAccuracyM)} m`} subtitle={`Raadata beholdt: ${rawLocationCount}`} tone="#475569" />
           </Col>
         </Row>
         <Row gutter={[12, 12]}>
           <Col xs={24} xl={15}>
-            <Card title="Kart og siste spor" extra={<Typography.Text type="secondary">{mapLocations.length} av {locations.length} posisjoner brukes</Typography.Text>}>
-              <OwnTracksMap data={filteredMapData} />
+            <Card title="Kart og siste spor" extra={<Typography.Text type="secondary">{mapLocationCount} av {rawLocationCount} posisjoner brukes</Typography.Text>}>
+              <OwnTracksMap data={filteredMapData} trackParams={timeParams} />
             </Card>
           </Col>
           <Col xs={24} xl={9}>
@@ -1422,7 +1587,7 @@ export default function App() {
         </Row>
       </>
     ),
-    [activeZoneNames, filteredActiveVisits.length, filteredMapData, filteredVisits.length, health, ignoredForAccuracy, latestUsableLocation, locations.length, mapLocations.length, maxCalculationAccuracyM, occupancyRows, occupancyTotalSeconds, precisionPolicyText, timeFilterLabel, visitColumns],
+    [activeZoneNames, filteredActiveVisits.length, filteredMapData, filteredVisits.length, health, ignoredForAccuracy, latestUsableLocation, rawLocationCount, mapLocationCount, maxCalculationAccuracyM, occupancyRows, occupancyTotalSeconds, precisionPolicyText, timeFilterLabel, visitColumns],
   );
 
   let content: React.ReactNode = dashboard;
@@ -1564,10 +1729,10 @@ export default function App() {
       <>
         <SectionHeader
           title="Kart"
-          subtitle={`${mapLocations.length} kartpunkter av ${locations.length} raapunkter, ${ignoredForAccuracy} ignorert over ${formatNumber(maxCalculationAccuracyM)} m - ${timeFilterLabel}`}
+          subtitle={`${mapLocationCount} kartpunkter av ${rawLocationCount} raapunkter, ${ignoredForAccuracy} ignorert over ${formatNumber(maxCalculationAccuracyM)} m - ${timeFilterLabel}`}
         />
         <Card title="Spor og soner">
-          <OwnTracksMap data={filteredMapData} large />
+          <OwnTracksMap data={filteredMapData} trackParams={timeParams} large />
         </Card>
       </>
     );
@@ -1675,7 +1840,7 @@ export default function App() {
             <MetricCard title="Presisjon p90" value={formatNumber(diagnostics?.accuracy.p90M)} suffix="m" subtitle={`Grense ${formatNumber(maxCalculationAccuracyM)} m`} tone="#0891b2" />
           </Col>
           <Col xs={24} md={8} xl={4}>
-            <MetricCard title="Brukbare posisjoner" value={diagnostics?.counts.usableLocations ?? mapLocations.length} subtitle={`${ignoredForAccuracy} filtrert bort`} tone="#7c3aed" />
+            <MetricCard title="Brukbare posisjoner" value={diagnostics?.counts.usableLocations ?? mapLocationCount} subtitle={`${ignoredForAccuracy} filtrert bort`} tone="#7c3aed" />
           </Col>
           <Col xs={24} md={8} xl={4}>
             <MetricCard title="Transitions" value={diagnostics?.counts.transitions ?? 0} subtitle={`Generert ${formatDateTime(diagnostics?.generatedAt)}`} tone="#15803d" />
@@ -1733,7 +1898,7 @@ export default function App() {
       <>
         <SectionHeader
           title="Meldinger"
-          subtitle={`${locations.length} raameldinger / ${groupedMessages.length} posisjoner. ${ignoredForAccuracy} markert lav presisjon. Periode: ${timeFilterLabel}`}
+          subtitle={`${messageRows.length} av ${locationPages?.total ?? rawLocationCount} raameldinger lastet / ${groupedMessages.length} posisjoner. ${ignoredForAccuracy} markert lav presisjon. Periode: ${timeFilterLabel}`}
         />
         <div className="message-view-toolbar">
           <Segmented
@@ -1753,8 +1918,13 @@ export default function App() {
         {messageView === "grouped" ? (
           <DataTable<MessageGroupRow> columns={groupedMessageColumns} data={groupedMessages} />
         ) : (
-          <DataTable<LocationRow> columns={locationColumns} data={[...locations].reverse()} />
+          <DataTable<LocationRow> columns={locationColumns} data={messageRows} />
         )}
+        {locationPages?.hasMore ? (
+          <Button loading={locationsLoading} onClick={() => void loadLocations(messageRows.length)}>
+            Last flere meldinger
+          </Button>
+        ) : null}
       </>
     );
   } else if (view === "events") {
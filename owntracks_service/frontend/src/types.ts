@@ -240,6 +240,8 @@ export type MapPayload = {
   filterMode?: TimeFilterMode;
   locations: LocationRow[];
   mapLocations?: LocationRow[];
+  mapBounds?: [number, number, number, number] | null;
+  pointsIncluded?: boolean;
   devices: DeviceRow[];
   waypoints: WaypointRow[];
   zoneVisits: VisitRow[];
@@ -256,6 +258,42 @@ export type MapPayload = {
   };
 };
 
+export type MapLocationsPage = {
+  start?: string;
+  end?: string;
+  offset: number;
+  limit: number;
+  total: number;
+  hasMore: boolean;
+  locations: LocationRow[];
+};
+
+export type MapTrackSegment = {
+  polyline?: string;
+  lat?: number[];
+  lon?: number[];
+  t: number[];
+};
+
+export type MapTrack = {
+  topic: string;
+  username?: string;
+  device?: string;
+  rawPoints: number;
+  points: number;
+  segments: MapTrackSegment[];
+};
+
+export type MapTracksPayload = {
+  start?: string;
+  end?: string;
+  zoom: number;
+  bbox?: number[] | null;
+  format: "polyline" | "arrays";
+  precision: number;
+  tracks: MapTrack[];
+};
+
 export type DiagnosticRecommendation = {
   severity: "ok" | "info" | "warning" | "bad";
   title: string;
@@ -67,15 +67,21 @@ class ParkingAppTest(unittest.TestCase):
 
     def test_dynamic_vehicle_and_settlement_paths_are_allowed(self) -> None:
         responses = [
+            httpx.Response(200, json={"role": "viewer"}, request=httpx.Request("GET", "http://fibaro10/api/auth/me")),
             httpx.Response(200, json={"plate": "AB12345"}, request=httpx.Request("GET", "http://fibaro10/api/parking/vehicles/ab12345")),
             httpx.Response(200, json={"id": 42}, request=httpx.Request("GET", "http://fibaro10/api/settlements/42")),
         ]
-        with TestClient(app) as client:
-            with patch.object(client.app.state.core_client, "request", new=AsyncMock(side_effect=responses)):
+        with TestClient(app, cookies={"fibaro10_session": "token"}) as client:
+            with patch.object(client.app.state.core_client, "request", new=AsyncMock(side_effect=responses)) as core_request:
                 vehicle = client.get("/api/parking/vehicles/AB12345")
                 settlement = client.get("/api/settlements/42")
         self.assertEqual(vehicle.status_code, 200)
         self.assertEqual(settlement.status_code, 200)
+        # The session's role is looked up once and remembered for the second read.
+        self.assertEqual(
+            [call.args[1] for call in core_request.await_args_list],
+            ["/api/auth/me", "/api/parking/vehicles/AB12345", "/api/settlements/42"],
+        )
 
     def test_car_detection_detail_path_is_allowed(self) -> None:
         core_response = httpx.Response(
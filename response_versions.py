@@ -0,0 +1,209 @@
+"""Weak ETags computed from data version stamps for the polled core JSON APIs."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+import hashlib
+from time import monotonic
+from typing import Any, Optional
+
+
+LONG_POLL_PARAMETER = "wait"
+CONDITIONAL_CACHE_CONTROL = "no-cache"
+DATA_VERSIONS_CHANNEL = "fibaro10_data_versions"
+MODULES_PATH_PREFIX = "/api/modules/"
+
+# Exact paths (and their sub-paths) or prefixes ending in "/" -> tables whose
+# data versions make up the ETag. An empty tuple marks payloads that only
+# change with a new build. The sunroom overview and session payloads escalate
+# their severity with the clock, and the operations overview reads Protect,
+# live HC3 switches and Roborock telemetry; none of that is in data_versions,
+# so those paths are left out.
+VERSIONED_PATH_TABLES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("/api/admin/builds", ()),
+    ("/api/hc3/doors/status", ("door_events",)),
+)
+
+# /api/modules/<module> -> the tables that module reads, so a write only
+# invalidates the modules that show it. "ventilasjon" also reads live HC3
+# switch status, and "admin" shows access_logs, which every request writes;
+# neither is versioned.
+MODULE_VERSION_TABLES: dict[str, tuple[str, ...]] = {
+    "omsetning": ("parkering", "sun2_room_daily_stats", "sun2_tanning_sessions"),
+    "koble": (
+        "parking_sun_link_candidates",
+        "parking_sun_link_job_state",
+        "parking_sun_link_matches",
+        "parking_sun_link_processed",
+    ),
+    "parkering": ("parkering", "kjoretoy", "kjoretoy_nokkeldata", "forecast_snapshots", "settlement_imports", "import_job_status"),
+    "soling": (
+        "sun2_tanning_sessions",
+        "sun2_room_daily_stats",
+        "sun2_product_sales",
+        "sun2_finance_settlements",
+        "sun2_members",
+        "sun2_beds",
+        "sun2_import_runs",
+        "sun2_session_import_runs",
+        "sun2_tanning_session_images",
+        "parkering",
+        "energy_fibaro_samples",
+        "energy_hourly_consumption",
+        "forecast_snapshots",
+        "settlement_imports",
+        "import_job_status",
+    ),
+    "energi": (
+        "energy_fibaro_samples",
+        "energy_hourly_consumption",
+        "energy_import_runs",
+        "energy_circuits",
+        "energy_loads",
+        "energy_nodes",
+        "ventilasjon_samples",
+        "sun2_beds",
+        "sun2_tanning_sessions",
+        "import_job_status",
+    ),
+    "lys": ("utelys_samples", "utelys_events", "yr_forecast_samples", "control_configs", "control_config_history"),
+    "renhold": (
+        "roborock_robots",
+        "roborock_status_samples",
+        "roborock_clean_jobs",
+        "roborock_consumables",
+        "roborock_schedules",
+        "roborock_telemetry_samples",
+        "control_configs",
+    ),
+    "vedlikehold": ("maintenance_log_entries", "site_visits", "import_job_status"),
+}
+
+
+def versioned_path_tables(path: str) -> Optional[tuple[str, ...]]:
+    normalized = str(path or "")
+    if normalized.startswith(MODULES_PATH_PREFIX):
+        return MODULE_VERSION_TABLES.get(normalized[len(MODULES_PATH_PREFIX):].strip("/").lower())
+    for prefix, tables in VERSIONED_PATH_TABLES:
+        if prefix.endswith("/"):
+            if normalized.startswith(prefix) and len(normalized) > len(prefix):
+                return tables
+        elif normalized == prefix or normalized.startswith(f"{prefix}/"):
+            return tables
+    return None
+
+
+def versioned_tables() -> list[str]:
+    tables = {table for _, path_tables in VERSIONED_PATH_TABLES for table in path_tables}
+    tables.update(table for module_tables in MODULE_VERSION_TABLES.values() for table in module_tables)
+    return sorted(tables)
+
+
+def data_version_trigger_statements(tables: Iterable[str]) -> list[str]:
+    """DDL for statement triggers that count writes per table in ``data_versions``.
+
+    The counter row is updated in the writing transaction, so readers see a
+    new version exactly when the data commits, in every process. A NOTIFY on
+    the same commit wakes long-polling requests.
+    """
+    statements = [
+        f"""
+        CREATE OR REPLACE FUNCTION fibaro10_bump_data_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO data_versions (table_name, version, changed_at)
+            VALUES (TG_TABLE_NAME, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT (table_name) DO UPDATE SET
+                version = data_versions.version + 1,
+                changed_at = EXCLUDED.changed_at;
+            PERFORM pg_notify('{DATA_VERSIONS_CHANNEL}', TG_TABLE_NAME);
+            RETURN NULL;
+        END
+        $$
+        """
+    ]
+    for table in tables:
+        statements.append(f'DROP TRIGGER IF EXISTS fibaro10_data_version ON "{table}"')
+        statements.append(
+            f'CREATE TRIGGER fibaro10_data_version AFTER INSERT OR UPDATE OR DELETE ON "{table}" '
+            "FOR EACH STATEMENT EXECUTE FUNCTION fibaro10_bump_data_version()"
+        )
+    return statements
+
+
+def table_version_sql() -> str:
+    return "SELECT table_name, version FROM data_versions WHERE table_name = ANY(:tables)"
+
+
+def table_version_parts(tables: Iterable[str], rows: Iterable[tuple[str, int]]) -> list[tuple[str, int]]:
+    """One (table, version) pair per table; tables without writes since the triggers were installed are 0."""
+    versions = {str(name): int(version or 0) for name, version in rows}
+    return [(table, versions.get(table, 0)) for table in sorted(set(tables))]
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as used for If-None-Match."""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def version_query_items(query_items: Iterable[tuple[str, str]]) -> list[tuple[str, str]]:
+    return sorted((key, value) for key, value in query_items if key != LONG_POLL_PARAMETER)
+
+
+def long_poll_seconds(value: Optional[str], limit: float) -> float:
+    try:
+        seconds = float(value or 0)
+    except ValueError:
+        return 0.0
+    if seconds != seconds:
+        return 0.0
+    return max(0.0, min(float(limit), seconds))
+
+
+class DataVersionSignal:
+    """Wakes long-polling requests when a data version may have changed."""
+
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+
+    def bump(self) -> None:
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+async def wait_for_new_etag(
+    current: str,
+    compute: Callable[[], Awaitable[str]],
+    signal: DataVersionSignal,
+    timeout: float,
+    interval: float,
+) -> str:
+    """Recompute the ETag until it differs from ``current`` or the timeout passes."""
+    deadline = monotonic() + max(0.0, timeout)
+    while (remaining := deadline - monotonic()) > 0:
+        await signal.wait(min(max(0.05, interval), remaining))
+        etag = await compute()
+        if etag != current:
+            return etag
+    return current
+
+
+def conditional_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
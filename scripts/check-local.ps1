@@ -51,6 +51,10 @@ Run "python" @("-m", "pytest", "alarm_mobile/tests", "-q") $repoRoot
 Run "python" @("-m", "pytest", "tests", "-q") (Join-Path $repoRoot "unifi_protect_events")
 Run "python" @("-m", "pytest", "tests/test_profiles.py", "-q") (Join-Path $repoRoot "visual_anomaly_service")
 
+Write-Host "Python benchmarks"
+# Endpoint benchmarks are skipped unless BENCHMARK_DATABASE_URL points at a scratch database.
+Run "python" @("-m", "pytest", "benchmarks", "-q") $repoRoot
+
 Write-Host "QNAP deploy plan tests"
 Run "powershell" @("-NoProfile", "-ExecutionPolicy", "Bypass", "-File", (Join-Path $PSScriptRoot "test-deploy-plan.ps1")) $repoRoot
 
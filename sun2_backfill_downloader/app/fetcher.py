@@ -0,0 +1,226 @@
+"""Direct export downloads for the Sun2 backfill.
+
+The browser is only used to log in. Its cookies are handed to one pooled
+``httpx.Client`` shared by the worker threads, and every request first waits
+for the shared :class:`RateLimiter`, so throughput is set by the configured
+upstream rate rather than by page navigation.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import threading
+from datetime import date
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Any, Callable, Iterable
+
+import httpx
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LoginRequired(RuntimeError):
+    """SUN2 answered with its login page; the session cookies have expired."""
+
+
+def looks_like_login_html(html: str) -> bool:
+    h = (html or "").lower()
+    return (
+        "vennligst logg inn" in h
+        or 'id="login-action"' in h
+        or 'id="login-form"' in h
+        or ("name=\"username\"" in h and "name=\"password\"" in h)
+    )
+
+
+def is_html_bytes(data: bytes) -> bool:
+    head = data[:900].lower()
+    return b"<!doctype" in head or b"<html" in head or b"<head" in head
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: Path) -> str:
+    return sha256_bytes(path.read_bytes())
+
+
+class RateLimiter:
+    """Spaces request starts at least ``1 / per_second`` apart across all threads; 0 disables it."""
+
+    def __init__(self, per_second: float) -> None:
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self.lock:
+            now = monotonic()
+            start_at = max(now, self.next_at)
+            self.next_at = start_at + self.interval
+        if start_at > now:
+            sleep(start_at - now)
+
+
+class ProgressLedger:
+    """Append-only ``date<TAB>sha256<TAB>bytes`` lines, one per downloaded day.
+
+    Appending a line costs the same on day 3000 as on day 1, unlike rewriting a
+    JSON status file. The last line for a date wins; the file is rewritten
+    without superseded lines when more than half of it is stale. A
+    ``floor<TAB>date`` line marks every earlier day as done without a checksum,
+    for days fetched before the ledger existed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: dict[str, tuple[str, int]] = {}
+        self.floor: date | None = None
+        lines = 0
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                parts = line.split("\t")
+                if len(parts) == 2 and parts[0] == "floor":
+                    try:
+                        self.floor = max(self.floor or date.min, date.fromisoformat(parts[1]))
+                    except ValueError:
+                        pass
+                    continue
+                if len(parts) != 3:
+                    continue
+                try:
+                    self.entries[parts[0]] = (parts[1], int(parts[2]))
+                except ValueError:
+                    continue
+                lines += 1
+        if lines > 2 * len(self.entries) + 100:
+            self.compact()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, day: date) -> tuple[str, int] | None:
+        return self.entries.get(day.isoformat())
+
+    def set_floor(self, day: date) -> None:
+        with self.lock:
+            self.floor = max(self.floor or date.min, day)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(f"floor\t{self.floor.isoformat()}\n")
+
+    def record(self, day: date, checksum: str, size: int) -> None:
+        with self.lock:
+            self.entries[day.isoformat()] = (checksum, size)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(f"{day.isoformat()}\t{checksum}\t{size}\n")
+
+    def compact(self) -> None:
+        with self.lock:
+            tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+            floor = f"floor\t{self.floor.isoformat()}\n" if self.floor else ""
+            tmp_path.write_text(
+                floor + "".join(f"{key}\t{checksum}\t{size}\n" for key, (checksum, size) in sorted(self.entries.items())),
+                encoding="utf-8",
+            )
+            tmp_path.replace(self.path)
+
+
+class ExportDownloader:
+    def __init__(
+        self,
+        cookies: Iterable[dict[str, Any]],
+        url_for: Callable[[date], str],
+        *,
+        rate_limiter: RateLimiter,
+        concurrency: int = 4,
+        retries: int = 3,
+        backoff_seconds: float = 2.0,
+        timeout: float = 30.0,
+        error_dir: Path | None = None,
+        transport: httpx.BaseTransport | None = None,
+    ) -> None:
+        self.url_for = url_for
+        self.rate_limiter = rate_limiter
+        self.retries = max(0, retries)
+        self.backoff_seconds = max(0.0, backoff_seconds)
+        self.error_dir = error_dir
+        self.generation = 0
+        self.requests = 0
+        self.retried = 0
+        limits = httpx.Limits(max_connections=max(1, concurrency), max_keepalive_connections=max(1, concurrency))
+        self.client = httpx.Client(
+            limits=limits,
+            timeout=timeout,
+            follow_redirects=True,
+            max_redirects=10,
+            headers={"User-Agent": "Sun2_backfill_downloader/1.0"},
+            transport=transport,
+        )
+        self.set_cookies(cookies)
+
+    def set_cookies(self, cookies: Iterable[dict[str, Any]]) -> None:
+        self.client.cookies.clear()
+        for cookie in cookies:
+            self.client.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain") or "", path=cookie.get("path") or "/")
+        self.generation += 1
+
+    def close(self) -> None:
+        self.client.close()
+
+    def __enter__(self) -> "ExportDownloader":
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
+
+    def _save_error(self, name: str, data: bytes) -> None:
+        if self.error_dir is not None:
+            self.error_dir.mkdir(parents=True, exist_ok=True)
+            (self.error_dir / name).write_bytes(data)
+
+    def _backoff(self, attempt: int, retry_after: str | None) -> None:
+        self.retried += 1
+        try:
+            delay = float(retry_after) if retry_after else 0.0
+        except ValueError:
+            delay = 0.0
+        delay = max(delay, self.backoff_seconds * 2**attempt)
+        sleep(delay * random.uniform(1.0, 1.25))
+
+    def fetch(self, day: date, filename: str) -> bytes:
+        """CSV bytes for one day; retries timeouts, 429 and 5xx with exponential backoff."""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            self.requests += 1
+            try:
+                response = self.client.get(self.url_for(day))
+            except httpx.TransportError:
+                if attempt >= self.retries:
+                    raise
+                self._backoff(attempt, None)
+                attempt += 1
+                continue
+            data = response.content
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                self._backoff(attempt, response.headers.get("retry-after"))
+                attempt += 1
+                continue
+            if response.status_code != 200:
+                self._save_error(f"HTTP_{response.status_code}_{filename}.html", data)
+                raise RuntimeError(f"HTTP {response.status_code}")
+            if is_html_bytes(data):
+                if looks_like_login_html(data.decode("utf-8", "replace")):
+                    raise LoginRequired("SUN2 ba om ny innlogging")
+                self._save_error(f"HTML_{filename}.html", data)
+                raise RuntimeError("Fikk HTML i stedet for CSV")
+            return data
@@ -3,9 +3,11 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+import threading
 import time
 import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any
@@ -16,6 +18,8 @@ from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Resp
 from playwright.sync_api import TimeoutError as PwTimeoutError
 from playwright.sync_api import sync_playwright
 
+from .fetcher import ExportDownloader, LoginRequired, ProgressLedger, RateLimiter, looks_like_login_html, sha256_bytes, sha256_file
+
 try:
     from zoneinfo import ZoneInfo
 except Exception:  # pragma: no cover
@@ -42,7 +46,14 @@ OUT_DIR = Path(env_value("OUT_DIR", "/data/backfill_raw") or "/data/backfill_raw
 DAILY_OUT_DIR = Path(env_value("DAILY_OUT_DIR", "/data/incoming") or "/data/incoming")
 ERROR_DIR = Path(env_value("ERROR_DIR", "/data/backfill_errors") or "/data/backfill_errors")
 STATUS_FILE = Path(env_value("STATUS_FILE", "/data/backfill_status.json") or "/data/backfill_status.json")
+LEDGER_FILE = Path(env_value("LEDGER_FILE", "/data/backfill_ledger.tsv") or "/data/backfill_ledger.tsv")
 PAUSE_SECONDS = float(env_value("PAUSE_SECONDS", "2") or "2")
+# PAUSE_SECONDS used to be the pause between serial downloads; it is now the default upstream rate.
+DOWNLOAD_RATE_PER_SECOND = float(env_value("DOWNLOAD_RATE_PER_SECOND", str(1 / PAUSE_SECONDS if PAUSE_SECONDS > 0 else 0)) or "0")
+DOWNLOAD_CONCURRENCY = max(1, int(env_value("DOWNLOAD_CONCURRENCY", "4") or "4"))
+DOWNLOAD_RETRIES = max(0, int(env_value("DOWNLOAD_RETRIES", "3") or "3"))
+RETRY_BACKOFF_SECONDS = float(env_value("RETRY_BACKOFF_SECONDS", "2") or "2")
+PROGRESS_SAVE_SECONDS = float(env_value("PROGRESS_SAVE_SECONDS", "5") or "5")
 SKIP_EXISTING = (env_value("SKIP_EXISTING", "1") or "1") == "1"
 AUTO_START = (env_value("AUTO_START", "0") or "0") == "1"
 DAILY_DOWNLOAD_ENABLED = (env_value("DAILY_DOWNLOAD_ENABLED", "1") or "1") == "1"
@@ -76,6 +87,11 @@ state: dict[str, Any] = {
     "downloaded": 0,
     "skipped": 0,
     "failed": 0,
+    "requests": 0,
+    "retried": 0,
+    "last_sha256": None,
+    "rate_per_second": DOWNLOAD_RATE_PER_SECOND,
+    "concurrency": DOWNLOAD_CONCURRENCY,
     "daily_download_enabled": DAILY_DOWNLOAD_ENABLED,
     "daily_download_time": DAILY_DOWNLOAD_TIME,
     "daily_last_check": None,
@@ -173,21 +189,6 @@ def export_url_for(day: date) -> str:
     return f"{EXPORT_URL}?startdate={d}&enddate={d}"
 
 
-def looks_like_login_html(html: str) -> bool:
-    h = (html or "").lower()
-    return (
-        "vennligst logg inn" in h
-        or 'id="login-action"' in h
-        or 'id="login-form"' in h
-        or ("name=\"username\"" in h and "name=\"password\"" in h)
-    )
-
-
-def is_html_bytes(data: bytes) -> bool:
-    head = data[:900].lower()
-    return b"<!doctype" in head or b"<html" in head or b"<head" in head
-
-
 def load_progress() -> dict[str, Any]:
     if not STATUS_FILE.exists():
         return {}
@@ -231,6 +232,40 @@ def login_if_needed(page, username: str, password: str) -> None:
         pass
 
 
+def browser_cookies(username: str, password: str, day: date) -> list[dict[str, Any]]:
+    """Log in through the browser once and return the session cookies for direct downloads."""
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context(locale="nb-NO", accept_downloads=True)
+        page = context.new_page()
+        page.goto(export_url_for(day), wait_until="domcontentloaded")
+        login_if_needed(page, username, password)
+        if looks_like_login_html(page.content()):
+            raise RuntimeError("Etter login havnet vi fortsatt paa login-side")
+        cookies = context.cookies()
+        context.close()
+        browser.close()
+    return cookies
+
+
+def new_downloader(cookies: list[dict[str, Any]], concurrency: int = DOWNLOAD_CONCURRENCY) -> ExportDownloader:
+    return ExportDownloader(
+        cookies,
+        export_url_for,
+        rate_limiter=RateLimiter(DOWNLOAD_RATE_PER_SECOND),
+        concurrency=concurrency,
+        retries=DOWNLOAD_RETRIES,
+        backoff_seconds=RETRY_BACKOFF_SECONDS,
+        error_dir=ERROR_DIR,
+    )
+
+
+def write_day_file(out_path: Path, data: bytes) -> None:
+    tmp_path = out_path.with_suffix(".csv.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(out_path)
+
+
 def download_one_day_sync(day: date, target_dir: Path) -> dict[str, Any]:
     username = env_required("SUN2_USERNAME")
     password = env_required("SUN2_PASSWORD")
@@ -250,30 +285,12 @@ def download_one_day_sync(day: date, target_dir: Path) -> dict[str, Any]:
         post_import_status(True, f"Dagsfil finnes allerede: {filename}", records_imported=0, records_total=1, raw={"file": filename, "target_dir": str(target_dir), "skipped": True})
         return {"ok": True, "file": filename, "skipped": True}
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(locale="nb-NO", accept_downloads=True)
-        page = context.new_page()
-        page.goto(export_url_for(day), wait_until="domcontentloaded")
-        login_if_needed(page, username, password)
-        if looks_like_login_html(page.content()):
-            raise RuntimeError("Etter login havnet vi fortsatt paa login-side")
-
-        response = context.request.get(export_url_for(day), max_redirects=10, timeout=30000)
-        data = response.body()
-        if response.status != 200:
-            (ERROR_DIR / f"HTTP_{response.status}_{filename}.html").write_bytes(data)
-            raise RuntimeError(f"HTTP {response.status}")
-        if is_html_bytes(data):
-            (ERROR_DIR / f"HTML_{filename}.html").write_bytes(data)
-            raise RuntimeError("Fikk HTML i stedet for CSV")
-        tmp_path = out_path.with_suffix(".csv.tmp")
-        tmp_path.write_bytes(data)
-        tmp_path.replace(out_path)
-        context.close()
-        browser.close()
+    with new_downloader(browser_cookies(username, password, day), concurrency=1) as downloader:
+        data = downloader.fetch(day, filename)
+    write_day_file(out_path, data)
 
     state["downloaded"] += 1
+    state["last_sha256"] = sha256_bytes(data)
     state["last_success_date"] = day.isoformat()
     state["last_success_at"] = datetime.utcnow().isoformat()
     state["last_error"] = None
@@ -294,6 +311,21 @@ def start_date_from_progress(config_start: date) -> date:
         return config_start
 
 
+def day_already_downloaded(day: date, out_path: Path, ledger: ProgressLedger) -> bool:
+    """Ledger days count as done even if the file was moved on; a file that no longer matches its checksum is fetched again."""
+    entry = ledger.get(day)
+    if entry is not None:
+        if not out_path.exists():
+            return True
+        checksum, _size = entry
+        return sha256_file(out_path) == checksum
+    if SKIP_EXISTING and out_path.exists():
+        data = out_path.read_bytes()
+        ledger.record(day, sha256_bytes(data), len(data))
+        return True
+    return False
+
+
 def run_backfill_sync() -> None:
     global stop_requested
     try:
@@ -301,75 +333,91 @@ def run_backfill_sync() -> None:
         password = env_required("SUN2_PASSWORD")
         configured_start = parse_date(env_value("START_DATE"), date(2017, 3, 1))
         end = parse_date(env_value("END_DATE"), local_today() - timedelta(days=1))
-        start = start_date_from_progress(configured_start)
         OUT_DIR.mkdir(parents=True, exist_ok=True)
         ERROR_DIR.mkdir(parents=True, exist_ok=True)
+        first_ledger_run = not LEDGER_FILE.exists()
+        ledger = ProgressLedger(LEDGER_FILE)
+        if first_ledger_run:
+            # Before the ledger existed, progress was a single last_success_date; keep it as a floor.
+            floor = start_date_from_progress(configured_start)
+            if floor > configured_start:
+                ledger.set_floor(floor)
+        start = max(configured_start, ledger.floor or configured_start)
+        pending = []
+        for day in iter_dates(start, end):
+            if day_already_downloaded(day, OUT_DIR / filename_for(day), ledger):
+                state["skipped"] += 1
+            else:
+                pending.append(day)
         state.update(
             {
                 "running": True,
                 "stop_requested": False,
                 "last_error": None,
-                "range": {"start": start.isoformat(), "end": end.isoformat(), "configured_start": configured_start.isoformat()},
+                "range": {
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "configured_start": configured_start.isoformat(),
+                    "pending": len(pending),
+                    "ledger_days": len(ledger),
+                },
             }
         )
         save_progress({})
 
-        if start > end:
+        if not pending:
             state.update({"running": False, "last_error": None})
             save_progress({"message": "Ferdig, ingen datoer igjen"})
             return
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(locale="nb-NO", accept_downloads=True)
-            page = context.new_page()
-
-            page.goto(export_url_for(start), wait_until="domcontentloaded")
-            login_if_needed(page, username, password)
-            if looks_like_login_html(page.content()):
-                raise RuntimeError("Etter login havnet vi fortsatt på login-side")
-
-            for day in iter_dates(start, end):
-                if stop_requested:
-                    state["stop_requested"] = True
-                    break
-                filename = filename_for(day)
-                out_path = OUT_DIR / filename
+        auth_lock = threading.Lock()
+        downloader = new_downloader(browser_cookies(username, password, pending[0]))
+
+        def reauthenticate(seen_generation: int) -> None:
+            with auth_lock:
+                if downloader.generation == seen_generation:
+                    downloader.set_cookies(browser_cookies(username, password, pending[0]))
+
+        def download(day: date) -> dict[str, Any] | None:
+            if stop_requested:
+                return None
+            filename = filename_for(day)
+            generation = downloader.generation
+            try:
+                data = downloader.fetch(day, filename)
+            except LoginRequired:
+                reauthenticate(generation)
+                data = downloader.fetch(day, filename)
+            checksum = sha256_bytes(data)
+            write_day_file(OUT_DIR / filename, data)
+            ledger.record(day, checksum, len(data))
+            return {"file": filename, "sha256": checksum, "bytes": len(data)}
+
+        last_saved = time.monotonic()
+        with downloader, ThreadPoolExecutor(max_workers=DOWNLOAD_CONCURRENCY, thread_name_prefix="sun2-backfill") as pool:
+            futures = {pool.submit(download, day): day for day in pending}
+            for future in as_completed(futures):
+                day = futures[future]
                 state["last_date"] = day.isoformat()
-                state["current_file"] = filename
-                if SKIP_EXISTING and out_path.exists():
-                    state["skipped"] += 1
-                    state["last_success_date"] = day.isoformat()
-                    save_progress({"last_action": "skipped_existing"})
-                    continue
-
                 try:
-                    response = context.request.get(export_url_for(day), max_redirects=10, timeout=30000)
-                    data = response.body()
-                    if response.status != 200:
-                        (ERROR_DIR / f"HTTP_{response.status}_{filename}.html").write_bytes(data)
-                        raise RuntimeError(f"HTTP {response.status}")
-                    if is_html_bytes(data):
-                        (ERROR_DIR / f"HTML_{filename}.html").write_bytes(data)
-                        raise RuntimeError("Fikk HTML i stedet for CSV")
-                    tmp_path = out_path.with_suffix(".csv.tmp")
-                    tmp_path.write_bytes(data)
-                    tmp_path.replace(out_path)
-                    state["downloaded"] += 1
-                    state["last_success_date"] = day.isoformat()
-                    state["last_success_at"] = datetime.utcnow().isoformat()
-                    state["last_error"] = None
-                    save_progress({"last_action": "downloaded"})
+                    result = future.result()
                 except Exception as exc:
                     state["failed"] += 1
                     state["last_error"] = f"{day.isoformat()}: {exc}"
-                    save_progress({"last_action": "failed"})
-
-                if PAUSE_SECONDS > 0:
-                    time.sleep(PAUSE_SECONDS)
-
-            context.close()
-            browser.close()
+                    result = None
+                if result is not None:
+                    state["downloaded"] += 1
+                    state["current_file"] = result["file"]
+                    state["last_sha256"] = result["sha256"]
+                    state["last_success_date"] = max(state.get("last_success_date") or "", day.isoformat())
+                    state["last_success_at"] = datetime.utcnow().isoformat()
+                elif stop_requested:
+                    state["stop_requested"] = True
+                state["requests"] = downloader.requests
+                state["retried"] = downloader.retried
+                if time.monotonic() - last_saved >= PROGRESS_SAVE_SECONDS:
+                    save_progress({"last_action": "downloading"})
+                    last_saved = time.monotonic()
     except Exception as exc:
         state["last_error"] = str(exc)
         save_progress({"last_action": "fatal_error"})
@@ -463,6 +511,7 @@ button{{border:0;border-radius:8px;background:#4b86c2;color:white;padding:.65rem
 <div class="metric"><span>Lastet ned</span><strong>{state.get('downloaded', 0)}</strong></div>
 <div class="metric"><span>Hoppet over</span><strong>{state.get('skipped', 0)}</strong></div>
 <div class="metric"><span>Feil</span><strong>{state.get('failed', 0)}</strong></div>
+<div class="metric"><span>Parallelle / rate</span><strong>{DOWNLOAD_CONCURRENCY} / {DOWNLOAD_RATE_PER_SECOND:g} per s</strong></div>
 <div class="metric"><span>Nattlig dagsfil</span><strong>{'På' if DAILY_DOWNLOAD_ENABLED else 'Av'}</strong></div>
 <div class="metric"><span>Natt-tid</span><strong>{DAILY_DOWNLOAD_TIME}</strong></div>
 <div class="metric"><span>Daglig mappe</span><strong>{DAILY_OUT_DIR}</strong></div>
@@ -2,13 +2,19 @@ from __future__ import annotations
 
 import asyncio
 import csv
+import gzip
+import hashlib
 import json
+import multiprocessing
 import os
 import re
 import shutil
+import threading
 import time
 import urllib.error
 import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
@@ -18,6 +24,8 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse, JSONResponse, Response
 
+from .watcher import DirectoryWatcher
+
 
 load_dotenv()
 
@@ -29,6 +37,15 @@ IMPORT_DIR = Path(os.getenv("IMPORT_DIR", "/data/incoming"))
 ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "/data/archive"))
 REJECTED_DIR = Path(os.getenv("REJECTED_DIR", "/data/rejected"))
 POLL_SECONDS = int(os.getenv("POLL_SECONDS", "10"))
+DATA_DIR = Path(os.getenv("SUN2_IMPORT_DATA_DIR", "/data"))
+IMPORTED_HASHES_FILE = Path(os.getenv("IMPORTED_HASHES_FILE", str(DATA_DIR / "imported_hashes.json")))
+WATCH_MODE = os.getenv("WATCH_MODE", "auto").strip().lower()
+WATCH_SETTLE_SECONDS = max(0.0, float(os.getenv("WATCH_SETTLE_SECONDS", "0.5")))
+PARSE_WORKERS = max(1, int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1)))))
+PARSE_POOL_MIN_FILES = max(2, int(os.getenv("PARSE_POOL_MIN_FILES", "8")))
+POST_MAX_DAYS = max(1, int(os.getenv("POST_MAX_DAYS", "90")))
+# Gateway errors mean Fibaro10 is down; every other HTTP error is answered for the data that was sent.
+OUTAGE_STATUS_CODES = {502, 503, 504}
 
 FILENAME_RE = re.compile(r"^(?:IMPORTED_|IGNORED_|ERROR_)?Statistics_room_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})\.csv$")
 EXPECTED_COLS = [
@@ -42,7 +59,17 @@ EXPECTED_COLS = [
     "Inntjent Ikke Medlemmer (KR)",
 ]
 
-app = FastAPI(title="Sun2_importer")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    task = asyncio.create_task(watch_loop())
+    try:
+        yield
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+app = FastAPI(title="Sun2_importer", lifespan=lifespan)
 state: dict[str, Any] = {
     "started_at": datetime.utcnow().isoformat(),
     "last_run_at": None,
@@ -52,8 +79,14 @@ state: dict[str, Any] = {
     "last_result": None,
     "processed_files": 0,
     "rejected_files": 0,
+    "skipped_files": 0,
     "running": False,
+    "watch_mode": None,
+    "watch_error": None,
+    "last_batch": None,
 }
+process_lock = threading.Lock()
+imported_hashes: dict[str, dict[str, Any]] | None = None
 
 
 @app.get("/favicon.ico", include_in_schema=False)
@@ -185,8 +218,25 @@ def parse_file(file_path: Path) -> tuple[date, list[dict[str, Any]]]:
     return stat_date, rows
 
 
-def post_to_fibaro10(source_file: str, stat_date: date, rows: list[dict[str, Any]]) -> dict[str, Any]:
-    payload = {
+def post_json(path: str, payload: dict[str, Any], timeout: float, compress: bool = False) -> dict[str, Any]:
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "User-Agent": "Sun2_importer/1.0",
+        "x-access-username": FIBARO10_API_USERNAME,
+        "x-access-password": FIBARO10_API_PASSWORD,
+    }
+    if compress:
+        data = gzip.compress(data, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    request = urllib.request.Request(f"{FIBARO10_API_BASE_URL}{path}", data=data, method="POST", headers=headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = response.read().decode("utf-8")
+        return json.loads(body) if body else {"status": response.status}
+
+
+def day_payload(source_file: str, stat_date: date, rows: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
         "source": "sun2_importer",
         "collector_id": COLLECTOR_ID,
         "timestamp": datetime.utcnow().isoformat(),
@@ -196,21 +246,66 @@ def post_to_fibaro10(source_file: str, stat_date: date, rows: list[dict[str, Any
         "rows": rows,
         "extra": {"import_dir": str(IMPORT_DIR)},
     }
-    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    request = urllib.request.Request(
-        f"{FIBARO10_API_BASE_URL}/api/sun2/room-stats/ingest",
-        data=data,
-        method="POST",
-        headers={
-            "Content-Type": "application/json; charset=utf-8",
-            "User-Agent": "Sun2_importer/1.0",
-            "x-access-username": FIBARO10_API_USERNAME,
-            "x-access-password": FIBARO10_API_PASSWORD,
-        },
-    )
-    with urllib.request.urlopen(request, timeout=20) as response:
-        body = response.read().decode("utf-8")
-        return json.loads(body) if body else {"status": response.status}
+
+
+def post_to_fibaro10(source_file: str, stat_date: date, rows: list[dict[str, Any]]) -> dict[str, Any]:
+    return post_json("/api/sun2/room-stats/ingest", day_payload(source_file, stat_date, rows), timeout=20)
+
+
+def post_days_to_fibaro10(days: list[tuple[str, date, list[dict[str, Any]]]]) -> dict[str, Any]:
+    """Send several daily files as one gzip-compressed request."""
+    payload = {
+        "source": "sun2_importer",
+        "collector_id": COLLECTOR_ID,
+        "timestamp": datetime.utcnow().isoformat(),
+        "ok": True,
+        "days": [day_payload(source_file, stat_date, rows) for source_file, stat_date, rows in days],
+        "extra": {"import_dir": str(IMPORT_DIR)},
+    }
+    try:
+        return post_json("/api/sun2/room-stats/ingest-batch", payload, timeout=60, compress=True)
+    except urllib.error.HTTPError as exc:
+        if exc.code not in {404, 405}:
+            raise
+    # Older Fibaro10 without the batch endpoint: one request per day.
+    responses = [post_to_fibaro10(source_file, stat_date, rows) for source_file, stat_date, rows in days]
+    return {"status": "ok", "days": responses}
+
+
+def http_error_detail(exc: urllib.error.HTTPError) -> str:
+    try:
+        body = exc.read().decode("utf-8", errors="replace")
+    except OSError:
+        body = ""
+    try:
+        detail = json.loads(body).get("detail") if body else None
+    except (ValueError, AttributeError):
+        detail = None
+    return f"HTTP {exc.code}: {detail or body or exc.reason}"
+
+
+def post_days_isolated(
+    days: list[tuple[str, date, list[dict[str, Any]]]],
+) -> tuple[list[tuple[dict[str, Any] | None, urllib.error.HTTPError | None]], int]:
+    """Post days in one request and halve the chunk when Fibaro10 rejects it.
+
+    The core stores a batch all-or-nothing, so one bad day would otherwise
+    hold back the whole backfill. Returns one (response, error) per day and
+    the number of requests sent. Outages are raised to the caller.
+    """
+    try:
+        response = post_days_to_fibaro10(days)
+    except urllib.error.HTTPError as exc:
+        if exc.code in OUTAGE_STATUS_CODES:
+            raise
+        if len(days) == 1:
+            return [(None, exc)], 1
+        middle = len(days) // 2
+        first, first_requests = post_days_isolated(days[:middle])
+        second, second_requests = post_days_isolated(days[middle:])
+        return first + second, 1 + first_requests + second_requests
+    day_responses = response.get("days") if isinstance(response.get("days"), list) else []
+    return [(day_responses[index] if index < len(day_responses) else response, None) for index in range(len(days))], 1
 
 
 def post_import_status(
@@ -232,93 +327,218 @@ def post_import_status(
         "message": message,
         "raw": {"collector_id": COLLECTOR_ID, **(raw or {})},
     }
-    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    request = urllib.request.Request(
-        f"{FIBARO10_API_BASE_URL}/api/import-status/report",
-        data=data,
-        method="POST",
-        headers={
-            "Content-Type": "application/json; charset=utf-8",
-            "User-Agent": "Sun2_importer/1.0",
-            "x-access-username": FIBARO10_API_USERNAME,
-            "x-access-password": FIBARO10_API_PASSWORD,
-        },
-    )
     try:
-        with urllib.request.urlopen(request, timeout=12):
-            pass
+        post_json("/api/import-status/report", payload, timeout=12)
     except Exception:
         pass
 
 
+def file_sha256(file_path: Path) -> str:
+    """Hash of name and content; closed days produce identical files for different dates."""
+    digest = hashlib.sha256(file_path.name.encode("utf-8") + b"\0")
+    with file_path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_imported_hashes() -> dict[str, dict[str, Any]]:
+    global imported_hashes
+    if imported_hashes is None:
+        try:
+            data = json.loads(IMPORTED_HASHES_FILE.read_text(encoding="utf-8"))
+            imported_hashes = data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            imported_hashes = {}
+    return imported_hashes
+
+
+def save_imported_hashes() -> None:
+    hashes = load_imported_hashes()
+    IMPORTED_HASHES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = IMPORTED_HASHES_FILE.with_name(f"{IMPORTED_HASHES_FILE.name}.tmp")
+    tmp_path.write_text(json.dumps(hashes, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, IMPORTED_HASHES_FILE)
+
+
+def parse_files(files: list[Path]) -> list[tuple[date | None, list[dict[str, Any]], Exception | None]]:
+    """Parse files in order; a backfill burst is spread over a process pool."""
+    if PARSE_WORKERS > 1 and len(files) >= PARSE_POOL_MIN_FILES:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(PARSE_WORKERS, len(files)), mp_context=context) as pool:
+            futures = [pool.submit(parse_file, file_path) for file_path in files]
+            results = []
+            for future in futures:
+                try:
+                    stat_date, rows = future.result()
+                    results.append((stat_date, rows, None))
+                except Exception as exc:
+                    results.append((None, [], exc))
+            return results
+    results = []
+    for file_path in files:
+        try:
+            stat_date, rows = parse_file(file_path)
+            results.append((stat_date, rows, None))
+        except Exception as exc:
+            results.append((None, [], exc))
+    return results
+
+
 def process_once() -> list[dict[str, Any]]:
+    with process_lock:
+        return import_files()
+
+
+def import_files() -> list[dict[str, Any]]:
     IMPORT_DIR.mkdir(parents=True, exist_ok=True)
     ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
     REJECTED_DIR.mkdir(parents=True, exist_ok=True)
     results = []
+    hashes = load_imported_hashes()
+    fresh: list[tuple[Path, str]] = []
     for file_path in sorted(IMPORT_DIR.glob("Statistics_room_*.csv")):
-        state["last_file"] = file_path.name
         try:
-            stat_date, rows = parse_file(file_path)
-        except Exception as exc:
+            digest = file_sha256(file_path)
+        except OSError:
+            continue
+        if digest in hashes:
+            skipped = move_to(file_path, ARCHIVE_DIR, "IGNORED_")
+            state["skipped_files"] += 1
+            results.append(
+                {
+                    "file": file_path.name,
+                    "ok": True,
+                    "skipped": True,
+                    "reason": f"Samme fil med samme innhold ble importert {hashes[digest].get('imported_at') or 'tidligere'}",
+                    "moved_to": str(skipped),
+                }
+            )
+            continue
+        fresh.append((file_path, digest))
+
+    parse_started = time.perf_counter()
+    parsed = []
+    for (file_path, digest), (stat_date, rows, error) in zip(fresh, parse_files([file_path for file_path, _digest in fresh])):
+        state["last_file"] = file_path.name
+        if error is not None:
             rejected = move_to(file_path, REJECTED_DIR, "ERROR_")
             state["rejected_files"] += 1
-            state["last_error"] = str(exc)
+            state["last_error"] = str(error)
             post_import_status(
                 ok=False,
-                message=f"Avvist fil {file_path.name}: {exc}",
+                message=f"Avvist fil {file_path.name}: {error}",
                 records_imported=0,
                 records_total=0,
                 raw={"source_file": file_path.name, "moved_to": str(rejected)},
             )
-            results.append({"file": file_path.name, "ok": False, "error": str(exc), "moved_to": str(rejected)})
+            results.append({"file": file_path.name, "ok": False, "error": str(error), "moved_to": str(rejected)})
             continue
-
+        parsed.append((file_path, digest, stat_date, rows))
+    parse_ms = round((time.perf_counter() - parse_started) * 1000, 1)
+
+    post_started = time.perf_counter()
+    parsed.sort(key=lambda item: (item[2], item[0].name))
+    requests = 0
+    for offset in range(0, len(parsed), POST_MAX_DAYS):
+        chunk = parsed[offset : offset + POST_MAX_DAYS]
+        names = [file_path.name for file_path, _digest, _stat_date, _rows in chunk]
+        row_count = sum(len(rows) for _file_path, _digest, _stat_date, rows in chunk)
         try:
-            response = post_to_fibaro10(file_path.name, stat_date, rows)
+            outcomes, sent = post_days_isolated([(file_path.name, stat_date, rows) for file_path, _digest, stat_date, rows in chunk])
+            requests += sent
         except (urllib.error.URLError, TimeoutError, OSError) as exc:
+            requests += 1
             state["last_error"] = f"Fibaro10 svarte ikke: {exc}"
             post_import_status(
                 ok=False,
-                message=f"Kunne ikke sende {file_path.name}: {exc}",
+                message=f"Kunne ikke sende {names[0] if len(names) == 1 else f'{len(names)} filer'}: {exc}",
                 records_imported=0,
-                records_total=len(rows),
-                raw={"source_file": file_path.name, "kept_in_incoming": True},
+                records_total=row_count,
+                raw={"source_files": names, "kept_in_incoming": True},
             )
-            results.append({"file": file_path.name, "ok": False, "error": state["last_error"], "kept_in_incoming": True})
+            results.extend({"file": name, "ok": False, "error": state["last_error"], "kept_in_incoming": True} for name in names)
             continue
 
-        archived = move_to(file_path, ARCHIVE_DIR, "IMPORTED_")
-        state["processed_files"] += 1
-        state["last_success_at"] = datetime.utcnow().isoformat()
-        state["last_error"] = None
+        imported_at = datetime.utcnow().isoformat()
+        imported = []
+        for (file_path, digest, stat_date, rows), (day_response, error) in zip(chunk, outcomes):
+            if error is not None:
+                detail = http_error_detail(error)
+                state["last_error"] = f"{file_path.name}: {detail}"
+                if 400 <= error.code < 500:
+                    # Fibaro10 refused the data itself; resending the same file cannot succeed.
+                    rejected = move_to(file_path, REJECTED_DIR, "ERROR_")
+                    state["rejected_files"] += 1
+                    outcome = {"moved_to": str(rejected)}
+                else:
+                    outcome = {"kept_in_incoming": True}
+                post_import_status(
+                    ok=False,
+                    message=f"Fibaro10 avviste {file_path.name}: {detail}",
+                    records_imported=0,
+                    records_total=len(rows),
+                    raw={"source_file": file_path.name, **outcome},
+                )
+                results.append({"file": file_path.name, "ok": False, "error": detail, **outcome})
+                continue
+            archived = move_to(file_path, ARCHIVE_DIR, "IMPORTED_")
+            hashes[digest] = {"file": file_path.name, "stat_date": stat_date.isoformat(), "imported_at": imported_at}
+            state["processed_files"] += 1
+            imported.append((file_path.name, stat_date, len(rows)))
+            results.append(
+                {
+                    "file": file_path.name,
+                    "ok": True,
+                    "rows": len(rows),
+                    "response": day_response,
+                    "moved_to": str(archived),
+                }
+            )
+        if not imported:
+            continue
+        save_imported_hashes()
+        state["last_success_at"] = imported_at
+        if len(imported) == len(chunk):
+            state["last_error"] = None
+        imported_names = [name for name, _stat_date, _rows in imported]
+        imported_rows = sum(count for _name, _stat_date, count in imported)
+        first_date, last_date = imported[0][1], imported[-1][1]
         post_import_status(
             ok=True,
-            message=f"Importerte {file_path.name}",
-            records_imported=len(rows),
-            records_total=len(rows),
-            raw={"source_file": file_path.name, "response": response},
+            message=f"Importerte {imported_names[0]}" if len(imported) == 1 else f"Importerte {len(imported)} filer ({first_date} til {last_date})",
+            records_imported=imported_rows,
+            records_total=imported_rows,
+            raw={"source_files": imported_names},
         )
-        result = {"file": file_path.name, "ok": True, "rows": len(rows), "response": response, "moved_to": str(archived)}
-        results.append(result)
+    if fresh:
+        state["last_batch"] = {
+            "files": len(fresh),
+            "parse_ms": parse_ms,
+            "post_ms": round((time.perf_counter() - post_started) * 1000, 1),
+            "requests": requests,
+        }
     state["last_run_at"] = datetime.utcnow().isoformat()
     state["last_result"] = results
     return results
 
 
-async def poll_loop() -> None:
+async def watch_loop() -> None:
     state["running"] = True
-    while True:
-        try:
-            await asyncio.to_thread(process_once)
-        except Exception as exc:
-            state["last_error"] = str(exc)
-        await asyncio.sleep(POLL_SECONDS)
-
-
-@app.on_event("startup")
-async def startup() -> None:
-    asyncio.create_task(poll_loop())
+    IMPORT_DIR.mkdir(parents=True, exist_ok=True)
+    watcher = DirectoryWatcher(IMPORT_DIR, POLL_SECONDS, WATCH_MODE, WATCH_SETTLE_SECONDS)
+    state["watch_mode"] = watcher.mode
+    state["watch_error"] = watcher.error
+    try:
+        while True:
+            try:
+                await asyncio.to_thread(process_once)
+            except Exception as exc:
+                state["last_error"] = str(exc)
+            # With inotify this returns as soon as a file lands; POLL_SECONDS is then only a safety rescan.
+            await asyncio.to_thread(watcher.wait, POLL_SECONDS)
+    finally:
+        watcher.close()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -351,6 +571,8 @@ pre{{white-space:pre-wrap;background:#0f172a;color:#e5e7eb;border-radius:8px;pad
 <div class="metric"><span>Siste kjøring</span><strong>{state.get('last_run_at') or '-'}</strong></div>
 <div class="metric"><span>Siste fil</span><strong>{state.get('last_file') or '-'}</strong></div>
 <div class="metric"><span>Importert</span><strong>{state.get('processed_files', 0)}</strong></div>
+<div class="metric"><span>Hoppet over</span><strong>{state.get('skipped_files', 0)}</strong></div>
+<div class="metric"><span>Overvåking</span><strong>{state.get('watch_mode') or '-'}</strong></div>
 </section>
 <section class="card">
 <form method="post" action="/sync-now"><button type="submit">Synk nå</button></form>
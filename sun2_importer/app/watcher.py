@@ -0,0 +1,149 @@
+"""Wait for new files in the import directory.
+
+Uses Linux inotify through libc when it is available, so a file is picked up
+as soon as the writer closes it or moves it into place. Anywhere else (or when
+the directory sits on a share that does not deliver inotify events) the
+watcher falls back to plain polling every ``poll_seconds``.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _libc():
+    name = ctypes.util.find_library("c")
+    if not name:
+        return None
+    try:
+        libc = ctypes.CDLL(name, use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1") or not hasattr(libc, "inotify_add_watch"):
+        return None
+    return libc
+
+
+class DirectoryWatcher:
+    def __init__(self, directory: Path, poll_seconds: float, mode: str = "auto", settle_seconds: float = 0.5) -> None:
+        self.directory = directory
+        self.poll_seconds = max(0.1, poll_seconds)
+        self.settle_seconds = max(0.0, settle_seconds)
+        self.fd: int | None = None
+        self.error: str | None = None
+        # close() may run while wait() sits in select() on another thread; the pipe wakes it,
+        # and whichever side finishes last releases the descriptors.
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.waiting = False
+        self.wake_fds: tuple[int, int] | None = None
+        if mode in {"auto", "inotify"}:
+            self._open_inotify()
+        self.mode = "inotify" if self.fd is not None else "poll"
+
+    def _open_inotify(self) -> None:
+        libc = _libc()
+        if libc is None:
+            self.error = "inotify er ikke tilgjengelig"
+            return
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            self.error = os.strerror(ctypes.get_errno())
+            return
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            self.error = os.strerror(ctypes.get_errno())
+            os.close(fd)
+            return
+        self.fd = fd
+        self.wake_fds = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+
+    def _drain(self) -> list[str]:
+        names: list[str] = []
+        assert self.fd is not None
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(buffer):
+                _wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = buffer[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    names.append(os.fsdecode(name))
+
+    def wait(self, timeout: float | None = None) -> list[str]:
+        """Block until files land or ``timeout`` passes; returns the names seen (empty when polling).
+
+        Events that keep arriving within ``settle_seconds`` of each other are
+        collected into one wakeup (for at most a few seconds), so a backfill
+        burst is handled as one batch.
+        """
+        timeout = self.poll_seconds if timeout is None else timeout
+        with self.lock:
+            if self.stopped.is_set():
+                return []
+            if self.fd is None:
+                polling = True
+            else:
+                polling = False
+                self.waiting = True
+        if polling:
+            self.stopped.wait(timeout)
+            return []
+        try:
+            return self._wait_inotify(timeout)
+        finally:
+            with self.lock:
+                self.waiting = False
+                if self.stopped.is_set():
+                    self._release()
+
+    def _wait_inotify(self, timeout: float) -> list[str]:
+        assert self.fd is not None and self.wake_fds is not None
+        watched = [self.fd, self.wake_fds[0]]
+        readable, _, _ = select.select(watched, [], [], timeout)
+        if self.fd not in readable:
+            return []
+        names = self._drain()
+        deadline = time.monotonic() + max(5.0, self.settle_seconds * 10)
+        while self.settle_seconds and time.monotonic() < deadline:
+            readable, _, _ = select.select(watched, [], [], self.settle_seconds)
+            if self.fd not in readable:
+                break
+            names.extend(self._drain())
+        return names
+
+    def _release(self) -> None:
+        for fd in (self.fd, *(self.wake_fds or ())):
+            if fd is not None:
+                os.close(fd)
+        self.fd = None
+        self.wake_fds = None
+
+    def close(self) -> None:
+        """Stop the watcher; a wait() in progress returns at once and closes the descriptors itself."""
+        with self.lock:
+            if self.stopped.is_set():
+                return
+            self.stopped.set()
+            if not self.waiting:
+                self._release()
+            elif self.wake_fds is not None:
+                os.write(self.wake_fds[1], b"\0")
@@ -6,10 +6,12 @@ import hashlib
 import json
 import os
 import re
+import threading
 import time
 import urllib.error
 import urllib.request
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any
@@ -99,6 +101,12 @@ COLLECTOR_ID = env_value("COLLECTOR_ID", "qnap-sun2-session-scraper") or "qnap-s
 MEMBER_PROFILE_LIMIT = int(env_value("MEMBER_PROFILE_LIMIT", "120") or "120")
 FETCH_MEMBER_PROFILES = (env_value("FETCH_MEMBER_PROFILES", "1") or "1") == "1"
 MEMBER_POST_BATCH_SIZE = int(env_value("MEMBER_POST_BATCH_SIZE", "500") or "500")
+SESSION_STREAM_POST = (env_value("SESSION_STREAM_POST", "1") or "1") == "1"
+SESSION_POST_CHUNK_ROWS = max(1, int(env_value("SESSION_POST_CHUNK_ROWS", "500") or "500"))
+RANGE_SYNC_PARALLEL_MONTHS = max(1, int(env_value("RANGE_SYNC_PARALLEL_MONTHS", "2") or "2"))
+BLOCK_HEAVY_RESOURCES = (env_value("BLOCK_HEAVY_RESOURCES", "1") or "1") == "1"
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_URL_PATTERN = re.compile(r"google-analytics|googletagmanager|doubleclick|facebook\.net|hotjar|clarity\.ms", re.I)
 
 app = FastAPI(title="Sun2_session_scraper")
 task: asyncio.Task | None = None
@@ -110,6 +118,7 @@ live_sync_task: asyncio.Task | None = None
 async def favicon():
     return Response(status_code=204)
 schedule_lock = asyncio.Lock()
+progress_lock = threading.RLock()
 stop_requested = False
 
 state: dict[str, Any] = {
@@ -148,6 +157,7 @@ state: dict[str, Any] = {
     "live_last_result": None,
     "current_file": None,
     "range": {},
+    "session_checkpoints": {},
 }
 
 
@@ -257,8 +267,80 @@ def load_progress() -> dict[str, Any]:
 
 def save_progress(extra: dict[str, Any]) -> None:
     STATUS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    payload = {**state, **extra, "saved_at": datetime.utcnow().isoformat()}
-    STATUS_FILE.write_text(json.dumps(payload, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    # Range months run in parallel threads, so writes go through a lock and an atomic replace.
+    with progress_lock:
+        payload = {**state, **extra, "saved_at": datetime.utcnow().isoformat()}
+        tmp_path = STATUS_FILE.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        tmp_path.replace(STATUS_FILE)
+
+
+def session_partial_path(filename: str) -> Path:
+    return OUT_DIR / f"{filename}.partial.jsonl"
+
+
+def load_session_checkpoint(filename: str) -> tuple[int, int, list[str], list[dict[str, Any]], int]:
+    """Pages already read for a month: (pages, raw rows, headers, sessions, posted sessions).
+
+    Page rows live in ``<file>.partial.jsonl``; the progress file records how many
+    of those pages are complete, so a torn last line is ignored.
+    """
+    with progress_lock:
+        checkpoint = dict((state.get("session_checkpoints") or {}).get(filename) or {})
+    pages = int(checkpoint.get("page") or 0)
+    path = session_partial_path(filename)
+    if pages <= 0 or not path.exists():
+        return 0, 0, [], [], 0
+    lines: list[str] = []
+    raw_rows = 0
+    headers: list[str] = []
+    sessions: list[dict[str, Any]] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            item = json.loads(line)
+        except ValueError:
+            break
+        if len(lines) >= pages or int(item.get("page") or 0) != len(lines) + 1:
+            break
+        lines.append(line)
+        raw_rows = int(item.get("raw_rows") or 0)
+        headers = list(item.get("headers") or headers)
+        sessions.extend(item.get("sessions") or [])
+    path.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+    posted_rows = min(len(sessions), int(checkpoint.get("posted_rows") or 0))
+    return len(lines), raw_rows, headers, sessions, posted_rows
+
+
+def save_session_checkpoint(
+    filename: str,
+    start: date,
+    end: date,
+    page_number: int,
+    raw_rows: int,
+    headers: list[str],
+    page_sessions: list[dict[str, Any]],
+    total_sessions: int,
+    posted_rows: int,
+) -> None:
+    line = {"page": page_number, "raw_rows": raw_rows, "headers": headers, "sessions": page_sessions}
+    with session_partial_path(filename).open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+    with progress_lock:
+        state["session_checkpoints"][filename] = {
+            "period": f"{start.isoformat()} - {end.isoformat()}",
+            "page": page_number,
+            "raw_rows": raw_rows,
+            "sessions": total_sessions,
+            "posted_rows": posted_rows,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        save_progress({})
+
+
+def clear_session_checkpoint(filename: str) -> None:
+    session_partial_path(filename).unlink(missing_ok=True)
+    with progress_lock:
+        state["session_checkpoints"].pop(filename, None)
 
 
 def export_row_count(path: Path) -> int:
@@ -1354,21 +1436,31 @@ def extract_largest_table(page) -> tuple[list[str], list[dict[str, str]]]:
     return best
 
 
-def extract_paginated_table(page, max_pages: int = 500) -> tuple[list[str], list[dict[str, str]]]:
-    all_rows: list[dict[str, str]] = []
-    headers: list[str] = []
+def iter_paginated_table(page, max_pages: int = 500, skip_pages: int = 0, row_offset: int = 0):
+    """Yield ``(page_number, headers, rows)`` while clicking through the pager.
+
+    The first ``skip_pages`` pages are only paged past, which lets a resumed
+    scrape continue after its last checkpoint. Row numbers continue from
+    ``row_offset`` so they match a scrape that read every page.
+    """
+    row_number = row_offset
     seen_ranges: set[tuple[int | None, int | None, int | None]] = set()
-    for _ in range(max_pages):
+    for page_index in range(max_pages):
+        page_number = page_index + 1
         visible_range = extract_visible_sessions_range(page)
         if visible_range != (None, None, None):
             if visible_range in seen_ranges:
                 break
             seen_ranges.add(visible_range)
-        headers, rows = extract_largest_table(page)
-        for row in rows:
-            row = dict(row)
-            row["__source_row_number"] = str(len(all_rows) + 1)
-            all_rows.append(row)
+        if page_number > skip_pages:
+            headers, rows = extract_largest_table(page)
+            numbered_rows = []
+            for row in rows:
+                row_number += 1
+                row = dict(row)
+                row["__source_row_number"] = str(row_number)
+                numbered_rows.append(row)
+            yield page_number, headers, numbered_rows
         _, visible_to, visible_total = visible_range
         if visible_to is not None and visible_total is not None and visible_to >= visible_total:
             break
@@ -1422,6 +1514,13 @@ def extract_paginated_table(page, max_pages: int = 500) -> tuple[list[str], list
         if not clicked:
             break
         page.wait_for_timeout(900)
+
+
+def extract_paginated_table(page, max_pages: int = 500) -> tuple[list[str], list[dict[str, str]]]:
+    all_rows: list[dict[str, str]] = []
+    headers: list[str] = []
+    for _, headers, rows in iter_paginated_table(page, max_pages):
+        all_rows.extend(rows)
     return headers, all_rows
 
 
@@ -1446,6 +1545,22 @@ def extract_visible_sessions_range(page) -> tuple[int | None, int | None, int |
     return int(match.group(1)), int(match.group(2)), int(match.group(3))
 
 
+def block_heavy_resources(route) -> None:
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or BLOCKED_URL_PATTERN.search(request.url):
+        route.abort()
+    else:
+        route.continue_()
+
+
+def new_browser_context(browser):
+    context = browser.new_context(locale="nb-NO", accept_downloads=True)
+    if BLOCK_HEAVY_RESOURCES:
+        # The scrapers only read table text, so images, fonts and trackers only slow page loads.
+        context.route("**/*", block_heavy_resources)
+    return context
+
+
 def save_debug(page, filename: str) -> None:
     ERROR_DIR.mkdir(parents=True, exist_ok=True)
     try:
@@ -1476,6 +1591,64 @@ def post_to_fibaro10(payload: dict[str, Any], endpoint: str = "/api/sun2/session
         return json.loads(body) if body else {"status": response.status}
 
 
+def session_chunk_is_postable(sessions: list[dict[str, Any]], posted_rows: int, start: date, end: date) -> bool:
+    # Rows that would fail final validation are held back for the retry instead of being streamed.
+    pending = sessions[posted_rows:]
+    if duplicate_session_source_ids(sessions):
+        return False
+    return all(start <= date.fromisoformat(item["stat_date"]) <= end for item in pending)
+
+
+def post_session_chunk(filename: str, start: date, end: date, page_number: int, rows: list[dict[str, Any]]) -> dict[str, Any]:
+    return post_to_fibaro10(
+        {
+            "source": "sun2_session_scraper",
+            "collector_id": COLLECTOR_ID,
+            "timestamp": datetime.utcnow().isoformat(),
+            "ok": True,
+            "source_file": filename,
+            "message": f"Skrapet {start.isoformat()} til {end.isoformat()} frem til side {page_number}",
+            "rows": rows,
+            "replace_source_file": False,
+            "extra": {
+                "period_start": start.isoformat(),
+                "period_end": end.isoformat(),
+                "page": page_number,
+                "streamed": True,
+            },
+        }
+    )
+
+
+def read_session_pages(
+    page,
+    filename: str,
+    start: date,
+    end: date,
+    resume: bool,
+) -> tuple[list[str], int, list[dict[str, Any]], int]:
+    """Read the session list page by page, checkpointing and streaming rows to Fibaro10."""
+    if resume:
+        skip_pages, raw_rows, headers, sessions, posted_rows = load_session_checkpoint(filename)
+    else:
+        clear_session_checkpoint(filename)
+        skip_pages, raw_rows, headers, sessions, posted_rows = 0, 0, [], [], 0
+    stream = SESSION_STREAM_POST and POST_TO_FIBARO10
+    for page_number, headers, rows in iter_paginated_table(page, skip_pages=skip_pages, row_offset=raw_rows):
+        raw_rows += len(rows)
+        page_sessions = [item for item in (normalize_session_row(row, start) for row in rows) if item]
+        sessions.extend(page_sessions)
+        if (
+            stream
+            and len(sessions) - posted_rows >= SESSION_POST_CHUNK_ROWS
+            and session_chunk_is_postable(sessions, posted_rows, start, end)
+        ):
+            post_session_chunk(filename, start, end, page_number, sessions[posted_rows:])
+            posted_rows = len(sessions)
+        save_session_checkpoint(filename, start, end, page_number, raw_rows, headers, page_sessions, len(sessions), posted_rows)
+    return headers, raw_rows, sessions, posted_rows
+
+
 def post_import_status(
     job_name: str,
     *,
@@ -1556,7 +1729,7 @@ def scrape_beds_sync() -> dict[str, Any]:
     password = env_required("SUN2_PASSWORD")
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context(locale="nb-NO", accept_downloads=True)
+        context = new_browser_context(browser)
         page = context.new_page()
         open_beds_page(page, username, password)
         beds = extract_beds(page)
@@ -1598,7 +1771,7 @@ def scrape_members_sync() -> dict[str, Any]:
     out_path = OUT_DIR / filename
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context(locale="nb-NO", accept_downloads=True)
+        context = new_browser_context(browser)
         page = context.new_page()
         open_members_page(page, username, password)
         headers, table_rows = extract_paginated_table(page, max_pages=1000)
@@ -1695,7 +1868,7 @@ def scrape_product_sales_sync(start: date, end: date, source_filename: str | Non
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context(locale="nb-NO", accept_downloads=True)
+        context = new_browser_context(browser)
         page = context.new_page()
         open_product_sales_page(page, username, password)
         set_date_range(page, start, end)
@@ -1771,7 +1944,7 @@ def scrape_finance_settlement_sync(start: date, end: date, source_filename: str
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context(locale="nb-NO", accept_downloads=True)
+        context = new_browser_context(browser)
         page = context.new_page()
         open_finance_page(page, username, password)
         selected_row = parse_finance_settlement_text(page.locator("body").inner_text(timeout=5000), start)
@@ -1838,13 +2011,17 @@ def scrape_month_sync(start: date, end: date, source_filename: str | None = None
     ERROR_DIR.mkdir(parents=True, exist_ok=True)
     filename = source_filename or filename_for(start)
     out_path = OUT_DIR / filename
-    state.update({"last_period": f"{start.isoformat()} - {end.isoformat()}", "current_file": filename, "rows_last_file": 0})
+    # Range months run in parallel threads; every update of the shared state takes progress_lock.
+    period = f"{start.isoformat()} - {end.isoformat()}"
+    with progress_lock:
+        state.update({"last_period": period, "current_file": filename, "rows_last_file": 0})
 
     period_is_still_open = end >= local_today()
     existing_rows_count = export_row_count(out_path)
     if SKIP_EXISTING and out_path.exists() and not period_is_still_open:
-        state["skipped_files"] += 1
-        state["last_success_period"] = state["last_period"]
+        with progress_lock:
+            state["skipped_files"] += 1
+            state["last_success_period"] = period
         save_progress({"last_action": "skipped_existing"})
         post_import_status(
             "sun2_sessions_import",
@@ -1858,22 +2035,29 @@ def scrape_month_sync(start: date, end: date, source_filename: str | None = None
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context(locale="nb-NO", accept_downloads=True)
+        context = new_browser_context(browser)
         page = context.new_page()
         open_sessions_page(page, username, password)
         set_date_range(page, start, end)
         expected_count = None
         headers: list[str] = []
-        table_rows: list[dict[str, str]] = []
+        raw_rows = 0
         sessions: list[dict[str, Any]] = []
+        posted_rows = 0
         for attempt in range(1, SCRAPE_VALIDATE_RETRIES + 1):
             if attempt > 1:
                 page.reload(wait_until="networkidle", timeout=30000)
                 set_date_range(page, start, end)
                 time.sleep(min(2, attempt))
             expected_count = extract_expected_sessions_count(page)
-            headers, table_rows = extract_paginated_table(page)
-            sessions = [item for item in (normalize_session_row(row, start) for row in table_rows) if item]
+            # Open periods gain rows while we read them, so only closed months resume from a checkpoint.
+            headers, raw_rows, sessions, posted_rows = read_session_pages(
+                page,
+                filename,
+                start,
+                end,
+                resume=attempt == 1 and not period_is_still_open,
+            )
             validation_error = None
             if expected_count is not None and len(sessions) != expected_count:
                 validation_error = (
@@ -1919,7 +2103,7 @@ def scrape_month_sync(start: date, end: date, source_filename: str | None = None
                 "period_start": start.isoformat(),
                 "period_end": end.isoformat(),
                 "headers": headers,
-                "raw_rows": len(table_rows),
+                "raw_rows": raw_rows,
                 "list_url": page.url,
             },
         }
@@ -1928,16 +2112,28 @@ def scrape_month_sync(start: date, end: date, source_filename: str | None = None
         tmp_path.replace(out_path)
         response = None
         if POST_TO_FIBARO10 and sessions:
-            response = post_to_fibaro10(payload)
-            state["posted_files"] += 1
+            if SESSION_STREAM_POST:
+                # Streamed pages are already stored; send the rest and let Fibaro10 drop rows Sun2 no longer lists.
+                final_payload = {
+                    **payload,
+                    "rows": sessions[posted_rows:],
+                    "keep_source_session_ids": [item["source_session_id"] for item in sessions],
+                }
+                response = post_to_fibaro10(final_payload)
+            else:
+                response = post_to_fibaro10(payload)
+            with progress_lock:
+                state["posted_files"] += 1
+        clear_session_checkpoint(filename)
         context.close()
         browser.close()
 
-    state["created_files"] += 1
-    state["rows_last_file"] = len(sessions)
-    state["last_success_period"] = state["last_period"]
-    state["last_success_at"] = datetime.utcnow().isoformat()
-    state["last_error"] = None
+    with progress_lock:
+        state["created_files"] += 1
+        state["rows_last_file"] = len(sessions)
+        state["last_success_period"] = period
+        state["last_success_at"] = datetime.utcnow().isoformat()
+        state["last_error"] = None
     save_progress({"last_action": "created", "fibaro10_response": response})
     post_import_status(
         "sun2_sessions_import",
@@ -1977,6 +2173,12 @@ def scrape_finance_settlement_previous_month_sync() -> dict[str, Any]:
 
 def start_date_from_progress(config_start: date) -> date:
     progress = load_progress()
+    resume_from = (progress.get("range") or {}).get("resume_from")
+    if resume_from:
+        try:
+            return max(config_start, date.fromisoformat(resume_from))
+        except ValueError:
+            pass
     last_period = progress.get("last_success_period") or ""
     match = re.search(r"(\d{4}-\d{2}-\d{2})\s*-\s*(\d{4}-\d{2}-\d{2})", last_period)
     if not match:
@@ -1988,6 +2190,38 @@ def start_date_from_progress(config_start: date) -> date:
         return config_start
 
 
+def scrape_range_month(period_start: date, period_end: date) -> bool:
+    if stop_requested:
+        return False
+    try:
+        scrape_month_sync(period_start, period_end)
+        return True
+    except Exception as exc:
+        message = f"{period_start:%Y-%m}: {exc}"
+        with progress_lock:
+            state["failed"] += 1
+            state["last_error"] = message
+        save_progress({"last_action": "failed"})
+        post_import_status(
+            "sun2_sessions_import",
+            ok=False,
+            message=message,
+            raw={"period_start": period_start.isoformat(), "period_end": period_end.isoformat()},
+        )
+        return False
+    finally:
+        if PAUSE_SECONDS > 0 and not stop_requested:
+            time.sleep(PAUSE_SECONDS)
+
+
+def range_resume_from(periods: list[tuple[date, date]], completed: set[date]) -> date | None:
+    """First month that still needs a scrape, or the day after the range when all are done."""
+    for period_start, _ in periods:
+        if period_start not in completed:
+            return period_start
+    return periods[-1][1] + timedelta(days=1) if periods else None
+
+
 def run_range_sync() -> None:
     global stop_requested
     try:
@@ -1999,7 +2233,12 @@ def run_range_sync() -> None:
                 "running": True,
                 "stop_requested": False,
                 "last_error": None,
-                "range": {"start": start.isoformat(), "end": end.isoformat(), "configured_start": configured_start.isoformat()},
+                "range": {
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "configured_start": configured_start.isoformat(),
+                    "parallel_months": RANGE_SYNC_PARALLEL_MONTHS,
+                },
             }
         )
         save_progress({})
@@ -2009,24 +2248,23 @@ def run_range_sync() -> None:
             state["last_error"] = f"Seng-sync feilet: {exc}"
             save_progress({"last_action": "beds_failed"})
             post_import_status("sun2_beds_import", ok=False, message=state["last_error"])
-        for period_start, period_end in iter_month_ranges(start, end):
-            if stop_requested:
-                state["stop_requested"] = True
-                break
-            try:
-                scrape_month_sync(period_start, period_end)
-            except Exception as exc:
-                state["failed"] += 1
-                state["last_error"] = f"{period_start:%Y-%m}: {exc}"
-                save_progress({"last_action": "failed"})
-                post_import_status(
-                    "sun2_sessions_import",
-                    ok=False,
-                    message=state["last_error"],
-                    raw={"period_start": period_start.isoformat(), "period_end": period_end.isoformat()},
-                )
-            if PAUSE_SECONDS > 0:
-                time.sleep(PAUSE_SECONDS)
+        periods = list(iter_month_ranges(start, end))
+        completed: set[date] = set()
+        # Each month runs in its own thread with its own browser, so months are independent.
+        with ThreadPoolExecutor(max_workers=RANGE_SYNC_PARALLEL_MONTHS, thread_name_prefix="sun2-month") as executor:
+            futures = {
+                executor.submit(scrape_range_month, period_start, period_end): period_start
+                for period_start, period_end in periods
+            }
+            for future in as_completed(futures):
+                if future.result():
+                    completed.add(futures[future])
+                resume_from = range_resume_from(periods, completed)
+                with progress_lock:
+                    state["range"]["resume_from"] = resume_from.isoformat() if resume_from else None
+                save_progress({})
+        if stop_requested:
+            state["stop_requested"] = True
     except Exception as exc:
         state["last_error"] = str(exc)
         save_progress({"last_action": "fatal_error"})
@@ -0,0 +1,138 @@
+"""In-memory sunroom occupancy fed by door events and Sun2 session ingest.
+
+Each core process keeps the recent door events per sunroom sensor and the
+recent Sun2 sessions per room, so the door alarm monitor and the sunroom
+endpoints evaluate rooms without querying door events and sessions again.
+Events reach every process through the live event bus; a reload from the
+database covers anything missed (startup, LISTEN outages, older writers).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Iterable, Mapping
+from datetime import datetime
+from time import monotonic
+from typing import Any, Optional
+
+
+def _row_sort_key(row: Any) -> tuple[datetime, int]:
+    return (getattr(row, "timestamp", None) or datetime.min, int(getattr(row, "id", None) or 0))
+
+
+class SunroomOccupancy:
+    def __init__(self, device_ids: Iterable[int], door_history: int = 180, max_age_seconds: float = 300.0) -> None:
+        self.device_ids = frozenset(int(device_id) for device_id in device_ids)
+        self.door_history = max(2, int(door_history))
+        self.max_age_seconds = max(1.0, float(max_age_seconds))
+        self.version = 0
+        self.reloads = 0
+        self.door_events_applied = 0
+        self._doors: dict[int, deque[Any]] = {}
+        self._sessions: dict[str, list[Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._sessions_stale = False
+        self._saved: dict[str, tuple[Any, ...]] = {}
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def needs_load(self, max_age_seconds: Optional[float] = None) -> bool:
+        if self._loaded_at is None:
+            return True
+        limit = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        return monotonic() - self._loaded_at >= limit
+
+    @property
+    def sessions_stale(self) -> bool:
+        return self._sessions_stale
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+        self._notify()
+
+    def invalidate_sessions(self) -> None:
+        self._sessions_stale = True
+        self._notify()
+
+    def load(self, door_rows: Iterable[Any], sessions_by_room: Mapping[str, list[Any]]) -> None:
+        """Replace the state with rows read from the database."""
+        doors: dict[int, deque[Any]] = {device_id: deque(maxlen=self.door_history) for device_id in self.device_ids}
+        for row in sorted(door_rows, key=_row_sort_key):
+            if row.device_id is not None and int(row.device_id) in doors:
+                doors[int(row.device_id)].append(row)
+        self._doors = doors
+        self.load_sessions(sessions_by_room)
+        self._loaded_at = monotonic()
+        self.reloads += 1
+
+    def load_sessions(self, sessions_by_room: Mapping[str, list[Any]]) -> None:
+        self._sessions = {room_id: list(rows) for room_id, rows in sessions_by_room.items()}
+        self._sessions_stale = False
+
+    def record_door_event(self, row: Any) -> bool:
+        """Add one door event; events seen before (by id) are ignored."""
+        if row.device_id is None or int(row.device_id) not in self.device_ids or not self.loaded:
+            return False
+        tail = self._doors.setdefault(int(row.device_id), deque(maxlen=self.door_history))
+        if row.id is not None and any(item.id == row.id for item in tail):
+            return False
+        if tail and _row_sort_key(row) < _row_sort_key(tail[-1]):
+            tail.append(row)
+            ordered = sorted(tail, key=_row_sort_key)
+            tail.clear()
+            tail.extend(ordered)
+        else:
+            tail.append(row)
+        self.door_events_applied += 1
+        self._notify()
+        return True
+
+    def door_rows(self) -> list[Any]:
+        """Recent events of every sensor, oldest first."""
+        return sorted((row for tail in self._doors.values() for row in tail), key=_row_sort_key)
+
+    def sessions_by_room(self, room_ids: Iterable[str], since: datetime) -> dict[str, list[Any]]:
+        rooms: dict[str, list[Any]] = {room_id: [] for room_id in room_ids}
+        for room_id, rows in self._sessions.items():
+            rooms[room_id] = [row for row in rows if row.started_at and row.started_at >= since]
+        return rooms
+
+    def unsaved(self, signatures: Mapping[str, tuple[Any, ...]]) -> dict[str, tuple[Any, ...]]:
+        """Rooms whose state differs from what was last written as a state row."""
+        return {room_id: signature for room_id, signature in signatures.items() if self._saved.get(room_id) != signature}
+
+    def mark_saved(self, signatures: Mapping[str, tuple[Any, ...]]) -> None:
+        self._saved.update(signatures)
+
+    def _notify(self) -> None:
+        self.version += 1
+        if self._changed is not None:
+            self._changed.set()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Wait until the state changes or ``timeout`` passes; True when it changed."""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._changed.clear()
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "ageSeconds": round(monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "version": self.version,
+            "reloads": self.reloads,
+            "doorEventsApplied": self.door_events_applied,
+            "doorEvents": sum(len(tail) for tail in self._doors.values()),
+            "sessions": sum(len(rows) for rows in self._sessions.values()),
+            "sessionsStale": self._sessions_stale,
+        }
@@ -0,0 +1,106 @@
+"""Shared helpers for the test modules."""
+
+import contextlib
+import os
+import unittest
+import uuid
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, Optional
+
+
+# Scratch Postgres for tests that run SQL for real. It is kept apart from
+# DATABASE_URL, which the core tests point at a dummy server, because these
+# tests create and drop their own schemas.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "").strip()
+
+requires_postgres = unittest.skipUnless(TEST_DATABASE_URL, "TEST_DATABASE_URL is not set")
+
+
+@contextlib.asynccontextmanager
+async def scratch_schema_engine() -> AsyncIterator[object]:
+    """Async engine whose search_path is a fresh schema that is dropped afterwards."""
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_async_engine(TEST_DATABASE_URL)
+    async with admin.begin() as conn:
+        await conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    engine = create_async_engine(TEST_DATABASE_URL, connect_args={"server_settings": {"search_path": schema}})
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+        async with admin.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        await admin.dispose()
+
+
+class FakeClock:
+    """Hand-driven stand-in for ``time.monotonic``/``time.time``, patched over a module's import."""
+
+    def __init__(self, now: float = 100.0) -> None:
+        self.now = now
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(round(seconds, 3))
+        self.now += seconds
+
+    async def async_sleep(self, seconds: float) -> None:
+        self.sleep(seconds)
+
+
+class FakeResult:
+    """Query result over fixed rows, with the accessors the code under test uses."""
+
+    def __init__(self, rows: Iterable[Any] = (), rowcount: Optional[int] = None) -> None:
+        self.rows = list(rows)
+        self.rowcount = len(self.rows) if rowcount is None else rowcount
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.rows)
+
+    def all(self) -> list[Any]:
+        return list(self.rows)
+
+    def first(self) -> Any:
+        return self.rows[0] if self.rows else None
+
+    def scalar(self) -> Any:
+        return self.rows[0][0] if self.rows else None
+
+    def scalars(self) -> "FakeResult":
+        return self
+
+
+class FakeSession:
+    """Async session that records statements and answers them with ``respond(statement, params)``.
+
+    ``respond`` returns a ``FakeResult`` or just its rows; rows passed to ``add`` collect in ``added``.
+    """
+
+    def __init__(self, respond: Optional[Callable[[Any, Any], Any]] = None) -> None:
+        self.respond = respond or (lambda _statement, _params: FakeResult())
+        self.statements: list[Any] = []
+        self.added: list[Any] = []
+        self.committed = False
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *_exc: Any) -> bool:
+        return False
+
+    async def execute(self, statement: Any, params: Any = None) -> FakeResult:
+        self.statements.append(statement)
+        result = self.respond(statement, params)
+        return result if isinstance(result, FakeResult) else FakeResult(result or ())
+
+    def add(self, row: Any) -> None:
+        self.added.append(row)
+
+    async def commit(self) -> None:
+        self.committed = True
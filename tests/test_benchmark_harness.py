@@ -0,0 +1,59 @@
+import json
+import random
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.dataset import door_event_rows, parking_rows, sun2_session_rows
+from benchmarks.harness import THRESHOLDS_PATH, load_thresholds, summarize
+
+
+class BenchmarkHarnessTests(unittest.TestCase):
+    def test_summary_flags_a_median_above_the_threshold(self) -> None:
+        result = summarize("overview", [12.0, 10.0, 30.0, 11.0, 9.0], threshold_ms=10.5)
+
+        self.assertEqual((result.min_ms, result.median_ms, result.p95_ms), (9.0, 11.0, 30.0))
+        self.assertTrue(result.regressed)
+        self.assertFalse(summarize("overview", [9.0], threshold_ms=None).regressed)
+
+    def test_thresholds_are_scaled_by_the_host_factor(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "thresholds.json"
+            path.write_text(json.dumps({"median_ms": {"overview": 200}}), encoding="utf-8")
+
+            self.assertEqual(load_thresholds(path, factor=1.5), {"overview": 300.0})
+
+        self.assertIn("api_overview", load_thresholds(THRESHOLDS_PATH, factor=1.0))
+
+    def test_a_slower_calibration_run_raises_the_thresholds(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "thresholds.json"
+            path.write_text(json.dumps({"calibration_ms": 20, "median_ms": {"overview": 200}}), encoding="utf-8")
+
+            self.assertEqual(load_thresholds(path, factor=1.0, calibration_ms=36), {"overview": 360.0})
+            self.assertEqual(load_thresholds(path, factor=1.0, calibration_ms=10), {"overview": 200.0})
+            self.assertEqual(load_thresholds(path, factor=2.0, calibration_ms=30), {"overview": 600.0})
+
+
+class BenchmarkDatasetTests(unittest.TestCase):
+    def test_generators_are_deterministic_and_stop_at_the_anchor(self) -> None:
+        now = datetime(2026, 8, 14, 12, 0)
+        first = list(sun2_session_rows(random.Random(7), now, scale=0.05))
+        second = list(sun2_session_rows(random.Random(7), now, scale=0.05))
+
+        self.assertEqual(first, second)
+        self.assertTrue(all(row["started_at"] <= now for row in first))
+        parking = list(parking_rows(random.Random(7), now, scale=0.05))
+        self.assertEqual(len({row["parking_id"] for row in parking}), len(parking))
+        self.assertTrue(all(row["end_time"] is None for row in parking if row["status"] == "ongoing"))
+
+    def test_door_events_alternate_closed_and_open_per_visit(self) -> None:
+        rows = list(door_event_rows(random.Random(7), datetime(2026, 8, 14, 12, 0), [(459, "door_solrom_01")], scale=0.02))
+
+        self.assertEqual([row["action"] for row in rows[:4]], ["CLOSED", "OPEN", "CLOSED", "OPEN"])
+        self.assertTrue(all(left["timestamp"] < right["timestamp"] for left, right in zip(rows, rows[1:])))
+
+
+if __name__ == "__main__":
+    unittest.main()
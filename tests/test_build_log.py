@@ -11,6 +11,10 @@ class BuildLogTests(unittest.TestCase):
         self.assertTrue(entry["isCurrent"])
         self.assertEqual(entry["path"], f"/admin/build/{build_log.APP_BUILD}")
 
+    def test_build_log_is_read_once_from_the_data_file(self) -> None:
+        self.assertIs(build_log.load_build_log(), build_log.BUILD_LOG)
+        self.assertEqual(build_log.build_log_entry_by_build(build_log.APP_BUILD)["build"], build_log.APP_BUILD)
+
     def test_minimal_entry_gets_safe_defaults(self) -> None:
         entry = build_log.normalized_build_log_entry({"build": "42", "changes": ["Endring"]})
 
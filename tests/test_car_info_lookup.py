@@ -1,4 +1,8 @@
+import asyncio
+import time
 import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
 
 from car_info_lookup.app.parsing import (
     compact_plate,
@@ -8,6 +12,9 @@ from car_info_lookup.app.parsing import (
     parse_biluppgifter_html,
     parse_tjekbil_json,
 )
+from car_info_lookup.app import registry as registry_module
+from car_info_lookup.app.registry import LookupCache, MockRegistry, TokenBucket, Upstream, VehicleRegistry, parse_country_days
+from support import FakeClock
 
 
 class NordicVehicleLookupTests(unittest.TestCase):
@@ -124,5 +131,97 @@ class NordicVehicleLookupTests(unittest.TestCase):
         self.assertEqual(parsed["fields"]["inspection_valid_to"], "2028-06-17")
 
 
+def mock_registry(svv: MockRegistry, rate_per_minute: float = 6000, concurrency: int = 4) -> VehicleRegistry:
+    return VehicleRegistry(
+        [Upstream("svv", "N", svv, TokenBucket(rate_per_minute, burst=1))],
+        LookupCache(":memory:"),
+        parse_country_days("N:30", 30),
+        parse_country_days("N:1", 7),
+        concurrency=concurrency,
+    )
+
+
+class SharedVehicleRegistryTests(unittest.IsolatedAsyncioTestCase):
+    async def test_answers_are_cached_with_positive_and_negative_ttls(self) -> None:
+        wall_clock = FakeClock(1000.0)
+        svv = MockRegistry({"EL12345": {"raw": {"merke": "Tesla"}}}, statuses={"EL99999": 503})
+        registry = mock_registry(svv)
+
+        with patch.object(registry_module, "time", SimpleNamespace(monotonic=time.monotonic, time=wall_clock)):
+            first = await registry.resolve("el 12345", "svv")
+            again = await registry.resolve("EL12345", "svv")
+            missing = await registry.resolve("EL00000", "svv")
+            await registry.resolve("EL99999", "svv")
+            await registry.resolve("EL99999", "svv")
+
+            self.assertTrue(first["confirmed"])
+            self.assertFalse(first["cached"])
+            self.assertTrue(again["cached"])
+            self.assertEqual(again["data"]["raw"], {"merke": "Tesla"})
+            self.assertEqual(missing["http_status"], 404)
+            self.assertEqual(svv.calls, ["EL12345", "EL00000", "EL99999", "EL99999"])
+
+            wall_clock.now += 2 * 86400
+            self.assertFalse((await registry.resolve("EL00000", "svv"))["cached"])
+            self.assertTrue((await registry.resolve("EL12345", "svv"))["cached"])
+
+    async def test_bulk_resolve_shares_one_upstream_call_per_plate(self) -> None:
+        svv = MockRegistry({"EL12345": {}, "AB11111": {}})
+        registry = mock_registry(svv, rate_per_minute=600)
+        started = time.monotonic()
+
+        results, single = await asyncio.gather(
+            registry.resolve_many(["EL12345", "el12345", "AB11111"], "svv"),
+            registry.resolve("EL12345", "svv"),
+        )
+
+        self.assertEqual([item["plate"] for item in results], ["EL12345", "AB11111"])
+        self.assertTrue(single["confirmed"])
+        self.assertEqual(sorted(svv.calls), ["AB11111", "EL12345"])
+        # Ten tokens per second: the second upstream call waited for the bucket.
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    async def test_cancelled_caller_leaves_a_shared_lookup_running(self) -> None:
+        svv = MockRegistry({"EL12345": {}})
+        registry = mock_registry(svv, concurrency=1)
+
+        # Holding the only upstream slot keeps both lookups waiting.
+        await registry._semaphore.acquire()
+        first = asyncio.create_task(registry.resolve("EL12345", "svv"))
+        second = asyncio.create_task(registry.resolve("EL12345", "svv"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        registry._semaphore.release()
+        result = await second
+
+        self.assertTrue(first.cancelled())
+        self.assertTrue(result["confirmed"])
+        self.assertTrue(result["shared"])
+        self.assertEqual(svv.calls, ["EL12345"])
+
+        await registry._semaphore.acquire()
+        lone = asyncio.create_task(registry.resolve("AB11111", "svv", force=True))
+        await asyncio.sleep(0.01)
+        lone.cancel()
+        await asyncio.sleep(0.01)
+        registry._semaphore.release()
+
+        self.assertEqual(registry.payload()["inflight"], 0)
+        self.assertEqual(svv.calls, ["EL12345"])
+
+    async def test_rate_limit_pauses_only_that_upstream(self) -> None:
+        svv = MockRegistry(statuses={"EL12345": 429})
+        registry = mock_registry(svv)
+
+        limited = await registry.resolve("EL12345", "svv")
+        paused = await registry.resolve("EL12345", "svv")
+
+        self.assertEqual((limited["http_status"], paused["http_status"]), (429, 429))
+        self.assertFalse(limited["cached"])
+        self.assertEqual(svv.calls, ["EL12345"])
+        self.assertGreater(registry.payload()["upstreams"]["svv"]["paused_seconds"], 0)
+
+
 if __name__ == "__main__":
     unittest.main()
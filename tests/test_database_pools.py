@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from application_lifecycle import BackgroundTaskSupervisor
+from database_pools import (
+    BACKGROUND,
+    INTERACTIVE,
+    QueryStats,
+    SlowQueryLog,
+    background_task_context,
+    current_query_stats,
+    db_workload,
+    instrument_engine,
+    listener_engine_options,
+    normalize_statement,
+    pool_settings,
+)
+
+
+class PoolSettingsTests(unittest.TestCase):
+    def test_role_defaults_favour_the_workload_the_process_serves(self) -> None:
+        web = pool_settings("web-blue", INTERACTIVE, {})
+        worker = pool_settings("worker", BACKGROUND, {})
+
+        self.assertGreater(web.pool_size, pool_settings("web-blue", BACKGROUND, {}).pool_size)
+        self.assertGreater(worker.pool_size, pool_settings("worker", INTERACTIVE, {}).pool_size)
+        self.assertEqual(web.application_name, "fibaro10-web-blue-interactive")
+
+    def test_environment_overrides_and_asyncpg_server_settings(self) -> None:
+        env = {"DB_BACKGROUND_POOL_SIZE": "3", "DB_BACKGROUND_STATEMENT_TIMEOUT_MS": "900000", "DB_POOL_PRE_PING": "nei"}
+        settings = pool_settings("combined", BACKGROUND, env)
+        options = settings.engine_options("postgresql+asyncpg://x@host/db")
+
+        self.assertEqual((settings.pool_size, settings.pre_ping), (3, False))
+        self.assertEqual(options["connect_args"]["server_settings"]["statement_timeout"], "900000")
+        self.assertNotIn("connect_args", settings.engine_options("sqlite://"))
+
+    def test_statement_timeout_is_off_unless_configured(self) -> None:
+        options = pool_settings("web-blue", INTERACTIVE, {}).engine_options("postgresql+asyncpg://x@host/db")
+
+        self.assertNotIn("statement_timeout", options["connect_args"]["server_settings"])
+
+    def test_listeners_get_unpooled_connections(self) -> None:
+        options = listener_engine_options("web-blue", "postgresql+asyncpg://x@host/db")
+
+        self.assertIs(options["poolclass"], NullPool)
+        self.assertEqual(options["connect_args"]["server_settings"]["application_name"], "fibaro10-web-blue-listen")
+
+
+class QueryAccountingTests(unittest.TestCase):
+    def test_statements_are_normalized_for_grouping(self) -> None:
+        self.assertEqual(
+            normalize_statement("SELECT *  FROM t1 WHERE id IN ($1, $2, 7) AND name = 'O''Neil'\n LIMIT 50"),
+            "SELECT * FROM t1 WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+
+    def test_engine_events_count_queries_per_request_and_log_slow_statements(self) -> None:
+        engine = create_engine("sqlite://")
+        slow_queries = SlowQueryLog(threshold_ms=0)
+        instrument_engine(engine, INTERACTIVE, slow_queries, logging.getLogger("database-pools-test"))
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            with self.assertLogs("database-pools-test", level="WARNING"), engine.connect() as conn:
+                for value in range(3):
+                    conn.execute(text(f"SELECT {value}"))
+        finally:
+            current_query_stats.reset(token)
+
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.most_repeated(), ("SELECT ?", 1))
+        self.assertEqual(slow_queries.payload()[0]["statement"], "SELECT ?")
+        self.assertEqual(slow_queries.payload()[0]["count"], 3)
+
+
+class BackgroundWorkloadTests(unittest.IsolatedAsyncioTestCase):
+    async def test_supervised_tasks_run_with_the_background_workload(self) -> None:
+        supervisor = BackgroundTaskSupervisor(logging.getLogger("database-pools-test"), task_context=background_task_context)
+        seen: list[str] = []
+
+        async def worker() -> None:
+            seen.append(db_workload.get())
+
+        await supervisor.start("worker", worker)
+        await asyncio.sleep(0)
+
+        self.assertEqual(seen, [BACKGROUND])
+        self.assertEqual(db_workload.get(), INTERACTIVE)
+
+
+if __name__ == "__main__":
+    unittest.main()
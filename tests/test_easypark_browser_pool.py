@@ -0,0 +1,156 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from easypark_downloader.app.browser_pool import BrowserPool, PhaseTimer, local_storage_init_script
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = [FakePage()]
+        self.handlers = {}
+        self.route_handler = None
+        self.cookies = []
+        self.init_scripts = []
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def route(self, _pattern, handler):
+        self.route_handler = handler
+
+    async def new_page(self):
+        page = FakePage()
+        self.pages.append(page)
+        return page
+
+    async def storage_state(self, path):
+        Path(path).write_text(json.dumps({"cookies": [{"name": "session", "value": "abc"}], "origins": []}), encoding="utf-8")
+
+    async def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    async def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = SimpleNamespace(resource_type=resource_type, url=url)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+class FakePlaywright:
+    stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+def make_pool(path, **options):
+    contexts = []
+
+    async def start():
+        return FakePlaywright()
+
+    async def launch(_playwright):
+        contexts.append(FakeContext())
+        return contexts[-1]
+
+    return BrowserPool(start, launch, storage_state_path=path, **options), contexts
+
+
+class EasyParkBrowserPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.state_path = Path(tempfile.mkdtemp(prefix="easypark-pool-")) / "storage-state.json"
+
+    def test_pages_are_reused_across_runs_and_parallel_runs_get_their_own_tab(self) -> None:
+        pool, contexts = make_pool(self.state_path)
+
+        async def scenario():
+            async with pool.page() as first:
+                pass
+            async with pool.page() as again:
+                self.assertIs(again, first)
+                async with pool.page() as parallel:
+                    self.assertIsNot(parallel, again)
+
+        asyncio.run(scenario())
+        self.assertEqual(len(contexts), 1)
+        self.assertEqual((pool.launches, pool.pages_opened, pool.pages_reused), (1, 1, 2))
+
+    def test_heavy_assets_are_blocked_but_recaptcha_is_not(self) -> None:
+        pool, contexts = make_pool(self.state_path)
+
+        async def scenario():
+            await pool.context()
+            routes = [
+                FakeRoute("image", "https://dashboard.easypark.net/logo.png"),
+                FakeRoute("image", "https://www.gstatic.com/recaptcha/api2/logo.png"),
+                FakeRoute("xhr", "https://dashboard.easypark.net/api/parkings"),
+            ]
+            for route in routes:
+                await contexts[0].route_handler(route)
+            return [route.outcome for route in routes]
+
+        self.assertEqual(asyncio.run(scenario()), ["abort", "continue", "continue"])
+        self.assertEqual(pool.blocked_requests, 1)
+
+    def test_storage_state_is_saved_and_restored_once_per_launch(self) -> None:
+        pool, contexts = make_pool(self.state_path, idle_seconds=1)
+
+        async def scenario():
+            await pool.context()
+            await pool.save_storage_state()
+            await pool.close("test")
+            await pool.context()
+            restored = [await pool.restore_storage_state(), await pool.restore_storage_state()]
+            pool.last_used -= 5
+            return restored, await pool.close_if_idle()
+
+        restored, idle_closed = asyncio.run(scenario())
+        self.assertEqual(restored, [True, False])
+        self.assertEqual(contexts[1].cookies, [{"name": "session", "value": "abc"}])
+        self.assertTrue(idle_closed)
+        self.assertTrue(contexts[0].closed and contexts[1].closed)
+        self.assertFalse(pool.is_open)
+
+    def test_local_storage_script_and_phase_timer(self) -> None:
+        script = local_storage_init_script({"origins": [{"origin": "https://dashboard.easypark.net", "localStorage": [{"name": "token", "value": "t"}]}]})
+        self.assertIn('"token": "t"', script)
+        self.assertIsNone(local_storage_init_script({"origins": []}))
+
+        timer = PhaseTimer()
+        with timer.phase("login"):
+            pass
+        with timer.phase("login"):
+            pass
+        self.assertEqual(set(timer.payload()), {"login_ms", "total_ms"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+
+from unittest.mock import patch
+
+import httpx
+
+import hc3_state_mirror
+from hc3_state_mirror import Hc3StateMirror, run_hc3_state_mirror
+from support import FakeClock
+
+
+class StubHc3:
+    """Serves /api/devices and a scripted /api/refreshStates feed."""
+
+    def __init__(self, devices: list[dict], feed: list[dict]) -> None:
+        self.devices = devices
+        self.feed = list(feed)
+        self.requests: list[str] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(f"{request.url.path}?{request.url.query.decode()}")
+        if request.url.path == "/api/devices":
+            return httpx.Response(200, json=self.devices)
+        if request.url.path == "/api/refreshStates":
+            if request.url.params.get("last") == "0":
+                return httpx.Response(200, json={"status": "IDLE", "last": 10, "changes": [], "events": []})
+            if self.feed:
+                return httpx.Response(200, json=self.feed.pop(0))
+            return httpx.Response(200, json={"status": "IDLE", "last": 99, "changes": [], "events": []})
+        return httpx.Response(404)
+
+
+class Hc3StateMirrorTests(unittest.IsolatedAsyncioTestCase):
+    def test_changes_and_property_events_update_the_device_table(self) -> None:
+        mirror = Hc3StateMirror(stale_after_seconds=15)
+        mirror.load([{"id": 459, "name": "Dør", "properties": {"value": False}}, {"id": 12, "properties": {"power": 0}}])
+
+        changed = mirror.apply(
+            {
+                "last": 11,
+                "changes": [{"id": 459, "value": True, "log": ""}, {"id": 12, "power": 0}],
+                "events": [{"type": "DevicePropertyUpdatedEvent", "data": {"id": 12, "property": "power", "newValue": 85.5}}],
+            }
+        )
+
+        self.assertEqual(changed, 2)
+        self.assertTrue(mirror.device(459)["properties"]["value"])
+        self.assertEqual(mirror.device(12)["properties"]["power"], 85.5)
+        self.assertNotIn("log", mirror.device(459)["properties"])
+        self.assertEqual(mirror.last, 11)
+
+    def test_stale_or_restructured_mirror_defers_to_hc3(self) -> None:
+        clock = FakeClock()
+        mirror = Hc3StateMirror(stale_after_seconds=15)
+        with patch.object(hc3_state_mirror, "monotonic", clock):
+            self.assertIsNone(mirror.device(459))
+            mirror.load([{"id": 459, "properties": {"value": False}}])
+            self.assertIsNotNone(mirror.rows())
+
+            clock.now += 20
+            self.assertIsNone(mirror.device(459))
+
+        mirror.apply({"last": 12, "events": [{"type": "DeviceCreatedEvent", "data": {"id": 600}}]})
+        self.assertTrue(mirror.needs_reload)
+        self.assertIsNone(mirror.rows())
+
+    async def test_runner_loads_the_snapshot_and_follows_the_change_feed(self) -> None:
+        stub = StubHc3(
+            devices=[{"id": 459, "name": "Dør", "properties": {"value": False}}],
+            feed=[{"status": "IDLE", "last": 11, "changes": [{"id": 459, "value": True}], "events": []}],
+        )
+        mirror = Hc3StateMirror()
+        async with httpx.AsyncClient(base_url="http://hc3.local", transport=httpx.MockTransport(stub.handler)) as client:
+            runner = asyncio.create_task(run_hc3_state_mirror(mirror, client, poll_interval_seconds=0.01))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if mirror.last == 99:
+                    break
+            runner.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await runner
+
+        self.assertTrue(mirror.device(459)["properties"]["value"])
+        self.assertEqual(stub.requests[:3], ["/api/refreshStates?last=0&lang=en", "/api/devices?", "/api/refreshStates?last=10&lang=en"])
+        self.assertEqual(sum(1 for path in stub.requests if path.startswith("/api/devices")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from microapp_backend.proxy_cache import ProxyResponseCache, cache_policy
+from parking_app.app.main import app as parking_app
+
+
+class CachePolicyTests(unittest.TestCase):
+    def test_policy_follows_core_cache_control(self) -> None:
+        self.assertFalse(cache_policy({"cache-control": "no-store", "etag": 'W/"1"'}).store)
+        self.assertFalse(cache_policy({"cache-control": "private, max-age=10", "etag": 'W/"1"'}).store)
+        self.assertEqual(cache_policy({"cache-control": "public, s-maxage=30, max-age=5"}).ttl_seconds, 30.0)
+        revalidate = cache_policy({"cache-control": "no-cache", "etag": 'W/"1"'})
+        self.assertTrue(revalidate.store)
+        self.assertEqual(revalidate.ttl_seconds, 0.0)
+        self.assertFalse(cache_policy({}).store)
+
+
+class ProxyResponseCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def test_fresh_shared_entry_is_served_to_other_sessions_with_the_same_role(self) -> None:
+        cache = ProxyResponseCache()
+        fetch = AsyncMock(return_value=httpx.Response(200, json={"ok": True}, headers={"cache-control": "max-age=30"}))
+
+        first = await cache.get(("role", "viewer", "/a"), ("session", "one", "/a"), fetch)
+        second = await cache.get(("role", "viewer", "/a"), ("session", "two", "/a"), fetch)
+        other_role = await cache.get(("role", "master", "/a"), ("session", "three", "/a"), fetch)
+
+        self.assertIs(first, second)
+        self.assertEqual(other_role.content, first.content)
+        self.assertEqual(fetch.await_count, 2)
+        self.assertEqual(cache.payload()["hits"], 1)
+
+    async def test_private_and_no_store_responses_are_not_cached(self) -> None:
+        cache = ProxyResponseCache()
+        fetch = AsyncMock(
+            side_effect=[
+                httpx.Response(200, content=b"mine", headers={"cache-control": "private, max-age=30"}),
+                httpx.Response(200, content=b"mine", headers={"cache-control": "private, max-age=30"}),
+                httpx.Response(200, content=b"live", headers={"cache-control": "no-store", "etag": 'W/"3"'}),
+                httpx.Response(200, content=b"live", headers={"cache-control": "no-store", "etag": 'W/"3"'}),
+            ]
+        )
+
+        await cache.get(("role", "viewer", "/me"), ("session", "one", "/me"), fetch)
+        await cache.get(("role", "viewer", "/me"), ("session", "one", "/me"), fetch)
+        await cache.get(None, ("session", "one", "/live"), fetch)
+        await cache.get(None, ("session", "one", "/live"), fetch)
+
+        self.assertEqual(fetch.await_count, 4)
+        self.assertEqual(fetch.await_args_list[3].args[0], {})
+        self.assertEqual(len(cache), 0)
+
+    async def test_stale_entry_is_revalidated_with_its_etag(self) -> None:
+        cache = ProxyResponseCache()
+        fetch = AsyncMock(
+            side_effect=[
+                httpx.Response(200, content=b"body", headers={"etag": 'W/"7"', "cache-control": "no-cache"}),
+                httpx.Response(304, headers={"etag": 'W/"7"'}),
+            ]
+        )
+
+        await cache.get(None, ("session", "one", "/v2"), fetch)
+        revalidated = await cache.get(None, ("session", "one", "/v2"), fetch)
+
+        self.assertEqual(fetch.await_args_list[1].args[0], {"If-None-Match": 'W/"7"'})
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertEqual(revalidated.content, b"body")
+        self.assertEqual(cache.payload()["revalidated"], 1)
+
+    async def test_concurrent_misses_for_a_session_share_one_core_request(self) -> None:
+        cache = ProxyResponseCache()
+        release = asyncio.Event()
+
+        async def fetch(conditional: dict[str, str]) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200, content=b"slow", headers={"cache-control": "max-age=5"})
+
+        waiters = [asyncio.create_task(cache.get(None, ("session", "one", "/slow"), fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        self.assertEqual({result.content for result in results}, {b"slow"})
+        self.assertEqual(cache.payload()["coalesced"], 2)
+        self.assertEqual(cache.payload()["misses"], 1)
+
+    async def test_least_recently_used_entry_is_evicted(self) -> None:
+        cache = ProxyResponseCache(max_entries=2)
+        fetch = AsyncMock(return_value=httpx.Response(200, content=b"x", headers={"cache-control": "max-age=30"}))
+
+        for path in ("/a", "/b", "/a", "/c"):
+            await cache.get(None, ("session", "one", path), fetch)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.payload()["evictions"], 1)
+        await cache.get(None, ("session", "one", "/a"), fetch)
+        self.assertEqual(fetch.await_count, 3)
+
+
+class DomainProxyCacheTests(unittest.TestCase):
+    def test_proxy_serves_cached_reads_and_clears_them_after_writes(self) -> None:
+        request = httpx.Request("GET", "http://fibaro10/api/settlements/42")
+        responses = [
+            httpx.Response(200, json={"role": "viewer"}, request=httpx.Request("GET", "http://fibaro10/api/auth/me")),
+            httpx.Response(200, json={"id": 42}, headers={"cache-control": "max-age=30", "etag": 'W/"42"'}, request=request),
+            httpx.Response(200, json={"ok": True}, request=httpx.Request("POST", "http://fibaro10/api/actions/parkering/refresh")),
+            httpx.Response(200, json={"id": 43}, headers={"cache-control": "max-age=30"}, request=request),
+        ]
+        with TestClient(parking_app, cookies={"fibaro10_session": "token"}) as client:
+            with patch.object(client.app.state.core_client, "request", new=AsyncMock(side_effect=responses)) as core_request:
+                first = client.get("/api/settlements/42")
+                cached = client.get("/api/settlements/42", headers={"If-None-Match": 'W/"42"'})
+                client.post("/api/actions/parkering/refresh", headers={"Origin": "http://testserver"})
+                refreshed = client.get("/api/settlements/42")
+            metrics = client.get("/api/app/cache").json()
+
+        self.assertEqual(first.json(), {"id": 42})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(refreshed.json(), {"id": 43})
+        self.assertEqual([call.args[1] for call in core_request.await_args_list], ["/api/auth/me", "/api/settlements/42", "/api/actions/parkering/refresh", "/api/settlements/42"])
+        self.assertEqual(metrics["hits"], 1)
+
+
+    def test_role_lookup_is_skipped_without_a_cookie_and_remembered_when_refused(self) -> None:
+        settlement = httpx.Request("GET", "http://fibaro10/api/settlements/42")
+        responses = [
+            httpx.Response(401, json={"detail": "Ikke innlogget"}, request=settlement),
+            httpx.Response(401, json={"detail": "Ikke innlogget"}, request=httpx.Request("GET", "http://fibaro10/api/auth/me")),
+            httpx.Response(401, json={"detail": "Ikke innlogget"}, request=settlement),
+            httpx.Response(401, json={"detail": "Ikke innlogget"}, request=settlement),
+        ]
+        with TestClient(parking_app) as client:
+            with patch.object(client.app.state.core_client, "request", new=AsyncMock(side_effect=responses)) as core_request:
+                anonymous = client.get("/api/settlements/42")
+                client.cookies.set("fibaro10_session", "expired")
+                refused = [client.get("/api/settlements/42") for _ in range(2)]
+
+        self.assertEqual([anonymous.status_code, *(response.status_code for response in refused)], [401, 401, 401])
+        self.assertEqual(
+            [call.args[1] for call in core_request.await_args_list],
+            ["/api/settlements/42", "/api/auth/me", "/api/settlements/42", "/api/settlements/42"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
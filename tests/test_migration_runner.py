@@ -2,7 +2,35 @@ import tempfile
 import unittest
 from pathlib import Path
 
-from migration_runner import discover_migrations, format_migration_list, migration_id_from_path, pending_migrations, split_sql_statements
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+from migration_runner import (
+    discover_migrations,
+    ensure_schema,
+    format_migration_list,
+    metadata_schema_parts,
+    migration_id_from_path,
+    pending_migrations,
+    schema_fingerprint,
+    split_sql_statements,
+)
+from support import FakeSession
+
+
+def state_connection() -> FakeSession:
+    """Connection that keeps schema_state fingerprints in a dict."""
+    fingerprints: dict[str, str] = {}
+
+    def respond(statement, parameters):
+        sql = str(statement)
+        if sql.startswith("SELECT fingerprint"):
+            stored = fingerprints.get(parameters["component"])
+            return [(stored,)] if stored is not None else []
+        if "INSERT INTO schema_state" in sql:
+            fingerprints[parameters["component"]] = parameters["fingerprint"]
+        return []
+
+    return FakeSession(respond)
 
 
 class MigrationRunnerTests(unittest.TestCase):
@@ -68,3 +96,27 @@ class MigrationRunnerTests(unittest.TestCase):
 
         self.assertEqual(len(statements), 1)
         self.assertIn("$body$", statements[0])
+
+
+class SchemaStateTests(unittest.IsolatedAsyncioTestCase):
+    def test_fingerprint_follows_column_changes(self) -> None:
+        def fingerprint(*columns: Column) -> str:
+            metadata = MetaData()
+            Table("events", metadata, Column("id", Integer, primary_key=True), *columns)
+            return schema_fingerprint(metadata_schema_parts(metadata))
+
+        self.assertEqual(fingerprint(Column("name", String)), fingerprint(Column("name", String)))
+        self.assertNotEqual(fingerprint(Column("name", String)), fingerprint(Column("name", String, index=True)))
+
+    async def test_schema_work_only_runs_when_the_fingerprint_changes(self) -> None:
+        conn = state_connection()
+        runs: list[str] = []
+
+        async def apply(_conn) -> None:
+            runs.append("applied")
+
+        self.assertTrue(await ensure_schema(conn, "core", "a", apply))
+        self.assertFalse(await ensure_schema(conn, "core", "a", apply))
+        self.assertTrue(await ensure_schema(conn, "core", "a", apply, force=True))
+        self.assertTrue(await ensure_schema(conn, "core", "b", apply))
+        self.assertEqual(len(runs), 3)
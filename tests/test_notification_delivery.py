@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import notification_delivery
+from notification_delivery import OutboxWakeup, TopicRateLimiter, coalesce_notification_items, ntfy_headers
+from support import FakeClock
+
+
+class NotificationDeliveryTests(unittest.IsolatedAsyncioTestCase):
+    def test_headers_skip_empty_optional_fields(self) -> None:
+        self.assertEqual(ntfy_headers("Dør", "4"), {"Title": "Dør", "Priority": "4"})
+        self.assertEqual(
+            ntfy_headers("Dør", "4", "door", "https://alarm")["Click"],
+            "https://alarm",
+        )
+
+    def test_coalesce_groups_identical_messages_in_claim_order(self) -> None:
+        items = [
+            {"id": 1, "topic": "doors", "title": "Dør åpen", "message": "Rom 3"},
+            {"id": 2, "topic": "lights", "title": "Lys", "message": "PÅ"},
+            {"id": 3, "topic": "doors", "title": "Dør åpen", "message": "Rom 3"},
+        ]
+
+        groups = coalesce_notification_items(items)
+
+        self.assertEqual([item["id"] for item, _ in groups], [1, 2])
+        self.assertEqual([item["id"] for item in groups[0][1]], [3])
+        self.assertEqual(groups[1][1], [])
+
+    def test_rate_limiter_allows_burst_then_reports_wait(self) -> None:
+        clock = FakeClock()
+        limiter = TopicRateLimiter(rate_per_minute=60, burst=2)
+
+        with patch.object(notification_delivery, "monotonic", clock):
+            self.assertEqual(limiter.reserve("lights"), 0.0)
+            self.assertEqual(limiter.reserve("lights"), 0.0)
+            self.assertAlmostEqual(limiter.reserve("lights"), 1.0)
+            self.assertEqual(limiter.reserve("doors"), 0.0)
+
+            clock.now += 1.0
+            self.assertEqual(limiter.reserve("lights"), 0.0)
+
+    async def test_wakeup_returns_immediately_after_earlier_notify(self) -> None:
+        wakeup = OutboxWakeup()
+        wakeup.notify()
+
+        self.assertTrue(await wakeup.wait(5))
+        self.assertFalse(await wakeup.wait(0.01))
+
+    async def test_wakeup_interrupts_waiting_worker(self) -> None:
+        wakeup = OutboxWakeup()
+        waiter = asyncio.create_task(wakeup.wait(5))
+        await asyncio.sleep(0)
+
+        wakeup.notify()
+
+        self.assertTrue(await asyncio.wait_for(waiter, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -72,3 +72,7 @@ class ObservabilityTests(unittest.TestCase):
         self.assertEqual(headers["Server-Timing"], "app;dur=123.5")
         self.assertEqual(headers["X-Response-Time"], "123.5ms")
         self.assertEqual(response_timing_headers(-1)["X-Response-Time"], "0.0ms")
+        self.assertEqual(
+            response_timing_headers(10, db_queries=3, db_duration_ms=4.25)["Server-Timing"],
+            'app;dur=10.0, db;dur=4.2;desc="3 queries"',
+        )
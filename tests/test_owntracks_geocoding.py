@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+
+from owntracks_service.app.geocoding import GeocodeEntry, Geocoder, LocalGeocodeProvider
+
+
+class FailingProvider:
+    name = "failing"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def reverse(self, lat: float, lon: float) -> dict:
+        self.calls += 1
+        raise OSError("offline")
+
+
+class OwnTracksGeocodingTests(unittest.TestCase):
+    def test_nearby_points_share_a_cached_result(self) -> None:
+        geocoder = Geocoder(LocalGeocodeProvider([]), radius_m=30)
+        geocoder.load([GeocodeEntry(lat=62.5, lon=11.7, name="Lilletorget 3", address="Lilletorget 3, Røros")])
+
+        self.assertEqual(geocoder.lookup(62.5001, 11.7003).name, "Lilletorget 3")
+        self.assertIsNone(geocoder.lookup(62.5005, 11.7))
+        self.assertIsNone(Geocoder(None).lookup(62.5, 11.7))
+
+    def test_misses_are_resolved_once_in_the_background_and_stored_in_batches(self) -> None:
+        stored: list[list[GeocodeEntry]] = []
+        provider = LocalGeocodeProvider([{"lat": 62.5, "lon": 11.7, "name": "Butikken", "address": "Storgata 1"}])
+        geocoder = Geocoder(provider, radius_m=30, min_interval_seconds=0, store=stored.append)
+
+        async def scenario() -> GeocodeEntry:
+            geocoder.start()
+            try:
+                self.assertIsNone(geocoder.lookup(62.5, 11.7))
+                self.assertIsNone(geocoder.lookup(62.50005, 11.7))
+                self.assertIsNone(geocoder.lookup(63.0, 11.7))
+                for _attempt in range(100):
+                    if geocoder.payload()["pending"] == 0 and stored:
+                        break
+                    await asyncio.sleep(0.01)
+                return geocoder.lookup(62.50005, 11.7)
+            finally:
+                await geocoder.stop()
+
+        entry = asyncio.run(scenario())
+        self.assertEqual((entry.name, entry.address), ("Butikken", "Storgata 1"))
+        self.assertEqual(sorted(item.name or "" for batch in stored for item in batch), ["", "Butikken"])
+        self.assertEqual(geocoder.resolved, 2)
+
+    def test_misses_before_the_worker_starts_are_queued_once_it_runs(self) -> None:
+        provider = LocalGeocodeProvider([{"lat": 62.5, "lon": 11.7, "name": "Butikken", "address": "Storgata 1"}])
+        geocoder = Geocoder(provider, radius_m=30, min_interval_seconds=0)
+
+        self.assertIsNone(geocoder.lookup(62.5, 11.7))
+        self.assertEqual(geocoder.payload()["pending"], 0)
+
+        async def scenario() -> None:
+            geocoder.start()
+            try:
+                geocoder.lookup(62.5, 11.7)
+                for _attempt in range(100):
+                    if geocoder.resolved:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                await geocoder.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(geocoder.lookup(62.5, 11.7).name, "Butikken")
+
+    def test_failures_are_not_retried_until_the_retry_window_passes(self) -> None:
+        provider = FailingProvider()
+        geocoder = Geocoder(provider, min_interval_seconds=0, retry_seconds=3600)
+
+        async def scenario() -> None:
+            geocoder.start()
+            try:
+                geocoder.lookup(62.5, 11.7)
+                for _attempt in range(100):
+                    if geocoder.failures:
+                        break
+                    await asyncio.sleep(0.01)
+                geocoder.lookup(62.5, 11.7)
+                await asyncio.sleep(0.02)
+            finally:
+                await geocoder.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(geocoder.payload()["pending"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from datetime import datetime
+
+from owntracks_service.app.ingest import IngestMessage, IngestQueue
+
+
+def message(topic: str, index: int) -> IngestMessage:
+    return IngestMessage(topic, f'{{"i":{index}}}', datetime(2026, 10, 19, 12, 0))
+
+
+class OwnTracksIngestQueueTests(unittest.TestCase):
+    def test_burst_is_stored_in_one_ordered_batch(self) -> None:
+        batches: list[list[str]] = []
+        queue = IngestQueue(lambda items: batches.append([item.payload_text for item in items]), max_delay_seconds=0.02)
+
+        async def scenario() -> None:
+            queue.start()
+            for index in range(200):
+                await queue.submit(message("owntracks/a/phone", index))
+            await queue.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(batches, [[f'{{"i":{index}}}' for index in range(200)]])
+        self.assertEqual(queue.payload()["largestBatch"], 200)
+
+    def test_waiting_callers_see_their_own_failure_but_not_their_neighbours(self) -> None:
+        def process(items: list[IngestMessage]) -> None:
+            if any(item.topic == "bad" for item in items):
+                raise ValueError("broken payload")
+
+        queue = IngestQueue(process, max_delay_seconds=0.02)
+
+        async def scenario() -> list[object]:
+            queue.start()
+            try:
+                return await asyncio.gather(
+                    queue.submit(message("good", 1), wait=True),
+                    queue.submit(message("bad", 2), wait=True),
+                    queue.submit(message("good", 3)),
+                    return_exceptions=True,
+                )
+            finally:
+                await queue.stop()
+
+        results = asyncio.run(scenario())
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(queue.failures, 1)
+
+    def test_outage_keeps_unwaited_messages_queued_until_the_store_recovers(self) -> None:
+        stored: list[str] = []
+        outage = {"calls": 0}
+
+        def process(items: list[IngestMessage]) -> None:
+            if outage["calls"] < 4:
+                outage["calls"] += 1
+                raise ConnectionError("database unavailable")
+            stored.extend(item.payload_text for item in items)
+
+        queue = IngestQueue(process, max_delay_seconds=0.01, retry_base_seconds=0.01, retry_max_seconds=0.02)
+
+        async def scenario() -> object:
+            queue.start()
+            try:
+                await queue.submit(message("owntracks/a/phone", 1))
+                await queue.submit(message("owntracks/a/phone", 2))
+                waited = await asyncio.gather(queue.submit(message("owntracks/a/phone", 3), wait=True), return_exceptions=True)
+                await queue.wait_idle()
+                return waited[0]
+            finally:
+                await queue.stop()
+
+        waited = asyncio.run(scenario())
+        self.assertEqual(stored[:2], ['{"i":1}', '{"i":2}'])
+        self.assertTrue(waited is None or isinstance(waited, ConnectionError))
+        self.assertGreater(queue.requeued, 0)
+        self.assertEqual(queue.retry_delay, 0.0)
+
+    def test_submit_without_a_running_worker_stores_inline(self) -> None:
+        stored: list[IngestMessage] = []
+        queue = IngestQueue(stored.extend)
+
+        asyncio.run(queue.submit(message("owntracks/a/phone", 1)))
+
+        self.assertEqual(len(stored), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
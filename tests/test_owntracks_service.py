@@ -2,21 +2,31 @@ import os
 import tempfile
 import unittest
 import base64
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
 
 _tmpdir = tempfile.mkdtemp(prefix="owntracks-service-test-")
 os.environ.setdefault("OWNTRACKS_DATA_DIR", _tmpdir)
 os.environ.setdefault("OWNTRACKS_DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'owntracks-test.db')}")
+os.environ.setdefault("OWNTRACKS_INGEST_WAIT_FOR_STORE", "true")
 
 from owntracks_service.app import main as owntracks_main  # noqa: E402
 from owntracks_service.app.main import (  # noqa: E402
+    StopPoint,
+    WaypointIndex,
+    candidate_is_near_existing_waypoint,
     canonical_owntracks_topic,
+    merge_stop_candidates,
     normalized_event_type,
+    stop_clusters_from_locations,
     waypoint_items_from_plural,
     waypoint_name_from_payload,
     waypoint_names,
     waypoint_state_for_event,
 )
+from owntracks_service.app.geocoding import LocalGeocodeProvider  # noqa: E402
+from owntracks_service.app.tracks import decode_polyline  # noqa: E402
 from fastapi.testclient import TestClient  # noqa: E402
 
 app = owntracks_main.app
@@ -113,6 +123,35 @@ class OwnTracksServiceTests(unittest.TestCase):
             self.assertGreater(all_rows[1]["distanceFromPreviousM"], 12000)
             self.assertLess(all_rows[1]["distanceFromPreviousM"], 13000)
 
+    def test_map_without_points_and_paged_locations(self) -> None:
+        topic = "owntracks/paged/android"
+        period = "hours=0&start=2025-03-01T00:00:00Z&end=2025-03-02T00:00:00Z"
+        with TestClient(app) as client:
+            for lat, created_at in [
+                (61.100, "2025-03-01T10:00:00Z"),
+                (61.101, "2025-03-01T11:00:00Z"),
+                (61.102, "2025-03-01T12:00:00Z"),
+            ]:
+                response = client.post(
+                    "/pub",
+                    json={"_type": "location", "topic": topic, "lat": lat, "lon": 10.466, "acc": 7, "created_at": created_at},
+                )
+                self.assertEqual(response.status_code, 200)
+
+            summary = client.get(f"/api/owntracks/map?{period}&points=0").json()
+            first = client.get(f"/api/owntracks/map/locations?{period}&limit=2").json()
+            second = client.get(f"/api/owntracks/map/locations?{period}&limit=2&offset=2").json()
+
+        self.assertEqual(summary["locations"], [])
+        self.assertEqual([row["lat"] for row in summary["mapLocations"]], [61.102])
+        self.assertEqual(summary["mapBounds"], [10.466, 61.1, 10.466, 61.102])
+        self.assertEqual(summary["qualityPolicy"]["rawLocations"], 3)
+        self.assertEqual((first["total"], first["hasMore"], second["hasMore"]), (3, True, False))
+        self.assertEqual([row["lat"] for row in first["locations"] + second["locations"]], [61.102, 61.101, 61.1])
+        # The oldest row of the first page still gets its distance from the row on the next page.
+        self.assertAlmostEqual(first["locations"][1]["distanceFromPreviousM"], 111.2, delta=1)
+        self.assertIsNone(second["locations"][0]["distanceFromPreviousM"])
+
     def test_map_keeps_raw_poor_accuracy_but_excludes_it_from_calculations(self) -> None:
         topic = "owntracks/poor-accuracy/android"
         with TestClient(app) as client:
@@ -871,6 +910,143 @@ class OwnTracksServiceTests(unittest.TestCase):
             self.assertGreaterEqual(suggestions[0]["totalDurationSeconds"], 600)
             self.assertEqual(suggestions[0]["visits"], 1)
 
+    def test_stop_detection_runs_per_topic_and_merges_repeat_visits(self) -> None:
+        start = datetime(2026, 10, 19, 8, 0)
+
+        def points(topic: str, lat: float, offset_minutes: int) -> list[StopPoint]:
+            return [
+                StopPoint(topic, None, None, start + timedelta(minutes=offset_minutes + minute), lat + minute * 0.00001, 11.7, 8.0)
+                for minute in range(0, 30, 5)
+            ]
+
+        phone = "owntracks/stops/phone"
+        tablet = "owntracks/stops/tablet"
+        rows = sorted(points(phone, 62.5, 0) + points(tablet, 63.0, 2) + points(phone, 62.5, 240), key=lambda point: point.at)
+        clusters = stop_clusters_from_locations(rows, min_duration_minutes=10, radius_m=120, max_gap_minutes=240)
+
+        self.assertEqual(sorted(candidate.topic for candidate in clusters), [phone, tablet])
+        self.assertEqual(clusters[0].sample_count, 12)
+
+        split = stop_clusters_from_locations(rows, min_duration_minutes=10, radius_m=120, max_gap_minutes=60)
+        merged = merge_stop_candidates(split, merge_radius_m=120)
+        self.assertEqual([(candidate.topic, candidate.visits) for candidate in merged], [(phone, 2), (tablet, 1)])
+        self.assertAlmostEqual(merged[0].lat, 62.500125, places=6)
+
+    def test_waypoint_index_matches_only_nearby_waypoints_on_the_same_topic(self) -> None:
+        topic = "owntracks/stops/phone"
+        index = WaypointIndex(
+            [
+                SimpleNamespace(topic=topic, lat=62.5, lon=11.7, radius_m=400),
+                SimpleNamespace(topic="owntracks/other/phone", lat=62.6, lon=11.7, radius_m=100),
+                SimpleNamespace(topic=topic, lat=None, lon=None, radius_m=100),
+            ]
+        )
+
+        def candidate(lat: float, lon: float, candidate_topic: str = topic) -> SimpleNamespace:
+            return SimpleNamespace(topic=candidate_topic, lat=lat, lon=lon)
+
+        self.assertTrue(candidate_is_near_existing_waypoint(candidate(62.503, 11.7), index, radius_m=100))
+        self.assertFalse(candidate_is_near_existing_waypoint(candidate(62.51, 11.7), index, radius_m=100))
+        self.assertFalse(candidate_is_near_existing_waypoint(candidate(62.6, 11.7), index, radius_m=100))
+        self.assertTrue(candidate_is_near_existing_waypoint(candidate(62.6, 11.7, "owntracks/other/phone"), index, radius_m=100))
+
+    def test_map_tracks_are_simplified_cached_and_clipped(self) -> None:
+        topic = "owntracks/tracks/phone"
+        base = 1783200000
+        with TestClient(app) as client:
+            points = [(minute * 60, 62.70000 + (minute % 2) * 0.00002, 11.90000) for minute in range(12)]
+            points += [(720 + step * 10, 62.70000 + step * 0.0005, 11.90000) for step in range(1, 31)]
+            for offset, lat, lon in points:
+                response = client.post(
+                    "/pub",
+                    json={"_type": "location", "topic": topic, "lat": lat, "lon": lon, "acc": 8, "tst": base + offset},
+                )
+                self.assertEqual(response.status_code, 200)
+
+            query = "hours=0&zoom=14&start=2026-07-04T00:00:00Z&end=2026-07-06T00:00:00Z&topic=" + topic
+            payload = client.get(f"/api/owntracks/map/tracks?{query}").json()
+            track = payload["tracks"][0]
+            self.assertEqual(track["rawPoints"], len(points))
+            self.assertLess(track["points"], 10)
+            self.assertEqual(len(track["stops"]), 1)
+            coordinates = decode_polyline(track["segments"][0]["polyline"])
+            self.assertEqual(coordinates[0], (62.7, 11.9))
+            self.assertAlmostEqual(coordinates[-1][0], 62.715, places=5)
+            self.assertEqual(track["segments"][0]["t"][0], base)
+
+            again = client.get(f"/api/owntracks/map/tracks?{query}&format=arrays").json()
+            self.assertEqual(again["summary"]["cachedDays"], again["summary"]["days"])
+            self.assertEqual(len(again["tracks"][0]["segments"][0]["lat"]), track["points"])
+
+            outside = client.get(f"/api/owntracks/map/tracks?{query}&bbox=10.0,60.0,10.5,60.5").json()
+            self.assertEqual(outside["tracks"], [])
+            tile = client.get(f"/api/owntracks/map/tiles/8/136/70?{query}").json()
+            self.assertEqual(tile["zoom"], 8)
+            self.assertEqual(len(tile["tracks"]), 1)
+            self.assertEqual(client.get(f"/api/owntracks/map/tracks?{query}&format=csv").status_code, 400)
+
+    def test_stop_suggestion_addresses_are_resolved_in_the_background(self) -> None:
+        topic = "owntracks/stop-geocode/android"
+        geocoder = owntracks_main.GEOCODER
+        original = (geocoder.provider, geocoder.min_interval_seconds)
+        geocoder.provider = LocalGeocodeProvider([{"lat": 62.8, "lon": 11.9, "name": "Hytta", "address": "Fjellveien 2"}])
+        geocoder.min_interval_seconds = 0
+        try:
+            with TestClient(app) as client:
+                for offset in (0, 600, 1200):
+                    client.post(
+                        "/pub",
+                        json={"_type": "location", "topic": topic, "lat": 62.8, "lon": 11.9, "acc": 8, "tst": 1783300000 + offset},
+                    )
+                query = "/api/owntracks/waypoint-suggestions?hours=0&min_minutes=10&radius_m=120&limit=100"
+
+                first = client.get(query).json()
+                suggestion = next(row for row in first["suggestions"] if row["topic"] == topic)
+                self.assertIsNone(suggestion["address"])
+                self.assertGreaterEqual(first["addressesPending"], 1)
+
+                for _attempt in range(100):
+                    with owntracks_main.SessionLocal() as session:
+                        cached = session.query(owntracks_main.OwnTracksGeocodeCache).filter_by(cache_key="62.80000,11.90000").one_or_none()
+                    if cached is not None:
+                        break
+                    time.sleep(0.01)
+                self.assertEqual(cached.name, "Hytta")
+                second = client.get(query).json()
+                suggestion = next(row for row in second["suggestions"] if row["topic"] == topic)
+                self.assertEqual((suggestion["suggestedName"], suggestion["address"]), ("Hytta", "Fjellveien 2"))
+
+        finally:
+            geocoder.provider, geocoder.min_interval_seconds = original
+
+    def test_queued_publish_absorbs_a_reconnect_burst_in_few_batches(self) -> None:
+        topic = "owntracks/burst/android"
+        queue = owntracks_main.INGEST_QUEUE
+        owntracks_main.INGEST_WAIT_FOR_STORE = False
+        try:
+            with TestClient(app) as client:
+                batches_before = queue.batches
+                messages = [
+                    {"_type": "location", "topic": topic, "lat": 62.9 + index * 0.0001, "lon": 11.9, "acc": 8, "tst": 1783400000 + index * 30}
+                    for index in range(60)
+                ]
+                for message in messages + messages[:5]:
+                    self.assertEqual(client.post("/pub", json=message).json(), [])
+                for _attempt in range(200):
+                    if client.get("/health").json()["ingest"]["queue"]["pending"] == 0:
+                        break
+                    time.sleep(0.01)
+                self.assertLess(queue.batches - batches_before, 30)
+
+            with owntracks_main.SessionLocal() as session:
+                rows = session.query(owntracks_main.OwnTracksLocation).filter_by(topic=topic).all()
+                device = session.query(owntracks_main.OwnTracksDevice).filter_by(topic=topic).one()
+            self.assertEqual(len(rows), 60)
+            self.assertEqual(device.message_count, 60)
+            self.assertAlmostEqual(device.last_lat, 62.9059)
+        finally:
+            owntracks_main.INGEST_WAIT_FOR_STORE = True
+
     def test_diagnostics_flags_stale_positions_and_large_gaps(self) -> None:
         topic = "owntracks/diagnostics/android"
         with TestClient(app) as client:
@@ -0,0 +1,49 @@
+import unittest
+
+from owntracks_service.app.tracks import clip_runs, decode_polyline, delta_encode, encode_polyline, parse_bbox, simplify_track, tile_bbox
+
+
+class OwnTracksTrackTests(unittest.TestCase):
+    def test_polyline_matches_the_reference_encoding(self) -> None:
+        lats = [38.5, 40.7, 43.252]
+        lons = [-120.2, -120.95, -126.453]
+
+        encoded = encode_polyline(lats, lons)
+
+        self.assertEqual(encoded, "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        self.assertEqual(decode_polyline(encoded), list(zip(lats, lons)))
+        self.assertEqual(delta_encode([100, 130, 125]), [100, 30, -5])
+
+    def test_simplification_drops_jitter_within_accuracy_but_keeps_corners_and_anchors(self) -> None:
+        lats = [62.5 + index * 0.001 for index in range(11)] + [62.51] * 10
+        lons = [11.7 + (0.00005 if index % 2 else 0.0) for index in range(11)] + [11.7 + index * 0.001 for index in range(1, 11)]
+        accuracies = [5.0] * len(lats)
+
+        kept = simplify_track(lats, lons, accuracies, tolerance_m=2.0)
+        self.assertEqual(kept, [0, 10, 20])
+
+        self.assertEqual(simplify_track(lats, lons, accuracies, tolerance_m=2.0, keep=[4, 15]), [0, 4, 10, 15, 20])
+        self.assertGreater(len(simplify_track(lats, lons, [None] * len(lats), tolerance_m=0.5)), 3)
+
+    def test_bbox_clipping_keeps_the_neighbours_of_inside_runs(self) -> None:
+        lats = [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+        lons = [0.0] * 7
+
+        self.assertEqual(clip_runs(lats, lons, (-1.0, 1.5, 1.0, 2.5)), [(1, 4)])
+        self.assertEqual(clip_runs(lats, lons, None), [(0, 7)])
+        self.assertEqual(clip_runs([0.0, 2.0, 0.0, 0.0, 2.0], [0.0] * 5, (-1.0, 1.5, 1.0, 2.5)), [(0, 3), (3, 5)])
+
+    def test_tile_and_bbox_parsing(self) -> None:
+        min_lon, min_lat, max_lon, max_lat = tile_bbox(1, 1, 0)
+        self.assertEqual((min_lon, max_lon), (0.0, 180.0))
+        self.assertAlmostEqual(min_lat, 0.0)
+        self.assertAlmostEqual(max_lat, 85.0511, places=4)
+
+        self.assertEqual(parse_bbox("11.6,62.4,11.8,62.6"), (11.6, 62.4, 11.8, 62.6))
+        self.assertIsNone(parse_bbox(None))
+        with self.assertRaises(ValueError):
+            parse_bbox("11.8,62.4,11.6,62.6")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import sys
+import time
+import unittest
+from types import SimpleNamespace
+
+from microapp_backend.profiler import IDLE_ROUTE, SamplingProfiler, route_codes
+
+
+def overview_endpoint(profiler: SamplingProfiler, now: float) -> None:
+    profiler.sample(sys._getframe(), now=now)
+
+
+class SamplingProfilerTests(unittest.TestCase):
+    def test_samples_are_attributed_to_the_route_whose_endpoint_is_on_the_stack(self) -> None:
+        profiler = SamplingProfiler(window_minutes=10)
+        profiler.routes = route_codes([SimpleNamespace(path="/api/overview", endpoint=overview_endpoint)])
+        now = 1_800_000_000.0
+        for _ in range(3):
+            overview_endpoint(profiler, now)
+
+        payload = profiler.payload(minutes=5, now=now)
+
+        self.assertEqual(payload["samples"], 3)
+        self.assertEqual(payload["routes"], [{"route": "/api/overview", "samples": 3, "share": 1.0}])
+        self.assertTrue(payload["stacks"][0]["stack"].endswith("test_sampling_profiler:overview_endpoint"))
+        self.assertIn(" 3\n", profiler.folded(minutes=5, route="/api/overview", now=now))
+        self.assertEqual(profiler.payload(minutes=5, now=now + 3600)["samples"], 0)
+
+    def test_idle_loop_frames_are_counted_but_not_kept_as_stacks(self) -> None:
+        profiler = SamplingProfiler()
+        namespace = {"sys": sys}
+        exec(compile("def select():\n    return sys._getframe()\n", "/usr/lib/python3.12/selectors.py", "exec"), namespace)
+        idle_frame = namespace["select"]()
+        profiler.sample(idle_frame, now=1_800_000_000.0)
+
+        payload = profiler.payload(now=1_800_000_000.0)
+
+        self.assertEqual((payload["samples"], payload["idleSamples"], payload["stacks"]), (1, 1, []))
+        self.assertNotIn(IDLE_ROUTE, [row["route"] for row in payload["routes"]])
+
+
+class BlockingCallTests(unittest.IsolatedAsyncioTestCase):
+    async def test_blocking_call_on_the_loop_is_reported_with_its_stack(self) -> None:
+        profiler = SamplingProfiler(interval_ms=10, blocking_ms=60, logger=logging.getLogger("profiler-test"))
+
+        def blocking_fetch() -> None:
+            time.sleep(0.3)
+
+        profiler.start({})
+        try:
+            await asyncio.sleep(0.05)
+            with self.assertLogs("profiler-test", level="WARNING") as logs:
+                blocking_fetch()
+                await asyncio.sleep(0.1)
+        finally:
+            await profiler.stop()
+
+        blocking = profiler.payload()["blocking"]
+        self.assertEqual(len(blocking), 1)
+        self.assertGreaterEqual(blocking[0]["durationMs"], 150)
+        self.assertTrue(blocking[0]["origin"].endswith("blocking_fetch"))
+        self.assertIn("Event loop blocked", logs.output[0])
+        self.assertFalse(profiler.running)
+
+
+if __name__ == "__main__":
+    unittest.main()
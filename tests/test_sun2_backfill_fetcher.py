@@ -0,0 +1,182 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+from sun2_backfill_downloader.app import fetcher, main
+from sun2_backfill_downloader.app.fetcher import ExportDownloader, LoginRequired, ProgressLedger, RateLimiter
+from support import FakeClock
+
+
+def url_for(day):
+    return f"https://sun2.example/export.php?startdate={day.isoformat()}&enddate={day.isoformat()}"
+
+
+class Sun2BackfillFetcherTests(unittest.TestCase):
+    def test_rate_limiter_spaces_requests_across_callers(self) -> None:
+        clock = FakeClock(0.0)
+        limiter = RateLimiter(2)
+
+        with patch.object(fetcher, "monotonic", clock), patch.object(fetcher, "sleep", clock.sleep):
+            for _ in range(3):
+                limiter.acquire()
+            clock.now = 5.0
+            limiter.acquire()
+            self.assertEqual(clock.sleeps, [0.5, 0.5])
+            RateLimiter(0).acquire()
+
+        self.assertEqual(len(clock.sleeps), 2)
+
+    def test_ledger_keeps_the_last_checksum_per_day_and_compacts(self) -> None:
+        path = Path(tempfile.mkdtemp(prefix="sun2-ledger-")) / "ledger.tsv"
+        ledger = ProgressLedger(path)
+        for index in range(150):
+            ledger.record(date(2020, 1, 1), f"sum{index}", index)
+        ledger.record(date(2020, 1, 2), "other", 7)
+
+        reloaded = ProgressLedger(path)
+
+        self.assertEqual(reloaded.get(date(2020, 1, 1)), ("sum149", 149))
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(len(path.read_text(encoding="utf-8").splitlines()), 2)
+
+    def test_downloader_retries_with_backoff_and_reuses_browser_cookies(self) -> None:
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(503, headers={"Retry-After": "3"})
+            return httpx.Response(200, content="Rom\tTotal\r\n".encode("utf-16"))
+
+        sleeps = []
+        downloader = ExportDownloader(
+            [{"name": "PHPSESSID", "value": "abc", "domain": "sun2.example", "path": "/"}],
+            url_for,
+            rate_limiter=RateLimiter(0),
+            transport=httpx.MockTransport(handler),
+        )
+        with downloader, patch.object(fetcher, "sleep", sleeps.append):
+            data = downloader.fetch(date(2020, 1, 1), "Statistics_room_2020-01-01_2020-01-01.csv")
+
+        self.assertTrue(data.decode("utf-16").startswith("Rom"))
+        self.assertEqual(len(calls), 2)
+        self.assertIn("PHPSESSID=abc", calls[1].headers["cookie"])
+        self.assertGreaterEqual(sleeps[0], 3)
+        self.assertEqual(downloader.retried, 1)
+
+    def test_login_page_and_other_html_are_not_saved_as_csv(self) -> None:
+        error_dir = Path(tempfile.mkdtemp(prefix="sun2-errors-"))
+        pages = iter(
+            [
+                '<html><form id="login-form"><input name="username"><input name="password"></form></html>',
+                "<!doctype html><p>Intern feil</p>",
+            ]
+        )
+        downloader = ExportDownloader(
+            [],
+            url_for,
+            rate_limiter=RateLimiter(0),
+            error_dir=error_dir,
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, text=next(pages))),
+        )
+        with downloader:
+            with self.assertRaises(LoginRequired):
+                downloader.fetch(date(2020, 1, 1), "a.csv")
+            with self.assertRaisesRegex(RuntimeError, "HTML"):
+                downloader.fetch(date(2020, 1, 2), "b.csv")
+
+        self.assertEqual([path.name for path in error_dir.iterdir()], ["HTML_b.csv.html"])
+
+
+LOGIN_HTML = '<html><form id="login-form"><input name="username"><input name="password"></form></html>'
+
+
+class Sun2BackfillRunTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.data_dir = Path(tempfile.mkdtemp(prefix="sun2-backfill-"))
+        self.out_dir = self.data_dir / "raw"
+        self.status_file = self.data_dir / "status.json"
+        self.ledger_file = self.data_dir / "ledger.tsv"
+        self.requested: list[str] = []
+        self.logins = 0
+
+    def browser_cookies(self, _username, _password, _day):
+        self.logins += 1
+        return [{"name": "PHPSESSID", "value": f"s{self.logins}", "domain": "sun2.example", "path": "/"}]
+
+    def run_backfill(self, handler, concurrency: int = 4) -> None:
+        def new_downloader(cookies, concurrency=concurrency):
+            return ExportDownloader(cookies, url_for, rate_limiter=RateLimiter(0), concurrency=concurrency, retries=0, transport=httpx.MockTransport(handler))
+
+        env = {"SUN2_USERNAME": "user", "SUN2_PASSWORD": "secret", "START_DATE": "2020-01-01", "END_DATE": "2020-01-06"}
+        with (
+            patch.dict(os.environ, env),
+            patch.dict(main.state, {"downloaded": 0, "skipped": 0, "failed": 0}),
+            patch.multiple(
+                main,
+                OUT_DIR=self.out_dir,
+                ERROR_DIR=self.data_dir / "errors",
+                STATUS_FILE=self.status_file,
+                LEDGER_FILE=self.ledger_file,
+                DOWNLOAD_CONCURRENCY=concurrency,
+                browser_cookies=self.browser_cookies,
+                new_downloader=new_downloader,
+            ),
+        ):
+            main.run_backfill_sync()
+            self.counts = {key: main.state[key] for key in ("downloaded", "skipped", "failed")}
+
+    def csv_handler(self, request):
+        self.requested.append(request.url.params["startdate"])
+        return httpx.Response(200, content="Rom\tTotal\r\n".encode("utf-16"))
+
+    def test_resume_keeps_the_pre_ledger_progress_after_files_move_on(self) -> None:
+        self.status_file.write_text(json.dumps({"last_success_date": "2020-01-03"}), encoding="utf-8")
+
+        self.run_backfill(self.csv_handler)
+        for path in self.out_dir.iterdir():
+            path.unlink()
+        self.run_backfill(self.csv_handler)
+
+        self.assertEqual(sorted(self.requested), ["2020-01-04", "2020-01-05", "2020-01-06"])
+        self.assertEqual(ProgressLedger(self.ledger_file).floor, date(2020, 1, 4))
+        self.assertEqual(self.counts, {"downloaded": 0, "skipped": 3, "failed": 0})
+
+    def test_expired_session_logs_in_again_once_for_all_workers(self) -> None:
+        def handler(request):
+            if "PHPSESSID=s1" in request.headers.get("cookie", ""):
+                return httpx.Response(200, text=LOGIN_HTML)
+            return self.csv_handler(request)
+
+        self.run_backfill(handler)
+
+        self.assertEqual(self.logins, 2)
+        self.assertEqual(sorted(self.requested), [f"2020-01-0{day}" for day in range(1, 7)])
+        self.assertEqual(len(ProgressLedger(self.ledger_file)), 6)
+        self.assertEqual(self.counts, {"downloaded": 6, "skipped": 0, "failed": 0})
+
+    def test_stop_leaves_the_remaining_days_for_the_next_run(self) -> None:
+        def handler(request):
+            main.stop_requested = True
+            return self.csv_handler(request)
+
+        self.run_backfill(handler, concurrency=1)
+
+        self.assertFalse(main.stop_requested)
+        self.assertEqual(self.requested, ["2020-01-01"])
+        self.assertEqual(json.loads(self.status_file.read_text(encoding="utf-8"))["last_action"], "stopped")
+
+        self.run_backfill(self.csv_handler, concurrency=1)
+
+        self.assertEqual(self.requested, [f"2020-01-0{day}" for day in range(1, 7)])
+        self.assertEqual(self.counts, {"downloaded": 5, "skipped": 1, "failed": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from migration_runner import split_sql_statements
+from response_versions import data_version_trigger_statements
+from support import requires_postgres, scratch_schema_engine
+from time_partitioning import (
+    PartitionedTable,
+    add_months,
+    expired_partitions,
+    maintain_time_partitions,
+    partition_month,
+    partition_name,
+    upcoming_months,
+)
+
+
+MIGRATION_PATH = Path(__file__).resolve().parents[1] / "migrations" / "versions" / "20261019_0900_partition_sample_tables.sql"
+DATA_VERSIONS_MIGRATION_PATH = MIGRATION_PATH.with_name("20261019_1400_add_data_versions.sql")
+
+
+class TimePartitioningTests(unittest.TestCase):
+    def test_add_months_rolls_over_year(self) -> None:
+        self.assertEqual(add_months(date(2026, 11, 1), 2), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+
+    def test_partition_name_round_trips(self) -> None:
+        name = partition_name("door_events", date(2026, 3, 1))
+
+        self.assertEqual(name, "door_events_p202603")
+        self.assertEqual(partition_month("door_events", name), date(2026, 3, 1))
+
+    def test_partition_month_ignores_legacy_default_and_other_tables(self) -> None:
+        self.assertIsNone(partition_month("door_events", "door_events_legacy"))
+        self.assertIsNone(partition_month("door_events", "door_events_default"))
+        self.assertIsNone(partition_month("door_events", "door_events_p202613"))
+        self.assertIsNone(partition_month("utelys_samples", "door_events_p202603"))
+
+    def test_upcoming_months_include_current_month(self) -> None:
+        self.assertEqual(
+            upcoming_months(datetime(2026, 12, 15, 8, 0), 2),
+            [date(2026, 12, 1), date(2027, 1, 1), date(2027, 2, 1)],
+        )
+
+    def test_expired_partitions_require_whole_month_before_cutoff(self) -> None:
+        names = [
+            "access_logs_legacy",
+            "access_logs_default",
+            "access_logs_p202603",
+            "access_logs_p202601",
+            "access_logs_p202602",
+        ]
+
+        expired = expired_partitions("access_logs", names, datetime(2026, 3, 1, 0, 0))
+
+        self.assertEqual(expired, ["access_logs_p202601", "access_logs_p202602"])
+
+
+DOOR_EVENTS_DDL = """
+CREATE TABLE door_events (
+    id SERIAL PRIMARY KEY,
+    timestamp TIMESTAMP,
+    action VARCHAR NOT NULL,
+    device_id INTEGER
+)
+"""
+ENERGY_SAMPLES_DDL = """
+CREATE TABLE energy_fibaro_samples (
+    id SERIAL PRIMARY KEY,
+    bucket_start TIMESTAMP NOT NULL,
+    inntak_w DOUBLE PRECISION,
+    CONSTRAINT uq_energy_fibaro_bucket UNIQUE (bucket_start)
+)
+"""
+DOOR_EVENT_ROWS = [
+    (datetime(2026, 1, 15, 8, 0), "open"),
+    (datetime(2026, 2, 10, 8, 0), "open"),
+    (datetime(2026, 2, 20, 8, 0), "close"),
+    (datetime(2026, 3, 5, 8, 0), "open"),
+    (None, "open"),
+]
+
+
+@requires_postgres
+class PartitionMigrationTests(unittest.IsolatedAsyncioTestCase):
+    TABLES = [PartitionedTable("door_events", "timestamp"), PartitionedTable("energy_fibaro_samples", "bucket_start")]
+
+    async def asyncSetUp(self) -> None:
+        from sqlalchemy import text
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        self.engine_context = scratch_schema_engine()
+        self.engine = await self.engine_context.__aenter__()
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        async with self.engine.begin() as conn:
+            await conn.execute(text(DOOR_EVENTS_DDL))
+            await conn.execute(text('CREATE INDEX ix_door_events_timestamp ON door_events (timestamp DESC)'))
+            await conn.execute(text("CREATE INDEX ix_door_events_device_timestamp ON door_events (device_id, timestamp DESC)"))
+            await conn.execute(text(ENERGY_SAMPLES_DDL))
+            for moment, action in DOOR_EVENT_ROWS:
+                await conn.execute(
+                    text("INSERT INTO door_events (timestamp, action) VALUES (:moment, :action)"),
+                    {"moment": moment, "action": action},
+                )
+            for month in (1, 2, 3):
+                await conn.execute(
+                    text("INSERT INTO energy_fibaro_samples (bucket_start, inntak_w) VALUES (:bucket, :value)"),
+                    {"bucket": datetime(2026, month, 1, 12, 0), "value": float(month)},
+                )
+            for statement in split_sql_statements(MIGRATION_PATH.read_text(encoding="utf-8")):
+                await conn.execute(text(statement))
+
+    async def asyncTearDown(self) -> None:
+        await self.engine_context.__aexit__(None, None, None)
+
+    async def rows(self, sql: str, params: dict | None = None) -> list[tuple]:
+        from sqlalchemy import text
+
+        async with self.engine.connect() as conn:
+            return [tuple(row) for row in (await conn.execute(text(sql), params or {})).fetchall()]
+
+    async def maintain(self, now_value: datetime, tables=None) -> dict:
+        return await maintain_time_partitions(self.session_factory, tables or self.TABLES, now_value, 1, backfill_batch_ids=2)
+
+    async def test_migration_only_prepares_a_copy_and_mirrors_writes(self) -> None:
+        from sqlalchemy import text
+
+        async with self.engine.begin() as conn:
+            await conn.execute(text("INSERT INTO door_events (timestamp, action) VALUES ('2026-03-06 09:00', 'close')"))
+            await conn.execute(text("UPDATE door_events SET action = 'forced' WHERE id = 1"))
+            await conn.execute(text("DELETE FROM door_events WHERE id = 2"))
+
+        self.assertEqual(await self.rows("SELECT relkind::text FROM pg_class WHERE oid = to_regclass('door_events')"), [("r",)])
+        self.assertEqual(
+            await self.rows("SELECT id, action FROM door_events_partitioned ORDER BY id"),
+            [(1, "forced"), (6, "close")],
+        )
+        self.assertEqual(
+            await self.rows("SELECT copied_id, max_id FROM time_partition_backfills WHERE table_name = 'door_events'"),
+            [(0, 5)],
+        )
+
+    async def test_backfill_swaps_in_monthly_partitions(self) -> None:
+        from sqlalchemy import text
+
+        async with self.engine.begin() as conn:
+            await conn.execute(text("UPDATE door_events SET action = 'forced' WHERE id = 1"))
+            await conn.execute(text("DELETE FROM door_events WHERE id = 2"))
+
+        results = await self.maintain(datetime(2026, 3, 10, 12, 0))
+
+        self.assertEqual(results["door_events"]["backfill"], {"copied": True, "swapped": True})
+        self.assertTrue(results["door_events"]["partitioned"])
+        self.assertEqual(
+            await self.rows("SELECT relname::text, relkind::text FROM pg_class WHERE relname LIKE 'door_events%' AND relkind IN ('r', 'p') AND NOT relispartition AND pg_table_is_visible(oid) ORDER BY relname"),
+            [("door_events", "p"), ("door_events_retired", "r")],
+        )
+        self.assertEqual(
+            await self.rows("SELECT id, tableoid::regclass::text, action FROM door_events ORDER BY id"),
+            [
+                (1, "door_events_p202601", "forced"),
+                (3, "door_events_p202602", "close"),
+                (4, "door_events_p202603", "open"),
+                (5, "door_events_default", "open"),
+            ],
+        )
+        indexes = {row[0] for row in await self.rows("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'door_events'")}
+        self.assertEqual(
+            indexes,
+            {"door_events_pkey", "ix_door_events_timestamp", "ix_door_events_device_timestamp", "ix_door_events_timestamp_brin"},
+        )
+        async with self.engine.begin() as conn:
+            new_id = (await conn.execute(text("INSERT INTO door_events (timestamp, action) VALUES ('2026-03-11 07:00', 'open') RETURNING id"))).scalar()
+            await conn.execute(text("DROP TABLE door_events_retired"))
+            await conn.execute(
+                text(
+                    "INSERT INTO energy_fibaro_samples (bucket_start, inntak_w) VALUES ('2026-02-01 12:00', 9) "
+                    "ON CONFLICT (bucket_start) DO UPDATE SET inntak_w = EXCLUDED.inntak_w"
+                )
+            )
+        self.assertEqual(new_id, 6)
+        self.assertEqual(
+            await self.rows("SELECT tableoid::regclass::text, inntak_w FROM energy_fibaro_samples WHERE bucket_start = '2026-02-01 12:00'"),
+            [("energy_fibaro_samples_p202602", 9.0)],
+        )
+
+    async def test_swap_keeps_the_data_version_trigger(self) -> None:
+        from sqlalchemy import text
+
+        async with self.engine.begin() as conn:
+            for statement in [
+                *split_sql_statements(DATA_VERSIONS_MIGRATION_PATH.read_text(encoding="utf-8")),
+                *data_version_trigger_statements(["door_events"]),
+            ]:
+                await conn.execute(text(statement))
+            await conn.execute(text("INSERT INTO door_events (timestamp, action) VALUES ('2026-03-06 09:00', 'close')"))
+        before = await self.rows("SELECT version FROM data_versions WHERE table_name = 'door_events'")
+
+        await self.maintain(datetime(2026, 3, 10, 12, 0))
+        async with self.engine.begin() as conn:
+            await conn.execute(text("INSERT INTO door_events (timestamp, action) VALUES ('2026-03-11 07:00', 'open')"))
+
+        self.assertEqual(await self.rows("SELECT relkind::text FROM pg_class WHERE oid = to_regclass('door_events')"), [("p",)])
+        self.assertEqual(await self.rows("SELECT version FROM data_versions WHERE table_name = 'door_events'"), [(before[0][0] + 1,)])
+
+    async def test_retention_drops_whole_months_after_swap(self) -> None:
+        await self.maintain(datetime(2026, 3, 10, 12, 0))
+
+        results = await self.maintain(datetime(2026, 4, 15, 12, 0), [PartitionedTable("door_events", "timestamp", retention_days=40)])
+
+        self.assertEqual(results["door_events"]["dropped"], ["door_events_p202601", "door_events_p202602"])
+        self.assertEqual(results["door_events"]["backfill"], None)
+        self.assertEqual(await self.rows("SELECT id FROM door_events ORDER BY id"), [(4,), (5,)])
+
+    async def test_swap_waits_for_the_next_run_when_the_table_is_busy(self) -> None:
+        from sqlalchemy import text
+
+        async with self.engine.connect() as reader:
+            await reader.execute(text("SELECT count(*) FROM door_events"))
+            with patch("time_partitioning.SWAP_LOCK_TIMEOUT", "100ms"):
+                results = await self.maintain(datetime(2026, 3, 10, 12, 0), self.TABLES[:1])
+            await reader.rollback()
+
+        self.assertEqual(results["door_events"]["backfill"], {"copied": True, "swapped": False})
+        self.assertFalse(results["door_events"]["partitioned"])
+        results = await self.maintain(datetime(2026, 3, 10, 12, 0), self.TABLES[:1])
+        self.assertEqual(results["door_events"]["backfill"], {"copied": True, "swapped": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+"""Monthly range partitions for the high-volume sample and event tables."""
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+import re
+from typing import Any, Optional
+
+
+PARTITION_SUFFIX_PATTERN = re.compile(r"_p(\d{4})(\d{2})$")
+SWAP_LOCK_TIMEOUT = "5s"
+LOCK_NOT_AVAILABLE = "55P03"
+
+# Core-owned tables converted by migrations/versions/20261019_0900_partition_sample_tables.sql.
+PARTITIONED_TABLE_COLUMNS = {
+    "energy_fibaro_samples": "bucket_start",
+    "utelys_samples": "bucket_start",
+    "ventilasjon_samples": "bucket_start",
+    "door_events": "timestamp",
+    "access_logs": "timestamp",
+}
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    table: str
+    column: str
+    retention_days: int = 0
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    if not name.startswith(f"{table}_p"):
+        return None
+    match = PARTITION_SUFFIX_PATTERN.search(name)
+    if match is None or len(name) != len(table) + 8:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return date(year, month, 1)
+
+
+def upcoming_months(now_value: date | datetime, months_ahead: int) -> list[date]:
+    first = month_start(now_value)
+    return [add_months(first, offset) for offset in range(max(0, int(months_ahead)) + 1)]
+
+
+def expired_partitions(table: str, names: Iterable[str], cutoff: datetime) -> list[str]:
+    """Monthly partitions whose whole range lies before the cutoff, oldest first.
+
+    The default partition never matches the monthly suffix, so it is left to
+    the row-level retention that still applies to it.
+    """
+    cutoff_day = cutoff.date() if isinstance(cutoff, datetime) else cutoff
+    expired: list[tuple[date, str]] = []
+    for name in names:
+        month = partition_month(table, name)
+        if month is not None and add_months(month, 1) <= cutoff_day:
+            expired.append((month, name))
+    return [name for _, name in sorted(expired)]
+
+
+async def partitioned_table_names(session: Any) -> set[str]:
+    from sqlalchemy import text
+
+    result = await session.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_partitioned_table p
+            JOIN pg_class c ON c.oid = p.partrelid
+            WHERE pg_table_is_visible(c.oid)
+            """
+        )
+    )
+    return {str(row[0]) for row in result.fetchall()}
+
+
+async def partition_names(session: Any, table: str) -> list[str]:
+    from sqlalchemy import text
+
+    result = await session.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)
+            """
+        ),
+        {"table": table},
+    )
+    return sorted(str(row[0]) for row in result.fetchall())
+
+
+async def pending_backfills(session: Any) -> dict[str, dict[str, int]]:
+    """Tables whose partitioned copy is still being filled, keyed by live table name."""
+    from sqlalchemy import text
+
+    if (await session.execute(text("SELECT to_regclass('time_partition_backfills')"))).scalar() is None:
+        return {}
+    result = await session.execute(
+        text("SELECT table_name, copied_id, max_id FROM time_partition_backfills WHERE swapped_at IS NULL")
+    )
+    return {str(row[0]): {"copied_id": int(row[1]), "max_id": int(row[2])} for row in result.fetchall()}
+
+
+async def backfill_partitioned_copy(
+    session_factory: Callable[[], Any],
+    table: PartitionedTable,
+    now_value: datetime,
+    months_ahead: int,
+    batch_ids: int,
+) -> dict[str, Any]:
+    """Copy history into ``<table>_partitioned`` one id batch per transaction, then swap it in.
+
+    Writes to the live table are mirrored by a trigger, so only ids present when
+    the migration ran need copying. The swap gives up after SWAP_LOCK_TIMEOUT and
+    is retried on the next run rather than queueing reads behind it.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.exc import DBAPIError
+
+    async with session_factory() as session:
+        for month in upcoming_months(now_value, months_ahead):
+            await session.execute(
+                text("SELECT fibaro10_ensure_month_partition(:parent, :column, :month, :prefix)"),
+                {"parent": f"{table.table}_partitioned", "column": table.column, "month": month, "prefix": table.table},
+            )
+        await session.commit()
+    remaining = 1
+    while remaining > 0:
+        async with session_factory() as session:
+            remaining = (
+                await session.execute(
+                    text("SELECT fibaro10_fill_partitioned_copy(:parent, :batch_ids)"),
+                    {"parent": table.table, "batch_ids": batch_ids},
+                )
+            ).scalar()
+            await session.commit()
+    async with session_factory() as session:
+        try:
+            await session.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+            swapped = bool((await session.execute(text("SELECT fibaro10_swap_partitioned_copy(:parent)"), {"parent": table.table})).scalar())
+            await session.commit()
+        except DBAPIError as exc:
+            if getattr(exc.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE:
+                raise
+            await session.rollback()
+            swapped = False
+    return {"copied": True, "swapped": swapped}
+
+
+async def maintain_time_partitions(
+    session_factory: Callable[[], Any],
+    tables: Iterable[PartitionedTable],
+    now_value: datetime,
+    months_ahead: int,
+    backfill_batch_ids: int = 10000,
+) -> dict[str, dict[str, Any]]:
+    from sqlalchemy import text
+
+    tables = list(tables)
+    results: dict[str, dict[str, Any]] = {}
+    async with session_factory() as session:
+        backfills = await pending_backfills(session)
+    for table in tables:
+        if table.table in backfills:
+            results[table.table] = {
+                "backfill": await backfill_partitioned_copy(session_factory, table, now_value, months_ahead, backfill_batch_ids)
+            }
+    async with session_factory() as session:
+        partitioned = await partitioned_table_names(session)
+        for table in tables:
+            backfill = results.get(table.table, {}).get("backfill")
+            if table.table not in partitioned:
+                results[table.table] = {"partitioned": False, "created": [], "dropped": [], "backfill": backfill}
+                continue
+            created: list[str] = []
+            for month in upcoming_months(now_value, months_ahead):
+                made = (
+                    await session.execute(
+                        text("SELECT fibaro10_ensure_month_partition(:parent, :column, :month)"),
+                        {"parent": table.table, "column": table.column, "month": month},
+                    )
+                ).scalar()
+                if made:
+                    created.append(partition_name(table.table, month))
+            dropped: list[str] = []
+            if table.retention_days > 0:
+                cutoff = now_value - timedelta(days=table.retention_days)
+                existing = await partition_names(session, table.table)
+                for name in expired_partitions(table.table, existing, cutoff):
+                    await session.execute(text(f'ALTER TABLE "{table.table}" DETACH PARTITION "{name}"'))
+                    await session.execute(text(f'DROP TABLE "{name}"'))
+                    dropped.append(name)
+            results[table.table] = {"partitioned": True, "created": created, "dropped": dropped, "backfill": backfill}
+        await session.commit()
+    return results
@@ -7,6 +7,8 @@ from typing import Any, Mapping, Optional
 
 import asyncpg
 
+from .statements import hot_statements
+
 
 EVENT_REFERENCE: dict[str, tuple[str, str]] = {
     "smartDetectZone": ("AI-detektering", "Objekt registrert i en konfigurert kamerasone."),
@@ -303,7 +305,9 @@ async def register_observation(
     event_type = str(event.get("event_type") or "unknown")
     category, description = event_reference(event_type)
     sample = _catalog_sample(event, policy.catalog_sample_limit_bytes)
-    await pool.execute(
+    await hot_statements.execute(
+        pool,
+        "observe_event_type",
         """
         INSERT INTO unifi_protect_event_type_config (
             console_key, event_type, category, description, store_enabled,
@@ -334,7 +338,9 @@ async def register_observation(
     )
     for detection_type in event.get("smart_detect_types") or ():
         display_name, detection_category, detection_description = detection_reference(str(detection_type))
-        await pool.execute(
+        await hot_statements.execute(
+            pool,
+            "observe_detection_type",
             """
             INSERT INTO unifi_protect_detection_type_config (
                 console_key, detection_type, display_name, category, description,
@@ -356,7 +362,9 @@ async def register_observation(
         )
     camera_id = event.get("camera_id")
     if camera_id:
-        await pool.execute(
+        await hot_statements.execute(
+            pool,
+            "observe_camera_event",
             """
             UPDATE unifi_protect_cameras
             SET observed_event_count = observed_event_count + 1,
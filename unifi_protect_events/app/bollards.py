@@ -18,6 +18,8 @@ import asyncpg
 import cv2
 import numpy as np
 
+from .statements import hot_statements
+
 
 logger = logging.getLogger("unifi_protect_events.bollards")
 
@@ -1973,7 +1975,9 @@ class BollardService:
             status = "changed"
         else:
             status = "normal"
-        await self.pool.execute(
+        await hot_statements.execute(
+            self.pool,
+            "bollard_scene_result",
             """
             UPDATE unifi_protect_bollard_camera_monitors
             SET latest_path = $3, latest_captured_at = $4, overlay_path = $5,
@@ -2060,7 +2064,9 @@ class BollardService:
         else:
             status = "suspected"
             consecutive = int(row["consecutive_abnormal"] or 0) + 1
-        await self.pool.execute(
+        await hot_statements.execute(
+            self.pool,
+            "bollard_region_result",
             """
             UPDATE unifi_protect_bollard_regions
             SET status = $3, last_match_score = $4, last_expected_score = $5,
@@ -2104,7 +2110,9 @@ class BollardService:
             status = "changed"
         else:
             status = "normal"
-        await self.pool.execute(
+        await hot_statements.execute(
+            self.pool,
+            "bollard_fixed_asset_result",
             """
             UPDATE unifi_protect_fixed_asset_monitors
             SET latest_path = $3, latest_captured_at = $4, overlay_path = $5,
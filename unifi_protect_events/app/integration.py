@@ -7,6 +7,8 @@ import hashlib
 import hmac
 import json
 import re
+import secrets
+from collections import deque
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from typing import Any, AsyncIterator, Mapping, Optional, Sequence
@@ -68,6 +70,10 @@ RECOGNITION_SCHEMA_STATEMENTS = (
         ON unifi_protect_recognitions (console_key, occurred_at DESC, recognition_id DESC)
     """,
     """
+    CREATE INDEX IF NOT EXISTS ix_unifi_protect_recognitions_received
+        ON unifi_protect_recognitions (console_key, received_at)
+    """,
+    """
     CREATE INDEX IF NOT EXISTS ix_unifi_protect_recognitions_value
         ON unifi_protect_recognitions (console_key, kind, normalized_value, occurred_at DESC)
     """,
@@ -280,41 +286,205 @@ def decode_cursor(value: str) -> tuple[datetime, str]:
         raise ValueError("Invalid cursor") from error
 
 
+class BrokerSubscription:
+    def __init__(self, identifier: int, queue_size: int, connected_at: datetime, last_sequence: int, last_event_id: str):
+        self.identifier = identifier
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=queue_size)
+        self.connected_at = connected_at
+        self.last_sequence = last_sequence
+        self.last_event_id = last_event_id
+        self.delivered = 0
+        self.overflows = 0
+        self.lagged = False
+
+    def acknowledge(self, event: Mapping[str, Any]) -> None:
+        if int(event["sequence"]) >= self.last_sequence:
+            self.last_sequence = int(event["sequence"])
+            self.last_event_id = str(event["id"])
+        self.delivered += 1
+
+
 class EventBroker:
-    def __init__(self, queue_size: int = 100):
+    """Fan-out of live events with a replay ring.
+
+    Every event gets a sequence number and a stream id built with
+    ``encode_cursor`` from the time it was stored and ``<epoch>:<sequence>``.
+    A subscriber whose queue fills up is marked lagged and catches up from
+    the ring instead of losing events; ids older than the ring or from an
+    earlier process fall back to ``replay_stream_events``.
+    """
+
+    def __init__(self, queue_size: int = 100, ring_size: int = 2000):
         self.queue_size = queue_size
-        self._subscribers: set[asyncio.Queue[dict[str, Any]]] = set()
+        self.epoch = secrets.token_hex(4)
+        self.sequence = 0
+        self.published = 0
+        self._ring: deque[dict[str, Any]] = deque(maxlen=max(1, ring_size))
+        self._subscribers: set[BrokerSubscription] = set()
+        self._next_subscriber = 0
         self._lock = asyncio.Lock()
 
+    def event_id(self, stored_at: datetime, sequence: int) -> str:
+        return encode_cursor(stored_at, f"{self.epoch}:{sequence}")
+
+    def current_id(self) -> str:
+        return self.event_id(utc_now(), self.sequence)
+
+    def parse_event_id(self, value: str) -> tuple[datetime, Optional[int]]:
+        """Return the stored time and, for ids from this process, the sequence."""
+        stored_at, identifier = decode_cursor(value)
+        epoch, _, sequence = identifier.partition(":")
+        if epoch != self.epoch or not sequence.isdigit():
+            return stored_at, None
+        return stored_at, int(sequence)
+
     @asynccontextmanager
-    async def subscribe(self) -> AsyncIterator[asyncio.Queue[dict[str, Any]]]:
-        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=self.queue_size)
+    async def subscribe(self) -> AsyncIterator[BrokerSubscription]:
         async with self._lock:
-            self._subscribers.add(queue)
+            self._next_subscriber += 1
+            subscription = BrokerSubscription(
+                self._next_subscriber,
+                self.queue_size,
+                utc_now(),
+                self.sequence,
+                self.current_id(),
+            )
+            self._subscribers.add(subscription)
         try:
-            yield queue
+            yield subscription
         finally:
             async with self._lock:
-                self._subscribers.discard(queue)
+                self._subscribers.discard(subscription)
 
-    async def publish(self, event: dict[str, Any]) -> None:
+    async def publish(self, event: dict[str, Any], stored_at: Optional[datetime] = None) -> dict[str, Any]:
         async with self._lock:
-            queues = tuple(self._subscribers)
-        for queue in queues:
-            if queue.full():
-                try:
-                    queue.get_nowait()
-                except asyncio.QueueEmpty:
-                    pass
+            self.sequence += 1
+            self.published += 1
+            stamped = {
+                **event,
+                "sequence": self.sequence,
+                "id": self.event_id(stored_at or utc_now(), self.sequence),
+            }
+            self._ring.append(stamped)
+            subscriptions = tuple(self._subscribers)
+        for subscription in subscriptions:
+            if subscription.lagged:
+                continue
             try:
-                queue.put_nowait(event)
+                subscription.queue.put_nowait(stamped)
             except asyncio.QueueFull:
-                pass
+                subscription.lagged = True
+                subscription.overflows += 1
+        return stamped
+
+    def events_after(self, sequence: int) -> Optional[list[dict[str, Any]]]:
+        """Ring events newer than ``sequence``, or ``None`` once the ring has rolled past it."""
+        if sequence > self.sequence:
+            return None
+        oldest = self._ring[0]["sequence"] if self._ring else self.sequence + 1
+        if sequence < oldest - 1:
+            return None
+        return [event for event in self._ring if event["sequence"] > sequence]
+
+    def drain(self, subscription: BrokerSubscription) -> None:
+        """Empty a lagged subscriber's queue; it then catches up from its last delivered id."""
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.lagged = False
 
     @property
     def subscriber_count(self) -> int:
         return len(self._subscribers)
 
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "sequence": self.sequence,
+            "published": self.published,
+            "ring_size": len(self._ring),
+            "ring_capacity": self._ring.maxlen,
+            "oldest_sequence": self._ring[0]["sequence"] if self._ring else None,
+            "subscribers": [
+                {
+                    "id": subscription.identifier,
+                    "connected_at": subscription.connected_at.isoformat(),
+                    "delivered": subscription.delivered,
+                    "queue_depth": subscription.queue.qsize(),
+                    "lag": self.sequence - subscription.last_sequence,
+                    "overflows": subscription.overflows,
+                    "lagged": subscription.lagged,
+                }
+                for subscription in sorted(self._subscribers, key=lambda item: item.identifier)
+            ],
+        }
+
+
+async def replay_stream_events(
+    pool: asyncpg.Pool,
+    console_key: str,
+    broker: EventBroker,
+    since: datetime,
+    *,
+    limit: int = 500,
+) -> Optional[list[dict[str, Any]]]:
+    """Rebuild stream events stored at or after ``since`` from the database.
+
+    Returns ``None`` when more than ``limit`` rows changed; the client should
+    then reload in full. The boundary is inclusive, so a consumer may see an
+    event it already has and must treat events as idempotent by their ids.
+    """
+    # Ids carry the sequence from before the query, so live events published
+    # meanwhile still follow and a later reconnect continues from the ring.
+    sequence = broker.sequence
+    events, recognitions = await asyncio.gather(
+        pool.fetch(
+            """
+            SELECT source_event_id, event_type, camera_id, camera_name, smart_detect_types,
+                   COALESCE(start_at, last_received_at) AS occurred_at, snapshot_status,
+                   last_received_at AS stored_at
+            FROM unifi_protect_events
+            WHERE console_key = $1 AND last_received_at >= $2
+            ORDER BY last_received_at, source_event_id
+            LIMIT $3
+            """,
+            console_key,
+            since,
+            limit + 1,
+        ),
+        pool.fetch(
+            """
+            SELECT recognition_id, kind, value, normalized_value, is_known,
+                   camera_id, camera_name, source_event_id, occurred_at,
+                   received_at, correlation_status, received_at AS stored_at
+            FROM unifi_protect_recognitions
+            WHERE console_key = $1 AND received_at >= $2
+              AND COALESCE(source_device, '') <> 'FAKE_MAC'
+            ORDER BY received_at, recognition_id
+            LIMIT $3
+            """,
+            console_key,
+            since,
+            limit + 1,
+        ),
+    )
+    if len(events) + len(recognitions) > limit:
+        return None
+    replayed: list[tuple[datetime, dict[str, Any]]] = []
+    for row in events:
+        data = dict(row)
+        stored_at = data.pop("stored_at")
+        data["smart_detect_types"] = list(data.get("smart_detect_types") or ())
+        data["occurred_at"] = data["occurred_at"].isoformat() if data.get("occurred_at") else None
+        replayed.append((stored_at, {"type": "event", "data": data}))
+    for row in recognitions:
+        data = dict(row)
+        stored_at = data.pop("stored_at")
+        replayed.append((stored_at, {"type": "recognition", "data": data}))
+    replayed.sort(key=lambda item: item[0])
+    return [
+        {**event, "sequence": sequence, "id": broker.event_id(stored_at, sequence)}
+        for stored_at, event in replayed
+    ]
+
 
 def request_token(request: Request) -> str:
     authorization = request.headers.get("Authorization", "")
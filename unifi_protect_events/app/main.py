@@ -28,6 +28,7 @@ from .build_log import (
     protect_ledger_build_log_payload,
     protect_ledger_build_summary,
 )
+from .statements import hot_statements
 
 
 logger = logging.getLogger("unifi_protect_events")
@@ -294,6 +295,8 @@ class Settings:
     snapshot_workers: int = 2
     snapshot_queue_size: int = 1000
     recognition_snapshot_workers: int = 2
+    stream_ring_size: int = 2000
+    stream_replay_limit: int = 500
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -330,6 +333,8 @@ class Settings:
                 1,
                 min(8, int(os.getenv("UNIFI_PROTECT_RECOGNITION_SNAPSHOT_WORKERS", "2"))),
             ),
+            stream_ring_size=max(100, min(100000, int(os.getenv("UNIFI_PROTECT_STREAM_RING_SIZE", "2000")))),
+            stream_replay_limit=max(10, min(5000, int(os.getenv("UNIFI_PROTECT_STREAM_REPLAY_LIMIT", "500")))),
         )
 
 
@@ -357,7 +362,7 @@ class ProtectEventCollector:
         self.last_retention_bollard_incidents = 0
         self.started_at = datetime.now(timezone.utc)
         self._ssl_context = self._make_ssl_context()
-        self.broker = integration.EventBroker()
+        self.broker = integration.EventBroker(ring_size=settings.stream_ring_size)
         self.snapshot_queue: asyncio.Queue[Mapping[str, Any]] = asyncio.Queue(
             maxsize=settings.snapshot_queue_size
         )
@@ -390,6 +395,7 @@ class ProtectEventCollector:
             min_size=1,
             max_size=5,
             command_timeout=30,
+            init=hot_statements.connection_opened,
         )
         for statement in SCHEMA_STATEMENTS:
             await self.pool.execute(statement)
@@ -424,6 +430,7 @@ class ProtectEventCollector:
             valid_cache_days=max(1, int(os.getenv("PROTECT_PLATE_VALIDATION_CACHE_DAYS", "30"))),
             negative_cache_days=max(1, int(os.getenv("PROTECT_PLATE_NEGATIVE_CACHE_DAYS", "7"))),
             transient_retry_minutes=max(5, int(os.getenv("PROTECT_PLATE_RETRY_MINUTES", "30"))),
+            shared_registry=env_bool("PROTECT_PLATE_SHARED_REGISTRY", True),
         )
         self.plate_validator = plate_validation.PlateValidator(
             self.pool,
@@ -641,7 +648,9 @@ class ProtectEventCollector:
             if camera_id and self.policy is not None and self.policy.snapshots_enabled
             else "not_requested"
         )
-        await self.pool.execute(
+        await hot_statements.execute(
+            self.pool,
+            "store_event",
             """
             INSERT INTO unifi_protect_events (
                 console_key, source_event_id, message_type, event_type, model_key,
@@ -705,7 +714,8 @@ class ProtectEventCollector:
                     "occurred_at": (event.get("start_at") or now).isoformat(),
                     "snapshot_status": snapshot_status,
                 },
-            }
+            },
+            stored_at=now,
         )
 
     async def enqueue_snapshot(self, event: Mapping[str, Any]) -> None:
@@ -1161,6 +1171,8 @@ class ProtectEventCollector:
             "recognition_snapshot_queue_depth": self.recognition_snapshot_queue.qsize(),
             "recognition_snapshot_workers": len(self.recognition_snapshot_tasks),
             "stream_subscribers": self.broker.subscriber_count,
+            "stream": self.broker.metrics(),
+            "prepared_statements": hot_statements.payload(),
             "started_at": self.started_at.isoformat(),
             "last_connected_at": self.last_connected_at.isoformat() if self.last_connected_at else None,
             "last_event_at": self.last_event_at.isoformat() if self.last_event_at else None,
@@ -2168,27 +2180,87 @@ async def api_v1_alarm_webhook(request: Request) -> dict[str, Any]:
     ):
         current.plate_validator.wake()
     for recognition in result["recognitions"]:
-        await current.broker.publish({"type": "recognition", "data": recognition})
+        await current.broker.publish(
+            {"type": "recognition", "data": recognition},
+            stored_at=recognition.get("received_at"),
+        )
     return result
 
 
+def stream_frame(event: Mapping[str, Any]) -> str:
+    payload = json.dumps(event["data"], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+def stream_reset_frame(current: "ProtectEventCollector", reason: str) -> str:
+    return f"id: {current.broker.current_id()}\nevent: reset\ndata: {json.dumps({'reason': reason})}\n\n"
+
+
+async def stream_catch_up(
+    current: "ProtectEventCollector",
+    last_event_id: str,
+) -> tuple[list[dict[str, Any]], Optional[str]]:
+    """Events a consumer missed since ``last_event_id``, or a reset reason when they cannot be rebuilt."""
+    try:
+        stored_at, sequence = current.broker.parse_event_id(last_event_id)
+    except ValueError:
+        return [], "invalid_id"
+    if sequence is not None:
+        events = current.broker.events_after(sequence)
+        if events is not None:
+            return events, None
+    if current.pool is None:
+        return [], "unavailable"
+    events = await integration.replay_stream_events(
+        current.pool,
+        current.settings.console_key,
+        current.broker,
+        stored_at,
+        limit=current.settings.stream_replay_limit,
+    )
+    if events is None:
+        return [], "too_many_changes"
+    return events, None
+
+
 @app.get("/api/v1/stream")
 async def api_v1_stream(request: Request) -> StreamingResponse:
     current = active_collector()
     require_read_api(request, current)
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id", "")
 
     async def stream() -> Any:
         yield "retry: 3000\n\n"
-        async with current.broker.subscribe() as queue:
+        async with current.broker.subscribe() as subscription:
+            if last_event_id.strip():
+                missed, reset_reason = await stream_catch_up(current, last_event_id.strip())
+                if reset_reason:
+                    yield stream_reset_frame(current, reset_reason)
+                for event in missed:
+                    subscription.acknowledge(event)
+                    yield stream_frame(event)
             while True:
                 if await request.is_disconnected():
                     break
+                if subscription.lagged:
+                    # Replay what the full queue could not hold instead of dropping it.
+                    current.broker.drain(subscription)
+                    missed, reset_reason = await stream_catch_up(current, subscription.last_event_id)
+                    if reset_reason:
+                        yield stream_reset_frame(current, reset_reason)
+                    for event in missed:
+                        subscription.acknowledge(event)
+                        yield stream_frame(event)
+                    continue
                 try:
-                    event = await asyncio.wait_for(queue.get(), timeout=20)
-                    payload = json.dumps(event["data"], ensure_ascii=False, default=str)
-                    yield f"event: {event['type']}\ndata: {payload}\n\n"
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=20)
                 except asyncio.TimeoutError:
                     yield ": keepalive\n\n"
+                    continue
+                if event["sequence"] <= subscription.last_sequence:
+                    continue
+                subscription.acknowledge(event)
+                yield stream_frame(event)
 
     return StreamingResponse(
         stream(),
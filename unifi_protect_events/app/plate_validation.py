@@ -154,6 +154,39 @@ def source_result(
     }
 
 
+def shared_svv_source(row: Mapping[str, Any], checked_at: datetime) -> Optional[dict[str, Any]]:
+    """Translate a ``/api/resolve`` row from the shared registry cache into a Norway source result.
+
+    Returns ``None`` when the shared service cannot ask SVV itself, so the
+    caller falls back to a direct lookup.
+    """
+    status = int(row.get("http_status") or 0)
+    if status == 0:
+        return None
+    data = row.get("data") if isinstance(row.get("data"), Mapping) else {}
+    raw = data.get("raw")
+    error = str(row.get("error") or "").strip() or None
+    url = str(row.get("url") or "") or None
+    if status == 200 and first_vehicle(raw):
+        return source_result(status=200, checked_at=checked_at, outcome="confirmed", data=raw, url=url)
+    if status == 200 or status in PERMANENT_NO_MATCH:
+        return source_result(
+            status=204 if status == 200 else status,
+            checked_at=checked_at,
+            outcome="not_found",
+            error=error or "Ingen treff hos Statens vegvesen",
+            data=raw,
+            url=url,
+        )
+    return source_result(
+        status=status,
+        checked_at=checked_at,
+        outcome="transient_error" if status in TRANSIENT_HTTP_STATUSES or status >= 500 else "error",
+        error=error or f"HTTP {status} fra Statens vegvesen",
+        url=url,
+    )
+
+
 def public_validation(row: Optional[Mapping[str, Any]]) -> dict[str, Any]:
     if not row:
         return {
@@ -219,6 +252,7 @@ class ValidationSettings:
     valid_cache_days: int = 30
     negative_cache_days: int = 7
     transient_retry_minutes: int = 30
+    shared_registry: bool = True
 
 
 class PlateValidator:
@@ -413,7 +447,31 @@ class PlateValidator:
             "parking_count": int(parking["parking_count"] or 0),
         }
 
+    async def _shared_svv_lookup(self, plate: str) -> Optional[dict[str, Any]]:
+        if not self.settings.shared_registry or not self.settings.car_info_url:
+            return None
+        checked_at = utc_now()
+        headers = {"Accept": "application/json"}
+        if self.settings.car_info_token:
+            headers["X-Car-Info-Token"] = self.settings.car_info_token
+        url = f"{self.settings.car_info_url.rstrip('/')}/api/resolve"
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.settings.timeout_seconds + 5)
+            async with self.session.post(
+                url, json={"plates": [plate], "registry": "svv"}, headers=headers, timeout=timeout
+            ) as response:
+                response.raise_for_status()
+                payload = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as error:
+            logger.warning("Shared registry lookup failed for %s, asking SVV directly: %s", plate, error)
+            return None
+        rows = [row for row in payload.get("results") or [] if isinstance(row, Mapping)]
+        return shared_svv_source(rows[0], checked_at) if rows else None
+
     async def _svv_lookup(self, plate: str) -> dict[str, Any]:
+        shared = await self._shared_svv_lookup(plate)
+        if shared is not None:
+            return shared
         checked_at = utc_now()
         if not self.settings.svv_api_key:
             return source_result(
@@ -0,0 +1,78 @@
+"""Hot statements prepared once per pooled connection.
+
+The event, observation and bollard paths run the same few statements many
+times a minute. They are prepared by name on each connection the first time
+they are used and reused from then on; ``payload`` reports how often a
+prepared statement was reused versus prepared.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+
+class StatementRegistry:
+    def __init__(self) -> None:
+        self._sql: dict[str, str] = {}
+        self._prepared: dict[int, dict[str, PreparedStatement]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reprepared = 0
+
+    async def connection_opened(self, connection: asyncpg.Connection) -> None:
+        """Pool ``init`` hook: forget statements of an earlier connection with the same backend pid."""
+        pid = connection.get_server_pid()
+        self._prepared.pop(pid, None)
+        connection.add_termination_listener(lambda _connection, pid=pid: self._prepared.pop(pid, None))
+
+    async def _statement(self, connection: Any, name: str, sql: str) -> PreparedStatement:
+        known = self._sql.setdefault(name, sql)
+        if known != sql:
+            raise ValueError(f"Statement {name} is already registered with different SQL")
+        statements = self._prepared.setdefault(connection.get_server_pid(), {})
+        statement = statements.get(name)
+        if statement is not None:
+            self.hits += 1
+            return statement
+        self.misses += 1
+        statement = await connection.prepare(sql)
+        statements[name] = statement
+        return statement
+
+    async def _run(self, pool: asyncpg.Pool, method: str, name: str, sql: str, args: tuple[Any, ...]) -> Any:
+        async with pool.acquire() as connection:
+            statement = await self._statement(connection, name, sql)
+            try:
+                return await getattr(statement, method)(*args)
+            except (asyncpg.InterfaceError, asyncpg.exceptions.InvalidCachedStatementError):
+                # A schema change or a reset invalidated the statement; prepare it again once.
+                self._prepared.get(connection.get_server_pid(), {}).pop(name, None)
+                self.reprepared += 1
+                statement = await self._statement(connection, name, sql)
+                return await getattr(statement, method)(*args)
+
+    async def execute(self, pool: asyncpg.Pool, name: str, sql: str, *args: Any) -> None:
+        await self._run(pool, "fetch", name, sql, args)
+
+    async def fetch(self, pool: asyncpg.Pool, name: str, sql: str, *args: Any) -> list[asyncpg.Record]:
+        return await self._run(pool, "fetch", name, sql, args)
+
+    async def fetchrow(self, pool: asyncpg.Pool, name: str, sql: str, *args: Any) -> asyncpg.Record | None:
+        return await self._run(pool, "fetchrow", name, sql, args)
+
+    def payload(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "registered": len(self._sql),
+            "connections": len(self._prepared),
+            "prepare_hits": self.hits,
+            "prepare_misses": self.misses,
+            "reprepared": self.reprepared,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+        }
+
+
+hot_statements = StatementRegistry()
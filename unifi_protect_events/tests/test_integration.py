@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from starlette.requests import Request
 
 from unifi_protect_events.app.integration import (
+    EventBroker,
     add_plate_quality,
     decode_cursor,
     daily_license_plates,
@@ -13,8 +14,9 @@ from unifi_protect_events.app.integration import (
     list_recognitions,
     require_webhook,
     recognition_kind,
+    replay_stream_events,
 )
-from unifi_protect_events.app.plate_validation import public_validation
+from unifi_protect_events.app.plate_validation import public_validation, shared_svv_source
 
 
 class _SearchPool:
@@ -210,6 +212,20 @@ class PlateQualityTests(unittest.TestCase):
         self.assertFalse(transient["likely_misread"])
         self.assertIsNone(transient["is_valid"])
 
+    def test_shared_registry_rows_map_to_norway_sources(self):
+        checked_at = datetime(2026, 7, 21, 12, 30, tzinfo=timezone.utc)
+        vehicle = {"kjoretoydataListe": [{"kjoretoyId": {"kjennemerke": "AB 12345"}}]}
+
+        confirmed = shared_svv_source({"http_status": 200, "data": {"raw": vehicle}, "url": "svv"}, checked_at)
+        not_found = shared_svv_source({"http_status": 204, "data": {}, "error": None}, checked_at)
+        limited = shared_svv_source({"http_status": 429, "data": {}, "error": "svv er i backoff"}, checked_at)
+
+        self.assertEqual(confirmed["outcome"], "confirmed")
+        self.assertEqual(confirmed["data"], vehicle)
+        self.assertEqual(not_found["outcome"], "not_found")
+        self.assertEqual(limited["outcome"], "transient_error")
+        self.assertIsNone(shared_svv_source({"http_status": 0, "error": "SVV_API_KEY mangler"}, checked_at))
+
     def test_confirmed_plate_wins_over_nearby_ocr_variant(self):
         observed = datetime(2026, 7, 21, 12, 30, tzinfo=timezone.utc)
         items = [
@@ -280,5 +296,71 @@ class PlateQualityTests(unittest.TestCase):
         self.assertEqual(items[1]["presentation_status"], "pending_review")
 
 
+class _ReplayPool:
+    def __init__(self, events, recognitions):
+        self.results = [events, recognitions]
+        self.queries = []
+
+    async def fetch(self, query, *arguments):
+        self.queries.append((query, arguments))
+        return self.results[len(self.queries) - 1]
+
+
+class EventBrokerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_full_subscriber_is_marked_lagged_and_catches_up_from_the_ring(self):
+        broker = EventBroker(queue_size=1, ring_size=10)
+        async with broker.subscribe() as subscription:
+            first = await broker.publish({"type": "event", "data": {"n": 1}})
+            await broker.publish({"type": "event", "data": {"n": 2}})
+            self.assertTrue(subscription.lagged)
+            self.assertEqual(broker.metrics()["subscribers"][0]["lag"], 2)
+
+            subscription.acknowledge(await subscription.queue.get())
+            broker.drain(subscription)
+            missed = broker.events_after(subscription.last_sequence)
+
+        self.assertEqual(subscription.last_event_id, first["id"])
+        self.assertEqual([event["data"]["n"] for event in missed], [2])
+        self.assertFalse(subscription.lagged)
+
+    async def test_rolled_over_or_foreign_ids_need_the_durable_replay(self):
+        broker = EventBroker(ring_size=2)
+        first = await broker.publish({"type": "event", "data": {}})
+        for _ in range(3):
+            await broker.publish({"type": "event", "data": {}})
+
+        stored_at, sequence = broker.parse_event_id(first["id"])
+        self.assertEqual(sequence, 1)
+        self.assertIsNone(broker.events_after(sequence))
+        self.assertEqual(len(broker.events_after(3)), 1)
+        self.assertIsNone(EventBroker().parse_event_id(first["id"])[1])
+        with self.assertRaises(ValueError):
+            broker.parse_event_id("not-a-cursor")
+
+    async def test_durable_replay_merges_tables_by_stored_time(self):
+        broker = EventBroker()
+        since = datetime(2026, 10, 19, 8, 0, tzinfo=timezone.utc)
+        pool = _ReplayPool(
+            [
+                {
+                    "source_event_id": "evt-1",
+                    "event_type": "smartDetectZone",
+                    "smart_detect_types": ["vehicle"],
+                    "occurred_at": since,
+                    "stored_at": datetime(2026, 10, 19, 8, 5, tzinfo=timezone.utc),
+                }
+            ],
+            [{"recognition_id": 9, "kind": "license_plate", "stored_at": datetime(2026, 10, 19, 8, 1, tzinfo=timezone.utc)}],
+        )
+
+        events = await replay_stream_events(pool, "console", broker, since, limit=10)
+
+        self.assertEqual([event["type"] for event in events], ["recognition", "event"])
+        self.assertEqual(events[1]["data"]["occurred_at"], since.isoformat())
+        self.assertEqual(broker.parse_event_id(events[1]["id"])[0], datetime(2026, 10, 19, 8, 5, tzinfo=timezone.utc))
+        self.assertIn("last_received_at >= $2", pool.queries[0][0])
+        self.assertIsNone(await replay_stream_events(_ReplayPool([{}] * 2, [{}]), "console", broker, since, limit=2))
+
+
 if __name__ == "__main__":
     unittest.main()
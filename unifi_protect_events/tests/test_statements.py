@@ -0,0 +1,79 @@
+import unittest
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+from unifi_protect_events.app.statements import StatementRegistry
+
+
+class _Statement:
+    def __init__(self, connection, sql):
+        self.connection = connection
+        self.sql = sql
+
+    async def fetch(self, *arguments):
+        if self.connection.invalidate:
+            self.connection.invalidate = False
+            raise asyncpg.InterfaceError("the prepared statement is closed")
+        self.connection.executed.append((self.sql, arguments))
+        return []
+
+
+class _Connection:
+    def __init__(self, pid):
+        self.pid = pid
+        self.prepared = []
+        self.executed = []
+        self.invalidate = False
+
+    def get_server_pid(self):
+        return self.pid
+
+    async def prepare(self, sql):
+        self.prepared.append(sql)
+        return _Statement(self, sql)
+
+
+class _Pool:
+    def __init__(self, *connections):
+        self.connections = list(connections)
+        self.turn = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        connection = self.connections[self.turn % len(self.connections)]
+        self.turn += 1
+        yield connection
+
+
+class StatementRegistryTests(unittest.IsolatedAsyncioTestCase):
+    async def test_statements_are_prepared_once_per_connection(self):
+        first, second = _Connection(11), _Connection(12)
+        pool = _Pool(first, second)
+        registry = StatementRegistry()
+
+        for value in range(4):
+            await registry.execute(pool, "touch", "UPDATE t SET n = $1", value)
+
+        self.assertEqual((first.prepared, second.prepared), (["UPDATE t SET n = $1"], ["UPDATE t SET n = $1"]))
+        self.assertEqual([arguments for _, arguments in first.executed + second.executed], [(0,), (2,), (1,), (3,)])
+        self.assertEqual(registry.payload()["prepare_hits"], 2)
+        self.assertEqual(registry.payload()["prepare_misses"], 2)
+
+    async def test_invalidated_statement_is_prepared_again(self):
+        connection = _Connection(11)
+        pool = _Pool(connection)
+        registry = StatementRegistry()
+        await registry.execute(pool, "touch", "UPDATE t SET n = $1", 1)
+        connection.invalidate = True
+
+        await registry.execute(pool, "touch", "UPDATE t SET n = $1", 2)
+
+        self.assertEqual(len(connection.prepared), 2)
+        self.assertEqual(registry.payload()["reprepared"], 1)
+        with self.assertRaises(ValueError):
+            await registry.execute(pool, "touch", "DELETE FROM t")
+
+
+if __name__ == "__main__":
+    unittest.main()